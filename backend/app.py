@@ -1,16 +1,45 @@
 import os
 import os
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 from backend.src.extensions import db
 from backend.src.routes.auth_routes import auth_bp
 from backend.src.routes.user_routes import user_bp
 from backend.src.routes.course_routes import course_bp
 from backend.src.routes.assignment_routes import assignment_bp # Import the assignment blueprint
+from backend.src.routes.event_routes import event_bp
+from backend.src.routes.metrics_routes import metrics_bp
+from backend.src.routes.deletion_routes import deletion_bp
+from backend.src.routes.notification_routes import notification_bp
+from backend.src.routes.dataset_routes import dataset_bp
+from backend.src.commands import register_commands
+from backend.src.utils.rate_limit import limiter
+from backend.src.utils.cache import catalog_cache
+from backend.src.utils.profiler import request_profiler
+from backend.src.utils.timing import server_timing
+from backend.src.utils.pubsub import notification_broker
+from backend.src.utils.timeseries import series_store
+from backend.src.utils.json_provider import make_json_provider
 # Import models for db.create_all()
 from backend.src.models.user_model import User
 from backend.src.models.course_model import Course, Chapter, Enrollment
-from backend.src.models.assignment_model import Assignment, Submission
+from backend.src.models.assignment_model import Assignment, Submission, SubmissionVersion
+from backend.src.models.reminder_model import AssignmentReminder
+from backend.src.models.event_model import LearningEvent
+from backend.src.models.metrics_model import WeeklyLearningActions, DailyActiveUsers, RollupCheckpoint
+from backend.src.models.stats_model import CourseStats, AssignmentStats
+from backend.src.models.deletion_model import DeletionJob
+from backend.src.models.archive_model import SubmissionArchiveSegment, ArchivedSubmission
+from backend.src.models.notification_model import Notification, NotificationCounter, NotificationFanout
+from backend.src.models.dataset_model import Dataset, DatasetSeries
+from backend.src.services.reminder_service import reminder_scheduler
+from backend.src.services.course_service import chapter_rebalancer
+from backend.src.services.deletion_service import deletion_purger
+from backend.src.services.notification_service import notification_fanout
+from backend.src.services.metrics_service import metrics_refresher
+from backend.src.services.event_service import event_buffer
+from backend.src.services.quiz_service import quiz_grader
 
 # Load environment variables from .env file
 load_dotenv()
@@ -29,14 +58,178 @@ def create_app(config_name='default'):
     # Configure JWT token expiration (optional, defaults to 1 hour in security.py if not set)
     app.config['JWT_ACCESS_TOKEN_EXPIRES_HOURS'] = int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRES_HOURS', 1))
 
+    # Due-date reminders: emit reminders REMINDER_LEAD_HOURS before each deadline.
+    # The background worker only runs when explicitly enabled (e.g. on one dedicated process).
+    # Every REMINDER_POLL_SECONDS it reads the deadlines that came within reach and the assignments
+    # created or moved since its last poll, and resumes from its saved checkpoint after a restart.
+    app.config['REMINDER_SCHEDULER_ENABLED'] = os.environ.get('REMINDER_SCHEDULER_ENABLED', 'false').lower() == 'true'
+    app.config['REMINDER_LEAD_HOURS'] = int(os.environ.get('REMINDER_LEAD_HOURS', 24))
+    app.config['REMINDER_POLL_SECONDS'] = int(os.environ.get('REMINDER_POLL_SECONDS', 60))
+
+    # Learning-event ingestion: events are buffered per process and bulk-inserted when the
+    # buffer reaches EVENT_FLUSH_SIZE rows or every EVENT_FLUSH_INTERVAL_SECONDS.
+    # A full buffer (EVENT_BUFFER_CAPACITY rows) makes POST /events/ answer 429.
+    app.config['EVENT_BUFFER_CAPACITY'] = int(os.environ.get('EVENT_BUFFER_CAPACITY', 10000))
+    app.config['EVENT_FLUSH_SIZE'] = int(os.environ.get('EVENT_FLUSH_SIZE', 500))
+    app.config['EVENT_FLUSH_INTERVAL_SECONDS'] = float(os.environ.get('EVENT_FLUSH_INTERVAL_SECONDS', 5))
+    app.config['EVENT_MAX_BATCH_SIZE'] = int(os.environ.get('EVENT_MAX_BATCH_SIZE', 500))
+    app.config['EVENT_MAX_BATCH_BYTES'] = int(os.environ.get('EVENT_MAX_BATCH_BYTES', 512 * 1024))
+    app.config['EVENT_FLUSHER_ENABLED'] = os.environ.get('EVENT_FLUSHER_ENABLED', 'true').lower() == 'true'
+
+    # Metrics rollups: a background worker folds in new rows every METRICS_ROLLUP_MAX_AGE_SECONDS
+    # (read endpoints only read the rollups). With METRICS_REFRESHER_ENABLED=false, run
+    # `flask refresh-metrics` instead (e.g. from cron).
+    app.config['METRICS_REFRESHER_ENABLED'] = os.environ.get('METRICS_REFRESHER_ENABLED', 'true').lower() == 'true'
+    app.config['METRICS_ROLLUP_MAX_AGE_SECONDS'] = int(os.environ.get('METRICS_ROLLUP_MAX_AGE_SECONDS', 60))
+    # Rows are folded in only once they are METRICS_ROLLUP_LAG_SECONDS old, so transactions still in
+    # flight when a refresh runs (and clock drift between workers) are not skipped.
+    app.config['METRICS_ROLLUP_LAG_SECONDS'] = int(os.environ.get('METRICS_ROLLUP_LAG_SECONDS', 120))
+    app.config['WELA_MIN_ACTIONS'] = int(os.environ.get('WELA_MIN_ACTIONS', 3))
+
+    # Rate limiting (token buckets). The auth routes are limited per client IP and per
+    # username/email so bursts of bad credentials are rejected before any bcrypt work.
+    # RATELIMIT_BACKEND=sqlite shares buckets between all worker processes on the host.
+    # The client IP is the socket peer unless TRUSTED_PROXY_COUNT reverse proxies sit in front of
+    # the app: then it is taken from X-Forwarded-For, counting that many hops from the right (the
+    # entries the proxies appended), never from the client-controlled leftmost entry.
+    app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    app.config['RATELIMIT_BACKEND'] = os.environ.get('RATELIMIT_BACKEND', 'memory')
+    app.config['RATELIMIT_SQLITE_PATH'] = os.environ.get('RATELIMIT_SQLITE_PATH', os.path.join(app.instance_path, 'ratelimit.sqlite3'))
+    app.config['TRUSTED_PROXY_COUNT'] = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+    app.config['RATELIMIT_AUTH_IP'] = os.environ.get('RATELIMIT_AUTH_IP', '20/minute')
+    app.config['RATELIMIT_AUTH_IDENTITY'] = os.environ.get('RATELIMIT_AUTH_IDENTITY', '5/minute')
+
+    # Course-catalog cache for GET /courses/ and GET /courses/<id> (serialized responses).
+    # Entries are keyed by version counters that course/chapter/assignment/enrollment writes bump.
+    # The default 'sqlite' backend shares entries and counters between the worker processes of a host;
+    # 'memory' is for a single worker, and its entries expire after CATALOG_CACHE_MEMORY_TTL_SECONDS.
+    app.config['CATALOG_CACHE_ENABLED'] = os.environ.get('CATALOG_CACHE_ENABLED', 'true').lower() == 'true'
+    app.config['CATALOG_CACHE_BACKEND'] = os.environ.get('CATALOG_CACHE_BACKEND', 'sqlite')
+    app.config['CATALOG_CACHE_SQLITE_PATH'] = os.environ.get('CATALOG_CACHE_SQLITE_PATH', os.path.join(app.instance_path, 'catalog_cache.sqlite3'))
+    app.config['CATALOG_CACHE_MAX_ENTRIES'] = int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', 1024))
+    app.config['CATALOG_CACHE_MEMORY_TTL_SECONDS'] = float(os.environ.get('CATALOG_CACHE_MEMORY_TTL_SECONDS', 10))
+
+    # Per-request statistical profiler. Profiles a random PROFILER_SAMPLE_RATE fraction of requests,
+    # and, with PROFILER_HEADER_ENABLED (needs a real SECRET_KEY), any request with a valid signed
+    # X-Profile header (`flask profile-token`), writing flame-graph-ready .folded files to
+    # PROFILER_OUTPUT_DIR, newest PROFILER_MAX_FILES kept. With both off no hooks are installed.
+    app.config['PROFILER_SAMPLE_RATE'] = float(os.environ.get('PROFILER_SAMPLE_RATE', 0.0))
+    app.config['PROFILER_HEADER_ENABLED'] = os.environ.get('PROFILER_HEADER_ENABLED', 'false').lower() == 'true'
+    app.config['PROFILER_INTERVAL_MS'] = float(os.environ.get('PROFILER_INTERVAL_MS', 5))
+    app.config['PROFILER_OUTPUT_DIR'] = os.environ.get('PROFILER_OUTPUT_DIR', os.path.join(app.instance_path, 'profiles'))
+    app.config['PROFILER_MAX_FILES'] = int(os.environ.get('PROFILER_MAX_FILES', 500))
+
+    # Phase timers (jwt, roles, db, serialize, json, app) aggregated into per-route histograms served
+    # by GET /metrics/timings. SERVER_TIMING_HEADER also reports them to every client in a
+    # Server-Timing header; it is off by default since the phases (e.g. bcrypt on /auth/login)
+    # make a timing oracle, so only turn it on for local debugging.
+    app.config['SERVER_TIMING_ENABLED'] = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    app.config['SERVER_TIMING_HEADER'] = os.environ.get('SERVER_TIMING_HEADER', 'false').lower() == 'true'
+
+    # Chapter ordering: Chapter.order is a sparse key, CHAPTER_ORDER_GAP apart after a respace, so
+    # chapters can be placed between neighbours without renumbering. Crowded spots are respaced
+    # in a background thread unless CHAPTER_REBALANCE_ENABLED is false (`flask rebalance-chapters`).
+    app.config['CHAPTER_ORDER_GAP'] = int(os.environ.get('CHAPTER_ORDER_GAP', 1024))
+    app.config['CHAPTER_REBALANCE_ENABLED'] = os.environ.get('CHAPTER_REBALANCE_ENABLED', 'true').lower() == 'true'
+
+    # Course / assignment deletion: rows are hidden at once and purged by a background worker in
+    # batches of DELETION_BATCH_SIZE rows (one short transaction each, DELETION_BATCH_PAUSE_MS apart).
+    # Jobs are stored in the database; any worker with DELETION_WORKER_ENABLED picks them up.
+    app.config['DELETION_WORKER_ENABLED'] = os.environ.get('DELETION_WORKER_ENABLED', 'true').lower() == 'true'
+    app.config['DELETION_BATCH_SIZE'] = int(os.environ.get('DELETION_BATCH_SIZE', 1000))
+    app.config['DELETION_BATCH_PAUSE_MS'] = float(os.environ.get('DELETION_BATCH_PAUSE_MS', 50))
+    app.config['DELETION_POLL_SECONDS'] = int(os.environ.get('DELETION_POLL_SECONDS', 30))
+    app.config['DELETION_STALE_SECONDS'] = int(os.environ.get('DELETION_STALE_SECONDS', 300))
+
+    # Submission history: resubmissions keep older versions as compressed deltas, with a full
+    # compressed snapshot every SUBMISSION_SNAPSHOT_INTERVAL versions to bound rebuild cost.
+    app.config['SUBMISSION_SNAPSHOT_INTERVAL'] = int(os.environ.get('SUBMISSION_SNAPSHOT_INTERVAL', 10))
+
+    # Term archival (`flask archive-submissions`): a course is closed once every assignment's due
+    # date is more than ARCHIVE_GRACE_DAYS old; its submissions then move into compressed,
+    # append-only segments of up to ARCHIVE_SEGMENT_ROWS rows (`flask restore-submissions` undoes it).
+    app.config['ARCHIVE_GRACE_DAYS'] = int(os.environ.get('ARCHIVE_GRACE_DAYS', 30))
+    app.config['ARCHIVE_SEGMENT_ROWS'] = int(os.environ.get('ARCHIVE_SEGMENT_ROWS', 256))
+
+    # Server-Sent Events (GET /notifications/stream): SSE_KEEPALIVE_SECONDS between keep-alive
+    # comments, the last SSE_REPLAY_SIZE events per topic kept for Last-Event-ID replay, streams
+    # closed after SSE_MAX_STREAM_SECONDS (clients reconnect and re-authenticate). SSE_TRANSPORT
+    # 'local' forwards events between worker processes on this host via Unix sockets; 'none'
+    # keeps them in-process (single worker). EventSource cannot send an Authorization header, so
+    # browsers open the stream with ?token= from POST /notifications/stream-token, a token valid
+    # for SSE_TOKEN_TTL_SECONDS.
+    app.config['SSE_KEEPALIVE_SECONDS'] = float(os.environ.get('SSE_KEEPALIVE_SECONDS', 15))
+    app.config['SSE_REPLAY_SIZE'] = int(os.environ.get('SSE_REPLAY_SIZE', 100))
+    app.config['SSE_MAX_STREAM_SECONDS'] = float(os.environ.get('SSE_MAX_STREAM_SECONDS', 3600))
+    app.config['SSE_RETRY_MS'] = int(os.environ.get('SSE_RETRY_MS', 3000))
+    app.config['SSE_TOKEN_TTL_SECONDS'] = int(os.environ.get('SSE_TOKEN_TTL_SECONDS', 60))
+    app.config['SSE_TRANSPORT'] = os.environ.get('SSE_TRANSPORT', 'local')
+    app.config['SSE_TRANSPORT_DIR'] = os.environ.get('SSE_TRANSPORT_DIR', os.path.join(app.instance_path, 'pubsub'))
+
+    # Notification inbox: course-wide notifications (new assignments) are written for courses of up
+    # to NOTIFICATION_INLINE_MAX students in the request's transaction (one INSERT ... SELECT); larger
+    # courses are handed to a background worker that writes NOTIFICATION_FANOUT_BATCH students per batch.
+    app.config['NOTIFICATION_INLINE_MAX'] = int(os.environ.get('NOTIFICATION_INLINE_MAX', 500))
+    app.config['NOTIFICATION_FANOUT_BATCH'] = int(os.environ.get('NOTIFICATION_FANOUT_BATCH', 5000))
+    app.config['NOTIFICATION_WORKER_ENABLED'] = os.environ.get('NOTIFICATION_WORKER_ENABLED', 'true').lower() == 'true'
+    app.config['NOTIFICATION_POLL_SECONDS'] = int(os.environ.get('NOTIFICATION_POLL_SECONDS', 30))
+
+    # Chapter import (POST /courses/<id>/chapters/import): uploads up to IMPORT_MAX_BYTES, Markdown
+    # files up to IMPORT_MAX_FILE_BYTES each, inserted IMPORT_BATCH_ROWS rows per statement.
+    app.config['IMPORT_MAX_BYTES'] = int(os.environ.get('IMPORT_MAX_BYTES', 50 * 1024 * 1024))
+    app.config['IMPORT_MAX_FILE_BYTES'] = int(os.environ.get('IMPORT_MAX_FILE_BYTES', 2 * 1024 * 1024))
+    app.config['IMPORT_BATCH_ROWS'] = int(os.environ.get('IMPORT_BATCH_ROWS', 500))
+
+    # Course package export (GET /courses/<id>/export): rows fetched per round trip while the zip
+    # streams out; bounds the export's memory together with the largest single chapter.
+    app.config['EXPORT_YIELD_ROWS'] = int(os.environ.get('EXPORT_YIELD_ROWS', 200))
+
+    # Monitoring datasets: series points are stored as arrays under DATASET_STORAGE_DIR (keep it on
+    # a disk every worker shares). Charts get DATASET_CHART_POINTS points per series unless they ask
+    # for another budget, at most DATASET_MAX_CHART_POINTS; uploads are limited to DATASET_MAX_UPLOAD_BYTES.
+    app.config['DATASET_STORAGE_DIR'] = os.environ.get('DATASET_STORAGE_DIR', os.path.join(app.instance_path, 'datasets'))
+    app.config['DATASET_CHART_POINTS'] = int(os.environ.get('DATASET_CHART_POINTS', 1000))
+    app.config['DATASET_MAX_CHART_POINTS'] = int(os.environ.get('DATASET_MAX_CHART_POINTS', 5000))
+    app.config['DATASET_MAX_UPLOAD_BYTES'] = int(os.environ.get('DATASET_MAX_UPLOAD_BYTES', 32 * 1024 * 1024))
+
+    # Quiz grading: re-grading a quiz after its answer key changes scores submissions in chunks of
+    # QUIZ_GRADING_CHUNK, spread over QUIZ_GRADING_WORKERS processes when there are several chunks
+    # (0 or 1 grades in the request's process).
+    app.config['QUIZ_GRADING_WORKERS'] = int(os.environ.get('QUIZ_GRADING_WORKERS', min(4, os.cpu_count() or 1)))
+    app.config['QUIZ_GRADING_CHUNK'] = int(os.environ.get('QUIZ_GRADING_CHUNK', 2000))
+
+    # JSON encoding: 'orjson' (fast, optional dependency), 'stdlib', or 'auto' (orjson if installed).
+    # Both encode datetimes as ISO 8601 and enums by value, so to_dict() leaves them as-is.
+    app.config['JSON_PROVIDER'] = os.environ.get('JSON_PROVIDER', 'auto')
+    app.json = make_json_provider(app)
+
+    if app.config['TRUSTED_PROXY_COUNT'] > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_COUNT'])
+
     # Initialize extensions
     db.init_app(app)
+    limiter.init_app(app)
+    catalog_cache.init_app(app)
+    request_profiler.init_app(app)
+    server_timing.init_app(app)
+    chapter_rebalancer.init_app(app)
+    notification_broker.init_app(app)
+    series_store.init_app(app)
+    quiz_grader.init_app(app)
 
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(user_bp)
     app.register_blueprint(course_bp)
     app.register_blueprint(assignment_bp) # Register the assignment blueprint
+    app.register_blueprint(event_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(deletion_bp)
+    app.register_blueprint(notification_bp)
+    app.register_blueprint(dataset_bp)
+
+    # CLI maintenance commands (flask refresh-metrics, flask rebuild-stats, ...)
+    register_commands(app)
 
     # Basic "Hello World" route for testing
     @app.route('/')
@@ -49,6 +242,13 @@ def create_app(config_name='default'):
     with app.app_context():
         db.create_all()
 
+    # Seed the deadline index (needs the tables above) and start the worker if enabled
+    reminder_scheduler.init_app(app)
+    event_buffer.init_app(app)
+    deletion_purger.init_app(app)
+    notification_fanout.init_app(app)
+    metrics_refresher.init_app(app)
+
     return app
 
 if __name__ == '__main__':
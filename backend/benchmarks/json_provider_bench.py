@@ -0,0 +1,116 @@
+"""
+Micro-benchmark: JSON encoding of realistic list payloads.
+
+Compares
+  * baseline   - the old path: to_dict pre-stringifies datetimes/enums, then stdlib json
+  * stdlib     - StdlibJSONProvider encoding raw datetimes/enums via its default hook
+  * orjson     - OrJSONProvider (skipped if orjson is not installed)
+
+Payloads mirror the dicts built by Course.to_dict(include_teacher=True, include_enrolled_count=True)
+and Submission.to_dict(include_student=True) for list endpoints.
+
+Run from the repository root:
+    python -m backend.benchmarks.json_provider_bench [--courses 500] [--submissions 5000] [--repeat 20]
+"""
+import argparse
+import enum
+import json
+import random
+import timeit
+from datetime import datetime, timedelta
+from flask import Flask
+from backend.src.utils.json_provider import StdlibJSONProvider, OrJSONProvider, orjson
+
+class Role(enum.Enum):
+    TEACHER = 'teacher'
+
+class SubmissionType(enum.Enum):
+    TEXT = 'text'
+
+def _timestamp(rng: random.Random) -> datetime:
+    return datetime(2024, 1, 1) + timedelta(seconds=rng.randrange(0, 365 * 86400), microseconds=rng.randrange(0, 10**6))
+
+def course_payload(n: int, rng: random.Random) -> list[dict]:
+    courses = []
+    for i in range(n):
+        teacher_created = _timestamp(rng)
+        courses.append({
+            'id': i + 1,
+            'title': f'Environmental Monitoring {i}: Air Quality Sampling',
+            'description': 'PM2.5 / PM10 sampling, calibration and QA/QC procedures. ' * 3,
+            'teacher_id': i % 40 + 1,
+            'created_at': _timestamp(rng),
+            'updated_at': _timestamp(rng),
+            'teacher': {
+                'id': i % 40 + 1, 'username': f'teacher{i % 40}', 'email': f'teacher{i % 40}@example.org',
+                'role': Role.TEACHER, 'first_name': 'Li', 'last_name': 'Wei', 'profile_picture_url': None,
+                'created_at': teacher_created, 'updated_at': teacher_created,
+            },
+            'enrolled_students_count': rng.randrange(0, 300),
+        })
+    return courses
+
+def submission_payload(n: int, rng: random.Random) -> list[dict]:
+    return [{
+        'id': i + 1,
+        'assignment_id': 7,
+        'student_id': i + 100,
+        'submission_type': SubmissionType.TEXT,
+        'content_text': 'Measured dissolved oxygen at three depths; see attached table. ' * 4,
+        'file_url': None,
+        'submitted_at': _timestamp(rng),
+        'grade': '85/100',
+        'score': 85.0,
+        'feedback': None,
+        'student': {'id': i + 100, 'username': f'student{i}', 'email': f'student{i}@example.org'},
+    } for i in range(n)]
+
+def _prestringify(obj):
+    """What the old to_dict methods did: isoformat()/.value before encoding."""
+    if isinstance(obj, dict):
+        return {k: _prestringify(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_prestringify(v) for v in obj]
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    return obj
+
+def run(courses: int, submissions: int, repeat: int):
+    rng = random.Random(42)
+    app = Flask(__name__)
+    payloads = {
+        f'{courses} courses': {'message': 'All courses fetched successfully', 'courses': course_payload(courses, rng)},
+        f'{submissions} submissions': {'message': 'Submissions fetched successfully', 'submissions': submission_payload(submissions, rng)},
+    }
+
+    stdlib = StdlibJSONProvider(app)
+    candidates = {
+        'baseline': lambda p: json.dumps(_prestringify(p)),
+        'stdlib': stdlib.dumps,
+    }
+    if orjson is not None:
+        fast = OrJSONProvider(app)
+        candidates['orjson'] = fast.dumps
+        # Both providers must produce the same document
+        for payload in payloads.values():
+            assert json.loads(fast.dumps(payload)) == json.loads(stdlib.dumps(payload))
+
+    print(f"{'payload':<20} {'provider':<10} {'best ms':>10} {'speedup':>9}")
+    for name, payload in payloads.items():
+        baseline_best = None
+        for provider, dumps in candidates.items():
+            best = min(timeit.repeat(lambda: dumps(payload), number=1, repeat=repeat)) * 1000
+            baseline_best = baseline_best or best
+            print(f"{name:<20} {provider:<10} {best:>10.2f} {baseline_best / best:>8.1f}x")
+    if orjson is None:
+        print("orjson is not installed; install it to benchmark OrJSONProvider.")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--courses', type=int, default=500)
+    parser.add_argument('--submissions', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    run(args.courses, args.submissions, args.repeat)
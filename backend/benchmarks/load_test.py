@@ -0,0 +1,432 @@
+"""
+Load test: a realistic traffic mix against a locally started backend.
+
+The harness
+  1. seeds a SQLite database (students, teachers, courses with chapters and assignments,
+     enrollments and some existing submissions),
+  2. starts the app in a separate process on that database (threaded Werkzeug server,
+     rate limiting off so logins are not throttled),
+  3. runs N concurrent virtual users per step. Each virtual user repeatedly picks a scenario
+     from the weighted mix (closed loop, optional think time), and
+  4. reports throughput, error rate and latency percentiles per step and per endpoint, and
+     the saturation point: the step after which adding users stops adding throughput.
+
+Scenarios (weights via --mix):
+  login        POST /auth/login                                         (bcrypt-bound)
+  my_courses   GET  /courses/my-courses
+  chapters     GET  /courses/<id>/chapters              (an enrolled course)
+  catalog      GET  /courses/
+  submit       POST /assignments/<id>/submissions       (next unsubmitted assignment;
+               falls back to GET .../submissions/me once all are submitted)
+  grade        GET  /assignments/<id>/submissions?fields=id,grade, then
+               POST /assignments/submissions/<id>/grade for an ungraded one
+
+Run from the repository root:
+    python -m backend.benchmarks.load_test [--users 1,2,4,8,16,32] [--duration 15]
+        [--mix login=5,my_courses=30,chapters=30,catalog=15,submit=12,grade=8] [--json results.json]
+
+Against an already running deployment (seed its database first with --seed-only):
+    python -m backend.benchmarks.load_test --seed-only --db /path/to/app.sqlite3
+    python -m backend.benchmarks.load_test --url http://127.0.0.1:5000 --db /path/to/app.sqlite3
+
+The load generator shares one interpreter across its virtual users; if it saturates before the
+server does (its own CPU at 100%), run several copies with --seed-skip against the same --url.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+PASSWORD = 'load-test-password'
+DEFAULT_MIX = 'login=5,my_courses=30,chapters=30,catalog=15,submit=12,grade=8'
+
+# --- Seeding -------------------------------------------------------------------------------------
+
+def seed(db_path: str, students: int, teachers: int, courses: int, chapters: int, assignments: int,
+         enrollments_per_student: int, seed_value: int = 7) -> dict:
+    """Creates the schema and bulk-inserts the data set. Returns the layout the virtual users need."""
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(db_path)}'
+    os.environ.setdefault('EVENT_FLUSHER_ENABLED', 'false')
+    from sqlalchemy import insert
+    from backend.app import create_app
+    from backend.src.extensions import db
+    from backend.src.models import User, RoleEnum, Course, Chapter, Enrollment, Assignment, Submission, SubmissionTypeEnum
+    from backend.src.services import stats_service
+    from backend.src.utils.security import hash_password
+
+    rng = random.Random(seed_value)
+    app = create_app()
+    with app.app_context():
+        password_hash = hash_password(PASSWORD) # One bcrypt hash shared by every seeded account
+        db.session.execute(insert(User), [{
+            'username': f'lt_teacher{i}', 'email': f'lt_teacher{i}@example.org', 'password_hash': password_hash,
+            'role': RoleEnum.TEACHER,
+        } for i in range(teachers)])
+        db.session.execute(insert(User), [{
+            'username': f'lt_student{i}', 'email': f'lt_student{i}@example.org', 'password_hash': password_hash,
+            'role': RoleEnum.STUDENT, 'first_name': 'Load', 'last_name': f'Student {i}',
+        } for i in range(students)])
+        teacher_ids = [row.id for row in db.session.query(User.id).filter(User.username.like('lt_teacher%')).order_by(User.id)]
+        student_ids = [row.id for row in db.session.query(User.id).filter(User.username.like('lt_student%')).order_by(User.id)]
+
+        db.session.execute(insert(Course), [{
+            'title': f'Load Test Course {i}', 'description': 'Air and water quality monitoring. ' * 5,
+            'teacher_id': teacher_ids[i % teachers],
+        } for i in range(courses)])
+        course_rows = db.session.query(Course.id, Course.teacher_id).filter(Course.title.like('Load Test Course %')).order_by(Course.id).all()
+        course_ids = [row.id for row in course_rows]
+
+        db.session.execute(insert(Chapter), [{
+            'course_id': course_id, 'title': f'Chapter {n}', 'content': 'Sensor calibration notes. ' * 40, 'order': n,
+        } for course_id in course_ids for n in range(1, chapters + 1)])
+        db.session.execute(insert(Assignment), [{
+            'course_id': course_id, 'title': f'Assignment {n}', 'description': 'Report your measurements.',
+            'grading_scheme': 'percentage',
+        } for course_id in course_ids for n in range(assignments)])
+        assignment_rows = db.session.query(Assignment.id, Assignment.course_id).filter(Assignment.course_id.in_(course_ids)).order_by(Assignment.id).all()
+        assignments_by_course = defaultdict(list)
+        for row in assignment_rows:
+            assignments_by_course[row.course_id].append(row.id)
+
+        enrolled = {student_id: rng.sample(course_ids, min(enrollments_per_student, len(course_ids))) for student_id in student_ids}
+        db.session.execute(insert(Enrollment), [
+            {'student_id': student_id, 'course_id': course_id}
+            for student_id, course_list in enrolled.items() for course_id in course_list
+        ])
+        # The first third of each course's assignments already has submissions for teachers to grade
+        presubmitted = max(assignments // 3, 1)
+        db.session.execute(insert(Submission), [{
+            'assignment_id': assignment_id, 'student_id': student_id, 'submission_type': SubmissionTypeEnum.TEXT,
+            'content_text': 'Measured PM2.5 at three sites; see table.',
+        } for student_id, course_list in enrolled.items() for course_id in course_list
+          for assignment_id in assignments_by_course[course_id][:presubmitted]])
+        db.session.commit()
+        stats_service.rebuild_all_stats()
+
+    return {
+        'students': [{'username': f'lt_student{i}', 'id': student_id, 'courses': enrolled[student_id]}
+                     for i, student_id in enumerate(student_ids)],
+        'teachers': [{'username': f'lt_teacher{i}', 'id': teacher_id,
+                      'courses': [row.id for row in course_rows if row.teacher_id == teacher_id]}
+                     for i, teacher_id in enumerate(teacher_ids)],
+        'assignments': {course_id: ids for course_id, ids in assignments_by_course.items()},
+        'presubmitted': presubmitted,
+    }
+
+# --- Server --------------------------------------------------------------------------------------
+
+def serve(port: int):
+    """Entry point of the server subprocess (`load_test serve`)."""
+    from werkzeug.serving import run_simple
+    from backend.app import create_app
+    run_simple('127.0.0.1', port, create_app(), threaded=True, use_reloader=False, use_debugger=False)
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(db_path: str) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = dict(os.environ,
+               DATABASE_URL=f'sqlite:///{os.path.abspath(db_path)}',
+               RATELIMIT_ENABLED='false', EVENT_FLUSHER_ENABLED='false')
+    process = subprocess.Popen([sys.executable, '-m', 'backend.benchmarks.load_test', 'serve', '--port', str(port)],
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited during startup:\n{process.stderr.read().decode(errors='replace')}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('Server did not become ready within 30 seconds.')
+
+# --- Virtual users -------------------------------------------------------------------------------
+
+class Recorder:
+    """Thread-safe per-endpoint latency and error collection for one step."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, label: str, seconds: float, ok: bool):
+        with self._lock:
+            self.latencies[label].append(seconds)
+            if not ok:
+                self.errors[label] += 1
+
+class VirtualUser:
+    """One simulated client: a student identity and a teacher identity on a keep-alive connection."""
+
+    def __init__(self, url: str, layout: dict, index: int, recorder: Recorder, rng: random.Random):
+        parts = urlsplit(url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        self.recorder = recorder
+        self.rng = rng
+        self.layout = layout
+        self.student = layout['students'][index % len(layout['students'])]
+        self.teacher = layout['teachers'][index % len(layout['teachers'])]
+        self.tokens = {}
+        # Next assignment index to submit per enrolled course (the first ones are presubmitted)
+        self.next_submission = {course_id: layout['presubmitted'] for course_id in self.student['courses']}
+
+    def request(self, method: str, path: str, label: str, body: dict | None = None, token: str | None = None,
+                expected=(200, 201)) -> tuple[int, dict | None]:
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        payload = json.dumps(body) if body is not None else None
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close() # Reconnects on the next request
+            self.recorder.record(label, time.perf_counter() - started, False)
+            return 0, None
+        self.recorder.record(label, time.perf_counter() - started, status in expected)
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+    def token(self, role: str) -> str | None:
+        if role not in self.tokens:
+            self.login(role)
+        return self.tokens.get(role)
+
+    def login(self, role: str = 'student'):
+        account = self.student if role == 'student' else self.teacher
+        status, data = self.request('POST', '/auth/login', 'POST /auth/login',
+                                    {'username_or_email': account['username'], 'password': PASSWORD})
+        if status == 200 and data:
+            self.tokens[role] = data['access_token']
+
+    # Scenarios
+
+    def scenario_login(self):
+        self.login('student')
+
+    def scenario_my_courses(self):
+        self.request('GET', '/courses/my-courses', 'GET /courses/my-courses', token=self.token('student'))
+
+    def scenario_chapters(self):
+        course_id = self.rng.choice(self.student['courses'])
+        self.request('GET', f'/courses/{course_id}/chapters', 'GET /courses/<id>/chapters', token=self.token('student'))
+
+    def scenario_catalog(self):
+        self.request('GET', '/courses/', 'GET /courses/')
+
+    def scenario_submit(self):
+        open_courses = [c for c in self.student['courses'] if self.next_submission[c] < len(self.layout['assignments'][c])]
+        if not open_courses:
+            course_id = self.rng.choice(self.student['courses'])
+            assignment_id = self.rng.choice(self.layout['assignments'][course_id][:self.layout['presubmitted']])
+            self.request('GET', f'/assignments/{assignment_id}/submissions/me', 'GET /assignments/<id>/submissions/me',
+                         token=self.token('student'))
+            return
+        course_id = self.rng.choice(open_courses)
+        assignment_id = self.layout['assignments'][course_id][self.next_submission[course_id]]
+        self.next_submission[course_id] += 1
+        self.request('POST', f'/assignments/{assignment_id}/submissions', 'POST /assignments/<id>/submissions',
+                     {'submission_type': 'text', 'content_text': 'Dissolved oxygen 7.9 mg/L at 1 m.'},
+                     token=self.token('student'))
+
+    def scenario_grade(self):
+        if not self.teacher['courses']:
+            return
+        course_id = self.rng.choice(self.teacher['courses'])
+        assignment_id = self.rng.choice(self.layout['assignments'][course_id])
+        token = self.token('teacher')
+        status, data = self.request('GET', f'/assignments/{assignment_id}/submissions?fields=id,grade',
+                                    'GET /assignments/<id>/submissions', token=token)
+        if status != 200 or not data:
+            return
+        ungraded = [s['id'] for s in data['submissions'] if s['grade'] is None]
+        if ungraded:
+            self.request('POST', f'/assignments/submissions/{self.rng.choice(ungraded)}/grade',
+                         'POST /assignments/submissions/<id>/grade',
+                         {'grade': f'{self.rng.randint(50, 100)}/100'}, token=token)
+
+SCENARIOS = ('login', 'my_courses', 'chapters', 'catalog', 'submit', 'grade')
+
+def parse_mix(mix: str) -> tuple[list[str], list[float]]:
+    names, weights = [], []
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}'. Choose from {', '.join(SCENARIOS)}.")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+def run_step(url: str, layout: dict, users: int, duration: float, names, weights, think_ms: float, offset: int) -> Recorder:
+    recorder = Recorder()
+    stop = threading.Event()
+
+    def loop(index: int):
+        rng = random.Random(offset + index)
+        user = VirtualUser(url, layout, offset + index, recorder, rng)
+        while not stop.is_set():
+            getattr(user, f'scenario_{rng.choices(names, weights)[0]}')()
+            if think_ms:
+                stop.wait(rng.expovariate(1000.0 / think_ms))
+        user.conn.close()
+
+    threads = [threading.Thread(target=loop, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    stop.wait(duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    return recorder
+
+# --- Reporting -----------------------------------------------------------------------------------
+
+def _percentiles(samples: list[float]) -> dict:
+    if len(samples) < 2:
+        value = samples[0] * 1000 if samples else 0.0
+        return {'p50': value, 'p90': value, 'p95': value, 'p99': value}
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {'p50': cuts[49] * 1000, 'p90': cuts[89] * 1000, 'p95': cuts[94] * 1000, 'p99': cuts[98] * 1000}
+
+def summarize(recorder: Recorder, users: int, duration: float) -> dict:
+    endpoints = {}
+    for label, samples in sorted(recorder.latencies.items()):
+        endpoints[label] = {
+            'requests': len(samples), 'errors': recorder.errors[label],
+            'rps': len(samples) / duration, **_percentiles(samples),
+        }
+    all_samples = [s for samples in recorder.latencies.values() for s in samples]
+    total_errors = sum(recorder.errors.values())
+    return {
+        'users': users, 'requests': len(all_samples), 'errors': total_errors,
+        'rps': len(all_samples) / duration,
+        'error_rate': total_errors / len(all_samples) if all_samples else 0.0,
+        **_percentiles(all_samples), 'endpoints': endpoints,
+    }
+
+def find_saturation(steps: list[dict], min_gain: float = 0.10, max_error_rate: float = 0.01) -> dict | None:
+    """
+    The last step before throughput stopped growing by at least `min_gain` (or errors exceeded
+    `max_error_rate`): beyond it, extra users only add queueing latency.
+    """
+    for previous, current in zip(steps, steps[1:]):
+        if current['error_rate'] > max_error_rate or current['rps'] < previous['rps'] * (1 + min_gain):
+            return previous
+    return None
+
+def print_step(step: dict):
+    print(f"{step['users']:>6} {step['requests']:>9} {step['rps']:>9.1f} {step['error_rate'] * 100:>7.2f}% "
+          f"{step['p50']:>8.1f} {step['p95']:>8.1f} {step['p99']:>8.1f}")
+
+def print_endpoints(step: dict):
+    print(f"\nPer endpoint at {step['users']} users:")
+    print(f"{'endpoint':<42} {'reqs':>7} {'req/s':>8} {'err':>5} {'p50 ms':>8} {'p90 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, e in step['endpoints'].items():
+        print(f"{label:<42} {e['requests']:>7} {e['rps']:>8.1f} {e['errors']:>5} "
+              f"{e['p50']:>8.1f} {e['p90']:>8.1f} {e['p95']:>8.1f} {e['p99']:>8.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command')
+    serve_parser = sub.add_parser('serve', help='(internal) run the app server process')
+    serve_parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--users', default='1,2,4,8,16,32', help='Concurrency steps, comma-separated')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds per step')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Scenario weights, e.g. my_courses=30,grade=8')
+    parser.add_argument('--think-ms', type=float, default=0, help='Mean think time between scenarios (0 = closed loop)')
+    parser.add_argument('--url', help='Target an already running server instead of starting one')
+    parser.add_argument('--db', help='SQLite file to seed / use (default: a temporary file)')
+    parser.add_argument('--seed-only', action='store_true', help='Seed --db and exit')
+    parser.add_argument('--seed-skip', action='store_true', help='Reuse the layout of an already seeded --db')
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--teachers', type=int, default=20)
+    parser.add_argument('--courses', type=int, default=40)
+    parser.add_argument('--chapters', type=int, default=12)
+    parser.add_argument('--assignments', type=int, default=30)
+    parser.add_argument('--enrollments', type=int, default=4, help='Courses per student')
+    parser.add_argument('--json', help='Write all step results to this file')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        serve(args.port)
+        return
+
+    names, weights = parse_mix(args.mix)
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='loadtest-'), 'loadtest.sqlite3')
+    layout_path = db_path + '.layout.json'
+    if args.seed_skip:
+        with open(layout_path) as f:
+            layout = json.load(f)
+        layout['assignments'] = {int(k): v for k, v in layout['assignments'].items()}
+    else:
+        print(f"Seeding {db_path} ...")
+        layout = seed(db_path, args.students, args.teachers, args.courses, args.chapters, args.assignments, args.enrollments)
+        with open(layout_path, 'w') as f:
+            json.dump(layout, f)
+    if args.seed_only:
+        print(f"Seeded; layout written to {layout_path}.")
+        return
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_server(db_path)
+        print(f"Server started at {url} (pid {process.pid}).")
+    try:
+        steps = []
+        print(f"\nMix: {args.mix}; {args.duration:.0f}s per step")
+        print(f"{'users':>6} {'requests':>9} {'req/s':>9} {'errors':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        offset = 0
+        for users in [int(u) for u in args.users.split(',')]:
+            recorder = run_step(url, layout, users, args.duration, names, weights, args.think_ms, offset)
+            offset += users # Fresh identities per step, so submissions do not run out early
+            step = summarize(recorder, users, args.duration)
+            steps.append(step)
+            print_step(step)
+
+        peak = max(steps, key=lambda s: s['rps'])
+        saturation = find_saturation(steps)
+        print_endpoints(peak)
+        if saturation is not None:
+            print(f"\nSaturation at ~{saturation['users']} users: {saturation['rps']:.1f} req/s, "
+                  f"p95 {saturation['p95']:.1f} ms. More users only add latency beyond this point.")
+        else:
+            print("\nNo saturation within the tested steps; add higher --users values.")
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({'mix': args.mix, 'duration': args.duration, 'steps': steps,
+                           'saturation_users': saturation['users'] if saturation else None}, f, indent=2)
+            print(f"Results written to {args.json}.")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+if __name__ == '__main__':
+    main()
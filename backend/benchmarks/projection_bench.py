@@ -0,0 +1,137 @@
+"""
+Benchmark: ORM entity hydration vs column projections for the course list endpoints.
+
+For each list service it compares
+  * orm        - the old path: load mapped entities, then Model.to_dict(...) (lazy loads included)
+  * projection - the current service: column-projection query into response dicts (read_models.project)
+
+and reports best wall time and peak traced memory (tracemalloc) for query + to_dict.
+
+Seeded data (in-memory SQLite):
+  * one course with --rows enrolled students          -> get_students_enrolled_in_course
+  * one student enrolled in --rows courses            -> get_enrolled_courses_for_student
+  * one teacher with --rows / 10 courses x 10 chapters -> get_courses_taught_by_teacher
+
+Run from the repository root:
+    python -m backend.benchmarks.projection_bench [--rows 10000] [--repeat 5]
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('EVENT_FLUSHER_ENABLED', 'false')
+
+from sqlalchemy import insert
+from backend.app import create_app
+from backend.src.extensions import db
+from backend.src.models import User, RoleEnum, Course, Chapter, Enrollment
+from backend.src.services import course_service, stats_service
+from backend.src.utils.fieldsets import Fieldset
+
+def seed(rows: int) -> dict:
+    """Bulk-inserts the benchmark data set; returns the ids each scenario queries."""
+    db.session.execute(insert(User), [
+        {'username': 'teacher', 'email': 'teacher@example.org', 'password_hash': 'x', 'role': RoleEnum.TEACHER},
+        {'username': 'reader', 'email': 'reader@example.org', 'password_hash': 'x', 'role': RoleEnum.STUDENT},
+    ])
+    db.session.execute(insert(User), [{
+        'username': f'student{i:06d}', 'email': f'student{i}@example.org', 'password_hash': 'x' * 60,
+        'role': RoleEnum.STUDENT, 'first_name': 'Field', 'last_name': f'Sampler {i}',
+    } for i in range(rows)])
+    teacher_id, reader_id = 1, 2
+
+    db.session.execute(insert(Course), [{
+        'title': f'Sensor Network Course {i:06d}', 'description': 'Calibration, deployment and QA/QC. ' * 4,
+        'teacher_id': teacher_id,
+    } for i in range(rows)])
+    first_course_id = 1
+
+    # Scenario 1: every seeded student in the first course
+    db.session.execute(insert(Enrollment), [
+        {'student_id': 3 + i, 'course_id': first_course_id} for i in range(rows)
+    ])
+    # Scenario 2: the reader enrolled in every course
+    db.session.execute(insert(Enrollment), [
+        {'student_id': reader_id, 'course_id': first_course_id + i} for i in range(rows)
+    ])
+    # Scenario 3: a second teacher with rows // 10 courses of 10 chapters each
+    db.session.execute(insert(User), [{'username': 'author', 'email': 'author@example.org', 'password_hash': 'x', 'role': RoleEnum.TEACHER}])
+    author_id = db.session.query(User.id).filter_by(username='author').scalar()
+    db.session.execute(insert(Course), [{
+        'title': f'Authored Course {i:05d}', 'description': 'Water quality monitoring.', 'teacher_id': author_id,
+    } for i in range(max(rows // 10, 1))])
+    authored = [row.id for row in db.session.query(Course.id).filter_by(teacher_id=author_id)]
+    db.session.execute(insert(Chapter), [{
+        'course_id': course_id, 'title': f'Chapter {n}', 'content': 'Lorem ipsum dolor sit amet. ' * 20, 'order': n,
+    } for course_id in authored for n in range(1, 11)])
+    db.session.commit()
+    stats_service.rebuild_all_stats() # Materialized counters, as on a live install
+    return {'teacher_id': teacher_id, 'course_id': first_course_id, 'reader_id': reader_id, 'author_id': author_id}
+
+def orm_students(ids):
+    users = User.query.join(Enrollment, Enrollment.student_id == User.id).filter(
+        Enrollment.course_id == ids['course_id']).order_by(User.username).all()
+    return [user.to_dict() for user in users]
+
+def orm_enrolled_courses(ids):
+    courses = Course.query.join(Enrollment, Enrollment.course_id == Course.id).filter(
+        Enrollment.student_id == ids['reader_id']).order_by(Course.title).all()
+    return [course.to_dict(include_chapters=False, include_teacher=True, include_enrolled_count=False) for course in courses]
+
+def orm_taught_courses(ids):
+    courses = Course.query.filter_by(teacher_id=ids['author_id']).order_by(Course.title).all()
+    return [course.to_dict(include_chapters=True, include_teacher=True, include_enrolled_count=True) for course in courses]
+
+TEACHING_FIELDSET = Fieldset(include=frozenset({'teacher', 'chapters', 'enrolled_students_count'}))
+
+SCENARIOS = {
+    'enrolled students': (
+        orm_students,
+        lambda ids: course_service.get_students_enrolled_in_course(ids['course_id'], ids['teacher_id']),
+    ),
+    'my courses': (
+        orm_enrolled_courses,
+        lambda ids: course_service.get_enrolled_courses_for_student(ids['reader_id'], Fieldset(include=frozenset({'teacher'}))),
+    ),
+    'teaching courses': (
+        orm_taught_courses,
+        lambda ids: course_service.get_courses_taught_by_teacher(ids['author_id'], TEACHING_FIELDSET),
+    ),
+}
+
+def measure(fn, ids, repeat: int) -> tuple[float, float, int]:
+    """Best wall time (ms) over `repeat` runs, peak traced memory (MiB) of one run, result length."""
+    best = float('inf')
+    for _ in range(repeat):
+        db.session.expunge_all() # No warm identity map between runs
+        started = time.perf_counter()
+        result = fn(ids)
+        best = min(best, time.perf_counter() - started)
+    db.session.expunge_all()
+    tracemalloc.start()
+    result = fn(ids)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 2**20, len(result)
+
+def run(rows: int, repeat: int):
+    app = create_app()
+    with app.app_context():
+        ids = seed(rows)
+        print(f"{'scenario':<18} {'path':<11} {'rows':>6} {'best ms':>9} {'peak MiB':>9} {'speedup':>8} {'memory':>7}")
+        for name, (orm_fn, projection_fn) in SCENARIOS.items():
+            orm_ms, orm_mib, n = measure(orm_fn, ids, repeat)
+            proj_ms, proj_mib, m = measure(projection_fn, ids, repeat)
+            assert n == m, f"{name}: {n} != {m} rows"
+            print(f"{name:<18} {'orm':<11} {n:>6} {orm_ms:>9.1f} {orm_mib:>9.2f}")
+            print(f"{name:<18} {'projection':<11} {m:>6} {proj_ms:>9.1f} {proj_mib:>9.2f} "
+                  f"{orm_ms / proj_ms:>7.1f}x {orm_mib / proj_mib:>6.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,134 @@
+import click
+from flask import current_app
+from backend.src.models import User, RoleEnum
+from backend.src.extensions import db
+from backend.src.services import metrics_service, stats_service, grade_analytics_service, course_service, deletion_service, archive_service, notification_service, quiz_service, package_service
+from backend.src.services.import_service import ImportServiceError
+from backend.src.utils.cache import catalog_cache
+from backend.src.utils.profiler import make_profile_token, HEADER, INSECURE_SECRET_KEY
+
+def register_commands(app):
+    """Registers the maintenance commands available through `flask <command>`."""
+
+    @app.cli.command('refresh-metrics')
+    def refresh_metrics_command():
+        """Fold new submissions and learning events into the metrics rollups."""
+        result = metrics_service.refresh_rollups()
+        click.echo(f"Rolled up {result['submissions']} submissions and {result['events']} learning events.")
+
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats_command():
+        """Recompute the materialized course and assignment statistics from source tables."""
+        result = stats_service.rebuild_all_stats()
+        catalog_cache.clear() # Enrolled counts may have changed for any course
+        click.echo(f"Rebuilt stats for {result['courses']} courses and {result['assignments']} assignments.")
+        click.echo(f"Rebuilt unread notification counters of {notification_service.rebuild_unread_counters()} users.")
+
+    @app.cli.command('rescore-grades')
+    def rescore_grades_command():
+        """Parse stored grades that have no numeric score yet."""
+        result = grade_analytics_service.rescore_submissions()
+        click.echo(f"Scored {result['scored']} submissions; {result['unparseable']} grades could not be parsed.")
+
+    @app.cli.command('rebalance-chapters')
+    @click.option('--course-id', type=int, default=None, help='Only this course (default: every course).')
+    def rebalance_chapters_command(course_id):
+        """Respace chapter order keys so new chapters fit between any two neighbours again."""
+        respaced = course_service.rebalance_chapters(course_id)
+        click.echo(f"Respaced chapter order keys of {respaced} courses.")
+
+    @app.cli.command('render-chapters')
+    @click.option('--course-id', type=int, default=None, help='Only this course (default: every course).')
+    @click.option('--force', is_flag=True, help='Re-render every chapter, not only stale ones.')
+    def render_chapters_command(course_id, force):
+        """Render chapter content whose stored HTML is missing or from an older renderer."""
+        rendered = course_service.render_chapters(course_id, force=force)
+        click.echo(f"Rendered {rendered} chapters.")
+
+    @app.cli.command('purge-deletions')
+    @click.option('--retry-failed', is_flag=True, help='Queue failed deletion jobs again first.')
+    def purge_deletions_command(retry_failed):
+        """Run queued deletion jobs now, in this process (e.g. when the background worker is disabled)."""
+        if retry_failed:
+            click.echo(f"Requeued {deletion_service.retry_failed_jobs()} failed jobs.")
+        ran = deletion_service.deletion_purger.run_pending()
+        click.echo(f"Ran {ran} deletion jobs.")
+
+    @app.cli.command('archive-submissions')
+    @click.option('--course-id', type=int, default=None, help='Only this course (default: every closed course).')
+    @click.option('--grace-days', type=int, default=None, help='Days past the last due date before a course counts as closed (default: ARCHIVE_GRACE_DAYS).')
+    def archive_submissions_command(course_id, grace_days):
+        """Move the submissions of closed courses into compressed cold storage."""
+        try:
+            results = [archive_service.archive_course(course_id, grace_days)] if course_id else \
+                archive_service.archive_closed_courses(grace_days)
+        except archive_service.ArchiveServiceError as e:
+            raise click.ClickException(str(e))
+        for result in results:
+            click.echo(f"Course {result['course_id']}: archived {result['submissions']} submissions into "
+                       f"{result['segments']} segments ({result['raw_bytes']} -> {result['stored_bytes']} bytes).")
+        click.echo(f"Archived {len(results)} courses.")
+
+    @app.cli.command('restore-submissions')
+    @click.option('--course-id', type=int, required=True, help='Course whose archived submissions to bring back.')
+    def restore_submissions_command(course_id):
+        """Move a course's archived submissions back into the live tables."""
+        try:
+            result = archive_service.restore_course(course_id)
+        except archive_service.ArchiveServiceError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Restored {result['submissions']} submissions from {result['segments']} segments.")
+
+    @app.cli.command('regrade-quiz')
+    @click.option('--assignment-id', type=int, required=True, help='Quiz to re-grade against its stored answer key.')
+    def regrade_quiz_command(assignment_id):
+        """Re-score a quiz's live submissions against its answer key."""
+        try:
+            result = quiz_service.regrade_assignment(assignment_id)
+        except quiz_service.QuizServiceError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Re-graded {result['regraded']} submissions ({result['changed']} changed).")
+
+    @app.cli.command('deliver-notifications')
+    def deliver_notifications_command():
+        """Run queued course-wide notification fan-outs now, in this process."""
+        ran = notification_service.notification_fanout.run_pending()
+        click.echo(f"Delivered {ran} notification fan-outs.")
+
+    @app.cli.command('import-course-package')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--teacher-id', type=int, required=True, help='Teacher who will own the new course.')
+    @click.option('--title', default=None, help='Course title (default: the packaged one).')
+    @click.option('--submissions', is_flag=True, help='Also import the packaged submissions (students matched by email, not enrolled).')
+    @click.option('--skip-invalid', is_flag=True, help='Import what is valid instead of failing on per-file errors.')
+    def import_course_package_command(path, teacher_id, title, submissions, skip_invalid):
+        """Create a course from an exported package; the only way to bring its submissions along."""
+        teacher = db.session.get(User, teacher_id)
+        if teacher is None or teacher.role != RoleEnum.TEACHER:
+            raise click.ClickException(f"User {teacher_id} is not a teacher.")
+        try:
+            with open(path, 'rb') as package:
+                result = package_service.import_course_package(teacher_id, package, title=title,
+                                                               include_submissions=submissions, skip_invalid=skip_invalid)
+        except (package_service.PackageServiceError, ImportServiceError) as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Imported course {result['course']['id']}: {result['imported_submissions']} submissions of "
+                   f"{result['submission_students']} students.")
+        if result['unmatched_students']:
+            click.echo(f"No student on this instance for: {', '.join(result['unmatched_students'])}")
+
+    @app.cli.command('clear-catalog-cache')
+    def clear_catalog_cache_command():
+        """Drop all cached course-catalog responses (e.g. after editing courses directly in the database)."""
+        catalog_cache.clear()
+        click.echo("Catalog cache cleared.")
+
+    @app.cli.command('profile-token')
+    @click.option('--ttl', default=3600, show_default=True, help='Seconds the token stays valid.')
+    def profile_token_command(ttl):
+        """Print a signed X-Profile header value; requests carrying it are profiled."""
+        if not current_app.config.get('PROFILER_HEADER_ENABLED'):
+            click.echo("Note: PROFILER_HEADER_ENABLED is off, so the server ignores X-Profile headers.", err=True)
+        if current_app.config['SECRET_KEY'] in (None, '', INSECURE_SECRET_KEY):
+            raise click.ClickException("Set SECRET_KEY first: tokens signed with the default key prove nothing.")
+        click.echo(f"{HEADER}: {make_profile_token(current_app.config['SECRET_KEY'], ttl)}")
@@ -1,20 +1,29 @@
+from datetime import datetime, timezone
 from flask import jsonify
 from backend.src.services import assignment_service
 from backend.src.services.assignment_service import AssignmentServiceError
+from backend.src.services import reminder_service, grade_analytics_service, quiz_service
+from backend.src.services.quiz_service import QuizServiceError
+from backend.src.services.grade_analytics_service import GradeAnalyticsServiceError
 from backend.src.models.assignment_model import SubmissionTypeEnum # For type conversion
+from backend.src.models.read_models import ASSIGNMENT, SUBMISSION, SUBMISSION_VERSION, REMINDER
+from backend.src.utils.fieldsets import FieldsetError, prune_payload
+from backend.src.utils.quiz import QuizError, parse_answers
 
 # --- Student-facing controllers ---
 
-def list_course_assignments_controller(current_student_id: int, course_id: int):
+def list_course_assignments_controller(current_student_id: int, course_id: int, query_args=None):
     """
     Controller to list assignments for a specific course, for an enrolled student.
+    Supports ?fields= / ?include= (default: basic assignment info, no expansions).
     """
     try:
-        assignments = assignment_service.list_assignments_for_course(course_id, current_student_id)
-        # `assignments` will be None if service layer determined not enrolled / not found
-        # However, service now raises exceptions for these cases.
-        assignments_data = [a.to_dict(include_submission_count=False) for a in assignments] # Basic assignment info
+        fieldset = ASSIGNMENT.parse(query_args)
+        # Service raises AssignmentServiceError when not enrolled / not found
+        assignments_data = assignment_service.list_assignments_for_course(course_id, current_student_id, fieldset)
         return {'message': 'Assignments fetched successfully', 'assignments': assignments_data}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
     except AssignmentServiceError as e:
         return {'message': str(e)}, e.status_code
     except Exception as e:
@@ -38,6 +47,13 @@ def submit_assignment_controller(current_student_id: int, assignment_id: int, re
     content_text = request_data.get('content_text')
     file_url = request_data.get('file_url') # Path to file or external URL
 
+    if submission_type_enum == SubmissionTypeEnum.QUIZ:
+        # {"answers": {"q1": "b", "q2": 9.8}}, stored as canonical JSON text
+        try:
+            content_text = parse_answers(request_data.get('answers'))
+        except QuizError as e:
+            return {'message': str(e)}, 400
+
     # Basic validation based on type (service layer will also validate)
     if submission_type_enum == SubmissionTypeEnum.TEXT and not content_text:
         return {'message': 'content_text is required for TEXT submissions.'}, 400
@@ -52,6 +68,8 @@ def submit_assignment_controller(current_student_id: int, assignment_id: int, re
             content_text=content_text,
             file_url=file_url
         )
+        if submission.version > 1:
+            return {'message': 'Assignment resubmitted successfully', 'submission': submission.to_dict(include_student=False, include_assignment=True)}, 200
         return {'message': 'Assignment submitted successfully', 'submission': submission.to_dict(include_student=False, include_assignment=True)}, 201
     except AssignmentServiceError as e:
         return {'message': str(e)}, e.status_code
@@ -59,22 +77,40 @@ def submit_assignment_controller(current_student_id: int, assignment_id: int, re
         # Log e
         return {'message': f'An unexpected error occurred: {str(e)}'}, 500
 
-def get_my_submission_controller(current_student_id: int, assignment_id: int):
+def get_my_submission_controller(current_student_id: int, assignment_id: int, query_args=None):
     """
     Controller for a student to retrieve their submission for a specific assignment.
+    Supports ?fields= / ?include= (default: basic assignment info for context).
     """
     try:
-        submission = assignment_service.get_student_submission_for_assignment(current_student_id, assignment_id)
-        if not submission:
+        fieldset = SUBMISSION.parse(query_args, default_include=('assignment',))
+        submission_data = assignment_service.get_student_submission_for_assignment(current_student_id, assignment_id, fieldset)
+        if not submission_data:
             return {'message': 'Submission not found for this assignment.'}, 404
-        # Include basic assignment info for context
-        return {'message': 'Submission fetched successfully', 'submission': submission.to_dict(include_student=False, include_assignment=True)}, 200
+        return {'message': 'Submission fetched successfully', 'submission': submission_data}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
     except AssignmentServiceError as e:
         return {'message': str(e)}, e.status_code
     except Exception as e:
         # Log e
         return {'message': f'An unexpected error occurred: {str(e)}'}, 500
 
+def list_my_reminders_controller(current_student_id: int, query_args=None):
+    """
+    Controller for a student to list the due-date reminders emitted for them.
+    Supports ?fields= / ?include= (default: basic assignment info).
+    """
+    try:
+        fieldset = REMINDER.parse(query_args, default_include=('assignment',))
+        reminders_data = reminder_service.get_reminders_for_student(current_student_id, fieldset)
+        return {'message': 'Reminders fetched successfully', 'reminders': reminders_data}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
 # --- Teacher-facing controllers ---
 
 def create_assignment_controller(current_teacher_id: int, course_id: int, request_data: dict):
@@ -84,15 +120,21 @@ def create_assignment_controller(current_teacher_id: int, course_id: int, reques
     if not request_data or not request_data.get('title'):
         return {'message': 'Title is required for an assignment.'}, 400
 
-    # Add more validation as needed, e.g., for due_date format
-    # due_date_str = request_data.get('due_date')
-    # parsed_due_date = None
-    # if due_date_str:
-    #     try:
-    #         # Example: parsed_due_date = datetime.fromisoformat(due_date_str)
-    #         # Ensure it's timezone-aware if necessary
-    #     except ValueError:
-    #         return {'message': 'Invalid due_date format.'}, 400
+    # due_date arrives as an ISO 8601 string; the reminder scheduler needs a real datetime.
+    due_date_str = request_data.get('due_date')
+    parsed_due_date = None
+    if due_date_str:
+        try:
+            parsed_due_date = datetime.fromisoformat(due_date_str)
+        except (TypeError, ValueError):
+            return {'message': 'Invalid due_date format. Expected ISO 8601, e.g. 2024-06-30T23:59:00.'}, 400
+        if parsed_due_date.tzinfo is not None:
+            # Stored as naive UTC, like the other TIMESTAMP columns
+            parsed_due_date = parsed_due_date.astimezone(timezone.utc).replace(tzinfo=None)
+
+    grading_scheme = request_data.get('grading_scheme') or 'auto'
+    if not isinstance(grading_scheme, str):
+        return {'message': 'grading_scheme must be a string.'}, 400
 
     try:
         assignment = assignment_service.create_assignment_for_course(
@@ -100,8 +142,10 @@ def create_assignment_controller(current_teacher_id: int, course_id: int, reques
             course_id=course_id,
             title=request_data['title'],
             description=request_data.get('description'),
-            due_date=request_data.get('due_date'),
-            chapter_id=request_data.get('chapter_id')
+            due_date=parsed_due_date,
+            chapter_id=request_data.get('chapter_id'),
+            grading_scheme=grading_scheme,
+            answer_key=request_data.get('answer_key')
         )
         # include_submission_count useful for teacher viewing their assignments
         return {'message': 'Assignment created successfully', 'assignment': assignment.to_dict(include_submission_count=True, include_course=True)}, 201
@@ -111,15 +155,45 @@ def create_assignment_controller(current_teacher_id: int, course_id: int, reques
         # Log e
         return {'message': f'An unexpected error occurred while creating assignment: {str(e)}'}, 500
 
-def list_submissions_for_assignment_controller(current_teacher_id: int, assignment_id: int):
+def set_answer_key_controller(current_teacher_id: int, assignment_id: int, request_data: dict):
+    """
+    Controller for a teacher to set or replace a quiz's answer key ({"answer_key": {"questions": [...]}}).
+    Every quiz submission is re-graded against the new key before the response.
+    """
+    if not request_data or 'answer_key' not in request_data:
+        return {'message': 'answer_key is required.'}, 400
+    try:
+        assignment, summary = quiz_service.set_answer_key(assignment_id, current_teacher_id, request_data['answer_key'])
+        return {'message': 'Answer key updated successfully', 'assignment': assignment.to_dict(include_submission_count=True), **summary}, 200
+    except QuizServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred while updating the answer key: {str(e)}'}, 500
+
+def get_quiz_controller(current_user, assignment_id: int):
+    """
+    Controller for a quiz's questions: with answers for the course teacher, without for enrolled students.
+    """
+    try:
+        return {'message': 'Quiz fetched successfully', 'quiz': quiz_service.get_quiz(assignment_id, current_user)}, 200
+    except QuizServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def list_submissions_for_assignment_controller(current_teacher_id: int, assignment_id: int, query_args=None):
     """
     Controller for a teacher to list all submissions for a specific assignment they manage.
+    Supports ?fields= / ?include= (default: basic student info for each submission).
     """
     try:
-        submissions = assignment_service.get_submissions_for_assignment(current_teacher_id, assignment_id)
-        # Include student info for each submission, and basic assignment info for context
-        submissions_data = [s.to_dict(include_student=True, include_assignment=False) for s in submissions]
+        fieldset = SUBMISSION.parse(query_args, default_include=('student',))
+        submissions_data = assignment_service.get_submissions_for_assignment(current_teacher_id, assignment_id, fieldset)
         return {'message': 'Submissions fetched successfully', 'submissions': submissions_data}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
     except AssignmentServiceError as e:
         return {'message': str(e)}, e.status_code
     except Exception as e:
@@ -147,3 +221,88 @@ def grade_submission_controller(current_teacher_id: int, submission_id: int, req
     except Exception as e:
         # Log e
         return {'message': f'An unexpected error occurred while grading: {str(e)}'}, 500
+
+def list_submission_versions_controller(current_user_id: int, submission_id: int, query_args=None):
+    """
+    Controller to list the versions of a submission (its student or the course teacher).
+    Supports ?fields=.
+    """
+    try:
+        fieldset = SUBMISSION_VERSION.parse(query_args)
+        versions = assignment_service.get_submission_versions(current_user_id, submission_id)
+        return {'message': 'Submission versions fetched successfully',
+                'versions': [SUBMISSION_VERSION.serialize(version, fieldset) for version in versions]}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except AssignmentServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def get_submission_version_controller(current_user_id: int, submission_id: int, version: int):
+    """
+    Controller to fetch one version of a submission, with its content.
+    """
+    try:
+        data = assignment_service.get_submission_version(current_user_id, submission_id, version)
+        return {'message': 'Submission version fetched successfully', 'version': data}, 200
+    except AssignmentServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def diff_submission_versions_controller(current_user_id: int, submission_id: int, query_args=None):
+    """
+    Controller to diff two versions of a submission: ?from=<version>&to=<version>
+    (default: the latest version against the previous one).
+    """
+    query_args = query_args or {}
+    versions = {}
+    for name in ('from', 'to'):
+        value = query_args.get(name)
+        if value is not None:
+            try:
+                versions[name] = int(value)
+            except ValueError:
+                return {'message': f"'{name}' must be a version number."}, 400
+
+    try:
+        diff = assignment_service.diff_submission_versions(current_user_id, submission_id, versions.get('from'), versions.get('to'))
+        return {'message': 'Submission diff computed successfully', **diff}, 200
+    except AssignmentServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def get_assignment_analytics_controller(current_teacher_id: int, assignment_id: int, query_args=None):
+    """
+    Controller for a teacher to get score statistics for one of their assignments. Supports ?fields=.
+    """
+    try:
+        analytics = grade_analytics_service.get_assignment_grade_analytics(current_teacher_id, assignment_id)
+        return {'message': 'Assignment analytics fetched successfully', 'analytics': prune_payload(analytics, query_args)}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except GradeAnalyticsServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred while computing analytics: {str(e)}'}, 500
+
+def get_course_analytics_controller(current_teacher_id: int, course_id: int, query_args=None):
+    """
+    Controller for a teacher to get score statistics across all assignments of a course. Supports ?fields=.
+    """
+    try:
+        analytics = grade_analytics_service.get_course_grade_analytics(current_teacher_id, course_id)
+        return {'message': 'Course analytics fetched successfully', 'analytics': prune_payload(analytics, query_args)}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except GradeAnalyticsServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred while computing analytics: {str(e)}'}, 500
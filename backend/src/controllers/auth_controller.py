@@ -15,19 +15,8 @@ def register_user_controller(request_data: dict):
 
     try:
         user = user_service.create_user(request_data)
-        # Do not return password_hash
-        user_data = {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'role': user.role,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'profile_picture_url': user.profile_picture_url,
-            'created_at': user.created_at.isoformat(),
-            'updated_at': user.updated_at.isoformat()
-        }
-        return {'message': 'User registered successfully', 'user': user_data}, 201
+        # User.to_dict() never includes password_hash; datetimes and role are encoded by the JSON provider
+        return {'message': 'User registered successfully', 'user': user.to_dict()}, 201
     except UserServiceError as e:
         return {'message': str(e)}, e.status_code
     except Exception as e:
@@ -50,13 +39,13 @@ def login_user_controller(request_data: dict):
 
     if user:
         try:
-            access_token = generate_jwt(user.id, user.role)
+            access_token = generate_jwt(user.id, user.role.value) # JWT payloads must be plain JSON
             # Include user details in the response along with the token
             user_data = {
                 'id': user.id,
                 'username': user.username,
                 'email': user.email,
-                'role': user.role
+                'role': user.role # RoleEnum, encoded as its value by the JSON provider
             }
             return {
                 'message': 'Login successful',
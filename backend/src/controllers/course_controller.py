@@ -1,30 +1,39 @@
-from flask import jsonify
-from backend.src.services import course_service
+from datetime import timedelta
+from flask import jsonify, current_app
+from backend.src.services import course_service, import_service, package_service
 from backend.src.services.course_service import CourseServiceError
+from backend.src.services.import_service import ImportServiceError
+from backend.src.services.package_service import PackageServiceError
+from backend.src.utils.archives import ArchiveError, spool
+from backend.src.models.read_models import COURSE, CHAPTER, USER
+from backend.src.utils.fieldsets import FieldsetError
 
-def list_my_courses_controller(current_student_id: int):
+def list_my_courses_controller(current_student_id: int, query_args=None):
     """
     Controller to list courses the current student is enrolled in.
+    Supports ?fields= / ?include= (default: course fields and teacher).
     """
     try:
-        courses = course_service.get_enrolled_courses_for_student(current_student_id)
-        # Serialize: include teacher, but not chapters or enrolled count for summary list
-        courses_data = [course.to_dict(include_chapters=False, include_teacher=True, include_enrolled_count=False) for course in courses]
+        fieldset = COURSE.parse(query_args, default_include=('teacher',))
+        courses_data = course_service.get_enrolled_courses_for_student(current_student_id, fieldset)
         return {'message': 'Enrolled courses fetched successfully', 'courses': courses_data}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
     except CourseServiceError as e:
         return {'message': str(e)}, e.status_code
     except Exception as e:
         # Log the exception e
         return {'message': f'An unexpected error occurred: {str(e)}'}, 500
 
-def get_my_course_details_controller(current_student_id: int, course_id: int):
+def get_my_course_details_controller(current_student_id: int, course_id: int, query_args=None):
     """
     Controller to get detailed information about a specific course the student is enrolled in.
-    Includes chapters.
+    Supports ?fields= / ?include= (default: teacher, chapters and enrolled count).
     """
     try:
-        course = course_service.get_course_details_for_student(current_student_id, course_id)
-        if not course:
+        fieldset = COURSE.parse(query_args, default_include=('teacher', 'chapters', 'enrolled_students_count'))
+        course_data = course_service.get_course_details_for_student(current_student_id, course_id, fieldset)
+        if not course_data:
             # This means student is not enrolled, or course doesn't exist.
             # Service returns None in this case.
             # Check if course exists at all to give a more specific error
@@ -33,54 +42,57 @@ def get_my_course_details_controller(current_student_id: int, course_id: int):
                 return {'message': 'Course not found'}, 404
             return {'message': 'Access denied: You are not enrolled in this course, or the course was not found for you.'}, 403
 
-        # Serialize: include chapters and teacher details
-        course_data = course.to_dict(include_chapters=True, include_teacher=True, include_enrolled_count=True)
         return {'message': 'Course details fetched successfully', 'course': course_data}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
     except CourseServiceError as e:
         return {'message': str(e)}, e.status_code
     except Exception as e:
         # Log the exception e
         return {'message': f'An unexpected error occurred: {str(e)}'}, 500
 
-def list_all_public_courses_controller():
+def list_all_public_courses_controller(query_args=None):
     """
     Controller to list all available courses (publicly or for logged-in users).
-    Does not require enrollment.
+    Does not require enrollment. Supports ?fields= / ?include= (default: teacher and enrolled count).
     """
     try:
-        courses = course_service.get_all_courses()
-        # Serialize: include teacher, optionally enrolled count, but not chapters for summary
-        courses_data = [course.to_dict(include_chapters=False, include_teacher=True, include_enrolled_count=True) for course in courses]
+        fieldset = COURSE.parse(query_args, default_include=('teacher', 'enrolled_students_count'))
+        courses_data = course_service.get_all_courses(fieldset)
         return {'message': 'All courses fetched successfully', 'courses': courses_data}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
     except Exception as e:
         # Log the exception e
         return {'message': f'An unexpected error occurred: {str(e)}'}, 500
 
-def get_public_course_details_controller(course_id: int):
+def get_public_course_details_controller(course_id: int, query_args=None):
     """
     Controller to get detailed information about a specific course (publicly or for logged-in users).
-    Does not require enrollment. Includes chapters.
+    Does not require enrollment. Supports ?fields= / ?include= (default: teacher, chapters and enrolled count).
     """
     try:
-        course = course_service.get_course_by_id(course_id) # This fetches with chapters and teacher
-        if not course:
+        fieldset = COURSE.parse(query_args, default_include=('teacher', 'chapters', 'enrolled_students_count'))
+        course_data = course_service.get_course_details(course_id, fieldset)
+        if not course_data:
             return {'message': 'Course not found'}, 404
 
-        # Serialize: include chapters and teacher details, optionally enrolled count
-        course_data = course.to_dict(include_chapters=True, include_teacher=True, include_enrolled_count=True)
         return {'message': 'Course details fetched successfully', 'course': course_data}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
     except Exception as e:
         # Log the exception e
         return {'message': f'An unexpected error occurred: {str(e)}'}, 500
 
-def get_course_chapters_controller(course_id: int, current_user_id: int | None = None):
+def get_course_chapters_controller(course_id: int, current_user_id: int | None = None, query_args=None):
     """
     Controller to get chapters for a course.
-    If current_user_id is provided, it verifies enrollment.
+    If current_user_id is provided, it verifies enrollment. Supports ?fields=.
     """
     try:
+        fieldset = CHAPTER.parse(query_args)
         # If current_user_id is provided, service will check enrollment
-        chapters = course_service.get_course_chapters(course_id, student_id=current_user_id)
+        chapters = course_service.get_course_chapters(course_id, student_id=current_user_id, fieldset=fieldset)
 
         if chapters is None: # Service returns None if course not found or user not enrolled
             # Distinguish between course not found and not enrolled
@@ -92,9 +104,9 @@ def get_course_chapters_controller(course_id: int, current_user_id: int | None =
             # If chapters is None for other reasons (e.g. course exists but has no chapters, though service returns list)
             return {'message': 'Chapters not found or access denied.'}, 404
 
-
-        chapters_data = [chapter.to_dict() for chapter in chapters]
-        return {'message': 'Chapters fetched successfully', 'chapters': chapters_data}, 200
+        return {'message': 'Chapters fetched successfully', 'chapters': chapters}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
     except CourseServiceError as e:
         return {'message': str(e)}, e.status_code
     except Exception as e:
@@ -129,18 +141,28 @@ def create_new_course_controller(current_teacher_id: int, request_data: dict):
 def add_chapter_controller(current_teacher_id: int, course_id: int, request_data: dict):
     """
     Controller for a teacher to add a chapter to their course.
+    Placement (at most one): 'order' (explicit sort key), 'after_chapter_id' or 'before_chapter_id';
+    with none of them the chapter is appended.
     """
-    required_fields = ['title', 'content', 'order']
+    required_fields = ['title', 'content']
     if not request_data or not all(field in request_data for field in required_fields):
         return {'message': f'Missing required fields: {", ".join(required_fields)}'}, 400
 
+    placement = [field for field in ('order', 'after_chapter_id', 'before_chapter_id') if request_data.get(field) is not None]
+    if len(placement) > 1:
+        return {'message': f'Give at most one of order, after_chapter_id, before_chapter_id (got {", ".join(placement)}).'}, 400
+    if placement and (not isinstance(request_data[placement[0]], int) or isinstance(request_data[placement[0]], bool)):
+        return {'message': f'{placement[0]} must be an integer.'}, 400
+
     try:
         new_chapter = course_service.add_chapter_to_course(
             course_id=course_id,
             teacher_id=current_teacher_id,
             title=request_data['title'],
             content=request_data['content'],
-            order=request_data['order']
+            order=request_data.get('order'),
+            after_chapter_id=request_data.get('after_chapter_id'),
+            before_chapter_id=request_data.get('before_chapter_id')
         )
         if not new_chapter: # Should be caught by CourseServiceError now
              return {'message': 'Failed to add chapter. Course not found or not owned by you.'}, 403 # or 404
@@ -151,6 +173,167 @@ def add_chapter_controller(current_teacher_id: int, course_id: int, request_data
         # Log e
         return {'message': f'An unexpected error occurred: {str(e)}'}, 500
 
+def update_chapter_controller(current_teacher_id: int, course_id: int, chapter_id: int, request_data: dict):
+    """
+    Controller for a teacher to edit a chapter of their course: 'title' and/or 'content'.
+    """
+    request_data = request_data or {}
+    changes = {field: request_data[field] for field in ('title', 'content') if field in request_data}
+    if not changes:
+        return {'message': 'Give at least one of title, content.'}, 400
+    if not all(isinstance(value, str) for value in changes.values()):
+        return {'message': 'title and content must be strings.'}, 400
+    if 'title' in changes and not changes['title'].strip():
+        return {'message': 'title must not be empty.'}, 400
+
+    try:
+        chapter = course_service.update_chapter(course_id, chapter_id, current_teacher_id, **changes)
+        return {'message': 'Chapter updated successfully', 'chapter': chapter.to_dict()}, 200
+    except CourseServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def reorder_chapters_controller(current_teacher_id: int, course_id: int, request_data: dict):
+    """
+    Controller for a teacher to apply a new order to all chapters of their course.
+    Expects {"chapter_ids": [...]} listing every chapter of the course once, in the new order.
+    """
+    chapter_ids = (request_data or {}).get('chapter_ids')
+    if not isinstance(chapter_ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in chapter_ids):
+        return {'message': 'chapter_ids must be a list of chapter IDs.'}, 400
+
+    try:
+        chapters = course_service.reorder_chapters(course_id, current_teacher_id, chapter_ids)
+        return {'message': 'Chapters reordered successfully', 'chapters': chapters}, 200
+    except CourseServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def clone_course_controller(current_teacher_id: int, course_id: int, request_data: dict | None):
+    """
+    Controller for a teacher to copy their course (chapters and assignments) for a new term.
+    Optional body fields: 'title', 'description', 'due_date_shift_days' (may be negative or fractional).
+    """
+    request_data = request_data or {}
+    shift_days = request_data.get('due_date_shift_days')
+    if shift_days is not None and (not isinstance(shift_days, (int, float)) or isinstance(shift_days, bool)):
+        return {'message': 'due_date_shift_days must be a number.'}, 400
+
+    try:
+        new_course, chapters_copied, assignments_copied = course_service.clone_course(
+            course_id=course_id,
+            teacher_id=current_teacher_id,
+            title=request_data.get('title'),
+            description=request_data.get('description'),
+            due_date_shift=timedelta(days=shift_days) if shift_days else None
+        )
+        return {
+            'message': 'Course cloned successfully',
+            'course': new_course.to_dict(include_chapters=False, include_teacher=False),
+            'chapters_copied': chapters_copied,
+            'assignments_copied': assignments_copied,
+        }, 201
+    except CourseServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def _upload(stream, content_length: int | None):
+    """Seekable upload (spooled if needed), or an error response tuple."""
+    max_bytes = current_app.config.get('IMPORT_MAX_BYTES', 50 * 1024 * 1024)
+    if content_length is not None and content_length > max_bytes:
+        return None, ({'message': f'Upload is larger than {max_bytes} bytes.'}, 413)
+    try:
+        seekable = stream.seekable()
+    except (AttributeError, OSError):
+        seekable = False
+    try:
+        return (stream if seekable else spool(stream, max_bytes)), None
+    except ArchiveError as e:
+        return None, ({'message': str(e)}, 413)
+
+def import_chapters_controller(current_teacher_id: int, course_id: int, stream, content_length: int | None, query_args=None):
+    """
+    Controller for a teacher to import chapters (and assignments) from a zip/tar archive with a
+    manifest.json. `stream` is the uploaded file, or the raw request body (copied to a temporary
+    file first, since a zip is read from its end). ?skip_invalid=true imports the valid files even
+    if others have errors; otherwise any error imports nothing and returns 422 with the list.
+    """
+    skip_invalid = (query_args or {}).get('skip_invalid', 'false').lower() == 'true'
+    upload, error = _upload(stream, content_length)
+    if error:
+        return error
+    try:
+        try:
+            result = import_service.import_course_archive(course_id, current_teacher_id, upload, skip_invalid=skip_invalid)
+        finally:
+            upload.close()
+        return {'message': 'Chapters imported successfully', **result}, 201
+    except ImportServiceError as e:
+        response = {'message': str(e)}
+        if e.errors:
+            response['errors'] = e.errors
+        return response, e.status_code
+    except CourseServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def export_course_controller(current_teacher_id: int, course_id: int, query_args=None):
+    """
+    Controller for a teacher to download their course as a zip package.
+    ?submissions=true adds every submission (students identified by email).
+    Returns ((file name, chunk generator), 200) or an error response.
+    """
+    include_submissions = (query_args or {}).get('submissions', 'false').lower() == 'true'
+    try:
+        return package_service.export_course_package(course_id, current_teacher_id, include_submissions), 200
+    except PackageServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def import_course_package_controller(current_teacher_id: int, stream, content_length: int | None, query_args=None):
+    """
+    Controller for a teacher to create a course from an exported package.
+    Optional ?title= overrides the packaged title; ?skip_invalid=true imports what is valid
+    instead of failing with 422 on per-file errors. Submissions are never imported over HTTP
+    (see `flask import-course-package --submissions`).
+    """
+    query_args = query_args or {}
+    if query_args.get('submissions', 'false').lower() == 'true':
+        return {'message': 'Submissions can only be imported by a maintainer (flask import-course-package --submissions).'}, 403
+    upload, error = _upload(stream, content_length)
+    if error:
+        return error
+    try:
+        try:
+            result = package_service.import_course_package(
+                current_teacher_id, upload,
+                title=query_args.get('title'),
+                skip_invalid=query_args.get('skip_invalid', 'false').lower() == 'true',
+            )
+        finally:
+            upload.close()
+        return {'message': 'Course imported successfully', **result}, 201
+    except PackageServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except ImportServiceError as e:
+        response = {'message': str(e)}
+        if e.errors:
+            response['errors'] = e.errors
+        return response, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
 def enroll_student_controller(current_teacher_id: int, course_id: int, request_data: dict):
     """
     Controller for a teacher to enroll a student in their course.
@@ -179,29 +362,33 @@ def enroll_student_controller(current_teacher_id: int, course_id: int, request_d
         # Log e
         return {'message': f'An unexpected error occurred: {str(e)}'}, 500
 
-def list_my_taught_courses_controller(current_teacher_id: int):
+def list_my_taught_courses_controller(current_teacher_id: int, query_args=None):
     """
     Controller for a teacher to list courses they teach.
+    Supports ?fields= / ?include= (default: teacher, chapters and enrolled count).
     """
     try:
-        courses = course_service.get_courses_taught_by_teacher(current_teacher_id)
-        # Serialize: include teacher (self), optionally chapters, optionally enrolled count
-        courses_data = [course.to_dict(include_chapters=True, include_teacher=True, include_enrolled_count=True) for course in courses]
+        fieldset = COURSE.parse(query_args, default_include=('teacher', 'chapters', 'enrolled_students_count'))
+        courses_data = course_service.get_courses_taught_by_teacher(current_teacher_id, fieldset)
         return {'message': 'Your taught courses fetched successfully', 'courses': courses_data}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
     except CourseServiceError as e: # Should not happen if teacher_id is from JWT
         return {'message': str(e)}, e.status_code
     except Exception as e:
         # Log e
         return {'message': f'An unexpected error occurred: {str(e)}'}, 500
 
-def list_enrolled_students_in_course_controller(current_teacher_id: int, course_id: int):
+def list_enrolled_students_in_course_controller(current_teacher_id: int, course_id: int, query_args=None):
     """
-    Controller for a teacher to list students enrolled in one of their courses.
+    Controller for a teacher to list students enrolled in one of their courses. Supports ?fields=.
     """
     try:
-        students = course_service.get_students_enrolled_in_course(course_id, current_teacher_id)
-        students_data = [student.to_dict() for student in students] # User.to_dict()
+        fieldset = USER.parse(query_args)
+        students_data = course_service.get_students_enrolled_in_course(course_id, current_teacher_id, fieldset)
         return {'message': 'Students enrolled in course fetched successfully', 'students': students_data}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
     except CourseServiceError as e:
         return {'message': str(e)}, e.status_code
     except Exception as e:
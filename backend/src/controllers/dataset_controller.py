@@ -0,0 +1,191 @@
+from flask import current_app
+from backend.src.services import dataset_service
+from backend.src.services.dataset_service import DatasetServiceError
+from backend.src.models.read_models import DATASET
+from backend.src.utils.fieldsets import FieldsetError
+
+def _optional_int(query_args, name: str) -> int | None:
+    value = (query_args or {}).get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise DatasetServiceError(f"'{name}' must be an integer.", 400)
+
+def _text_fields(request_data: dict, required: tuple, optional: tuple) -> dict | str:
+    """The given string fields of a JSON body, or an error message."""
+    missing = [field for field in required if not request_data.get(field)]
+    if missing:
+        return f'Missing required fields: {", ".join(missing)}'
+    fields = {field: request_data[field] for field in required + optional if field in request_data}
+    if not all(value is None or isinstance(value, str) for value in fields.values()):
+        return f'{", ".join(fields)} must be strings.'
+    return fields
+
+def create_dataset_controller(current_teacher_id: int, course_id: int, request_data: dict):
+    """
+    Controller for a teacher to add a dataset to their course: 'title', optional 'description'
+    and 'chapter_id' (the chapter that charts it).
+    """
+    fields = _text_fields(request_data or {}, ('title',), ('description',))
+    if isinstance(fields, str):
+        return {'message': fields}, 400
+    try:
+        dataset = dataset_service.create_dataset(course_id, current_teacher_id, chapter_id=request_data.get('chapter_id'), **fields)
+        return {'message': 'Dataset created successfully', 'dataset': dataset.to_dict()}, 201
+    except DatasetServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def update_dataset_controller(current_teacher_id: int, dataset_id: int, request_data: dict):
+    """
+    Controller for a teacher to edit a dataset: 'title', 'description' and/or 'chapter_id' (null detaches it).
+    """
+    request_data = request_data or {}
+    fields = _text_fields(request_data, (), ('title', 'description'))
+    if isinstance(fields, str):
+        return {'message': fields}, 400
+    if 'title' in fields and not (fields['title'] or '').strip():
+        return {'message': 'title must not be empty.'}, 400
+    if 'chapter_id' in request_data:
+        fields['chapter_id'] = request_data['chapter_id']
+    if not fields:
+        return {'message': 'Give at least one of title, description, chapter_id.'}, 400
+    try:
+        dataset = dataset_service.update_dataset(dataset_id, current_teacher_id, fields)
+        return {'message': 'Dataset updated successfully', 'dataset': dataset.to_dict()}, 200
+    except DatasetServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def list_course_datasets_controller(current_user, course_id: int, query_args=None):
+    """
+    Controller listing a course's datasets for its teacher or enrolled students.
+    ?chapter_id= narrows to one chapter's; ?include=series adds each dataset's series summaries.
+    """
+    try:
+        fieldset = DATASET.parse(query_args)
+        chapter_id = _optional_int(query_args, 'chapter_id')
+        datasets = dataset_service.list_course_datasets(course_id, current_user, fieldset, chapter_id)
+        return {'message': 'Datasets fetched successfully', 'datasets': datasets}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except DatasetServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def get_dataset_controller(current_user, dataset_id: int, query_args=None):
+    """
+    Controller for one dataset; its series (point counts, time spans, value ranges) are included by default.
+    """
+    try:
+        fieldset = DATASET.parse(query_args, default_include=('series',))
+        return {'message': 'Dataset fetched successfully', 'dataset': dataset_service.get_dataset(dataset_id, current_user, fieldset)}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except DatasetServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def delete_dataset_controller(current_teacher_id: int, dataset_id: int):
+    """
+    Controller for a teacher to delete a dataset with all its series and points.
+    """
+    try:
+        removed = dataset_service.delete_dataset(dataset_id, current_teacher_id)
+        return {'message': 'Dataset deleted successfully', 'deleted_series': removed}, 200
+    except DatasetServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def create_series_controller(current_teacher_id: int, dataset_id: int, request_data: dict):
+    """
+    Controller for a teacher to add an (empty) series to a dataset: 'name' and optional 'unit'.
+    """
+    fields = _text_fields(request_data or {}, ('name',), ('unit',))
+    if isinstance(fields, str):
+        return {'message': fields}, 400
+    try:
+        series = dataset_service.create_series(dataset_id, current_teacher_id, **fields)
+        return {'message': 'Series created successfully', 'series': series.to_dict()}, 201
+    except DatasetServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def delete_series_controller(current_teacher_id: int, dataset_id: int, series_id: int):
+    """
+    Controller for a teacher to delete one series and its points.
+    """
+    try:
+        dataset_service.delete_series(dataset_id, series_id, current_teacher_id)
+        return {'message': 'Series deleted successfully'}, 200
+    except DatasetServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def append_points_controller(current_teacher_id: int, dataset_id: int, series_id: int, stream, content_length: int | None,
+                             content_type: str | None):
+    """
+    Controller for a teacher to upload points to a series, as JSON ([[timestamp, value], ...]) or
+    CSV (timestamp,value lines). Bodies are limited to DATASET_MAX_UPLOAD_BYTES; send long
+    histories in several uploads.
+    """
+    max_bytes = current_app.config.get('DATASET_MAX_UPLOAD_BYTES', 32 * 1024 * 1024)
+    if content_length is not None and content_length > max_bytes:
+        return {'message': f'Upload is larger than {max_bytes} bytes.'}, 413
+    body = stream.read(max_bytes + 1)
+    if len(body) > max_bytes:
+        return {'message': f'Upload is larger than {max_bytes} bytes.'}, 413
+    if not body.strip():
+        return {'message': 'Request body must contain points.'}, 400
+    try:
+        series, written = dataset_service.append_points(dataset_id, series_id, current_teacher_id, body, content_type)
+        return {'message': 'Points added successfully', 'written': written, 'series': series.to_dict()}, 200
+    except DatasetServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def chart_data_controller(current_user, dataset_id: int, query_args=None):
+    """
+    Controller for chart data: ?start= / ?end= (epoch ms or ISO 8601) bound the time range,
+    ?points= is the budget per series (the chart's width in pixels; default DATASET_CHART_POINTS,
+    capped at DATASET_MAX_CHART_POINTS), ?series=1,2 picks series (default all).
+    """
+    query_args = query_args or {}
+    try:
+        series_ids = None
+        if query_args.get('series'):
+            try:
+                series_ids = [int(value) for value in query_args['series'].split(',') if value.strip()]
+            except ValueError:
+                raise DatasetServiceError("'series' must be a comma-separated list of series ids.", 400)
+        chart = dataset_service.chart_data(
+            dataset_id, current_user,
+            series_ids=series_ids,
+            start=query_args.get('start'),
+            end=query_args.get('end'),
+            points=_optional_int(query_args, 'points'),
+        )
+        return {'message': 'Chart data fetched successfully', **chart}, 200
+    except DatasetServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
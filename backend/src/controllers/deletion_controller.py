@@ -0,0 +1,62 @@
+from backend.src.services import deletion_service
+from backend.src.services.deletion_service import DeletionServiceError
+from backend.src.models.read_models import DELETION_JOB
+from backend.src.utils.fieldsets import FieldsetError
+
+def delete_course_controller(current_teacher_id: int, course_id: int):
+    """
+    Controller for a teacher to delete their course. The course disappears at once;
+    its rows are purged in the background (202 with the job to poll).
+    """
+    try:
+        job = deletion_service.delete_course(course_id, current_teacher_id)
+        return {'message': 'Course deleted; its data is being purged in the background.', 'job': job.to_dict()}, 202
+    except DeletionServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def delete_assignment_controller(current_teacher_id: int, assignment_id: int):
+    """
+    Controller for a teacher to delete an assignment of their course (see delete_course_controller).
+    """
+    try:
+        job = deletion_service.delete_assignment(assignment_id, current_teacher_id)
+        return {'message': 'Assignment deleted; its submissions are being purged in the background.', 'job': job.to_dict()}, 202
+    except DeletionServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def get_deletion_job_controller(current_teacher_id: int, job_id: int, query_args=None):
+    """
+    Controller to follow the progress of one of the teacher's deletions. Supports ?fields=.
+    """
+    try:
+        fieldset = DELETION_JOB.parse(query_args)
+        job = deletion_service.get_deletion_job(job_id, current_teacher_id)
+        return {'message': 'Deletion job fetched successfully', 'job': DELETION_JOB.serialize(job.to_dict(), fieldset)}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except DeletionServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def list_deletion_jobs_controller(current_teacher_id: int, query_args=None):
+    """
+    Controller to list the teacher's most recent deletions. Supports ?fields=.
+    """
+    try:
+        fieldset = DELETION_JOB.parse(query_args)
+        jobs = deletion_service.list_deletion_jobs(current_teacher_id)
+        return {'message': 'Deletion jobs fetched successfully',
+                'jobs': [DELETION_JOB.serialize(job.to_dict(), fieldset) for job in jobs]}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
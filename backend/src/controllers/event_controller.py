@@ -0,0 +1,31 @@
+from flask import current_app
+from backend.src.services import event_service
+from backend.src.services.event_service import EventServiceError, event_buffer
+
+def ingest_events_controller(current_user_id: int, body: bytes):
+    """
+    Controller to ingest a batch of NDJSON learning events for the current user.
+    Valid events are buffered for a later bulk insert; invalid lines are reported back.
+    """
+    if not body or not body.strip():
+        return {'message': 'Request body must contain at least one NDJSON event.'}, 400
+
+    try:
+        rows, errors = event_service.parse_ndjson_batch(
+            body,
+            user_id=current_user_id,
+            max_events=current_app.config.get('EVENT_MAX_BATCH_SIZE', 500)
+        )
+        if rows and not event_buffer.offer(rows):
+            return {'message': 'Event buffer is full, retry later.'}, 429
+
+        response = {'message': 'Events accepted', 'accepted': len(rows), 'rejected': len(errors)}
+        if errors:
+            response['errors'] = errors
+        # 202: events are buffered, not yet written
+        return response, 202 if rows else 400
+    except EventServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred while ingesting events: {str(e)}'}, 500
@@ -0,0 +1,73 @@
+from datetime import date
+from backend.src.services import metrics_service
+from backend.src.services.metrics_service import MetricsServiceError
+from backend.src.utils.fieldsets import FieldsetError, prune_payload
+from backend.src.utils.timing import server_timing
+
+def _parse_date(value: str | None, field: str) -> date:
+    if not value:
+        return metrics_service.today()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise MetricsServiceError(f"Invalid {field}: '{value}'. Expected YYYY-MM-DD.", 400)
+
+def get_wela_controller(week_str: str | None, query_args=None):
+    """
+    Controller to get the Weekly Engaged Learning Actions (North Star) metric for a week.
+    """
+    try:
+        wela = metrics_service.get_wela(_parse_date(week_str, 'week'))
+        return {'message': 'WELA fetched successfully', 'metrics': prune_payload(wela, query_args)}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except MetricsServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def get_active_users_controller(date_str: str | None, query_args=None):
+    """
+    Controller to get DAU / WAU / MAU ending on a given date.
+    """
+    try:
+        active_users = metrics_service.get_active_users(_parse_date(date_str, 'date'))
+        return {'message': 'Active users fetched successfully', 'metrics': prune_payload(active_users, query_args)}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except MetricsServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def get_retention_controller(start_str: str | None, period: str, query_args=None):
+    """
+    Controller to get next-week / next-month retention for a registration cohort.
+    """
+    if not start_str:
+        return {'message': 'start (YYYY-MM-DD) is required.'}, 400
+    try:
+        retention = metrics_service.get_retention(_parse_date(start_str, 'start'), period)
+        return {'message': 'Retention fetched successfully', 'metrics': prune_payload(retention, query_args)}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except MetricsServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def get_timings_controller(query_args=None):
+    """
+    Controller to get this worker's per-route phase latency histograms (see utils/timing.py).
+    """
+    try:
+        timings = server_timing.histograms.snapshot()
+        return {'message': 'Timings fetched successfully', 'timings': prune_payload(timings, query_args)}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
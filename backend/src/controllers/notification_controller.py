@@ -0,0 +1,115 @@
+from flask import current_app
+from backend.src.services import notification_service
+from backend.src.services.notification_service import NotificationServiceError
+from backend.src.models.read_models import NOTIFICATION
+from backend.src.utils.fieldsets import FieldsetError, prune_payload
+from backend.src.utils.security import generate_stream_token
+
+def open_stream_controller(current_user, last_event_id: str | None):
+    """
+    Controller opening a user's Server-Sent Events stream. Returns the body generator and 200,
+    or an error dict and status.
+    """
+    try:
+        last_id = notification_service.parse_last_event_id(last_event_id)
+        return notification_service.open_stream(current_user, last_id), 200
+    except NotificationServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def create_stream_token_controller(current_user_id: int):
+    """
+    Controller issuing a stream token: EventSource clients open /notifications/stream?token=...
+    with it, and fetch a new one whenever they have to reconnect after it expired.
+    """
+    try:
+        return {
+            'message': 'Stream token created successfully',
+            'token': generate_stream_token(current_user_id),
+            'expires_in': current_app.config.get('SSE_TOKEN_TTL_SECONDS', 60),
+        }, 200
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def _positive_int(query_args, name: str, default: int | None = None, maximum: int | None = None) -> int | None:
+    value = (query_args or {}).get(name)
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise NotificationServiceError(f"'{name}' must be a positive integer.", 400)
+    if number < 1:
+        raise NotificationServiceError(f"'{name}' must be a positive integer.", 400)
+    return min(number, maximum) if maximum is not None else number
+
+def list_notifications_controller(current_user_id: int, query_args=None):
+    """
+    Controller for a page of the user's inbox, newest first, with the unread count.
+    Supports ?limit= (max 100), ?before=<next_before of the previous page>, ?unread=true,
+    and ?fields= / ?include= (course, assignment).
+    """
+    try:
+        fieldset = NOTIFICATION.parse(query_args)
+        limit = _positive_int(query_args, 'limit', 20, 100)
+        before = _positive_int(query_args, 'before')
+        unread_only = str((query_args or {}).get('unread', '')).lower() == 'true'
+        notifications, next_before = notification_service.list_notifications(current_user_id, fieldset, before, limit, unread_only)
+        return {
+            'message': 'Notifications fetched successfully',
+            'notifications': notifications,
+            'next_before': next_before,
+            'unread_count': notification_service.get_unread_count(current_user_id),
+        }, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except NotificationServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def get_unread_count_controller(current_user_id: int, query_args=None):
+    """
+    Controller for the unread badge: a single counter row read. Supports ?fields=.
+    """
+    try:
+        payload = prune_payload({'unread_count': notification_service.get_unread_count(current_user_id)}, query_args)
+        return {'message': 'Unread count fetched successfully', **payload}, 200
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def mark_read_controller(current_user_id: int, notification_id: int):
+    """
+    Controller to mark one of the user's notifications read.
+    """
+    try:
+        notification = notification_service.mark_read(current_user_id, notification_id)
+        return {
+            'message': 'Notification marked as read',
+            'notification': notification,
+            'unread_count': notification_service.get_unread_count(current_user_id),
+        }, 200
+    except NotificationServiceError as e:
+        return {'message': str(e)}, e.status_code
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+def mark_all_read_controller(current_user_id: int):
+    """
+    Controller to mark all of the user's notifications read.
+    """
+    try:
+        marked = notification_service.mark_all_read(current_user_id)
+        return {'message': f'{marked} notifications marked as read', 'marked': marked,
+                'unread_count': notification_service.get_unread_count(current_user_id)}, 200
+    except Exception as e:
+        # Log e
+        return {'message': f'An unexpected error occurred: {str(e)}'}, 500
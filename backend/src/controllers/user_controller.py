@@ -1,16 +1,21 @@
 from backend.src.services import user_service
 from backend.src.services.user_service import UserServiceError
+from backend.src.models.read_models import USER
+from backend.src.utils.fieldsets import FieldsetError
 
-def get_user_profile_controller(current_user_id: int):
+def get_user_profile_controller(current_user, query_args=None):
     """
-    Controller to get the profile of the currently authenticated user.
-    Relies on current_user_id being passed from a JWT decorator.
+    Controller to get the profile of the currently authenticated user. Supports ?fields=.
+    Uses the User entity already loaded by the JWT decorator instead of querying it again.
     """
-    user = user_service.get_user_by_id(current_user_id)
-    if not user:
+    if not current_user:
         return {'message': 'User not found'}, 404
+    try:
+        fieldset = USER.parse(query_args)
+    except FieldsetError as e:
+        return {'message': str(e)}, e.status_code
 
-    return {'message': 'User profile fetched successfully', 'user': user.to_dict()}, 200
+    return {'message': 'User profile fetched successfully', 'user': USER.serialize(current_user.to_dict(), fieldset)}, 200
 
 def update_user_profile_controller(current_user_id: int, request_data: dict):
     """
@@ -1,5 +1,14 @@
 from .user_model import User, RoleEnum
 from .course_model import Course, Chapter, Enrollment, enrollments_table
+from .assignment_model import Assignment, Submission, SubmissionVersion, SubmissionTypeEnum
+from .reminder_model import AssignmentReminder
+from .event_model import LearningEvent, LearningEventTypeEnum
+from .metrics_model import WeeklyLearningActions, DailyActiveUsers, RollupCheckpoint
+from .stats_model import CourseStats, AssignmentStats
+from .deletion_model import DeletionJob
+from .archive_model import SubmissionArchiveSegment, ArchivedSubmission
+from .notification_model import Notification, NotificationCounter, NotificationFanout
+from .dataset_model import Dataset, DatasetSeries
 
 __all__ = [
     'User',
@@ -10,5 +19,22 @@ __all__ = [
     'enrollments_table', # If this table object needs to be accessed directly elsewhere
     'Assignment',
     'Submission',
-    'SubmissionTypeEnum'
+    'SubmissionVersion',
+    'SubmissionTypeEnum',
+    'AssignmentReminder',
+    'LearningEvent',
+    'LearningEventTypeEnum',
+    'WeeklyLearningActions',
+    'DailyActiveUsers',
+    'RollupCheckpoint',
+    'CourseStats',
+    'AssignmentStats',
+    'DeletionJob',
+    'SubmissionArchiveSegment',
+    'ArchivedSubmission',
+    'Notification',
+    'NotificationCounter',
+    'NotificationFanout',
+    'Dataset',
+    'DatasetSeries'
 ]
@@ -0,0 +1,45 @@
+from backend.src.extensions import db
+from sqlalchemy.sql import func
+from sqlalchemy import UniqueConstraint
+
+class SubmissionArchiveSegment(db.Model):
+    """
+    Cold storage for submissions of a closed course (see services/archive_service.py): up to
+    ARCHIVE_SEGMENT_ROWS submissions of one assignment, with their version history, as one
+    zlib-compressed JSON document. Segments are append-only; they are only ever written once
+    and deleted again by a restore or a purge.
+    """
+    __tablename__ = 'submission_archive_segments'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False, index=True)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.id'), nullable=False, index=True)
+    row_count = db.Column(db.Integer, nullable=False)
+    raw_bytes = db.Column(db.Integer, nullable=False) # Size of the uncompressed document
+    payload = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.TIMESTAMP, server_default=func.now())
+
+    def __repr__(self):
+        return f'<SubmissionArchiveSegment {self.id} Assignment {self.assignment_id} ({self.row_count} rows)>'
+
+class ArchivedSubmission(db.Model):
+    """
+    Index entry of one archived submission: where it sits in its segment, plus the few columns
+    gradebook aggregates read (grade, score), so those never have to decompress a segment.
+    The primary key is the submission's original id, which a restore gives back.
+    """
+    __tablename__ = 'archived_submissions'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    segment_id = db.Column(db.Integer, db.ForeignKey('submission_archive_segments.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False) # Index into the segment's record list
+    grade = db.Column(db.String(255), nullable=True)
+    score = db.Column(db.Float, nullable=True)
+    submitted_at = db.Column(db.TIMESTAMP, nullable=True)
+
+    __table_args__ = (UniqueConstraint('assignment_id', 'student_id', name='uq_archived_assignment_student'),)
+
+    def __repr__(self):
+        return f'<ArchivedSubmission {self.id} for Assignment {self.assignment_id} by Student {self.student_id}>'
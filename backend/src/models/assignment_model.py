@@ -9,6 +9,7 @@ class SubmissionTypeEnum(enum.Enum):
     TEXT = "text"
     FILE_UPLOAD = "file_upload"
     URL = "url" # Added another common type
+    QUIZ = "quiz" # JSON answers to a quiz assignment's questions, auto-graded (utils/quiz.py)
 
 class Assignment(db.Model):
     __tablename__ = 'assignments'
@@ -19,14 +20,23 @@ class Assignment(db.Model):
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=True)
     due_date = db.Column(db.TIMESTAMP, nullable=True)
+    grading_scheme = db.Column(db.String(32), nullable=False, default='auto', server_default='auto') # See utils/grading.py
+    answer_key = db.Column(db.JSON(none_as_null=True), nullable=True) # Set for quizzes (schema: utils/quiz.py); submissions are auto-graded
     created_at = db.Column(db.TIMESTAMP, server_default=func.now())
     updated_at = db.Column(db.TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    deleted_at = db.Column(db.TIMESTAMP, nullable=True) # Soft-deleted: hidden everywhere, rows purged by deletion_service
+    archived_at = db.Column(db.TIMESTAMP, nullable=True) # Submissions moved to cold storage (archive_service); reads merge both
 
     # Relationships
     course = db.relationship('Course', backref=db.backref('assignments', lazy='dynamic'))
     chapter = db.relationship('Chapter', backref=db.backref('assignments', lazy='dynamic')) # An assignment can optionally belong to a chapter
     submissions = db.relationship('Submission', backref='assignment', lazy='dynamic', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_assignments_due_date', 'due_date'), # Reminder horizon scan
+        db.Index('ix_assignments_updated_at', 'updated_at'), # Reminder scan for new or moved deadlines
+    )
+
     def __repr__(self):
         return f'<Assignment {self.id} "{self.title}" Course {self.course_id}>'
 
@@ -37,16 +47,22 @@ class Assignment(db.Model):
             'chapter_id': self.chapter_id,
             'title': self.title,
             'description': self.description,
-            'due_date': self.due_date.isoformat() if self.due_date else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'due_date': self.due_date,
+            'grading_scheme': self.grading_scheme,
+            'is_quiz': self.answer_key is not None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
         }
         if include_course and self.course:
             data['course'] = {'id': self.course.id, 'title': self.course.title} # Basic info
         if include_chapter and self.chapter:
             data['chapter'] = {'id': self.chapter.id, 'title': self.chapter.title} # Basic info
         if include_submission_count:
-            data['submission_count'] = self.submissions.count() if self.submissions else 0
+            # Materialized counter (AssignmentStats); COUNT only for rows without stats yet
+            if self.stats is not None:
+                data['submission_count'] = self.stats.submission_count
+            else:
+                data['submission_count'] = self.submissions.count()
         return data
 
 class Submission(db.Model):
@@ -61,7 +77,9 @@ class Submission(db.Model):
     file_url = db.Column(db.String(2048), nullable=True) # For file uploads or external URLs
 
     submitted_at = db.Column(db.TIMESTAMP, server_default=func.now())
-    grade = db.Column(db.String(255), nullable=True) # e.g., "A+", "85/100", "Pass"
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1') # Latest version; older ones in submission_versions
+    grade = db.Column(db.String(255), nullable=True) # Display label, e.g., "A+", "85/100", "Pass"
+    score = db.Column(db.Float, nullable=True) # grade parsed to 0-100 by the assignment's grading scheme
     feedback = db.Column(db.Text, nullable=True) # Teacher's feedback
 
     # Relationships
@@ -69,7 +87,10 @@ class Submission(db.Model):
     student = db.relationship('User', backref=db.backref('submissions', lazy='dynamic'))
 
     # Constraints
-    __table_args__ = (UniqueConstraint('assignment_id', 'student_id', name='uq_assignment_student_submission'),)
+    __table_args__ = (
+        UniqueConstraint('assignment_id', 'student_id', name='uq_assignment_student_submission'),
+        db.Index('ix_submissions_submitted_at', 'submitted_at', 'id'), # Metrics rollup checkpoint order
+    )
 
     def __repr__(self):
         return f'<Submission {self.id} for Assignment {self.assignment_id} by Student {self.student_id}>'
@@ -79,11 +100,13 @@ class Submission(db.Model):
             'id': self.id,
             'assignment_id': self.assignment_id,
             'student_id': self.student_id,
-            'submission_type': self.submission_type.value if isinstance(self.submission_type, SubmissionTypeEnum) else str(self.submission_type),
+            'submission_type': self.submission_type,
             'content_text': self.content_text,
             'file_url': self.file_url,
-            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
+            'submitted_at': self.submitted_at,
+            'version': self.version,
             'grade': self.grade,
+            'score': self.score,
             'feedback': self.feedback,
         }
         if include_student and self.student:
@@ -92,3 +115,39 @@ class Submission(db.Model):
             # Basic assignment info to avoid recursion if assignment includes submissions
             data['assignment'] = {'id': self.assignment.id, 'title': self.assignment.title}
         return data
+
+class SubmissionVersion(db.Model):
+    """
+    A superseded version of a submission. The latest version lives in full in `submissions`;
+    each older one is stored as a compressed delta that rebuilds its text from the next newer
+    version (kind 'delta'), or every few versions as a compressed full text (kind 'snapshot')
+    so rebuilding an old version never walks the whole chain. See utils/textdelta.py.
+    """
+    __tablename__ = 'submission_versions'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    submission_type = db.Column(db.Enum(SubmissionTypeEnum), nullable=False)
+    file_url = db.Column(db.String(2048), nullable=True)
+    kind = db.Column(db.String(8), nullable=False) # 'delta' or 'snapshot'
+    payload = db.Column(db.LargeBinary, nullable=True) # NULL snapshot = no content_text
+    content_length = db.Column(db.Integer, nullable=True) # Characters in content_text, for listings
+    submitted_at = db.Column(db.TIMESTAMP, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('submission_id', 'version', name='uq_submission_version'),
+        db.Index('ix_submission_versions_submitted_at', 'submitted_at', 'id'), # Metrics rollup checkpoint order
+    )
+
+    def __repr__(self):
+        return f'<SubmissionVersion {self.version} of Submission {self.submission_id}>'
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'submission_type': self.submission_type,
+            'file_url': self.file_url,
+            'content_length': self.content_length,
+            'submitted_at': self.submitted_at,
+        }
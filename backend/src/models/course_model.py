@@ -19,6 +19,7 @@ class Course(db.Model):
     teacher_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.TIMESTAMP, server_default=func.now())
     updated_at = db.Column(db.TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    deleted_at = db.Column(db.TIMESTAMP, nullable=True) # Soft-deleted: hidden everywhere, rows purged by deletion_service
 
     # Relationship to the User who is the teacher
     teacher = db.relationship('User', backref=db.backref('taught_courses', lazy='dynamic'))
@@ -40,8 +41,8 @@ class Course(db.Model):
             'title': self.title,
             'description': self.description,
             'teacher_id': self.teacher_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
         }
         if include_teacher and self.teacher:
             # Embeds teacher's public profile using User.to_dict()
@@ -51,11 +52,12 @@ class Course(db.Model):
             chapters_query = self.chapters.order_by(Chapter.order.asc()) if self.chapters else []
             data['chapters'] = [chapter.to_dict() for chapter in chapters_query]
         if include_enrolled_count:
-            # Efficiently count enrolled students if the relationship is dynamic
-            if hasattr(self.enrolled_students, 'count'): # For dynamic relationships
-                 data['enrolled_students_count'] = self.enrolled_students.count()
-            else: # For non-dynamic or if already loaded
-                 data['enrolled_students_count'] = len(self.enrolled_students) if self.enrolled_students else 0
+            # Read the materialized counter (CourseStats, joined-loaded with the course);
+            # only courses created before the stats table existed fall back to a COUNT.
+            if self.stats is not None:
+                data['enrolled_students_count'] = self.stats.enrolled_count
+            else:
+                data['enrolled_students_count'] = self.enrollment_records.count()
 
         # Note: including full enrolled_students list directly can be large and cause recursion.
         # It's better to have a separate endpoint for listing students in a course.
@@ -68,12 +70,20 @@ class Chapter(db.Model):
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=True) # E.g., Markdown, HTML, or reference to video
-    order = db.Column(db.Integer, nullable=False) # Order of the chapter within the course
+    # Rendered once at write time (utils/rendering.py) and served as-is: sanitized HTML, its table
+    # of contents, and the content hash they were rendered from (stale hashes: `flask render-chapters`)
+    content_html = db.Column(db.Text, nullable=True)
+    content_toc = db.Column(db.JSON, nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True)
+    order = db.Column(db.Integer, nullable=False) # Sparse sort key within the course (see utils/ordering.py)
     created_at = db.Column(db.TIMESTAMP, server_default=func.now())
     updated_at = db.Column(db.TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     # course backref is implicitly created by Course.chapters relationship
 
+    # Neighbour lookups when placing a chapter, and ordered chapter listings
+    __table_args__ = (db.Index('ix_chapters_course_order', 'course_id', 'order'),)
+
     def __repr__(self):
         return f'<Chapter {self.title} - Course {self.course_id}>'
 
@@ -83,9 +93,11 @@ class Chapter(db.Model):
             'course_id': self.course_id, # Keep course_id for reference
             'title': self.title,
             'content': self.content,
+            'content_html': self.content_html,
+            'toc': self.content_toc,
             'order': self.order,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
         }
         if include_course_info and self.course:
             # Avoid full course serialization to prevent recursion if course includes chapters.
@@ -119,7 +131,7 @@ class Enrollment(db.Model):
             'id': self.id,
             'student_id': self.student_id,
             'course_id': self.course_id,
-            'enrolled_at': self.enrolled_at.isoformat() if self.enrolled_at else None,
+            'enrolled_at': self.enrolled_at,
         }
         # Optionally include student and course details (be careful of circular refs if too deep)
         # if self.student:
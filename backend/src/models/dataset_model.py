@@ -0,0 +1,68 @@
+from backend.src.extensions import db
+from sqlalchemy.sql import func
+
+class Dataset(db.Model):
+    """
+    A set of monitoring series (e.g. one station's PM2.5 and PM10 readings) attached to a course
+    and optionally shown in one of its chapters.
+    """
+    __tablename__ = 'datasets'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False, index=True)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapters.id'), nullable=True) # Chapter that charts it, if any
+    title = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.TIMESTAMP, server_default=func.now())
+    updated_at = db.Column(db.TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f'<Dataset {self.id} "{self.title}" Course {self.course_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'course_id': self.course_id,
+            'chapter_id': self.chapter_id,
+            'title': self.title,
+            'description': self.description,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+        }
+
+class DatasetSeries(db.Model):
+    """
+    One series of a dataset. The points live in array files (utils/timeseries.py), not in the
+    database; this row caches their count, time span and value range, updated with every write.
+    """
+    __tablename__ = 'dataset_series'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    dataset_id = db.Column(db.Integer, db.ForeignKey('datasets.id'), nullable=False, index=True)
+    name = db.Column(db.String(255), nullable=False) # E.g. 'PM2.5', 'Dissolved oxygen'
+    unit = db.Column(db.String(32), nullable=True) # E.g. 'µg/m³', 'mg/L'
+    point_count = db.Column(db.Integer, nullable=False, default=0)
+    start_at = db.Column(db.TIMESTAMP, nullable=True) # First and last point (UTC)
+    end_at = db.Column(db.TIMESTAMP, nullable=True)
+    min_value = db.Column(db.Float, nullable=True)
+    max_value = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.TIMESTAMP, server_default=func.now())
+    updated_at = db.Column(db.TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f'<DatasetSeries {self.id} "{self.name}" Dataset {self.dataset_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'dataset_id': self.dataset_id,
+            'name': self.name,
+            'unit': self.unit,
+            'point_count': self.point_count,
+            'start_at': self.start_at,
+            'end_at': self.end_at,
+            'min_value': self.min_value,
+            'max_value': self.max_value,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+        }
@@ -0,0 +1,43 @@
+from backend.src.extensions import db
+from sqlalchemy.sql import func
+
+class DeletionJob(db.Model):
+    """
+    Background purge of a soft-deleted course or assignment (see services/deletion_service.py).
+    The target row is already hidden when the job is created; the job deletes its child rows
+    in bounded batches and records progress so the teacher can follow it.
+    """
+    __tablename__ = 'deletion_jobs'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(16), nullable=False) # 'course' or 'assignment'
+    target_id = db.Column(db.Integer, nullable=False) # No foreign key: the target row is deleted by the job
+    requested_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    status = db.Column(db.String(16), nullable=False, default='pending') # pending, running, done, failed
+    step = db.Column(db.String(64), nullable=True) # Table currently being purged
+    total_rows = db.Column(db.Integer, nullable=False, default=0) # Counted when the purge starts
+    purged_rows = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.TIMESTAMP, server_default=func.now())
+    heartbeat_at = db.Column(db.TIMESTAMP, nullable=True) # Updated per batch; a stale running job is reclaimed
+    finished_at = db.Column(db.TIMESTAMP, nullable=True)
+
+    __table_args__ = (db.Index('ix_deletion_jobs_status', 'status'),)
+
+    def __repr__(self):
+        return f'<DeletionJob {self.id} {self.kind} {self.target_id} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'target_id': self.target_id,
+            'status': self.status,
+            'step': self.step,
+            'total_rows': self.total_rows,
+            'purged_rows': self.purged_rows,
+            'progress': round(min(self.purged_rows / self.total_rows, 1.0), 4) if self.total_rows else (1.0 if self.status == 'done' else 0.0),
+            'error': self.error,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
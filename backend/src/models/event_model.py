@@ -0,0 +1,52 @@
+import enum
+from backend.src.extensions import db
+from sqlalchemy.sql import func
+
+class LearningEventTypeEnum(enum.Enum):
+    CHAPTER_VIEW = "chapter_view"
+    INTERACTION = "interaction" # Time spent on interactive content (3D models, charts, ...)
+    QUIZ_COMPLETED = "quiz_completed"
+    CSAT = "csat" # 1-5 satisfaction score after a chapter or project
+    NPS = "nps" # 0-10 recommendation score
+
+class LearningEvent(db.Model):
+    """
+    Append-only log of client-side learning events (see docs/Metrics_Framework.md).
+    Rows are only ever bulk-inserted by the event buffer; the only update is the deletion
+    purge detaching them from a deleted course (course_id, chapter_id set to NULL).
+    """
+    __tablename__ = 'learning_events'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    event_type = db.Column(db.Enum(LearningEventTypeEnum), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=True)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapters.id'), nullable=True)
+    target = db.Column(db.String(128), nullable=True) # e.g. which interactive element was used
+    duration_ms = db.Column(db.Integer, nullable=True) # For interaction events
+    value = db.Column(db.Integer, nullable=True) # Score for quiz / CSAT / NPS events
+    occurred_at = db.Column(db.TIMESTAMP, nullable=False) # Client-reported time
+    received_at = db.Column(db.TIMESTAMP, server_default=func.now())
+
+    __table_args__ = (
+        db.Index('ix_learning_events_occurred_at', 'occurred_at'),
+        db.Index('ix_learning_events_user_occurred_at', 'user_id', 'occurred_at'),
+        db.Index('ix_learning_events_received_at', 'received_at', 'id'), # Metrics rollup checkpoint order
+    )
+
+    def __repr__(self):
+        return f'<LearningEvent {self.id} {self.event_type} User {self.user_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'event_type': self.event_type,
+            'course_id': self.course_id,
+            'chapter_id': self.chapter_id,
+            'target': self.target,
+            'duration_ms': self.duration_ms,
+            'value': self.value,
+            'occurred_at': self.occurred_at,
+            'received_at': self.received_at,
+        }
@@ -0,0 +1,47 @@
+from backend.src.extensions import db
+from sqlalchemy.sql import func
+from backend.src.utils.bitmap import bitmap_from_bytes, bitmap_count
+
+class WeeklyLearningActions(db.Model):
+    """Per-student engaged learning action counter for one ISO week (week_start is a Monday)."""
+    __tablename__ = 'weekly_learning_actions'
+
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    week_start = db.Column(db.Date, primary_key=True, index=True)
+    action_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<WeeklyLearningActions Student {self.student_id} Week {self.week_start}: {self.action_count}>'
+
+class DailyActiveUsers(db.Model):
+    """Set of users active on one day, stored as a user-id bitmap (see utils/bitmap.py)."""
+    __tablename__ = 'daily_active_users'
+
+    day = db.Column(db.Date, primary_key=True)
+    user_bitmap = db.Column(db.LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f'<DailyActiveUsers {self.day}: {bitmap_count(bitmap_from_bytes(self.user_bitmap))} users>'
+
+class RollupCheckpoint(db.Model):
+    """
+    Position (timestamp, then id) of the last source row folded into the rollups, per source table.
+    The due-date reminder worker keeps its checkpoint here too (source 'assignment_reminders').
+    """
+    __tablename__ = 'rollup_checkpoints'
+
+    source = db.Column(db.String(64), primary_key=True) # e.g. 'submissions', 'learning_events', 'assignment_reminders'
+    last_seen_at = db.Column(db.TIMESTAMP, nullable=True) # Source timestamp (submitted_at / received_at) of that row
+    last_id = db.Column(db.BigInteger, nullable=False, default=0) # Its id, to order rows sharing a timestamp
+    updated_at = db.Column(db.TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f'<RollupCheckpoint {self.source} @ {self.last_seen_at} #{self.last_id}>'
+
+    def to_dict(self):
+        return {
+            'source': self.source,
+            'last_seen_at': self.last_seen_at,
+            'last_id': self.last_id,
+            'updated_at': self.updated_at,
+        }
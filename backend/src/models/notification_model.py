@@ -0,0 +1,70 @@
+from backend.src.extensions import db
+from sqlalchemy.sql import func
+
+class Notification(db.Model):
+    """
+    One inbox entry of one user. Course-wide notifications are written for every enrolled
+    student by a single INSERT ... SELECT from enrollments (see services/notification_service.py).
+    """
+    __tablename__ = 'notifications'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    kind = db.Column(db.String(32), nullable=False) # 'assignment_created', 'submission_graded'
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=True)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.id'), nullable=True)
+    title = db.Column(db.String(255), nullable=False) # Assignment title at the time of the notification
+    created_at = db.Column(db.TIMESTAMP, server_default=func.now())
+    read_at = db.Column(db.TIMESTAMP, nullable=True)
+
+    # Inbox pages walk a user's notifications by descending id
+    __table_args__ = (db.Index('ix_notifications_user_id', 'user_id', 'id'),)
+
+    def __repr__(self):
+        return f'<Notification {self.id} {self.kind} for User {self.user_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'course_id': self.course_id,
+            'assignment_id': self.assignment_id,
+            'title': self.title,
+            'created_at': self.created_at,
+            'read_at': self.read_at,
+        }
+
+class NotificationCounter(db.Model):
+    """Unread notifications of a user, maintained with every insert and read (no COUNT scans)."""
+    __tablename__ = 'notification_counters'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<NotificationCounter User {self.user_id}: {self.unread_count} unread>'
+
+class NotificationFanout(db.Model):
+    """
+    A course-wide notification too large to write on the request path, delivered in the
+    background in batches of enrolled students (keyset on student_id, progress in `cursor`).
+    """
+    __tablename__ = 'notification_fanouts'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(32), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.id'), nullable=True)
+    title = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='pending') # pending, running, done, failed
+    cursor = db.Column(db.Integer, nullable=True) # Highest student_id already notified
+    delivered = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.TIMESTAMP, server_default=func.now())
+    heartbeat_at = db.Column(db.TIMESTAMP, nullable=True)
+    finished_at = db.Column(db.TIMESTAMP, nullable=True)
+
+    __table_args__ = (db.Index('ix_notification_fanouts_status', 'status'),)
+
+    def __repr__(self):
+        return f'<NotificationFanout {self.id} {self.kind} Course {self.course_id} {self.status}>'
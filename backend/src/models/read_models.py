@@ -0,0 +1,308 @@
+"""
+Column-projection read models for GET endpoints.
+
+Each Resource maps public field names to columns and declares its expansions:
+  * Embed     - a to-one related resource (teacher of a course, student of a submission)
+  * Children  - a to-many related resource (chapters of a course)
+  * Computed  - a scalar SQL expression (enrolled count), selected only when included
+
+A Resource's `live` criteria (e.g. "not soft-deleted") are added to every query for it, including
+the batched queries of expansions, so deleted rows never leak into any response.
+
+`project()` turns a Fieldset (utils/fieldsets.py) into SQL: only requested columns are selected,
+and each included Embed/Children costs one batched `WHERE key IN (...)` query regardless of the
+number of rows. Results are plain dicts with the same keys as the corresponding model's
+`to_dict()`; no ORM identity map, no change tracking, no unused columns such as password_hash.
+`from_records()` shapes rows that were loaded elsewhere (the submission archive) the same way.
+"""
+from dataclasses import dataclass
+from sqlalchemy import select, func, or_, case, cast, type_coerce
+from backend.src.extensions import db
+from backend.src.models.user_model import User
+from backend.src.models.course_model import Course, Chapter, Enrollment
+from backend.src.models.assignment_model import Assignment, Submission, SubmissionVersion
+from backend.src.models.reminder_model import AssignmentReminder
+from backend.src.models.stats_model import CourseStats, AssignmentStats
+from backend.src.models.notification_model import Notification
+from backend.src.models.dataset_model import Dataset, DatasetSeries
+from backend.src.models.deletion_model import DeletionJob
+from backend.src.utils.fieldsets import Fieldset, parse_fieldset
+from backend.src.utils.timing import phase
+
+IN_CHUNK_SIZE = 5000 # Keys per batched IN (...) query; stays under every backend's bind-parameter limit
+
+@dataclass(frozen=True)
+class Embed:
+    resource: 'Resource'
+    foreign_key: object # Column on the parent that references resource.key
+    default_fields: tuple[str, ...] | None = None # None = all fields of the embedded resource
+
+@dataclass(frozen=True)
+class Children:
+    resource: 'Resource'
+    parent_key: object # Column on the child that references the parent's key
+    order_by: tuple = ()
+
+@dataclass(frozen=True)
+class Computed:
+    expression: object # Factory returning a scalar SQL expression correlated to the parent row
+
+class Resource:
+    def __init__(self, name: str, model, fields: dict, expansions: dict | None = None, key: str = 'id', live: tuple = ()):
+        self.name = name
+        self.model = model
+        self.fields = fields # Public name -> column, in response order
+        self.expansions = expansions or {}
+        self.key = key
+        self.live = live # WHERE clauses every query for this resource gets
+
+    def parse(self, args, default_include=()) -> Fieldset:
+        """Parses ?fields= / ?include= for this resource; raises FieldsetError on unknown names."""
+        described = {
+            name: (None if isinstance(expansion, Computed) else tuple(expansion.resource.fields))
+            for name, expansion in self.expansions.items()
+        }
+        return parse_fieldset(args, self.fields, described, default_include)
+
+    def serialize(self, data: dict, fieldset: Fieldset | None) -> dict:
+        """Trims an already-built to_dict() (e.g. of a freshly written entity) to a fieldset."""
+        if fieldset is None or fieldset.fields is None:
+            return data
+        return {name: value for name, value in data.items()
+                if fieldset.wants(name) or name in fieldset.include}
+
+def _chunks(values: list, size: int = IN_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def _visible_fields(resource: Resource, fieldset: Fieldset) -> list[str]:
+    visible = [name for name in resource.fields if fieldset.wants(name)]
+    if not visible and not fieldset.include:
+        visible = [resource.key] # Never return bare empty objects
+    return visible
+
+def project(resource: Resource, fieldset: Fieldset | None = None, *criteria, joins=(), order_by=(), limit=None) -> list[dict]:
+    """
+    Runs one column-projection query for `resource` (plus one batched query per included
+    Embed / Children expansion) and returns response dicts.
+
+    `criteria` are WHERE clauses, `joins` (target, onclause) pairs for filtering through other
+    tables (e.g. enrollments), `order_by` the ORDER BY of the top-level query and `limit` its
+    LIMIT (for keyset-paginated lists).
+    """
+    fieldset = fieldset or Fieldset()
+    visible = _visible_fields(resource, fieldset)
+
+    # Row layout: visible fields, then hidden columns needed by expansions, then computed values
+    columns = [resource.fields[name] for name in visible]
+    hidden_index = {}
+    def _hidden(column) -> int:
+        for position, existing in enumerate(columns):
+            if existing is column:
+                return position
+        columns.append(column)
+        return len(columns) - 1
+
+    included = [(name, expansion) for name, expansion in resource.expansions.items() if fieldset.includes(name)]
+    for name, expansion in included:
+        if isinstance(expansion, Embed):
+            hidden_index[name] = _hidden(expansion.foreign_key)
+        elif isinstance(expansion, Children):
+            hidden_index[name] = _hidden(resource.fields[resource.key])
+    for name, expansion in included:
+        if isinstance(expansion, Computed):
+            columns.append(expansion.expression().label(name))
+            hidden_index[name] = len(columns) - 1
+
+    stmt = select(*columns).select_from(resource.model)
+    for target, onclause in joins:
+        stmt = stmt.join(target, onclause)
+    if criteria or resource.live:
+        stmt = stmt.where(*resource.live, *criteria)
+    if order_by:
+        stmt = stmt.order_by(*order_by)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    with phase('db'):
+        rows = db.session.execute(stmt).all()
+
+    with phase('serialize'): # Nested project() calls for expansions report their own db time
+        results = [dict(zip(visible, row)) for row in rows]
+        for name, expansion in included:
+            position = hidden_index[name]
+            if isinstance(expansion, Computed):
+                for data, row in zip(results, rows):
+                    data[name] = row[position]
+            elif isinstance(expansion, Embed):
+                _attach_embed(name, expansion, fieldset, results, rows, position)
+            else:
+                _attach_children(name, expansion, fieldset, results, rows, position)
+    return results
+
+def from_records(resource: Resource, fieldset: Fieldset | None, records: list[dict]) -> list[dict]:
+    """
+    Response dicts for records that did not come from `resource.model` (e.g. decoded from the
+    submission archive), keyed by public field name. Embed expansions are batched as in
+    project(); Children and Computed ones need the parent row in SQL and are rejected.
+    """
+    fieldset = fieldset or Fieldset()
+    visible = _visible_fields(resource, fieldset)
+    with phase('serialize'):
+        results = [{name: record.get(name) for name in visible} for record in records]
+        for name, expansion in resource.expansions.items():
+            if not fieldset.includes(name):
+                continue
+            if not isinstance(expansion, Embed):
+                raise ValueError(f"Expansion '{name}' of {resource.name} cannot be built from records.")
+            field = next(field for field, column in resource.fields.items() if column is expansion.foreign_key)
+            _attach_embed(name, expansion, fieldset, results, [(record[field],) for record in records], 0)
+    return results
+
+def _attach_embed(name, expansion: Embed, fieldset: Fieldset, results, rows, position):
+    target = expansion.resource
+    fields = fieldset.nested_fields(name) or expansion.default_fields
+    keys = list({row[position] for row in rows if row[position] is not None})
+    by_key = {}
+    if keys:
+        # Select the key even if the client did not ask for it, to map rows back
+        wanted = frozenset(fields) | {target.key} if fields is not None else None
+        for chunk in _chunks(keys):
+            for data in project(target, Fieldset(fields=wanted), target.fields[target.key].in_(chunk)):
+                by_key[data[target.key]] = data
+        if fields is not None and target.key not in fields:
+            by_key = {key: {k: v for k, v in data.items() if k != target.key} for key, data in by_key.items()}
+    for data, row in zip(results, rows):
+        data[name] = by_key.get(row[position])
+
+def _attach_children(name, expansion: Children, fieldset: Fieldset, results, rows, position):
+    target = expansion.resource
+    fields = fieldset.nested_fields(name)
+    parent_field = next(field for field, column in target.fields.items() if column is expansion.parent_key)
+    keys = [row[position] for row in rows]
+    grouped = {key: [] for key in keys}
+    if keys:
+        wanted = frozenset(fields) | {parent_field} if fields is not None else None
+        for chunk in _chunks(keys):
+            children = project(target, Fieldset(fields=wanted), expansion.parent_key.in_(chunk),
+                               order_by=(expansion.parent_key, *expansion.order_by))
+            for child in children:
+                grouped[child[parent_field]].append(child)
+        if fields is not None and parent_field not in fields:
+            for children in grouped.values():
+                for child in children:
+                    del child[parent_field]
+    for data, key in zip(results, keys):
+        data[name] = grouped[key]
+
+def _enrolled_count():
+    # Materialized counter, with a COUNT fallback for courses that have no stats row yet
+    materialized = select(CourseStats.enrolled_count).where(CourseStats.course_id == Course.id).scalar_subquery()
+    fallback = select(func.count(Enrollment.id)).where(Enrollment.course_id == Course.id).scalar_subquery()
+    return func.coalesce(materialized, fallback)
+
+def _course_not_deleted(course_id_column):
+    return course_id_column.not_in(select(Course.id).where(Course.deleted_at.isnot(None)))
+
+def _assignment_not_deleted(assignment_id_column):
+    # Few assignments are soft-deleted at any time (they are purged in the background), so NOT IN stays small
+    return assignment_id_column.not_in(select(Assignment.id).where(Assignment.deleted_at.isnot(None)))
+
+def _submission_count():
+    materialized = select(AssignmentStats.submission_count).where(AssignmentStats.assignment_id == Assignment.id).scalar_subquery()
+    fallback = select(func.count(Submission.id)).where(Submission.assignment_id == Assignment.id).scalar_subquery()
+    return func.coalesce(materialized, fallback)
+def _deletion_progress():
+    # Same as DeletionJob.to_dict()'s progress, minus the rounding
+    return case(
+        (DeletionJob.total_rows == 0, case((DeletionJob.status == 'done', 1.0), else_=0.0)),
+        (DeletionJob.purged_rows >= DeletionJob.total_rows, 1.0),
+        else_=cast(DeletionJob.purged_rows, db.Float) / DeletionJob.total_rows,
+    )
+
+
+USER = Resource('user', User, {
+    'id': User.id, 'username': User.username, 'email': User.email, 'role': User.role,
+    'first_name': User.first_name, 'last_name': User.last_name, 'profile_picture_url': User.profile_picture_url,
+    'created_at': User.created_at, 'updated_at': User.updated_at,
+})
+
+CHAPTER = Resource('chapter', Chapter, {
+    'id': Chapter.id, 'course_id': Chapter.course_id, 'title': Chapter.title, 'content': Chapter.content,
+    'content_html': Chapter.content_html, 'toc': Chapter.content_toc, 'order': Chapter.order, 'created_at': Chapter.created_at, 'updated_at': Chapter.updated_at,
+})
+
+COURSE = Resource('course', Course, {
+    'id': Course.id, 'title': Course.title, 'description': Course.description, 'teacher_id': Course.teacher_id,
+    'created_at': Course.created_at, 'updated_at': Course.updated_at,
+}, expansions={
+    'teacher': Embed(USER, Course.teacher_id),
+    'chapters': Children(CHAPTER, Chapter.course_id, order_by=(Chapter.order.asc(),)),
+    'enrolled_students_count': Computed(_enrolled_count),
+}, live=(Course.deleted_at.is_(None),))
+
+ASSIGNMENT = Resource('assignment', Assignment, {
+    'id': Assignment.id, 'course_id': Assignment.course_id, 'chapter_id': Assignment.chapter_id,
+    'title': Assignment.title, 'description': Assignment.description, 'due_date': Assignment.due_date,
+    'grading_scheme': Assignment.grading_scheme, 'is_quiz': type_coerce(Assignment.answer_key.isnot(None), db.Boolean),
+    'created_at': Assignment.created_at, 'updated_at': Assignment.updated_at,
+}, expansions={
+    'course': Embed(COURSE, Assignment.course_id, default_fields=('id', 'title')),
+    'chapter': Embed(CHAPTER, Assignment.chapter_id, default_fields=('id', 'title')),
+    'submission_count': Computed(_submission_count),
+}, live=(Assignment.deleted_at.is_(None),))
+
+SUBMISSION = Resource('submission', Submission, {
+    'id': Submission.id, 'assignment_id': Submission.assignment_id, 'student_id': Submission.student_id,
+    'submission_type': Submission.submission_type, 'content_text': Submission.content_text,
+    'file_url': Submission.file_url, 'submitted_at': Submission.submitted_at, 'version': Submission.version, 'grade': Submission.grade,
+    'score': Submission.score, 'feedback': Submission.feedback,
+}, expansions={
+    'student': Embed(USER, Submission.student_id, default_fields=('id', 'username', 'email')),
+    'assignment': Embed(ASSIGNMENT, Submission.assignment_id, default_fields=('id', 'title')),
+}, live=(_assignment_not_deleted(Submission.assignment_id),))
+
+SUBMISSION_VERSION = Resource('submission_version', SubmissionVersion, {
+    'version': SubmissionVersion.version, 'submission_type': SubmissionVersion.submission_type,
+    'file_url': SubmissionVersion.file_url, 'content_length': SubmissionVersion.content_length,
+    'submitted_at': SubmissionVersion.submitted_at,
+}, key='version')
+
+REMINDER = Resource('reminder', AssignmentReminder, {
+    'id': AssignmentReminder.id, 'assignment_id': AssignmentReminder.assignment_id,
+    'student_id': AssignmentReminder.student_id, 'due_date': AssignmentReminder.due_date,
+    'created_at': AssignmentReminder.created_at,
+}, expansions={
+    'assignment': Embed(ASSIGNMENT, AssignmentReminder.assignment_id, default_fields=('id', 'title', 'course_id')),
+}, live=(_assignment_not_deleted(AssignmentReminder.assignment_id),))
+
+NOTIFICATION = Resource('notification', Notification, {
+    'id': Notification.id, 'kind': Notification.kind, 'course_id': Notification.course_id,
+    'assignment_id': Notification.assignment_id, 'title': Notification.title,
+    'created_at': Notification.created_at, 'read_at': Notification.read_at,
+}, expansions={
+    'course': Embed(COURSE, Notification.course_id, default_fields=('id', 'title')),
+    'assignment': Embed(ASSIGNMENT, Notification.assignment_id, default_fields=('id', 'title', 'due_date')),
+}, live=(or_(Notification.assignment_id.is_(None), _assignment_not_deleted(Notification.assignment_id)),
+         or_(Notification.course_id.is_(None), _course_not_deleted(Notification.course_id))))
+
+SERIES = Resource('series', DatasetSeries, {
+    'id': DatasetSeries.id, 'dataset_id': DatasetSeries.dataset_id, 'name': DatasetSeries.name, 'unit': DatasetSeries.unit,
+    'point_count': DatasetSeries.point_count, 'start_at': DatasetSeries.start_at, 'end_at': DatasetSeries.end_at,
+    'min_value': DatasetSeries.min_value, 'max_value': DatasetSeries.max_value,
+    'created_at': DatasetSeries.created_at, 'updated_at': DatasetSeries.updated_at,
+})
+
+DATASET = Resource('dataset', Dataset, {
+    'id': Dataset.id, 'course_id': Dataset.course_id, 'chapter_id': Dataset.chapter_id, 'title': Dataset.title,
+    'description': Dataset.description, 'created_at': Dataset.created_at, 'updated_at': Dataset.updated_at,
+}, expansions={
+    'series': Children(SERIES, DatasetSeries.dataset_id, order_by=(DatasetSeries.id,)),
+    'chapter': Embed(CHAPTER, Dataset.chapter_id, default_fields=('id', 'title')),
+}, live=(_course_not_deleted(Dataset.course_id),))
+
+DELETION_JOB = Resource('deletion_job', DeletionJob, {
+    'id': DeletionJob.id, 'kind': DeletionJob.kind, 'target_id': DeletionJob.target_id, 'status': DeletionJob.status,
+    'step': DeletionJob.step, 'total_rows': DeletionJob.total_rows, 'purged_rows': DeletionJob.purged_rows,
+    'progress': _deletion_progress(), 'error': DeletionJob.error,
+    'created_at': DeletionJob.created_at, 'finished_at': DeletionJob.finished_at,
+})
@@ -0,0 +1,34 @@
+from backend.src.extensions import db
+from sqlalchemy.sql import func
+from sqlalchemy import UniqueConstraint
+
+class AssignmentReminder(db.Model):
+    __tablename__ = 'assignment_reminders'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.id'), nullable=False, index=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    due_date = db.Column(db.TIMESTAMP, nullable=False) # Deadline the reminder was emitted for
+    created_at = db.Column(db.TIMESTAMP, server_default=func.now())
+
+    # Relationships
+    assignment = db.relationship('Assignment')
+    student = db.relationship('User')
+
+    # One reminder per student per assignment; makes the bulk INSERT ... SELECT idempotent across workers
+    __table_args__ = (UniqueConstraint('assignment_id', 'student_id', name='uq_assignment_student_reminder'),)
+
+    def __repr__(self):
+        return f'<AssignmentReminder Assignment {self.assignment_id} Student {self.student_id}>'
+
+    def to_dict(self, include_assignment=True):
+        data = {
+            'id': self.id,
+            'assignment_id': self.assignment_id,
+            'student_id': self.student_id,
+            'due_date': self.due_date,
+            'created_at': self.created_at,
+        }
+        if include_assignment and self.assignment:
+            data['assignment'] = {'id': self.assignment.id, 'title': self.assignment.title, 'course_id': self.assignment.course_id}
+        return data
@@ -0,0 +1,50 @@
+from backend.src.extensions import db
+
+class CourseStats(db.Model):
+    """
+    Materialized counters for one course, kept current by stats_service in the same
+    transaction as the enrollment / submission / grading that changes them.
+    Rebuild from source tables with `flask rebuild-stats`.
+    """
+    __tablename__ = 'course_stats'
+
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), primary_key=True)
+    enrolled_count = db.Column(db.Integer, nullable=False, default=0)
+    submission_count = db.Column(db.Integer, nullable=False, default=0)
+    graded_count = db.Column(db.Integer, nullable=False, default=0)
+    last_activity_at = db.Column(db.TIMESTAMP, nullable=True)
+
+    # One-to-one, joined so serializing a list of courses never issues a query per course
+    course = db.relationship('Course', backref=db.backref('stats', uselist=False, lazy='joined'))
+
+    def __repr__(self):
+        return f'<CourseStats Course {self.course_id}>'
+
+    def to_dict(self):
+        return {
+            'enrolled_count': self.enrolled_count,
+            'submission_count': self.submission_count,
+            'graded_count': self.graded_count,
+            'last_activity_at': self.last_activity_at,
+        }
+
+class AssignmentStats(db.Model):
+    """Materialized counters for one assignment (see CourseStats)."""
+    __tablename__ = 'assignment_stats'
+
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.id'), primary_key=True)
+    submission_count = db.Column(db.Integer, nullable=False, default=0)
+    graded_count = db.Column(db.Integer, nullable=False, default=0)
+    last_activity_at = db.Column(db.TIMESTAMP, nullable=True)
+
+    assignment = db.relationship('Assignment', backref=db.backref('stats', uselist=False, lazy='joined'))
+
+    def __repr__(self):
+        return f'<AssignmentStats Assignment {self.assignment_id}>'
+
+    def to_dict(self):
+        return {
+            'submission_count': self.submission_count,
+            'graded_count': self.graded_count,
+            'last_activity_at': self.last_activity_at,
+        }
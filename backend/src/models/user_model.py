@@ -54,12 +54,12 @@ class User(db.Model):
             'id': self.id,
             'username': self.username,
             'email': self.email,
-            'role': self.role.value if isinstance(self.role, RoleEnum) else str(self.role), # Ensure role is stringified
+            'role': self.role, # RoleEnum; the app's JSON provider emits its value
             'first_name': self.first_name,
             'last_name': self.last_name,
             'profile_picture_url': self.profile_picture_url,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
         # Example for conditional sensitive data, though not used for password_hash here
         # if include_sensitive:
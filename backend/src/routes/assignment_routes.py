@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, request
 from backend.src.utils.decorators import jwt_required, roles_required
-from backend.src.controllers import assignment_controller # Corrected import path
+from backend.src.controllers import assignment_controller, deletion_controller
 
 assignment_bp = Blueprint('assignments', __name__, url_prefix='/assignments')
 
@@ -34,15 +34,83 @@ def get_my_submission_route(current_user, assignment_id: int):
     """
     response, status_code = assignment_controller.get_my_submission_controller(
         current_student_id=current_user.id,
-        assignment_id=assignment_id
+        assignment_id=assignment_id,
+        query_args=request.args
+    )
+    return jsonify(response), status_code
+
+# GET /assignments/<assignment_id>/quiz - A quiz's questions (answers only for the course teacher)
+@assignment_bp.route('/<int:assignment_id>/quiz', methods=['GET'])
+@jwt_required
+def get_quiz_route(current_user, assignment_id: int):
+    response, status_code = assignment_controller.get_quiz_controller(current_user, assignment_id)
+    return jsonify(response), status_code
+
+# GET /assignments/reminders - Student lists due-date reminders emitted for them
+@assignment_bp.route('/reminders', methods=['GET'])
+@jwt_required
+@roles_required(['student'])
+def list_my_reminders_route(current_user):
+    """
+    Route for a student to list reminders for assignments they have not submitted yet.
+    """
+    response, status_code = assignment_controller.list_my_reminders_controller(
+        current_student_id=current_user.id,
+        query_args=request.args
     )
     return jsonify(response), status_code
 
 
+# Submission history: visible to the submitting student and the course teacher
+@assignment_bp.route('/submissions/<int:submission_id>/versions', methods=['GET'])
+@jwt_required
+def list_submission_versions_route(current_user, submission_id: int):
+    """ Lists every version of a submission (metadata only), oldest first. """
+    response, status_code = assignment_controller.list_submission_versions_controller(current_user.id, submission_id, request.args)
+    return jsonify(response), status_code
+
+@assignment_bp.route('/submissions/<int:submission_id>/versions/<int:version>', methods=['GET'])
+@jwt_required
+def get_submission_version_route(current_user, submission_id: int, version: int):
+    """ One version of a submission, with its content_text. """
+    response, status_code = assignment_controller.get_submission_version_controller(current_user.id, submission_id, version)
+    return jsonify(response), status_code
+
+@assignment_bp.route('/submissions/<int:submission_id>/diff', methods=['GET'])
+@jwt_required
+def diff_submission_versions_route(current_user, submission_id: int):
+    """ Unified diff between two versions: ?from=<version>&to=<version>. """
+    response, status_code = assignment_controller.diff_submission_versions_controller(current_user.id, submission_id, request.args)
+    return jsonify(response), status_code
+
+
 # --- Teacher specific routes for assignments ---
 # These are on the `assignment_bp` as they are actions on specific assignments,
 # although creating an assignment itself might be on `course_bp` (e.g. POST /courses/<id>/assignments)
 
+# DELETE /assignments/<assignment_id> - Teacher deletes an assignment (hidden at once, purged in the background)
+@assignment_bp.route('/<int:assignment_id>', methods=['DELETE'])
+@jwt_required
+@roles_required(['teacher'])
+def delete_assignment_route(current_user, assignment_id: int):
+    response, status_code = deletion_controller.delete_assignment_controller(current_user.id, assignment_id)
+    return jsonify(response), status_code
+
+# PUT /assignments/<assignment_id>/answer-key - Teacher sets a quiz's answer key; submissions are re-graded
+@assignment_bp.route('/<int:assignment_id>/answer-key', methods=['PUT'])
+@jwt_required
+@roles_required(['teacher'])
+def set_answer_key_route(current_user, assignment_id: int):
+    """
+    Route for a teacher to set or replace the answer key of an assignment (making it a quiz).
+    Responds with how many submissions were re-graded and how many grades changed.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Request body must be JSON'}), 400
+    response, status_code = assignment_controller.set_answer_key_controller(current_user.id, assignment_id, data)
+    return jsonify(response), status_code
+
 # GET /assignments/<assignment_id>/submissions - Teacher lists all submissions for an assignment
 @assignment_bp.route('/<int:assignment_id>/submissions', methods=['GET'])
 @jwt_required
@@ -53,7 +121,8 @@ def list_submissions_for_assignment_route(current_user, assignment_id: int):
     """
     response, status_code = assignment_controller.list_submissions_for_assignment_controller(
         current_teacher_id=current_user.id,
-        assignment_id=assignment_id
+        assignment_id=assignment_id,
+        query_args=request.args
     )
     return jsonify(response), status_code
 
@@ -75,3 +144,18 @@ def grade_submission_route(current_user, submission_id: int):
         request_data=data
     )
     return jsonify(response), status_code
+
+# GET /assignments/<assignment_id>/analytics - Teacher gets score statistics for an assignment
+@assignment_bp.route('/<int:assignment_id>/analytics', methods=['GET'])
+@jwt_required
+@roles_required(['teacher'])
+def get_assignment_analytics_route(current_user, assignment_id: int):
+    """
+    Route for a teacher to get mean, percentiles, histogram and per-student z-scores.
+    """
+    response, status_code = assignment_controller.get_assignment_analytics_controller(
+        current_teacher_id=current_user.id,
+        assignment_id=assignment_id,
+        query_args=request.args
+    )
+    return jsonify(response), status_code
@@ -1,9 +1,11 @@
 from flask import Blueprint, request, jsonify
 from backend.src.controllers.auth_controller import register_user_controller, login_user_controller
+from backend.src.utils.decorators import rate_limited
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limited('auth', identity_fields=('username', 'email'))
 def register_route():
     """
     Registration route. Expects JSON data with user details.
@@ -16,6 +18,7 @@ def register_route():
     return jsonify(response), status_code
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limited('auth', identity_fields=('username_or_email',))
 def login_route():
     """
     Login route. Expects JSON data with username_or_email and password.
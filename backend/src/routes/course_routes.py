@@ -1,6 +1,7 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from backend.src.utils.decorators import jwt_required, roles_required
-from backend.src.controllers import course_controller, assignment_controller # Import assignment_controller
+from backend.src.utils.cache import catalog_cached
+from backend.src.controllers import course_controller, assignment_controller, deletion_controller, dataset_controller
 
 course_bp = Blueprint('courses', __name__, url_prefix='/courses')
 
@@ -15,7 +16,7 @@ def list_my_enrolled_courses(current_user):
     """
     # current_user object is passed by @jwt_required
     # Assuming 'student' role check is implicitly handled or to be added via @roles_required
-    response, status_code = course_controller.list_my_courses_controller(current_user.id)
+    response, status_code = course_controller.list_my_courses_controller(current_user.id, request.args)
     return jsonify(response), status_code
 
 @course_bp.route('/my-courses/<int:course_id>', methods=['GET'])
@@ -26,27 +27,29 @@ def get_my_enrolled_course_details(current_user, course_id: int):
     Gets detailed information for a specific course the authenticated student is enrolled in.
     Includes chapters.
     """
-    response, status_code = course_controller.get_my_course_details_controller(current_user.id, course_id)
+    response, status_code = course_controller.get_my_course_details_controller(current_user.id, course_id, request.args)
     return jsonify(response), status_code
 
 # Public/General course routes (do not require enrollment, but JWT for user context if needed)
 @course_bp.route('/', methods=['GET'])
 # No @jwt_required here if truly public, or @jwt_optional if context is useful but not mandatory
+@catalog_cached
 def list_all_courses():
     """
     Lists all available courses. (Public access)
     """
-    response, status_code = course_controller.list_all_public_courses_controller()
+    response, status_code = course_controller.list_all_public_courses_controller(request.args)
     return jsonify(response), status_code
 
 @course_bp.route('/<int:course_id>', methods=['GET'])
 # No @jwt_required here if truly public
+@catalog_cached
 def get_course_details(course_id: int):
     """
     Gets detailed information for a specific course. (Public access)
     Includes chapters.
     """
-    response, status_code = course_controller.get_public_course_details_controller(course_id)
+    response, status_code = course_controller.get_public_course_details_controller(course_id, request.args)
     return jsonify(response), status_code
 
 @course_bp.route('/<int:course_id>/chapters', methods=['GET'])
@@ -59,7 +62,7 @@ def get_chapters_for_course(current_user, course_id: int):
     """
     # If this route should be public, remove @jwt_required and pass None for user_id
     # For now, assuming only logged-in users can see chapters, enrollment checked by controller/service.
-    response, status_code = course_controller.get_course_chapters_controller(course_id, current_user_id=current_user.id)
+    response, status_code = course_controller.get_course_chapters_controller(course_id, current_user_id=current_user.id, query_args=request.args)
     return jsonify(response), status_code
 
 # --- Teacher specific routes ---
@@ -69,7 +72,7 @@ def get_chapters_for_course(current_user, course_id: int):
 @roles_required(['teacher'])
 def list_my_teaching_courses(current_user):
     """ Lists courses taught by the authenticated teacher. """
-    response, status_code = course_controller.list_my_taught_courses_controller(current_user.id)
+    response, status_code = course_controller.list_my_taught_courses_controller(current_user.id, request.args)
     return jsonify(response), status_code
 
 @course_bp.route('/', methods=['POST'])
@@ -94,6 +97,88 @@ def add_chapter_to_course_route(current_user, course_id: int):
     response, status_code = course_controller.add_chapter_controller(current_user.id, course_id, data)
     return jsonify(response), status_code
 
+@course_bp.route('/<int:course_id>/chapters/import', methods=['POST'])
+@jwt_required
+@roles_required(['teacher'])
+def import_chapters_route(current_user, course_id: int):
+    """
+    Imports chapters from a zip/tar of Markdown files plus manifest.json, sent as a multipart
+    'file' field or as the raw request body. Authenticated user must be the teacher of the course.
+    """
+    upload = request.files.get('file')
+    stream = upload.stream if upload is not None else request.stream
+    response, status_code = course_controller.import_chapters_controller(
+        current_user.id, course_id, stream, request.content_length, request.args)
+    return jsonify(response), status_code
+
+@course_bp.route('/<int:course_id>/chapters/<int:chapter_id>', methods=['PATCH'])
+@jwt_required
+@roles_required(['teacher'])
+def update_chapter_route(current_user, course_id: int, chapter_id: int):
+    """ Edits a chapter's title and/or content. Authenticated user must be the teacher of the course. """
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Request body must be JSON'}), 400
+    response, status_code = course_controller.update_chapter_controller(current_user.id, course_id, chapter_id, data)
+    return jsonify(response), status_code
+
+@course_bp.route('/<int:course_id>/chapters/order', methods=['PUT'])
+@jwt_required
+@roles_required(['teacher'])
+def reorder_chapters_route(current_user, course_id: int):
+    """ Applies a new chapter order ({"chapter_ids": [...]}, every chapter once). Authenticated user must be the teacher of the course. """
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Request body must be JSON'}), 400
+    response, status_code = course_controller.reorder_chapters_controller(current_user.id, course_id, data)
+    return jsonify(response), status_code
+
+@course_bp.route('/<int:course_id>/export', methods=['GET'])
+@jwt_required
+@roles_required(['teacher'])
+def export_course_route(current_user, course_id: int):
+    """
+    Streams the course as a zip package (manifest, chapters, assignments; ?submissions=true adds
+    submissions). Authenticated user must be the teacher of the course.
+    """
+    body, status_code = course_controller.export_course_controller(current_user.id, course_id, request.args)
+    if status_code != 200:
+        return jsonify(body), status_code
+    filename, chunks = body
+    # The generator reads the database as the client downloads, so it keeps the request context
+    return Response(stream_with_context(chunks), mimetype='application/zip', headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no',
+    })
+
+@course_bp.route('/import', methods=['POST'])
+@jwt_required
+@roles_required(['teacher'])
+def import_course_package_route(current_user):
+    """ Creates a course from an exported package (multipart 'file' field or raw request body). """
+    upload = request.files.get('file')
+    stream = upload.stream if upload is not None else request.stream
+    response, status_code = course_controller.import_course_package_controller(
+        current_user.id, stream, request.content_length, request.args)
+    return jsonify(response), status_code
+
+@course_bp.route('/<int:course_id>', methods=['DELETE'])
+@jwt_required
+@roles_required(['teacher'])
+def delete_course_route(current_user, course_id: int):
+    """ Deletes a course (hidden at once, purged in the background). Authenticated user must be the teacher of the course. """
+    response, status_code = deletion_controller.delete_course_controller(current_user.id, course_id)
+    return jsonify(response), status_code
+
+@course_bp.route('/<int:course_id>/clone', methods=['POST'])
+@jwt_required
+@roles_required(['teacher'])
+def clone_course_route(current_user, course_id: int):
+    """ Copies a course with its chapters and assignments. Authenticated user must be the teacher of the course. """
+    data = request.get_json(silent=True) # Body is optional
+    response, status_code = course_controller.clone_course_controller(current_user.id, course_id, data)
+    return jsonify(response), status_code
+
 @course_bp.route('/<int:course_id>/enrollments', methods=['POST'])
 @jwt_required
 @roles_required(['teacher'])
@@ -110,10 +195,32 @@ def enroll_student_in_course_route(current_user, course_id: int):
 @roles_required(['teacher'])
 def list_students_in_course_route(current_user, course_id: int):
     """ Lists students enrolled in a specific course taught by the authenticated teacher. """
-    response, status_code = course_controller.list_enrolled_students_in_course_controller(current_user.id, course_id)
+    response, status_code = course_controller.list_enrolled_students_in_course_controller(current_user.id, course_id, request.args)
     return jsonify(response), status_code
 
 
+# --- Monitoring datasets of a course (series, points and charts: routes/dataset_routes.py) ---
+
+# GET /courses/<course_id>/datasets - Teacher or enrolled student lists the course's datasets
+@course_bp.route('/<int:course_id>/datasets', methods=['GET'])
+@jwt_required
+def list_course_datasets_route(current_user, course_id: int):
+    """ Lists a course's datasets (?chapter_id= for one chapter's, ?include=series for their series). """
+    response, status_code = dataset_controller.list_course_datasets_controller(current_user, course_id, request.args)
+    return jsonify(response), status_code
+
+# POST /courses/<course_id>/datasets - Teacher adds a dataset to their course
+@course_bp.route('/<int:course_id>/datasets', methods=['POST'])
+@jwt_required
+@roles_required(['teacher'])
+def create_dataset_route(current_user, course_id: int):
+    """ Creates an empty dataset ({"title", "description", "chapter_id"}). Authenticated user must be the teacher of the course. """
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Request body must be JSON'}), 400
+    response, status_code = dataset_controller.create_dataset_controller(current_user.id, course_id, data)
+    return jsonify(response), status_code
+
 # --- Routes related to Assignments within a Course ---
 
 # GET /courses/<course_id>/assignments - Student lists assignments for an enrolled course
@@ -131,7 +238,8 @@ def list_course_assignments_route(current_user, course_id: int):
     # If teachers also use this, controller logic might need adjustment or a separate teacher endpoint.
     response, status_code = assignment_controller.list_course_assignments_controller(
         current_student_id=current_user.id, # Assumes student context from jwt
-        course_id=course_id
+        course_id=course_id,
+        query_args=request.args
     )
     return jsonify(response), status_code
 
@@ -154,6 +262,23 @@ def create_assignment_for_course_route(current_user, course_id: int):
     )
     return jsonify(response), status_code
 
+# GET /courses/<course_id>/analytics - Teacher gets score statistics across a course's assignments
+@course_bp.route('/<int:course_id>/analytics', methods=['GET'])
+@jwt_required
+@roles_required(['teacher'])
+def get_course_analytics_route(current_user, course_id: int):
+    """
+    Route for a teacher to get score statistics for all graded submissions in their course.
+    Per-student z-scores use each student's mean score across assignments.
+    """
+    response, status_code = assignment_controller.get_course_analytics_controller(
+        current_teacher_id=current_user.id,
+        course_id=course_id,
+        query_args=request.args
+    )
+    return jsonify(response), status_code
+
+
 
 # Student enrollment route (could be a separate blueprint or handled by students themselves)
 # For now, teacher enrolls student. If students self-enroll, this would change.
@@ -0,0 +1,72 @@
+from flask import Blueprint, jsonify, request
+from backend.src.utils.decorators import jwt_required, roles_required
+from backend.src.controllers import dataset_controller
+
+dataset_bp = Blueprint('datasets', __name__, url_prefix='/datasets')
+
+# Monitoring datasets of a course (created and listed under /courses/<id>/datasets)
+
+# GET /datasets/<dataset_id> - Dataset with its series summaries (teacher or enrolled student)
+@dataset_bp.route('/<int:dataset_id>', methods=['GET'])
+@jwt_required
+def get_dataset_route(current_user, dataset_id: int):
+    response, status_code = dataset_controller.get_dataset_controller(current_user, dataset_id, request.args)
+    return jsonify(response), status_code
+
+@dataset_bp.route('/<int:dataset_id>', methods=['PATCH'])
+@jwt_required
+@roles_required(['teacher'])
+def update_dataset_route(current_user, dataset_id: int):
+    """ Edits a dataset's title, description or chapter. Authenticated user must be the teacher of the course. """
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Request body must be JSON'}), 400
+    response, status_code = dataset_controller.update_dataset_controller(current_user.id, dataset_id, data)
+    return jsonify(response), status_code
+
+@dataset_bp.route('/<int:dataset_id>', methods=['DELETE'])
+@jwt_required
+@roles_required(['teacher'])
+def delete_dataset_route(current_user, dataset_id: int):
+    """ Deletes a dataset with its series and their points. """
+    response, status_code = dataset_controller.delete_dataset_controller(current_user.id, dataset_id)
+    return jsonify(response), status_code
+
+@dataset_bp.route('/<int:dataset_id>/series', methods=['POST'])
+@jwt_required
+@roles_required(['teacher'])
+def create_series_route(current_user, dataset_id: int):
+    """ Adds a series ({"name": "PM2.5", "unit": "µg/m³"}); points are uploaded separately. """
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Request body must be JSON'}), 400
+    response, status_code = dataset_controller.create_series_controller(current_user.id, dataset_id, data)
+    return jsonify(response), status_code
+
+@dataset_bp.route('/<int:dataset_id>/series/<int:series_id>', methods=['DELETE'])
+@jwt_required
+@roles_required(['teacher'])
+def delete_series_route(current_user, dataset_id: int, series_id: int):
+    response, status_code = dataset_controller.delete_series_controller(current_user.id, dataset_id, series_id)
+    return jsonify(response), status_code
+
+# POST /datasets/<dataset_id>/series/<series_id>/points - Append points (JSON or CSV body)
+@dataset_bp.route('/<int:dataset_id>/series/<int:series_id>/points', methods=['POST'])
+@jwt_required
+@roles_required(['teacher'])
+def append_points_route(current_user, dataset_id: int, series_id: int):
+    """
+    Uploads points as the raw request body: JSON [[timestamp, value], ...] or CSV timestamp,value
+    lines. Timestamps are epoch milliseconds or ISO 8601; existing timestamps are overwritten.
+    """
+    response, status_code = dataset_controller.append_points_controller(
+        current_user.id, dataset_id, series_id, request.stream, request.content_length, request.mimetype)
+    return jsonify(response), status_code
+
+# GET /datasets/<dataset_id>/chart - Downsampled points for a chart (?start, ?end, ?points, ?series)
+@dataset_bp.route('/<int:dataset_id>/chart', methods=['GET'])
+@jwt_required
+def chart_data_route(current_user, dataset_id: int):
+    """ At most ?points= points per series over the requested time range, picked by LTTB. """
+    response, status_code = dataset_controller.chart_data_controller(current_user, dataset_id, request.args)
+    return jsonify(response), status_code
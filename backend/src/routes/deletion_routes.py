@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify, request
+from backend.src.utils.decorators import jwt_required, roles_required
+from backend.src.controllers import deletion_controller
+
+deletion_bp = Blueprint('deletions', __name__, url_prefix='/deletions')
+
+# Progress of background purges started by DELETE /courses/<id> and DELETE /assignments/<id>
+
+@deletion_bp.route('/', methods=['GET'])
+@jwt_required
+@roles_required(['teacher'])
+def list_deletion_jobs_route(current_user):
+    """ Lists the authenticated teacher's most recent deletion jobs. """
+    response, status_code = deletion_controller.list_deletion_jobs_controller(current_user.id, request.args)
+    return jsonify(response), status_code
+
+@deletion_bp.route('/<int:job_id>', methods=['GET'])
+@jwt_required
+@roles_required(['teacher'])
+def get_deletion_job_route(current_user, job_id: int):
+    """ Status and progress (purged_rows / total_rows) of one deletion job. """
+    response, status_code = deletion_controller.get_deletion_job_controller(current_user.id, job_id, request.args)
+    return jsonify(response), status_code
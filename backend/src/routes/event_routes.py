@@ -0,0 +1,27 @@
+from flask import Blueprint, jsonify, request, current_app
+from backend.src.utils.decorators import jwt_required
+from backend.src.controllers import event_controller
+
+event_bp = Blueprint('events', __name__, url_prefix='/events')
+
+# POST /events/ - Client submits a batch of learning events (NDJSON, one event per line)
+@event_bp.route('/', methods=['POST'])
+@jwt_required
+def ingest_events_route(current_user):
+    """
+    Route for clients to report learning events (chapter views, interactions, CSAT, ...).
+    Expects `Content-Type: application/x-ndjson`.
+    """
+    max_bytes = current_app.config.get('EVENT_MAX_BATCH_BYTES', 512 * 1024)
+    if request.content_length is not None and request.content_length > max_bytes:
+        return jsonify({'message': f'Batch exceeds the maximum of {max_bytes} bytes.'}), 413
+
+    response, status_code = event_controller.ingest_events_controller(
+        current_user_id=current_user.id,
+        body=request.get_data(cache=False)
+    )
+    if status_code == 429:
+        # Tell well-behaved clients when to retry instead of hammering the buffer
+        retry_after = max(1, int(current_app.config.get('EVENT_FLUSH_INTERVAL_SECONDS', 5)))
+        return jsonify(response), status_code, {'Retry-After': str(retry_after)}
+    return jsonify(response), status_code
@@ -0,0 +1,43 @@
+from flask import Blueprint, jsonify, request
+from backend.src.utils.decorators import jwt_required, roles_required
+from backend.src.controllers import metrics_controller
+
+metrics_bp = Blueprint('metrics', __name__, url_prefix='/metrics')
+
+# All metrics are served from the rollup tables maintained by metrics_service.refresh_rollups()
+
+@metrics_bp.route('/wela', methods=['GET'])
+@jwt_required
+@roles_required(['teacher'])
+def get_wela_route(current_user):
+    """ Weekly Engaged Learning Actions. Optional ?week=YYYY-MM-DD (any day of the week). """
+    response, status_code = metrics_controller.get_wela_controller(request.args.get('week'), request.args)
+    return jsonify(response), status_code
+
+@metrics_bp.route('/active-users', methods=['GET'])
+@jwt_required
+@roles_required(['teacher'])
+def get_active_users_route(current_user):
+    """ DAU / WAU / MAU. Optional ?date=YYYY-MM-DD (defaults to today). """
+    response, status_code = metrics_controller.get_active_users_controller(request.args.get('date'), request.args)
+    return jsonify(response), status_code
+
+@metrics_bp.route('/retention', methods=['GET'])
+@jwt_required
+@roles_required(['teacher'])
+def get_retention_route(current_user):
+    """ Cohort retention. Requires ?start=YYYY-MM-DD, optional ?period=week|month. """
+    response, status_code = metrics_controller.get_retention_controller(
+        request.args.get('start'),
+        request.args.get('period', 'week'),
+        request.args
+    )
+    return jsonify(response), status_code
+
+@metrics_bp.route('/timings', methods=['GET'])
+@jwt_required
+@roles_required(['teacher'])
+def get_timings_route(current_user):
+    """ Per-route Server-Timing phase histograms (jwt, roles, db, serialize, json, app, total) of this worker. """
+    response, status_code = metrics_controller.get_timings_controller(request.args)
+    return jsonify(response), status_code
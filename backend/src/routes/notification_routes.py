@@ -0,0 +1,59 @@
+from flask import Blueprint, Response, jsonify, request
+from backend.src.utils.decorators import jwt_required, stream_auth_required
+from backend.src.controllers import notification_controller
+
+notification_bp = Blueprint('notifications', __name__, url_prefix='/notifications')
+
+# GET /notifications/ - The authenticated user's inbox, newest first (keyset pages via ?before=)
+@notification_bp.route('/', methods=['GET'])
+@jwt_required
+def list_notifications_route(current_user):
+    """ One page of notifications plus `next_before` (cursor of the next page) and `unread_count`. """
+    response, status_code = notification_controller.list_notifications_controller(current_user.id, request.args)
+    return jsonify(response), status_code
+
+# GET /notifications/unread-count - Unread badge, read from a counter row
+@notification_bp.route('/unread-count', methods=['GET'])
+@jwt_required
+def get_unread_count_route(current_user):
+    response, status_code = notification_controller.get_unread_count_controller(current_user.id, request.args)
+    return jsonify(response), status_code
+
+# POST /notifications/<notification_id>/read - Mark one notification read
+@notification_bp.route('/<int:notification_id>/read', methods=['POST'])
+@jwt_required
+def mark_read_route(current_user, notification_id: int):
+    response, status_code = notification_controller.mark_read_controller(current_user.id, notification_id)
+    return jsonify(response), status_code
+
+# POST /notifications/read-all - Mark every notification read
+@notification_bp.route('/read-all', methods=['POST'])
+@jwt_required
+def mark_all_read_route(current_user):
+    response, status_code = notification_controller.mark_all_read_controller(current_user.id)
+    return jsonify(response), status_code
+
+# POST /notifications/stream-token - Short-lived token for opening the stream from a browser
+@notification_bp.route('/stream-token', methods=['POST'])
+@jwt_required
+def create_stream_token_route(current_user):
+    response, status_code = notification_controller.create_stream_token_controller(current_user.id)
+    return jsonify(response), status_code
+
+# GET /notifications/stream - Server-Sent Events: submission_graded, assignment_created, resync
+@notification_bp.route('/stream', methods=['GET'])
+@stream_auth_required
+def notification_stream_route(current_user):
+    """
+    Long-lived text/event-stream for the authenticated user (Authorization header, or
+    ?token=<stream token> for EventSource). Reconnecting clients send the standard
+    Last-Event-ID header (or ?last_event_id=) to receive the events they missed.
+    """
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    body, status_code = notification_controller.open_stream_controller(current_user, last_event_id)
+    if status_code != 200:
+        return jsonify(body), status_code
+    return Response(body, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no', # Keep reverse proxies (nginx) from buffering the stream
+    })
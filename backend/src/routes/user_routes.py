@@ -10,7 +10,7 @@ def get_profile_route(current_user): # current_user is injected by @jwt_required
     """
     Route to get the profile of the authenticated user.
     """
-    response, status_code = get_user_profile_controller(current_user.id)
+    response, status_code = get_user_profile_controller(current_user, request.args)
     return jsonify(response), status_code
 
 @user_bp.route('/profile', methods=['PUT'])
@@ -0,0 +1,263 @@
+import base64
+import json
+import zlib
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from sqlalchemy import select, update, delete, insert, exists, or_, union_all
+from backend.src.models import (
+    Course, Assignment, Submission, SubmissionVersion, SubmissionTypeEnum, SubmissionArchiveSegment, ArchivedSubmission
+)
+from backend.src.models.read_models import from_records, SUBMISSION
+from backend.src.extensions import db
+from backend.src.utils.cache import catalog_cache
+from backend.src.utils.fieldsets import Fieldset
+
+class ArchiveServiceError(Exception):
+    """Custom exception for archive service errors."""
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+# --- Segment encoding ---
+# A segment is a JSON list of submission records (SUBMISSION field names) compressed with zlib.
+# Each record carries its superseded versions (submission_versions rows, payloads base64), so a
+# restore puts back exactly what was archived.
+
+_DATETIME_FIELDS = ('submitted_at',)
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, SubmissionTypeEnum):
+        return value.value
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    return value
+
+def _decode_submission(record: dict) -> dict:
+    data = dict(record)
+    data['submission_type'] = SubmissionTypeEnum(data['submission_type'])
+    for name in _DATETIME_FIELDS:
+        if data.get(name) is not None:
+            data[name] = datetime.fromisoformat(data[name])
+    return data
+
+def _decode_version(record: dict) -> dict:
+    data = _decode_submission(record)
+    if data.get('payload') is not None:
+        data['payload'] = base64.b64decode(data['payload'])
+    return data
+
+def pack_segment(records: list[dict]) -> tuple[bytes, int]:
+    """Compressed segment payload and its uncompressed size."""
+    raw = json.dumps([{name: _encode_value(value) for name, value in record.items()} for record in records],
+                     separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return zlib.compress(raw, 9), len(raw)
+
+def unpack_segment(payload: bytes) -> list[dict]:
+    """Decoded records of a segment; `versions` stays in its encoded form until a restore needs it."""
+    return [_decode_submission(record) for record in json.loads(zlib.decompress(payload).decode('utf-8'))]
+
+# --- Closed courses ---
+
+def closed_course_ids(grace_days: int | None = None) -> list[int]:
+    """
+    Courses whose every assignment was due more than `grace_days` ago (an assignment without a
+    due date keeps its course open) and that still have live submissions to archive.
+    """
+    grace_days = current_app.config.get('ARCHIVE_GRACE_DAYS', 30) if grace_days is None else grace_days
+    cutoff = _utcnow() - timedelta(days=grace_days)
+    live_assignments = (Assignment.course_id == Course.id, Assignment.deleted_at.is_(None))
+    still_open = select(Assignment.id).where(
+        *live_assignments, or_(Assignment.due_date.is_(None), Assignment.due_date >= cutoff))
+    has_submissions = select(Submission.id).join(Assignment, Assignment.id == Submission.assignment_id).\
+        where(*live_assignments)
+    return list(db.session.execute(
+        select(Course.id).where(Course.deleted_at.is_(None), ~exists(still_open), exists(has_submissions)).order_by(Course.id)
+    ).scalars())
+
+# --- Archive / restore ---
+
+def _archive_segment(course_id: int, assignment_id: int, segment_rows: int) -> tuple[int, int, int]:
+    """
+    Moves the next `segment_rows` live submissions of an assignment into one new segment, in one
+    transaction: a concurrent reader sees each submission in exactly one of the two stores.
+    Returns (submissions moved, raw bytes, stored bytes).
+    """
+    columns = [SUBMISSION.fields[name] for name in SUBMISSION.fields]
+    rows = db.session.execute(
+        select(*columns).where(Submission.assignment_id == assignment_id).
+        order_by(Submission.id).limit(segment_rows).with_for_update()
+    ).all()
+    if not rows:
+        return 0, 0, 0
+    records = [dict(zip(SUBMISSION.fields, row)) for row in rows]
+    submission_ids = [record['id'] for record in records]
+
+    versions = {submission_id: [] for submission_id in submission_ids}
+    version_rows = db.session.execute(
+        select(SubmissionVersion).where(SubmissionVersion.submission_id.in_(submission_ids)).
+        order_by(SubmissionVersion.submission_id, SubmissionVersion.version)
+    ).scalars()
+    for row in version_rows:
+        versions[row.submission_id].append({
+            'version': row.version, 'submission_type': row.submission_type, 'file_url': row.file_url,
+            'kind': row.kind, 'payload': row.payload, 'content_length': row.content_length,
+            'submitted_at': row.submitted_at,
+        })
+    for record in records:
+        record['versions'] = [{name: _encode_value(value) for name, value in version.items()}
+                              for version in versions[record['id']]]
+
+    payload, raw_bytes = pack_segment(records)
+    try:
+        segment = SubmissionArchiveSegment(course_id=course_id, assignment_id=assignment_id,
+                                           row_count=len(records), raw_bytes=raw_bytes, payload=payload)
+        db.session.add(segment)
+        db.session.flush()
+        db.session.execute(insert(ArchivedSubmission), [
+            {'id': record['id'], 'assignment_id': assignment_id, 'student_id': record['student_id'],
+             'segment_id': segment.id, 'position': position, 'grade': record['grade'],
+             'score': record['score'], 'submitted_at': record['submitted_at']}
+            for position, record in enumerate(records)
+        ])
+        db.session.execute(delete(SubmissionVersion).where(SubmissionVersion.submission_id.in_(submission_ids)))
+        db.session.execute(delete(Submission).where(Submission.id.in_(submission_ids)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(records), raw_bytes, len(payload)
+
+def archive_course(course_id: int, grace_days: int | None = None, segment_rows: int | None = None) -> dict:
+    """
+    Moves every submission of a closed course into compressed segments, one short transaction
+    per segment. The course's assignments are flagged first, so reads consult the archive from
+    the start and nothing is ever invisible mid-way. Safe to rerun: it picks up whatever is
+    still live (including late submissions that arrived after an earlier run).
+    """
+    segment_rows = segment_rows or current_app.config.get('ARCHIVE_SEGMENT_ROWS', 256)
+    course = Course.query.filter_by(id=course_id, deleted_at=None).first()
+    if not course:
+        raise ArchiveServiceError(f"Course with ID {course_id} not found.", 404)
+    grace_days = current_app.config.get('ARCHIVE_GRACE_DAYS', 30) if grace_days is None else grace_days
+    cutoff = _utcnow() - timedelta(days=grace_days)
+    open_assignment = Assignment.query.filter(
+        Assignment.course_id == course_id, Assignment.deleted_at.is_(None),
+        or_(Assignment.due_date.is_(None), Assignment.due_date >= cutoff)
+    ).first()
+    if open_assignment:
+        raise ArchiveServiceError(f"Course {course_id} is still open: assignment {open_assignment.id} is not past its due date plus {grace_days} days.", 409)
+
+    assignment_ids = list(db.session.execute(
+        select(Assignment.id).where(Assignment.course_id == course_id, Assignment.deleted_at.is_(None)).order_by(Assignment.id)
+    ).scalars())
+    try:
+        db.session.execute(
+            update(Assignment).where(Assignment.id.in_(assignment_ids), Assignment.archived_at.is_(None)).values(archived_at=_utcnow())
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    catalog_cache.invalidate_course(course_id)
+
+    result = {'course_id': course_id, 'submissions': 0, 'segments': 0, 'raw_bytes': 0, 'stored_bytes': 0}
+    for assignment_id in assignment_ids:
+        while True:
+            moved, raw_bytes, stored_bytes = _archive_segment(course_id, assignment_id, segment_rows)
+            if not moved:
+                break
+            result['submissions'] += moved
+            result['segments'] += 1
+            result['raw_bytes'] += raw_bytes
+            result['stored_bytes'] += stored_bytes
+    return result
+
+def archive_closed_courses(grace_days: int | None = None) -> list[dict]:
+    return [archive_course(course_id, grace_days) for course_id in closed_course_ids(grace_days)]
+
+def _restore_segment(segment_id: int) -> int:
+    """Puts one segment's submissions (original ids) and versions back and drops the segment."""
+    segment = db.session.get(SubmissionArchiveSegment, segment_id)
+    records = unpack_segment(segment.payload)
+    try:
+        db.session.execute(insert(Submission), [
+            {name: value for name, value in record.items() if name != 'versions'} for record in records
+        ])
+        versions = [{'submission_id': record['id'], **_decode_version(version)}
+                    for record in records for version in record['versions']]
+        if versions:
+            db.session.execute(insert(SubmissionVersion), versions)
+        db.session.execute(delete(ArchivedSubmission).where(ArchivedSubmission.segment_id == segment_id))
+        db.session.delete(segment)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(records)
+
+def restore_course(course_id: int) -> dict:
+    """Moves a course's archived submissions back into the live tables, segment by segment."""
+    course = Course.query.filter_by(id=course_id, deleted_at=None).first()
+    if not course:
+        raise ArchiveServiceError(f"Course with ID {course_id} not found.", 404)
+
+    segment_ids = list(db.session.execute(
+        select(SubmissionArchiveSegment.id).where(SubmissionArchiveSegment.course_id == course_id).order_by(SubmissionArchiveSegment.id)
+    ).scalars())
+    restored = sum(_restore_segment(segment_id) for segment_id in segment_ids)
+    try:
+        db.session.execute(update(Assignment).where(Assignment.course_id == course_id).values(archived_at=None))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    catalog_cache.invalidate_course(course_id)
+    return {'course_id': course_id, 'submissions': restored, 'segments': len(segment_ids)}
+
+# --- Read path ---
+
+def is_archived(assignment_id: int, student_id: int) -> bool:
+    return db.session.execute(
+        select(exists().where(ArchivedSubmission.assignment_id == assignment_id, ArchivedSubmission.student_id == student_id))
+    ).scalar()
+
+def archived_submissions(fieldset: Fieldset | None, assignment_id: int, student_id: int | None = None) -> list[dict]:
+    """
+    Archived submissions of an assignment (optionally of one student) as SUBMISSION response
+    dicts, oldest first. Only the segments holding the wanted rows are read and decompressed.
+    """
+    query = select(ArchivedSubmission.segment_id, ArchivedSubmission.position).\
+        where(ArchivedSubmission.assignment_id == assignment_id)
+    if student_id is not None:
+        query = query.where(ArchivedSubmission.student_id == student_id)
+    wanted = {}
+    for segment_id, position in db.session.execute(query):
+        wanted.setdefault(segment_id, []).append(position)
+    if not wanted:
+        return []
+
+    records = []
+    payloads = db.session.execute(
+        select(SubmissionArchiveSegment.id, SubmissionArchiveSegment.payload).where(SubmissionArchiveSegment.id.in_(list(wanted)))
+    ).all()
+    for segment_id, payload in payloads:
+        segment_records = unpack_segment(payload)
+        records.extend(segment_records[position] for position in wanted[segment_id])
+    records.sort(key=lambda record: (record['submitted_at'] is None, record['submitted_at'] or datetime.min, record['id']))
+    return from_records(SUBMISSION, fieldset, records)
+
+def score_rows(*criteria):
+    """
+    (student_id, score) of live and archived submissions, as one UNION ALL for analytics.
+    `criteria` are applied to both sides and may refer to Assignment (joined on both).
+    """
+    live = select(Submission.student_id, Submission.score).\
+        join(Assignment, Assignment.id == Submission.assignment_id).where(Submission.score.isnot(None), *criteria)
+    archived = select(ArchivedSubmission.student_id, ArchivedSubmission.score).\
+        join(Assignment, Assignment.id == ArchivedSubmission.assignment_id).where(ArchivedSubmission.score.isnot(None), *criteria)
+    return union_all(live, archived)
@@ -1,6 +1,17 @@
-from backend.src.models import Assignment, Submission, SubmissionTypeEnum, Enrollment, User, Course
+import difflib
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import select, func
+from backend.src.models import Assignment, Submission, SubmissionVersion, ArchivedSubmission, SubmissionTypeEnum, Enrollment, User, Course, Chapter
+from backend.src.models.read_models import project, ASSIGNMENT, SUBMISSION
 from backend.src.extensions import db
 from backend.src.services.course_service import CourseServiceError # Re-using for consistency or define a generic ServiceError
+from backend.src.services.reminder_service import reminder_scheduler
+from backend.src.services import stats_service, archive_service, notification_service, quiz_service
+from backend.src.utils.grading import parse_grade, get_grading_scheme, GradeParseError
+from backend.src.utils.fieldsets import Fieldset
+from backend.src.utils.cache import catalog_cache
+from backend.src.utils.textdelta import make_delta, apply_delta, pack_snapshot, unpack_snapshot
 from sqlalchemy.exc import IntegrityError
 
 class AssignmentServiceError(Exception):
@@ -9,30 +20,36 @@ class AssignmentServiceError(Exception):
         super().__init__(message)
         self.status_code = status_code
 
+def _utcnow() -> datetime:
+    # TIMESTAMP columns are stored naive (UTC)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 # --- Student-facing services ---
 
-def list_assignments_for_course(course_id: int, student_id: int) -> list[Assignment] | None:
+def list_assignments_for_course(course_id: int, student_id: int, fieldset: Fieldset | None = None) -> list[dict]:
     """
-    Lists all assignments for a given course if the student is enrolled.
-    Returns None if student is not enrolled or course does not exist.
+    Lists all assignments for a given course if the student is enrolled, projected to `fieldset`.
+    Raises AssignmentServiceError if student is not enrolled or course does not exist.
     """
     # Verify student enrollment
     enrollment = Enrollment.query.filter_by(student_id=student_id, course_id=course_id).first()
     if not enrollment:
         # Check if course exists to differentiate error
-        course_exists = Course.query.get(course_id) is not None
+        course_exists = Course.query.filter_by(id=course_id, deleted_at=None).first() is not None
         if not course_exists:
             raise AssignmentServiceError(f"Course with ID {course_id} not found.", 404)
         raise AssignmentServiceError("You are not enrolled in this course.", 403)
 
-    return Assignment.query.filter_by(course_id=course_id).order_by(Assignment.due_date.asc()).all()
+    return project(ASSIGNMENT, fieldset, Assignment.course_id == course_id, order_by=(Assignment.due_date.asc(),))
 
 def submit_assignment(student_id: int, assignment_id: int, submission_type: SubmissionTypeEnum, content_text: str = None, file_url: str = None) -> Submission:
     """
     Submits an assignment for a student.
-    Prevents re-submission if one already exists.
+    A student who already submitted may resubmit until the due date, as long as the submission
+    is not graded yet; the submission then becomes the new version (see _store_new_version).
+    Quiz submissions are graded on arrival (see quiz_service), so they are final.
     """
-    assignment = Assignment.query.get(assignment_id)
+    assignment = Assignment.query.filter_by(id=assignment_id, deleted_at=None).first()
     if not assignment:
         raise AssignmentServiceError(f"Assignment with ID {assignment_id} not found.", 404)
 
@@ -41,11 +58,6 @@ def submit_assignment(student_id: int, assignment_id: int, submission_type: Subm
     if not is_enrolled:
         raise AssignmentServiceError("You are not enrolled in the course for this assignment.", 403)
 
-    # Check for existing submission
-    existing_submission = Submission.query.filter_by(student_id=student_id, assignment_id=assignment_id).first()
-    if existing_submission:
-        raise AssignmentServiceError("You have already submitted this assignment.", 409) # 409 Conflict
-
     # Validate submission content based on type
     if submission_type == SubmissionTypeEnum.TEXT and not content_text:
         raise AssignmentServiceError("Content text is required for text submissions.", 400)
@@ -53,7 +65,23 @@ def submit_assignment(student_id: int, assignment_id: int, submission_type: Subm
         raise AssignmentServiceError("File URL is required for file upload submissions.", 400)
     if submission_type == SubmissionTypeEnum.URL and not file_url: # URL type submission using file_url field
          raise AssignmentServiceError("URL is required for URL submissions.", 400)
+    if (submission_type == SubmissionTypeEnum.QUIZ) != (assignment.answer_key is not None):
+        if assignment.answer_key is not None:
+            raise AssignmentServiceError("This assignment is a quiz; submit your answers with submission_type 'quiz'.", 400)
+        raise AssignmentServiceError("This assignment is not a quiz.", 400)
+    if submission_type == SubmissionTypeEnum.QUIZ and not content_text:
+        raise AssignmentServiceError("Answers are required for quiz submissions.", 400)
 
+    # Check for existing submission
+    existing_submission = Submission.query.filter_by(student_id=student_id, assignment_id=assignment_id).with_for_update().first()
+    if existing_submission:
+        if existing_submission.grade is not None:
+            raise AssignmentServiceError("Your submission has already been graded and can no longer be changed.", 409) # 409 Conflict
+        if assignment.due_date is not None and _utcnow() > assignment.due_date:
+            raise AssignmentServiceError("The due date has passed; you can no longer resubmit this assignment.", 409)
+        return _store_new_version(existing_submission, submission_type, content_text, file_url)
+    if assignment.archived_at is not None and archive_service.is_archived(assignment_id, student_id):
+        raise AssignmentServiceError("Your submission has been archived with the closed course and can no longer be changed.", 409)
 
     new_submission = Submission(
         student_id=student_id,
@@ -65,6 +93,10 @@ def submit_assignment(student_id: int, assignment_id: int, submission_type: Subm
 
     try:
         db.session.add(new_submission)
+        stats_service.record_submission(assignment.course_id, assignment_id)
+        if submission_type == SubmissionTypeEnum.QUIZ:
+            # Graded on arrival, against the key as of this transaction
+            quiz_service.grade_on_arrival(new_submission, assignment, quiz_service.locked_answer_key(assignment_id))
         db.session.commit()
     except IntegrityError: # Catches DB-level unique constraint violations if any slip through
         db.session.rollback()
@@ -74,14 +106,145 @@ def submit_assignment(student_id: int, assignment_id: int, submission_type: Subm
         # Log e
         raise AssignmentServiceError(f"An unexpected error occurred during submission: {str(e)}", 500)
 
+    if new_submission.grade is not None:
+        quiz_service.publish_grade(new_submission)
     return new_submission
 
-def get_student_submission_for_assignment(student_id: int, assignment_id: int) -> Submission | None:
+def _store_new_version(submission: Submission, submission_type: SubmissionTypeEnum, content_text: str | None, file_url: str | None) -> Submission:
+    """
+    Moves the submission's current version into submission_versions and makes the new content
+    current. The old text is stored as a compressed delta against the new one (every
+    SUBMISSION_SNAPSHOT_INTERVAL versions as a compressed full text), so reading the latest
+    version stays a plain row read and storage grows with the size of the edits.
     """
-    Retrieves a student's submission for a specific assignment.
+    previous = submission.content_text
+    interval = current_app.config.get('SUBMISSION_SNAPSHOT_INTERVAL', 10)
+    if previous is None:
+        kind, payload = 'snapshot', None
+    elif content_text is None or submission.version % interval == 0:
+        kind, payload = 'snapshot', pack_snapshot(previous)
+    else:
+        kind, payload = 'delta', make_delta(content_text, previous)
+
+    try:
+        db.session.add(SubmissionVersion(
+            submission_id=submission.id,
+            version=submission.version,
+            submission_type=submission.submission_type,
+            file_url=submission.file_url,
+            kind=kind,
+            payload=payload,
+            content_length=len(previous) if previous is not None else None,
+            submitted_at=submission.submitted_at,
+        ))
+        submission.submission_type = submission_type
+        submission.content_text = content_text
+        submission.file_url = file_url
+        submission.submitted_at = _utcnow()
+        submission.version += 1
+        db.session.commit()
+    except IntegrityError: # Another resubmission stored this version first
+        db.session.rollback()
+        raise AssignmentServiceError("Resubmission failed due to a concurrent resubmission. Please try again.", 409)
+    except Exception as e:
+        db.session.rollback()
+        # Log e
+        raise AssignmentServiceError(f"An unexpected error occurred during resubmission: {str(e)}", 500)
+    return submission
+
+def _submission_for_viewer(submission_id: int, viewer_id: int) -> Submission:
+    """The submission, if `viewer_id` is its student or the teacher of its course."""
+    submission = db.session.get(Submission, submission_id)
+    if not submission or submission.assignment.deleted_at is not None:
+        raise AssignmentServiceError(f"Submission with ID {submission_id} not found.", 404)
+    if viewer_id not in (submission.student_id, submission.assignment.course.teacher_id):
+        raise AssignmentServiceError("You are not allowed to view this submission.", 403)
+    return submission
+
+def _version_text(submission: Submission, version: int) -> str | None:
+    """
+    Rebuilds the content_text of `version`: start from the nearest snapshot at or above it
+    (or from the latest text) and apply the deltas walking down.
+    """
+    if version == submission.version:
+        return submission.content_text
+    snapshot = db.session.execute(
+        select(func.min(SubmissionVersion.version)).where(
+            SubmissionVersion.submission_id == submission.id, SubmissionVersion.kind == 'snapshot',
+            SubmissionVersion.version >= version)
+    ).scalar()
+    rows = db.session.execute(
+        select(SubmissionVersion.kind, SubmissionVersion.payload).where(
+            SubmissionVersion.submission_id == submission.id,
+            SubmissionVersion.version.between(version, snapshot if snapshot is not None else submission.version - 1)
+        ).order_by(SubmissionVersion.version.desc())
+    ).all()
+    text = submission.content_text
+    for kind, payload in rows:
+        if kind == 'snapshot':
+            text = unpack_snapshot(payload) if payload is not None else None
+        else:
+            text = apply_delta(text or '', payload)
+    return text
+
+def _check_version(submission: Submission, version: int):
+    if not 1 <= version <= submission.version:
+        raise AssignmentServiceError(f"Version {version} does not exist; this submission has versions 1 to {submission.version}.", 404)
+
+def _latest_version_info(submission: Submission) -> dict:
+    return {
+        'version': submission.version,
+        'submission_type': submission.submission_type,
+        'file_url': submission.file_url,
+        'content_length': len(submission.content_text) if submission.content_text is not None else None,
+        'submitted_at': submission.submitted_at,
+    }
+
+def get_submission_versions(viewer_id: int, submission_id: int) -> list[dict]:
+    """Metadata of every version of a submission, oldest first (no content)."""
+    submission = _submission_for_viewer(submission_id, viewer_id)
+    history = SubmissionVersion.query.filter_by(submission_id=submission_id).order_by(SubmissionVersion.version).all()
+    return [row.to_dict() for row in history] + [_latest_version_info(submission)]
+
+def get_submission_version(viewer_id: int, submission_id: int, version: int) -> dict:
+    """One version of a submission including its rebuilt content_text."""
+    submission = _submission_for_viewer(submission_id, viewer_id)
+    _check_version(submission, version)
+    if version == submission.version:
+        info = _latest_version_info(submission)
+    else:
+        info = SubmissionVersion.query.filter_by(submission_id=submission_id, version=version).one().to_dict()
+    return {**info, 'content_text': _version_text(submission, version)}
+
+def diff_submission_versions(viewer_id: int, submission_id: int, from_version: int | None = None, to_version: int | None = None) -> dict:
+    """
+    Unified diff of content_text between two versions (default: the latest against the one before).
+    """
+    submission = _submission_for_viewer(submission_id, viewer_id)
+    to_version = submission.version if to_version is None else to_version
+    from_version = max(to_version - 1, 1) if from_version is None else from_version
+    _check_version(submission, from_version)
+    _check_version(submission, to_version)
+
+    old_text = _version_text(submission, from_version) or ''
+    new_text = _version_text(submission, to_version) or ''
+    diff = difflib.unified_diff(
+        old_text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+        fromfile=f'version {from_version}', tofile=f'version {to_version}'
+    )
+    return {
+        'submission_id': submission_id,
+        'from_version': from_version,
+        'to_version': to_version,
+        'diff': ''.join(line if line.endswith('\n') else line + '\n' for line in diff),
+    }
+
+def get_student_submission_for_assignment(student_id: int, assignment_id: int, fieldset: Fieldset | None = None) -> dict | None:
+    """
+    Retrieves a student's submission for a specific assignment, projected to `fieldset`.
     """
     # Optionally, verify assignment exists and student is enrolled in its course first.
-    assignment = Assignment.query.get(assignment_id)
+    assignment = Assignment.query.filter_by(id=assignment_id, deleted_at=None).first()
     if not assignment:
          raise AssignmentServiceError(f"Assignment with ID {assignment_id} not found.", 404)
 
@@ -89,16 +252,22 @@ def get_student_submission_for_assignment(student_id: int, assignment_id: int) -
     if not is_enrolled:
         raise AssignmentServiceError("You are not enrolled in the course for this assignment, hence cannot view submissions.", 403)
 
-    return Submission.query.filter_by(student_id=student_id, assignment_id=assignment_id).first()
+    submissions = project(SUBMISSION, fieldset, Submission.student_id == student_id, Submission.assignment_id == assignment_id)
+    if not submissions and assignment.archived_at is not None:
+        # The course is closed and archived; the submission may live in the cold store
+        submissions = archive_service.archived_submissions(fieldset, assignment_id, student_id)
+    return submissions[0] if submissions else None
 
 
 # --- Teacher-facing services ---
 
-def create_assignment_for_course(teacher_id: int, course_id: int, title: str, description: str | None = None, due_date=None, chapter_id: int | None = None) -> Assignment:
+def create_assignment_for_course(teacher_id: int, course_id: int, title: str, description: str | None = None, due_date=None, chapter_id: int | None = None, grading_scheme: str = 'auto',
+                                 answer_key: dict | None = None) -> Assignment:
     """
     Creates an assignment for a course, by the course teacher.
+    With an answer key (see utils/quiz.py) the assignment is a quiz and its submissions are auto-graded.
     """
-    course = Course.query.filter_by(id=course_id, teacher_id=teacher_id).first()
+    course = Course.query.filter_by(id=course_id, teacher_id=teacher_id, deleted_at=None).first()
     if not course:
         # This error message is more specific for the teacher creating the assignment.
         raise AssignmentServiceError("Course not found or you are not the teacher of this course, so you cannot add assignments to it.", 403)
@@ -108,22 +277,48 @@ def create_assignment_for_course(teacher_id: int, course_id: int, title: str, de
         if not chapter:
             raise AssignmentServiceError(f"Chapter with ID {chapter_id} not found in course {course_id}.", 400)
 
+    try:
+        get_grading_scheme(grading_scheme)
+    except GradeParseError as e:
+        raise AssignmentServiceError(str(e), 400)
+    if answer_key is not None:
+        try:
+            answer_key = quiz_service.parse_key(answer_key)
+        except quiz_service.QuizServiceError as e:
+            raise AssignmentServiceError(str(e), e.status_code)
+
     new_assignment = Assignment(
         course_id=course_id,
         chapter_id=chapter_id,
         title=title,
         description=description,
-        due_date=due_date # Consider date parsing/validation if it's a string
+        due_date=due_date, # Parsed to a datetime by the controller
+        grading_scheme=grading_scheme,
+        answer_key=answer_key
     )
     db.session.add(new_assignment)
+    db.session.flush() # Assigns new_assignment.id for the stats row
+    stats_service.init_assignment_stats(new_assignment.id)
+    # Inbox entries for every enrolled student: one INSERT ... SELECT here, or a background job for large courses
+    deferred = notification_service.notify_course_students(course_id, 'assignment_created', title, new_assignment.id)
     db.session.commit()
+    catalog_cache.invalidate_course(course_id)
+    if deferred:
+        notification_service.notification_fanout.wake()
+
+    # Index the deadline so the reminder scheduler picks it up without rescanning assignments
+    reminder_scheduler.schedule(new_assignment.id, new_assignment.due_date)
+    notification_service.notify_course(course_id, 'assignment_created', {
+        'assignment_id': new_assignment.id, 'course_id': course_id, 'title': new_assignment.title,
+        'due_date': new_assignment.due_date,
+    })
     return new_assignment
 
-def get_submissions_for_assignment(teacher_id: int, assignment_id: int) -> list[Submission]:
+def get_submissions_for_assignment(teacher_id: int, assignment_id: int, fieldset: Fieldset | None = None) -> list[dict]:
     """
     Retrieves all submissions for a given assignment, if the assignment belongs to a course taught by teacher_id.
     """
-    assignment = Assignment.query.get(assignment_id)
+    assignment = Assignment.query.filter_by(id=assignment_id, deleted_at=None).first()
     if not assignment:
         raise AssignmentServiceError(f"Assignment with ID {assignment_id} not found.", 404)
 
@@ -131,24 +326,46 @@ def get_submissions_for_assignment(teacher_id: int, assignment_id: int) -> list[
     if assignment.course.teacher_id != teacher_id:
         raise AssignmentServiceError("You are not authorized to view submissions for this assignment as you do not teach the course it belongs to.", 403)
 
-    return Submission.query.filter_by(assignment_id=assignment_id).order_by(Submission.submitted_at.asc()).all()
+    submissions = project(SUBMISSION, fieldset, Submission.assignment_id == assignment_id, order_by=(Submission.submitted_at.asc(),))
+    if assignment.archived_at is not None:
+        # Archived submissions predate the course closing, so they come before any live (late) ones
+        submissions = archive_service.archived_submissions(fieldset, assignment_id) + submissions
+    return submissions
 
-def grade_submission(teacher_id: int, submission_id: int, grade: str, feedback: str | None = None) -> Submission:
+def grade_submission(teacher_id: int, submission_id: int, grade: str | int | float, feedback: str | None = None) -> Submission:
     """
     Grades a submission. The submission must belong to an assignment in a course taught by the teacher.
+    The grade is parsed with the assignment's grading scheme into a numeric score and a display label.
     """
     submission = Submission.query.options(
         db.joinedload(Submission.assignment).joinedload(Assignment.course) # Eager load for auth check
     ).get(submission_id)
 
-    if not submission:
+    if not submission and db.session.get(ArchivedSubmission, submission_id) is not None:
+        raise AssignmentServiceError("This submission is archived with its closed course; restore the course's submissions to grade it.", 409)
+    if not submission or submission.assignment.deleted_at is not None:
         raise AssignmentServiceError(f"Submission with ID {submission_id} not found.", 404)
 
     # Verify teacher owns the course of this submission's assignment
     if submission.assignment.course.teacher_id != teacher_id:
         raise AssignmentServiceError("You are not authorized to grade this submission as you do not teach the course it belongs to.", 403)
 
-    submission.grade = grade
+    try:
+        parsed = parse_grade(grade, submission.assignment.grading_scheme)
+    except GradeParseError as e:
+        raise AssignmentServiceError(str(e), 400)
+
+    newly_graded = submission.grade is None
+    submission.grade = parsed.label
+    submission.score = parsed.score
     submission.feedback = feedback
+    stats_service.record_grading(submission.assignment.course_id, submission.assignment_id, newly_graded)
+    notification_service.add_notification(submission.student_id, 'submission_graded', submission.assignment.title,
+                                          submission.assignment.course_id, submission.assignment_id)
     db.session.commit()
+    # Pushed to the student's open streams, so clients no longer poll /submissions/me for grades
+    notification_service.notify_user(submission.student_id, 'submission_graded', {
+        'submission_id': submission.id, 'assignment_id': submission.assignment_id,
+        'grade': submission.grade, 'score': submission.score,
+    })
     return submission
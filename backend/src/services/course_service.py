@@ -1,6 +1,21 @@
-from backend.src.models import Course, Chapter, Enrollment, User
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import timedelta
+from sqlalchemy import select, update, insert, func, case, literal, and_
+from sqlalchemy.orm import aliased
+from backend.src.models import Course, Chapter, Enrollment, User, Assignment, AssignmentStats
+from backend.src.models.read_models import project, COURSE, CHAPTER, USER
 from backend.src.extensions import db
-from sqlalchemy.orm import joinedload
+from backend.src.services import stats_service
+from backend.src.services.reminder_service import reminder_scheduler
+from backend.src.utils.fieldsets import Fieldset
+from backend.src.utils.cache import catalog_cache
+from backend.src.utils.ordering import ORDER_GAP, key_between, is_crowded, spaced_keys
+from backend.src.utils.rendering import render_cached
+
+logger = logging.getLogger(__name__)
 
 class CourseServiceError(Exception):
     """Custom exception for course service errors."""
@@ -8,71 +23,63 @@ class CourseServiceError(Exception):
         super().__init__(message)
         self.status_code = status_code
 
-def get_all_courses() -> list[Course]:
+# Read services take an optional Fieldset (see utils/fieldsets.py) and return response dicts built
+# by column projection (models/read_models.py); None means all fields and no expansions.
+
+def get_all_courses(fieldset: Fieldset | None = None) -> list[dict]:
     """
     Returns a list of all courses.
     Consider pagination for large numbers of courses.
     """
-    return Course.query.order_by(Course.created_at.desc()).all()
+    return project(COURSE, fieldset, order_by=(Course.created_at.desc(),))
 
 def get_course_by_id(course_id: int) -> Course | None:
     """
-    Fetches a single course by its ID, including its chapters and teacher info.
+    Fetches a single course entity by its ID (chapters and teacher load lazily).
+    """
+    return Course.query.filter_by(id=course_id, deleted_at=None).first()
+
+def get_course_details(course_id: int, fieldset: Fieldset | None = None) -> dict | None:
+    """
+    Projects a single course (with whatever expansions the fieldset includes), or None if not found.
     """
-    return Course.query.options(
-        joinedload(Course.chapters),
-        joinedload(Course.teacher) # Assuming 'teacher' is the relationship attribute
-    ).get(course_id)
+    courses = project(COURSE, fieldset, Course.id == course_id)
+    return courses[0] if courses else None
 
-def get_enrolled_courses_for_student(student_id: int) -> list[Course]:
+def get_enrolled_courses_for_student(student_id: int, fieldset: Fieldset | None = None) -> list[dict]:
     """
     Retrieves all courses a student is enrolled in.
     """
-    # This uses the many-to-many relationship defined in Course model
-    student = User.query.get(student_id)
-    if not student:
+    if db.session.query(User.id).filter_by(id=student_id).first() is None:
         raise CourseServiceError("Student not found", 404)
-    return student.enrolled_courses.order_by(Course.title).all()
+
+    return project(COURSE, fieldset, Enrollment.student_id == student_id,
+                   joins=((Enrollment, Enrollment.course_id == Course.id),),
+                   order_by=(Course.title,))
 
 
-def get_course_details_for_student(student_id: int, course_id: int) -> Course | None:
+def get_course_details_for_student(student_id: int, course_id: int, fieldset: Fieldset | None = None) -> dict | None:
     """
     Retrieves details for a specific course if the student is enrolled in it.
-    Includes chapters.
     """
     # Check enrollment first using the Enrollment model or the association
     is_enrolled = db.session.query(Enrollment.id).\
         filter_by(student_id=student_id, course_id=course_id).first() is not None
 
-    # Alternative using the relationship on User model (if available and preferred)
-    # student = User.query.get(student_id)
-    # if not student:
-    #     raise CourseServiceError("Student not found", 404)
-    # course = student.enrolled_courses.filter_by(id=course_id).first()
-    # if not course:
-    #     return None # Student is not enrolled or course doesn't exist
-
     if not is_enrolled:
         # You could raise an error here to be handled by the controller
         # For now, returning None, controller will decide 403 vs 404
         return None
 
-    # If enrolled, fetch the course with its chapters
-    # The options(joinedload(Course.chapters)) ensures chapters are loaded efficiently.
-    course = Course.query.options(
-        joinedload(Course.chapters),
-        joinedload(Course.teacher) # Also load teacher info
-        ).get(course_id)
-    return course
+    return get_course_details(course_id, fieldset)
 
 
-def get_course_chapters(course_id: int, student_id: int | None = None) -> list[Chapter] | None:
+def get_course_chapters(course_id: int, student_id: int | None = None, fieldset: Fieldset | None = None) -> list[dict] | None:
     """
     Retrieves all chapters for a specific course, ordered by 'order'.
     If student_id is provided, it first checks if the student is enrolled.
     """
-    course = Course.query.get(course_id)
-    if not course:
+    if db.session.query(Course.id).filter_by(id=course_id, deleted_at=None).first() is None:
         return None # Course not found
 
     if student_id: # If student_id is passed, verify enrollment
@@ -83,7 +90,7 @@ def get_course_chapters(course_id: int, student_id: int | None = None) -> list[C
             # For now, returning None, controller can interpret as not authorized or not found
             return None
 
-    return Chapter.query.filter_by(course_id=course_id).order_by(Chapter.order.asc()).all()
+    return project(CHAPTER, fieldset, Chapter.course_id == course_id, order_by=(Chapter.order.asc(),))
 
 
 def is_student_enrolled(student_id: int, course_id: int) -> bool:
@@ -106,30 +113,308 @@ def create_course(teacher_id: int, title: str, description: str | None = None) -
 
     new_course = Course(title=title, description=description, teacher_id=teacher_id)
     db.session.add(new_course)
+    db.session.flush() # Assigns new_course.id for the stats row
+    stats_service.init_course_stats(new_course.id)
     db.session.commit()
+    catalog_cache.invalidate_course(new_course.id)
     return new_course
 
-def add_chapter_to_course(course_id: int, teacher_id: int, title: str, content: str, order: int) -> Chapter | None:
-    """
-    Adds a chapter to a course if the course is taught by the given teacher.
-    """
-    course = Course.query.filter_by(id=course_id, teacher_id=teacher_id).first()
+# Chapter key writes (placement, reorder, respace) of one course must not interleave: a placement
+# computes its key from the neighbours it read. They lock the course row (across workers, where the
+# database supports row locks) and hold chapter_rebalancer.lock(course_id) (within a worker, e.g. on
+# SQLite), a per-course lock so writes to different courses do not wait on each other.
+
+def _teacher_course_for_update(course_id: int, teacher_id: int) -> Course:
+    course = Course.query.filter_by(id=course_id, teacher_id=teacher_id, deleted_at=None).with_for_update().first()
     if not course:
         # Course doesn't exist or isn't taught by this teacher.
         # Controller should distinguish between 404 and 403 if needed.
         raise CourseServiceError("Course not found or you are not the teacher of this course.", 404) # Or 403
+    return course
 
-    new_chapter = Chapter(course_id=course_id, title=title, content=content, order=order)
-    db.session.add(new_chapter)
-    db.session.commit()
+@contextmanager
+def locked_course_chapters(course_id: int, teacher_id: int):
+    """
+    Serializes chapter writes to a course taught by `teacher_id` (see above): holds
+    chapter_rebalancer.lock(course_id) and the course row lock, and yields the course. The caller commits
+    (or rolls back) inside the block.
+    """
+    with chapter_rebalancer.lock(course_id):
+        yield _teacher_course_for_update(course_id, teacher_id)
+
+def last_chapter_order(course_id: int) -> int | None:
+    return db.session.execute(select(func.max(Chapter.order)).where(Chapter.course_id == course_id)).scalar()
+
+def rendered_chapter_columns(content: str | None) -> dict:
+    """
+    The rendered-content columns of a chapter holding `content`. Called on every chapter write,
+    so reads never render; identical content (imports, repeated saves) reuses a recent rendering.
+    """
+    key, rendered = render_cached(content)
+    return {'content_html': rendered.html, 'content_toc': rendered.toc, 'content_hash': key}
+
+def _chapter_order(course_id: int, chapter_id: int) -> int:
+    order = db.session.execute(
+        select(Chapter.order).where(Chapter.id == chapter_id, Chapter.course_id == course_id)
+    ).scalar()
+    if order is None:
+        raise CourseServiceError(f"Chapter {chapter_id} not found in this course.", 404)
+    return order
+
+def _neighbour_orders(course_id: int, after_chapter_id: int | None, before_chapter_id: int | None) -> tuple[int | None, int | None]:
+    """Sort keys of the chapters the new one goes between (None = end of the list)."""
+    in_course = Chapter.course_id == course_id
+    if after_chapter_id is not None:
+        before = _chapter_order(course_id, after_chapter_id)
+        after = db.session.execute(select(func.min(Chapter.order)).where(in_course, Chapter.order > before)).scalar()
+    elif before_chapter_id is not None:
+        after = _chapter_order(course_id, before_chapter_id)
+        before = db.session.execute(select(func.max(Chapter.order)).where(in_course, Chapter.order < after)).scalar()
+    else: # Append
+        before = last_chapter_order(course_id)
+        after = None
+    return before, after
+
+def _write_chapter_order(course_id: int, chapter_ids: list[int], gap: int, **values) -> int:
+    """Stages one UPDATE giving `chapter_ids` evenly spaced keys in list order."""
+    if not chapter_ids:
+        return 0
+    keys = dict(zip(chapter_ids, spaced_keys(len(chapter_ids), gap)))
+    result = db.session.execute(
+        update(Chapter).
+        where(Chapter.course_id == course_id, Chapter.id.in_(chapter_ids)).
+        values(order=case(keys, value=Chapter.id), **values)
+    )
+    return result.rowcount
+
+def _respace_chapters(course_id: int, gap: int) -> int:
+    # Ties (legacy duplicate orders) keep their id order
+    chapter_ids = list(db.session.execute(
+        select(Chapter.id).where(Chapter.course_id == course_id).order_by(Chapter.order, Chapter.id)
+    ).scalars())
+    # A respace only moves sort keys; keep updated_at as the time of the last real edit
+    return _write_chapter_order(course_id, chapter_ids, gap, updated_at=Chapter.updated_at)
+
+def add_chapter_to_course(course_id: int, teacher_id: int, title: str, content: str, order: int | None = None,
+                          after_chapter_id: int | None = None, before_chapter_id: int | None = None) -> Chapter | None:
+    """
+    Adds a chapter to a course if the course is taught by the given teacher.
+
+    Placement: an explicit `order` key is stored as given; otherwise the chapter goes right after
+    `after_chapter_id`, right before `before_chapter_id`, or at the end. Chapter.order is a sparse
+    key (utils/ordering.py), so placing between two neighbours writes only the new row. When
+    neighbours are adjacent the course is respaced first (one UPDATE); when a placement leaves
+    little room, a background respace is scheduled.
+    """
+    gap = chapter_rebalancer.gap
+    crowded = False
+    rendered = rendered_chapter_columns(content) # Before taking the locks
+    with locked_course_chapters(course_id, teacher_id):
+        if order is None:
+            before, after = _neighbour_orders(course_id, after_chapter_id, before_chapter_id)
+            order = key_between(before, after, gap)
+            if order is None:
+                _respace_chapters(course_id, gap)
+                before, after = _neighbour_orders(course_id, after_chapter_id, before_chapter_id)
+                order = key_between(before, after, gap)
+            crowded = is_crowded(order, before, after)
+
+        new_chapter = Chapter(course_id=course_id, title=title, content=content, order=order, **rendered)
+        db.session.add(new_chapter)
+        db.session.commit()
+    catalog_cache.invalidate_course(course_id)
+    if crowded:
+        chapter_rebalancer.request(course_id)
     return new_chapter
 
+def update_chapter(course_id: int, chapter_id: int, teacher_id: int, title: str | None = None, content: str | None = None) -> Chapter:
+    """
+    Updates a chapter's title and/or content, if the course is taught by the given teacher.
+    New content is rendered here, before it is stored, unless it renders to what is stored already.
+    """
+    course = Course.query.filter_by(id=course_id, teacher_id=teacher_id, deleted_at=None).first()
+    if not course:
+        raise CourseServiceError("Course not found or you are not the teacher of this course.", 404)
+    chapter = Chapter.query.filter_by(id=chapter_id, course_id=course_id).first()
+    if not chapter:
+        raise CourseServiceError(f"Chapter {chapter_id} not found in this course.", 404)
+
+    if title is not None:
+        chapter.title = title
+    if content is not None:
+        chapter.content = content
+        rendered = rendered_chapter_columns(content)
+        if rendered['content_hash'] != chapter.content_hash:
+            for name, value in rendered.items():
+                setattr(chapter, name, value)
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    catalog_cache.invalidate_course(course_id)
+    return chapter
+
+def render_chapters(course_id: int | None = None, force: bool = False, batch_size: int = 200) -> int:
+    """
+    Renders chapters whose stored rendering is missing or was made from other content or by an
+    older renderer (content_hash mismatch), or every chapter with `force`. Commits per batch.
+    Returns the number of chapters rendered.
+    """
+    rendered_count, last_id = 0, 0
+    while True:
+        query = select(Chapter.id, Chapter.course_id, Chapter.content, Chapter.content_hash).\
+            where(Chapter.id > last_id).order_by(Chapter.id).limit(batch_size)
+        if course_id is not None:
+            query = query.where(Chapter.course_id == course_id)
+        rows = db.session.execute(query).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        touched = set()
+        for row in rows:
+            columns = rendered_chapter_columns(row.content)
+            if force or columns['content_hash'] != row.content_hash:
+                # Rendering is not an edit; keep updated_at as the time of the last real one
+                db.session.execute(update(Chapter).where(Chapter.id == row.id).values(updated_at=Chapter.updated_at, **columns))
+                touched.add(row.course_id)
+                rendered_count += 1
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        for touched_id in touched:
+            catalog_cache.invalidate_course(touched_id)
+    return rendered_count
+
+def reorder_chapters(course_id: int, teacher_id: int, chapter_ids: list[int]) -> list[dict]:
+    """
+    Applies a complete new chapter order in one UPDATE. `chapter_ids` must list every chapter
+    of the course exactly once. Returns the new (id, order) pairs in order.
+    """
+    if len(set(chapter_ids)) != len(chapter_ids):
+        raise CourseServiceError("chapter_ids contains duplicates.", 400)
+
+    gap = chapter_rebalancer.gap
+    with locked_course_chapters(course_id, teacher_id):
+        existing = set(db.session.execute(select(Chapter.id).where(Chapter.course_id == course_id)).scalars())
+        missing, unknown = existing - set(chapter_ids), set(chapter_ids) - existing
+        if missing or unknown:
+            details = []
+            if missing:
+                details.append(f"missing chapters {sorted(missing)}")
+            if unknown:
+                details.append(f"chapters not in this course {sorted(unknown)}")
+            raise CourseServiceError(f"chapter_ids must list every chapter of the course exactly once: {'; '.join(details)}.", 400)
+
+        _write_chapter_order(course_id, chapter_ids, gap)
+        db.session.commit()
+    catalog_cache.invalidate_course(course_id)
+    return [{'id': chapter_id, 'order': key} for chapter_id, key in zip(chapter_ids, spaced_keys(len(chapter_ids), gap))]
+
+def rebalance_chapters(course_id: int | None = None) -> int:
+    """
+    Respaces the chapter keys of one course (or of every course) without changing their order.
+    Returns the number of courses respaced.
+    """
+    gap = chapter_rebalancer.gap
+    if course_id is None:
+        course_ids = list(db.session.execute(select(Chapter.course_id).distinct()).scalars())
+    else:
+        course_ids = [course_id]
+    for respaced_id in course_ids:
+        with chapter_rebalancer.lock(respaced_id):
+            try:
+                db.session.execute(select(Course.id).where(Course.id == respaced_id).with_for_update())
+                _respace_chapters(respaced_id, gap)
+                db.session.commit() # One transaction per course keeps lock times short
+            except Exception:
+                db.session.rollback()
+                raise
+    if course_id is None:
+        catalog_cache.clear()
+    elif course_ids:
+        catalog_cache.invalidate_course(*course_ids)
+    return len(course_ids)
+
+def _shifted(column, delta: timedelta):
+    # Timestamp arithmetic is dialect-specific; SQLite stores TIMESTAMP as text
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return func.datetime(column, f'{int(delta.total_seconds()):+d} seconds')
+    return column + delta
+
+def clone_course(course_id: int, teacher_id: int, title: str | None = None, description: str | None = None,
+                 due_date_shift: timedelta | None = None) -> tuple[Course, int, int]:
+    """
+    Copies a course with its chapters and assignments (not enrollments or submissions) for a new
+    term, in one transaction: one INSERT for the course, then INSERT ... SELECT statements for the
+    chapters, the assignments (chapter links remapped, due dates shifted by `due_date_shift`,
+    quiz answer keys kept) and their stats rows. Returns (new course, chapters copied, assignments copied).
+    """
+    # The source's chapter lock is held throughout: assignments find their chapter's copy by the
+    # source's ROW_NUMBER() order, which a concurrent placement or reorder would shift
+    with locked_course_chapters(course_id, teacher_id) as source:
+        try:
+            new_course = Course(title=title or source.title,
+                                description=source.description if description is None else description,
+                                teacher_id=teacher_id)
+            db.session.add(new_course)
+            db.session.flush()
+            stats_service.init_course_stats(new_course.id)
+            db.session.flush()
+
+            # Copies get freshly spaced keys in source order; the key then identifies each copy, which
+            # is how assignments find the copy of their chapter without a per-row round trip.
+            ranked = select(
+                Chapter.id, Chapter.title, Chapter.content, Chapter.content_html, Chapter.content_toc, Chapter.content_hash,
+                (func.row_number().over(order_by=(Chapter.order, Chapter.id)) * chapter_rebalancer.gap).label('key'),
+            ).where(Chapter.course_id == course_id).subquery()
+            chapters_copied = db.session.execute(
+                insert(Chapter).from_select( # Rendered content is copied, not re-rendered
+                    ['course_id', 'title', 'content', 'content_html', 'content_toc', 'content_hash', 'order'],
+                    select(literal(new_course.id), ranked.c.title, ranked.c.content, ranked.c.content_html,
+                           ranked.c.content_toc, ranked.c.content_hash, ranked.c.key)
+                )
+            ).rowcount
+
+            copy = aliased(Chapter)
+            due_date = Assignment.due_date if due_date_shift is None else _shifted(Assignment.due_date, due_date_shift)
+            assignments = select(
+                literal(new_course.id), copy.id, Assignment.title, Assignment.description, due_date, Assignment.grading_scheme,
+                Assignment.answer_key,
+            ).select_from(Assignment).\
+                outerjoin(ranked, ranked.c.id == Assignment.chapter_id).\
+                outerjoin(copy, and_(copy.course_id == new_course.id, copy.order == ranked.c.key)).\
+                where(Assignment.course_id == course_id, Assignment.deleted_at.is_(None)).order_by(Assignment.id)
+            assignments_copied = db.session.execute(
+                insert(Assignment).from_select(
+                    ['course_id', 'chapter_id', 'title', 'description', 'due_date', 'grading_scheme', 'answer_key'], assignments
+                )
+            ).rowcount
+
+            db.session.execute(insert(AssignmentStats).from_select(
+                ['assignment_id'], select(Assignment.id).where(Assignment.course_id == new_course.id)
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    catalog_cache.invalidate_course(new_course.id)
+    deadlines = db.session.execute(
+        select(Assignment.id, Assignment.due_date).where(Assignment.course_id == new_course.id, Assignment.due_date.isnot(None))
+    ).all()
+    for assignment_id, deadline in deadlines:
+        reminder_scheduler.schedule(assignment_id, deadline)
+    return new_course, chapters_copied, assignments_copied
+
 def enroll_student_in_course(course_id: int, student_id: int, requesting_teacher_id: int) -> Enrollment | str:
     """
     Enrolls a student in a course, typically initiated by a teacher of that course.
     Returns the Enrollment object or a message string if already enrolled or error.
     """
-    course = Course.query.filter_by(id=course_id, teacher_id=requesting_teacher_id).first()
+    course = Course.query.filter_by(id=course_id, teacher_id=requesting_teacher_id, deleted_at=None).first()
     if not course:
         raise CourseServiceError("Course not found or you are not authorized to manage enrollments for this course.", 403)
 
@@ -146,29 +431,97 @@ def enroll_student_in_course(course_id: int, student_id: int, requesting_teacher
 
     new_enrollment = Enrollment(student_id=student_id, course_id=course_id)
     db.session.add(new_enrollment)
+    stats_service.record_enrollment(course_id)
     db.session.commit()
+    catalog_cache.invalidate_course(course_id) # Enrolled count changed
     return new_enrollment
 
-def get_courses_taught_by_teacher(teacher_id: int) -> list[Course]:
+def get_courses_taught_by_teacher(teacher_id: int, fieldset: Fieldset | None = None) -> list[dict]:
     """
     Retrieves all courses taught by a specific teacher.
     """
     # Assumes teacher_id is validated (user exists and is a teacher).
-    # The backref 'taught_courses' on the User model could also be used if preferred:
-    # teacher = User.query.get(teacher_id)
-    # if not teacher or teacher.role != RoleEnum.TEACHER:
-    #     raise CourseServiceError("Teacher not found or user is not a teacher.", 404)
-    # return teacher.taught_courses.order_by(Course.title).all()
+    return project(COURSE, fieldset, Course.teacher_id == teacher_id, order_by=(Course.title,))
 
-    return Course.query.filter_by(teacher_id=teacher_id).order_by(Course.title).all()
-
-def get_students_enrolled_in_course(course_id: int, teacher_id: int) -> list[User]:
+def get_students_enrolled_in_course(course_id: int, teacher_id: int, fieldset: Fieldset | None = None) -> list[dict]:
     """
     Retrieves a list of students enrolled in a specific course taught by the teacher.
     """
-    course = Course.query.filter_by(id=course_id, teacher_id=teacher_id).first()
-    if not course:
+    course_exists = db.session.query(Course.id).filter_by(id=course_id, teacher_id=teacher_id, deleted_at=None).first()
+    if not course_exists:
         raise CourseServiceError("Course not found or you are not the teacher of this course.", 403) # or 404
 
-    # Using the Course.enrolled_students relationship
-    return course.enrolled_students.order_by(User.username).all()
+    # Enrollment rows are what enroll_student_in_course writes
+    return project(USER, fieldset, Enrollment.course_id == course_id,
+                   joins=((Enrollment, Enrollment.student_id == User.id),),
+                   order_by=(User.username,))
+
+
+class ChapterRebalancer:
+    """
+    Background respacing of crowded chapter keys.
+
+    `add_chapter_to_course` calls `request()` when a placement leaves less than LOW_WATER_GAP
+    between neighbours; a daemon thread (started on first use) respaces the queued courses
+    so the next insert at that spot is again a single-row write. Requests for the same
+    course coalesce while queued. Also holds CHAPTER_ORDER_GAP for the service functions.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.gap = ORDER_GAP
+        self._pending = set()
+        self._course_locks = weakref.WeakValueDictionary() # course_id -> RLock, dropped once unused
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('CHAPTER_REBALANCE_ENABLED', True)
+        self.gap = app.config.get('CHAPTER_ORDER_GAP', ORDER_GAP)
+        app.extensions['chapter_rebalancer'] = self
+
+    def lock(self, course_id: int) -> threading.RLock:
+        """The lock serializing chapter key writes to `course_id` within this worker."""
+        with self._lock:
+            course_lock = self._course_locks.get(course_id)
+            if course_lock is None:
+                course_lock = self._course_locks[course_id] = threading.RLock()
+            return course_lock
+
+    def request(self, course_id: int):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._pending.add(course_id)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='chapter-rebalancer', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def run_pending(self) -> int:
+        """Respaces every queued course. Must run inside an app context."""
+        with self._lock:
+            course_ids, self._pending = self._pending, set()
+        for course_id in course_ids:
+            try:
+                rebalance_chapters(course_id)
+            except Exception:
+                logger.exception("Respacing chapters of course %s failed", course_id)
+        return len(course_ids)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self.app.app_context():
+                respaced = self.run_pending()
+                if respaced:
+                    logger.info("Respaced chapter order keys of %d courses", respaced)
+
+
+chapter_rebalancer = ChapterRebalancer()
@@ -0,0 +1,334 @@
+"""
+Monitoring datasets: named time series (PM2.5, dissolved oxygen, ...) attached to a course and
+charted in its chapters.
+
+Points are not rows: each series is a pair of memory-mapped arrays (utils/timeseries.py) and its
+database row only caches the count, time span and value range. Charts never receive a raw
+series; `chart_data` cuts the requested time range by binary search and reduces it to the
+chart's pixel budget with LTTB, so the response size depends on the chart's width, not on
+how many points the sensor recorded.
+
+Timestamps are UTC. Uploads accept epoch milliseconds or ISO 8601 strings (naive ones are
+taken as UTC); chart responses use epoch milliseconds, which charting libraries take as-is.
+"""
+import csv
+import io
+import json
+import math
+from datetime import datetime, timezone, timedelta
+import numpy as np
+from flask import current_app
+from sqlalchemy import select, delete
+from backend.src.models import Course, Chapter, Dataset, DatasetSeries, RoleEnum
+from backend.src.models.read_models import project, DATASET
+from backend.src.extensions import db
+from backend.src.services import course_service
+from backend.src.utils.fieldsets import Fieldset
+from backend.src.utils.timeseries import series_store, lttb, as_float
+
+_EPOCH = datetime(1970, 1, 1)
+MIN_CHART_POINTS = 3 # LTTB keeps the first and last point plus at least one in between
+
+class DatasetServiceError(Exception):
+    """Custom exception for dataset service errors."""
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _from_ms(ms: int | None) -> datetime | None:
+    return None if ms is None else _EPOCH + timedelta(milliseconds=ms)
+
+def _to_ms(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // timedelta(milliseconds=1)
+
+# Timestamps must map back to a datetime (years 1-9999); epoch microseconds/nanoseconds do not
+MIN_TIMESTAMP_MS = _to_ms(datetime.min)
+MAX_TIMESTAMP_MS = _to_ms(datetime.max)
+
+def _out_of_range(name: str) -> DatasetServiceError:
+    return DatasetServiceError(f"'{name}' is outside the supported range (years 1-9999 in epoch milliseconds).")
+
+def _in_range(ms: int, name: str) -> int:
+    if not MIN_TIMESTAMP_MS <= ms <= MAX_TIMESTAMP_MS:
+        raise _out_of_range(name)
+    return ms
+
+def parse_timestamp(value, name: str = 'timestamp') -> int:
+    """Epoch milliseconds from a number / numeric string (already epoch ms) or an ISO 8601 string."""
+    if isinstance(value, bool):
+        raise DatasetServiceError(f"'{name}' must be epoch milliseconds or an ISO 8601 timestamp.")
+    if isinstance(value, (int, float)):
+        if not math.isfinite(value):
+            raise DatasetServiceError(f"'{name}' must be epoch milliseconds or an ISO 8601 timestamp.")
+        return _in_range(int(value), name)
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            return _in_range(int(value), name)
+        except ValueError:
+            pass
+        try:
+            number = float(value) # E.g. 1.7e12
+            if math.isfinite(number):
+                return _in_range(int(number), name)
+        except ValueError:
+            pass
+        try:
+            return _to_ms(datetime.fromisoformat(value))
+        except ValueError:
+            pass
+    raise DatasetServiceError(f"'{name}' must be epoch milliseconds or an ISO 8601 timestamp.")
+
+# --- Access ---
+
+def _course_for_teacher(course_id: int, teacher_id: int) -> Course:
+    course = Course.query.filter_by(id=course_id, teacher_id=teacher_id, deleted_at=None).first()
+    if not course:
+        raise DatasetServiceError("Course not found or you are not the teacher of this course.", 404)
+    return course
+
+def _check_reader(course_id: int, user):
+    """Teachers read their own courses' datasets, students those of courses they are enrolled in."""
+    if user.role == RoleEnum.TEACHER:
+        allowed = db.session.query(Course.id).filter_by(id=course_id, teacher_id=user.id, deleted_at=None).first() is not None
+    else:
+        allowed = db.session.query(Course.id).filter_by(id=course_id, deleted_at=None).first() is not None \
+            and course_service.is_student_enrolled(user.id, course_id)
+    if not allowed:
+        raise DatasetServiceError("Course not found or you do not have access to it.", 404)
+
+def _dataset(dataset_id: int) -> Dataset:
+    dataset = db.session.execute(
+        select(Dataset).join(Course, Course.id == Dataset.course_id).where(Dataset.id == dataset_id, Course.deleted_at.is_(None))
+    ).scalar_one_or_none()
+    if dataset is None:
+        raise DatasetServiceError("Dataset not found.", 404)
+    return dataset
+
+def _teacher_dataset(dataset_id: int, teacher_id: int) -> Dataset:
+    dataset = _dataset(dataset_id)
+    _course_for_teacher(dataset.course_id, teacher_id)
+    return dataset
+
+def _series(dataset_id: int, series_id: int, for_update: bool = False) -> DatasetSeries:
+    query = DatasetSeries.query.filter_by(id=series_id, dataset_id=dataset_id)
+    series = (query.with_for_update() if for_update else query).first()
+    if series is None:
+        raise DatasetServiceError("Series not found in this dataset.", 404)
+    return series
+
+def _course_chapter(course_id: int, chapter_id) -> int | None:
+    if chapter_id is None:
+        return None
+    if not isinstance(chapter_id, int) or isinstance(chapter_id, bool) or \
+            db.session.query(Chapter.id).filter_by(id=chapter_id, course_id=course_id).first() is None:
+        raise DatasetServiceError("'chapter_id' must be a chapter of this course.", 400)
+    return chapter_id
+
+# --- Datasets and series ---
+
+def create_dataset(course_id: int, teacher_id: int, title: str, description: str | None = None,
+                   chapter_id: int | None = None) -> Dataset:
+    _course_for_teacher(course_id, teacher_id)
+    dataset = Dataset(course_id=course_id, chapter_id=_course_chapter(course_id, chapter_id), title=title, description=description)
+    db.session.add(dataset)
+    db.session.commit()
+    return dataset
+
+def update_dataset(dataset_id: int, teacher_id: int, changes: dict) -> Dataset:
+    """Applies title / description / chapter_id from `changes` (chapter_id null detaches it)."""
+    dataset = _teacher_dataset(dataset_id, teacher_id)
+    if 'title' in changes:
+        dataset.title = changes['title']
+    if 'description' in changes:
+        dataset.description = changes['description']
+    if 'chapter_id' in changes:
+        dataset.chapter_id = _course_chapter(dataset.course_id, changes['chapter_id'])
+    db.session.commit()
+    return dataset
+
+def list_course_datasets(course_id: int, user, fieldset: Fieldset | None = None, chapter_id: int | None = None) -> list[dict]:
+    _check_reader(course_id, user)
+    criteria = [Dataset.course_id == course_id]
+    if chapter_id is not None:
+        criteria.append(Dataset.chapter_id == chapter_id)
+    return project(DATASET, fieldset, *criteria, order_by=(Dataset.id,))
+
+def get_dataset(dataset_id: int, user, fieldset: Fieldset | None = None) -> dict:
+    dataset = _dataset(dataset_id)
+    _check_reader(dataset.course_id, user)
+    return project(DATASET, fieldset, Dataset.id == dataset_id)[0]
+
+def delete_dataset(dataset_id: int, teacher_id: int) -> int:
+    """Deletes a dataset with its series; returns the number of series removed."""
+    dataset = _teacher_dataset(dataset_id, teacher_id)
+    series_ids = list(db.session.execute(select(DatasetSeries.id).where(DatasetSeries.dataset_id == dataset_id)).scalars())
+    db.session.execute(delete(DatasetSeries).where(DatasetSeries.dataset_id == dataset_id))
+    db.session.delete(dataset)
+    db.session.commit()
+    remove_series_files(series_ids)
+    return len(series_ids)
+
+def create_series(dataset_id: int, teacher_id: int, name: str, unit: str | None = None) -> DatasetSeries:
+    _teacher_dataset(dataset_id, teacher_id)
+    series = DatasetSeries(dataset_id=dataset_id, name=name, unit=unit, point_count=0)
+    db.session.add(series)
+    db.session.commit()
+    series_store.delete(series.id) # Leftovers of a series whose id was reused (SQLite may reuse the highest id)
+    return series
+
+def delete_series(dataset_id: int, series_id: int, teacher_id: int):
+    _teacher_dataset(dataset_id, teacher_id)
+    series = _series(dataset_id, series_id)
+    db.session.delete(series)
+    db.session.commit()
+    remove_series_files([series_id])
+
+def remove_series_files(series_ids: list[int]):
+    """Deletes the point files of these series (also the deletion purge's before_delete hook)."""
+    for series_id in series_ids:
+        series_store.delete(series_id)
+
+# --- Points ---
+
+def _points_from_json(data) -> tuple[list, list]:
+    points = data.get('points') if isinstance(data, dict) else data
+    if not isinstance(points, list):
+        raise DatasetServiceError("Body must be a JSON list of [timestamp, value] pairs or {\"points\": [...]}.")
+    timestamps, values = [], []
+    for row, point in enumerate(points, start=1):
+        if isinstance(point, dict):
+            point = (point.get('timestamp', point.get('t')), point.get('value', point.get('v')))
+        if not isinstance(point, (list, tuple)) or len(point) != 2:
+            raise DatasetServiceError(f"Point {row}: expected [timestamp, value].")
+        timestamps.append(point[0])
+        values.append(point[1])
+    return timestamps, values
+
+def _points_from_csv(text: str) -> tuple[list, list]:
+    timestamps, values = [], []
+    for row, record in enumerate(csv.reader(io.StringIO(text)), start=1):
+        if not record or not any(field.strip() for field in record):
+            continue
+        if len(record) < 2:
+            raise DatasetServiceError(f"Row {row}: expected timestamp,value.")
+        if row == 1 and not _is_number(record[1]): # Header line
+            continue
+        timestamps.append(record[0].strip())
+        values.append(record[1].strip())
+    return timestamps, values
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+def parse_points(body: bytes, content_type: str | None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (timestamps in epoch ms, values) from an upload: JSON ([[t, v], ...], {"points": [...]}, or
+    objects with timestamp/value) or CSV (timestamp,value per line, optional header).
+    Columns that are all numeric are converted in one step; ISO timestamps row by row.
+    """
+    try:
+        text = body.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise DatasetServiceError("Upload must be UTF-8 encoded.")
+    if 'json' in (content_type or '') or text.lstrip().startswith(('[', '{')):
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise DatasetServiceError(f"Invalid JSON: {e}")
+        timestamps, values = _points_from_json(data)
+    else:
+        timestamps, values = _points_from_csv(text)
+
+    try:
+        values = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        values = None
+    if values is None or not np.isfinite(values).all():
+        raise DatasetServiceError("Every value must be a finite number.")
+    if (np.abs(values) > np.finfo(np.float32).max).any():
+        # Series values are stored as float32; anything larger would silently become inf
+        raise DatasetServiceError("Every value must fit in a 32-bit float.")
+    try:
+        timestamps = np.array(timestamps, dtype=np.int64) # Epoch milliseconds throughout (the common case)
+    except (TypeError, ValueError, OverflowError):
+        parsed = np.empty(len(timestamps), dtype=np.int64)
+        for row, value in enumerate(timestamps):
+            parsed[row] = parse_timestamp(value, f'timestamp of point {row + 1}')
+        timestamps = parsed
+    # Checked before anything reaches the series files: an out-of-range point stored there
+    # would break the series summary on every later upload
+    out_of_range = np.flatnonzero((timestamps < MIN_TIMESTAMP_MS) | (timestamps > MAX_TIMESTAMP_MS))
+    if out_of_range.size:
+        raise _out_of_range(f'timestamp of point {out_of_range[0] + 1}')
+    return timestamps, values
+
+def append_points(dataset_id: int, series_id: int, teacher_id: int, body: bytes, content_type: str | None) -> tuple[DatasetSeries, int]:
+    """
+    Adds uploaded points to a series (see parse_points); a timestamp that already exists gets the
+    new value. Returns the updated series and the number of points written.
+    """
+    _teacher_dataset(dataset_id, teacher_id)
+    timestamps, values = parse_points(body, content_type)
+    # The row lock orders concurrent uploads, so the summary committed last is the latest one
+    series = _series(dataset_id, series_id, for_update=True)
+    summary, written = series_store.append(series.id, timestamps, values)
+    series.point_count = summary.point_count
+    series.start_at = _from_ms(summary.start_ms)
+    series.end_at = _from_ms(summary.end_ms)
+    series.min_value = summary.min_value
+    series.max_value = summary.max_value
+    db.session.commit()
+    return series, written
+
+# --- Charts ---
+
+def chart_data(dataset_id: int, user, series_ids: list[int] | None = None, start=None, end=None,
+               points: int | None = None) -> dict:
+    """
+    Chart-ready slices of a dataset's series between `start` and `end` (inclusive, either
+    optional), each reduced to at most `points` points (the chart's width in pixels is a good
+    budget). Per series: the points as [epoch ms, value] pairs, how many raw points the range
+    holds, and whether they were downsampled.
+    """
+    dataset = _dataset(dataset_id)
+    _check_reader(dataset.course_id, user)
+    start_ms = parse_timestamp(start, 'start') if start not in (None, '') else None
+    end_ms = parse_timestamp(end, 'end') if end not in (None, '') else None
+    if start_ms is not None and end_ms is not None and start_ms > end_ms:
+        raise DatasetServiceError("'start' must not be after 'end'.")
+    max_points = current_app.config.get('DATASET_MAX_CHART_POINTS', 5000)
+    budget = current_app.config.get('DATASET_CHART_POINTS', 1000) if points is None else points
+    if budget < MIN_CHART_POINTS:
+        raise DatasetServiceError(f"'points' must be at least {MIN_CHART_POINTS}.")
+    budget = min(budget, max_points)
+
+    query = select(DatasetSeries.id, DatasetSeries.name, DatasetSeries.unit).where(DatasetSeries.dataset_id == dataset_id)
+    if series_ids:
+        query = query.where(DatasetSeries.id.in_(series_ids))
+    rows = db.session.execute(query.order_by(DatasetSeries.id)).all()
+    if series_ids and len(rows) != len(set(series_ids)):
+        raise DatasetServiceError("Series not found in this dataset.", 404)
+
+    charts = []
+    for series_id, name, unit in rows:
+        timestamps, values = series_store.window(series_id, start_ms, end_ms)
+        total = len(timestamps)
+        if total > budget:
+            keep = lttb(timestamps, values, budget)
+            timestamps, values = timestamps[keep], values[keep]
+        charts.append({
+            'id': series_id,
+            'name': name,
+            'unit': unit,
+            'total_points': total,
+            'downsampled': total > budget,
+            'points': [[t, as_float(v)] for t, v in zip(timestamps.tolist(), values.tolist())],
+        })
+    return {'dataset_id': dataset_id, 'start': start_ms, 'end': end_ms, 'max_points': budget, 'series': charts}
@@ -0,0 +1,319 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, update, delete, func, or_, and_
+from backend.src.models import (
+    Course, Chapter, Enrollment, enrollments_table, Assignment, Submission, SubmissionVersion, AssignmentReminder,
+    LearningEvent, CourseStats, AssignmentStats, DeletionJob, SubmissionArchiveSegment, ArchivedSubmission,
+    Notification, NotificationFanout, Dataset, DatasetSeries
+)
+from backend.src.extensions import db
+from backend.src.services import stats_service, notification_service, dataset_service
+from backend.src.utils.cache import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+class DeletionServiceError(Exception):
+    """Custom exception for deletion service errors."""
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+# --- Purge plans ---
+
+@dataclass(frozen=True)
+class PurgeStep:
+    """
+    One table to empty for a target, in batches walked by ascending `key` (keyset pagination,
+    so every row of the table is scanned at most once per step). With `detach`, matching rows
+    are kept and those columns are set instead (for logs that outlive the course). `before_delete`
+    runs with each batch's keys, in the batch's transaction, for bookkeeping such as counters.
+    """
+    label: str
+    target: object # Model or Table
+    key: object # Column to batch by; unique within the step's rows
+    criteria: object # target_id -> tuple of WHERE clauses
+    detach: dict = field(default_factory=dict)
+    before_delete: object = None # keys -> None
+
+def _course_assignment_ids(course_id: int):
+    return select(Assignment.id).where(Assignment.course_id == course_id)
+
+def _course_chapter_ids(course_id: int):
+    return select(Chapter.id).where(Chapter.course_id == course_id)
+
+# Children first, so no step ever leaves a dangling foreign key behind it
+PURGE_PLANS = {
+    'course': (
+        PurgeStep('submission_versions', SubmissionVersion, SubmissionVersion.id,
+                  lambda c: (SubmissionVersion.submission_id.in_(
+                      select(Submission.id).where(Submission.assignment_id.in_(_course_assignment_ids(c)))),)),
+        PurgeStep('submissions', Submission, Submission.id,
+                  lambda c: (Submission.assignment_id.in_(_course_assignment_ids(c)),)),
+        PurgeStep('archived_submissions', ArchivedSubmission, ArchivedSubmission.id,
+                  lambda c: (ArchivedSubmission.assignment_id.in_(_course_assignment_ids(c)),)),
+        PurgeStep('submission_archive_segments', SubmissionArchiveSegment, SubmissionArchiveSegment.id,
+                  lambda c: (SubmissionArchiveSegment.course_id == c,)),
+        PurgeStep('assignment_reminders', AssignmentReminder, AssignmentReminder.id,
+                  lambda c: (AssignmentReminder.assignment_id.in_(_course_assignment_ids(c)),)),
+        PurgeStep('notifications', Notification, Notification.id,
+                  lambda c: (or_(Notification.course_id == c, Notification.assignment_id.in_(_course_assignment_ids(c))),),
+                  before_delete=notification_service.unread_adjustments),
+        PurgeStep('notification_fanouts', NotificationFanout, NotificationFanout.id,
+                  lambda c: (NotificationFanout.course_id == c,)),
+        PurgeStep('assignment_stats', AssignmentStats, AssignmentStats.assignment_id,
+                  lambda c: (AssignmentStats.assignment_id.in_(_course_assignment_ids(c)),)),
+        # Learning events feed user-level metrics, so they are kept but detached from the course
+        PurgeStep('learning_events', LearningEvent, LearningEvent.id,
+                  lambda c: (or_(LearningEvent.course_id == c, LearningEvent.chapter_id.in_(_course_chapter_ids(c))),),
+                  detach={'course_id': None, 'chapter_id': None}),
+        PurgeStep('assignments', Assignment, Assignment.id, lambda c: (Assignment.course_id == c,)),
+        PurgeStep('enrollments', Enrollment, Enrollment.id, lambda c: (Enrollment.course_id == c,)),
+        PurgeStep('enrollments_secondary', enrollments_table, enrollments_table.c.student_id,
+                  lambda c: (enrollments_table.c.course_id == c,)),
+        # Point files go with each batch of series rows; a rolled-back batch only loses files of an already deleted course
+        PurgeStep('dataset_series', DatasetSeries, DatasetSeries.id,
+                  lambda c: (DatasetSeries.dataset_id.in_(select(Dataset.id).where(Dataset.course_id == c)),),
+                  before_delete=dataset_service.remove_series_files),
+        PurgeStep('datasets', Dataset, Dataset.id, lambda c: (Dataset.course_id == c,)),
+        PurgeStep('chapters', Chapter, Chapter.id, lambda c: (Chapter.course_id == c,)),
+        PurgeStep('course_stats', CourseStats, CourseStats.course_id, lambda c: (CourseStats.course_id == c,)),
+        PurgeStep('courses', Course, Course.id, lambda c: (Course.id == c, Course.deleted_at.isnot(None))),
+    ),
+    'assignment': (
+        PurgeStep('submission_versions', SubmissionVersion, SubmissionVersion.id,
+                  lambda a: (SubmissionVersion.submission_id.in_(select(Submission.id).where(Submission.assignment_id == a)),)),
+        PurgeStep('submissions', Submission, Submission.id, lambda a: (Submission.assignment_id == a,)),
+        PurgeStep('archived_submissions', ArchivedSubmission, ArchivedSubmission.id,
+                  lambda a: (ArchivedSubmission.assignment_id == a,)),
+        PurgeStep('submission_archive_segments', SubmissionArchiveSegment, SubmissionArchiveSegment.id,
+                  lambda a: (SubmissionArchiveSegment.assignment_id == a,)),
+        PurgeStep('assignment_reminders', AssignmentReminder, AssignmentReminder.id,
+                  lambda a: (AssignmentReminder.assignment_id == a,)),
+        PurgeStep('notifications', Notification, Notification.id, lambda a: (Notification.assignment_id == a,),
+                  before_delete=notification_service.unread_adjustments),
+        PurgeStep('notification_fanouts', NotificationFanout, NotificationFanout.id,
+                  lambda a: (NotificationFanout.assignment_id == a,)),
+        PurgeStep('assignment_stats', AssignmentStats, AssignmentStats.assignment_id,
+                  lambda a: (AssignmentStats.assignment_id == a,)),
+        PurgeStep('assignments', Assignment, Assignment.id, lambda a: (Assignment.id == a, Assignment.deleted_at.isnot(None))),
+    ),
+}
+
+def _count(step: PurgeStep, target_id: int) -> int:
+    return db.session.execute(select(func.count()).select_from(step.target).where(*step.criteria(target_id))).scalar()
+
+def _purge_batch(step: PurgeStep, target_id: int, after, batch_size: int) -> tuple[int, object, bool]:
+    """
+    Deletes (or detaches) the next batch of at most `batch_size` rows after key `after`.
+    Returns (rows changed, last key, whether more rows may follow).
+    """
+    criteria = step.criteria(target_id)
+    query = select(step.key).select_from(step.target).where(*criteria)
+    if after is not None:
+        query = query.where(step.key > after)
+    keys = list(db.session.execute(query.order_by(step.key).limit(batch_size)).scalars())
+    if not keys:
+        return 0, after, False
+    if step.detach:
+        stmt = update(step.target).where(step.key.in_(keys), *criteria).values(**step.detach)
+    else:
+        if step.before_delete is not None:
+            step.before_delete(keys)
+        stmt = delete(step.target).where(step.key.in_(keys), *criteria)
+    return db.session.execute(stmt).rowcount, keys[-1], len(keys) == batch_size
+
+# --- Soft delete (request path) ---
+
+def delete_course(course_id: int, teacher_id: int) -> DeletionJob:
+    """
+    Hides a course and its assignments immediately (one UPDATE each), takes their notifications
+    out of the unread counters and queues the purge of everything that belongs to it.
+    """
+    course = Course.query.filter_by(id=course_id, deleted_at=None).with_for_update().first()
+    if not course:
+        raise DeletionServiceError("Course not found.", 404)
+    if course.teacher_id != teacher_id:
+        raise DeletionServiceError("You are not the teacher of this course.", 403)
+
+    now = _utcnow()
+    try:
+        course.deleted_at = now
+        db.session.execute(
+            update(Assignment).where(Assignment.course_id == course_id, Assignment.deleted_at.is_(None)).values(deleted_at=now)
+        )
+        notification_service.retire_notifications(Notification.course_id == course_id)
+        job = DeletionJob(kind='course', target_id=course_id, requested_by=teacher_id)
+        db.session.add(job)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    catalog_cache.invalidate_course(course_id)
+    deletion_purger.wake()
+    return job
+
+def delete_assignment(assignment_id: int, teacher_id: int) -> DeletionJob:
+    """
+    Hides an assignment immediately, takes its submissions out of the course counters and its
+    notifications out of the unread counters, and queues the purge of its submissions and reminders.
+    """
+    assignment = Assignment.query.filter_by(id=assignment_id, deleted_at=None).with_for_update().first()
+    if not assignment:
+        raise DeletionServiceError(f"Assignment with ID {assignment_id} not found.", 404)
+    if assignment.course.teacher_id != teacher_id:
+        raise DeletionServiceError("You are not the teacher of the course this assignment belongs to.", 403)
+
+    try:
+        assignment.deleted_at = _utcnow()
+        db.session.flush()
+        stats_service.record_assignment_removed(assignment.course_id, assignment_id)
+        notification_service.retire_notifications(Notification.assignment_id == assignment_id)
+        job = DeletionJob(kind='assignment', target_id=assignment_id, requested_by=teacher_id)
+        db.session.add(job)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    catalog_cache.invalidate_course(assignment.course_id)
+    deletion_purger.wake()
+    return job
+
+def get_deletion_job(job_id: int, teacher_id: int) -> DeletionJob:
+    job = db.session.get(DeletionJob, job_id)
+    if not job or job.requested_by != teacher_id:
+        raise DeletionServiceError(f"Deletion job with ID {job_id} not found.", 404)
+    return job
+
+def list_deletion_jobs(teacher_id: int, limit: int = 50) -> list[DeletionJob]:
+    return DeletionJob.query.filter_by(requested_by=teacher_id).order_by(DeletionJob.id.desc()).limit(limit).all()
+
+# --- Purge (background) ---
+
+def _claimable(stale_before: datetime):
+    return or_(
+        DeletionJob.status == 'pending',
+        and_(DeletionJob.status == 'running', DeletionJob.heartbeat_at < stale_before), # Its worker died
+    )
+
+def claim_next_job(stale_seconds: int = 300) -> DeletionJob | None:
+    """Atomically marks the oldest claimable job as running for this worker and returns it."""
+    while True:
+        now = _utcnow()
+        claimable = _claimable(now - timedelta(seconds=stale_seconds))
+        job_id = db.session.execute(
+            select(DeletionJob.id).where(claimable).order_by(DeletionJob.id).limit(1)
+        ).scalar()
+        if job_id is None:
+            db.session.commit()
+            return None
+        claimed = db.session.execute(
+            update(DeletionJob).where(DeletionJob.id == job_id, claimable).values(status='running', heartbeat_at=now)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(DeletionJob, job_id)
+        # Another worker got it first; look again
+
+def run_job(job: DeletionJob, batch_size: int = 1000, pause_seconds: float = 0.05) -> DeletionJob:
+    """
+    Purges a claimed job's rows step by step. Each batch is its own short transaction that also
+    records progress, so live traffic only ever waits for one batch. Purging is idempotent: a
+    reclaimed job simply continues with whatever rows are left.
+    """
+    steps = PURGE_PLANS[job.kind]
+    try:
+        job.total_rows = job.purged_rows + sum(_count(step, job.target_id) for step in steps)
+        db.session.commit()
+        for step in steps:
+            job.step = step.label
+            after = None
+            while True:
+                purged, after, more = _purge_batch(step, job.target_id, after, batch_size)
+                job.purged_rows += purged
+                job.heartbeat_at = _utcnow()
+                db.session.commit()
+                if not more:
+                    break
+                if pause_seconds:
+                    time.sleep(pause_seconds) # Leave room for live transactions between batches
+        job.status, job.step, job.finished_at = 'done', None, _utcnow()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        job.status, job.error = 'failed', str(e)
+        db.session.commit()
+        logger.exception("Deletion job %s failed", job.id)
+    return job
+
+def retry_failed_jobs() -> int:
+    result = db.session.execute(update(DeletionJob).where(DeletionJob.status == 'failed').values(status='pending', error=None))
+    db.session.commit()
+    return result.rowcount
+
+
+class DeletionPurger:
+    """
+    Worker thread running queued deletion jobs one at a time. Jobs live in the database, so any
+    worker process can pick up a job queued by another one (claims are atomic UPDATEs), and a
+    job whose worker died is reclaimed once its heartbeat is DELETION_STALE_SECONDS old.
+    Soft deletes call `wake()`; otherwise the queue is polled every DELETION_POLL_SECONDS.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.batch_size = 1000
+        self.pause_seconds = 0.05
+        self.poll_seconds = 30
+        self.stale_seconds = 300
+        self._wakeup = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config.get('DELETION_BATCH_SIZE', 1000)
+        self.pause_seconds = app.config.get('DELETION_BATCH_PAUSE_MS', 50) / 1000.0
+        self.poll_seconds = app.config.get('DELETION_POLL_SECONDS', 30)
+        self.stale_seconds = app.config.get('DELETION_STALE_SECONDS', 300)
+        app.extensions['deletion_purger'] = self
+        if app.config.get('DELETION_WORKER_ENABLED', True):
+            self.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def run_pending(self) -> int:
+        """Runs jobs until none is claimable. Must run inside an app context."""
+        ran = 0
+        while (job := claim_next_job(self.stale_seconds)) is not None:
+            run_job(job, self.batch_size, self.pause_seconds)
+            ran += 1
+        return ran
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='deletion-purger', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    ran = self.run_pending()
+                    if ran:
+                        logger.info("Ran %d deletion jobs", ran)
+            except Exception:
+                logger.exception("Deletion purge tick failed")
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+
+deletion_purger = DeletionPurger()
@@ -0,0 +1,301 @@
+import atexit
+import json
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, select, or_
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from backend.src.models import LearningEvent, LearningEventTypeEnum, Course, Chapter, Enrollment
+from backend.src.extensions import db
+
+logger = logging.getLogger(__name__)
+
+class EventServiceError(Exception):
+    """Custom exception for event ingestion errors."""
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+# Score ranges for events that carry a `value`
+_VALUE_RANGES = {
+    LearningEventTypeEnum.CSAT: (1, 5),
+    LearningEventTypeEnum.NPS: (0, 10),
+    LearningEventTypeEnum.QUIZ_COMPLETED: (0, 100),
+}
+_EVENT_TYPES = {e.value: e for e in LearningEventTypeEnum}
+_MAX_CLOCK_SKEW = timedelta(minutes=5)
+_INT32_MAX = 2**31 - 1 # Integer columns are 32-bit on Postgres; larger values fail the INSERT
+
+# A row that fails with one of these is dropped; OperationalError/InterfaceError (database
+# unavailable, locked, connection lost) are transient and keep the batch buffered instead
+_ROW_ERRORS = (DBAPIError, OverflowError)
+_TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _optional_int(event: dict, field: str, minimum: int = 0, maximum: int = _INT32_MAX) -> int | None:
+    value = event.get(field)
+    if value is None:
+        return None
+    # bool is an int subclass; reject it explicitly
+    if not isinstance(value, int) or isinstance(value, bool) or value < minimum or value > maximum:
+        raise EventServiceError(f"'{field}' must be an integer >= {minimum} and <= {maximum}")
+    return value
+
+def validate_event(event, user_id: int, now: datetime | None = None) -> dict:
+    """
+    Validates one decoded NDJSON event and returns the row to insert.
+    Deliberately hand-rolled (no schema library) so a 500-line batch validates in microseconds.
+    The user is always taken from the JWT, never from the event body.
+    """
+    if not isinstance(event, dict):
+        raise EventServiceError("Event must be a JSON object.")
+
+    event_type = _EVENT_TYPES.get(event.get('type'))
+    if event_type is None:
+        raise EventServiceError(f"Invalid or missing 'type'. Must be one of {list(_EVENT_TYPES)}.")
+
+    occurred_at = event.get('occurred_at')
+    if not isinstance(occurred_at, str):
+        raise EventServiceError("'occurred_at' (ISO 8601 string) is required.")
+    try:
+        occurred_at = datetime.fromisoformat(occurred_at)
+    except ValueError:
+        raise EventServiceError("'occurred_at' is not a valid ISO 8601 timestamp.")
+    if occurred_at.tzinfo is not None:
+        occurred_at = occurred_at.astimezone(timezone.utc).replace(tzinfo=None)
+    if occurred_at > (now or _utcnow()) + _MAX_CLOCK_SKEW:
+        raise EventServiceError("'occurred_at' is in the future.")
+
+    target = event.get('target')
+    if target is not None and (not isinstance(target, str) or len(target) > 128):
+        raise EventServiceError("'target' must be a string of at most 128 characters.")
+
+    row = {
+        'user_id': user_id,
+        'event_type': event_type,
+        'course_id': _optional_int(event, 'course_id', minimum=1),
+        'chapter_id': _optional_int(event, 'chapter_id', minimum=1),
+        'target': target,
+        'duration_ms': _optional_int(event, 'duration_ms'),
+        'value': None,
+        'occurred_at': occurred_at,
+    }
+
+    if event_type == LearningEventTypeEnum.INTERACTION and row['duration_ms'] is None:
+        raise EventServiceError("'duration_ms' is required for interaction events.")
+    if event_type in _VALUE_RANGES:
+        low, high = _VALUE_RANGES[event_type]
+        row['value'] = _optional_int(event, 'value', minimum=low, maximum=high)
+        if row['value'] is None and event_type != LearningEventTypeEnum.QUIZ_COMPLETED:
+            raise EventServiceError(f"'value' is required for {event_type.value} events.")
+    return row
+
+def parse_ndjson_batch(body: bytes, user_id: int, max_events: int) -> tuple[list[dict], list[dict]]:
+    """
+    Splits an NDJSON body into validated rows and per-line errors.
+    Returns (rows, errors) where each error is {'line': n, 'message': ...} (1-based line numbers).
+    """
+    rows, errors, line_numbers = [], [], []
+    now = _utcnow()
+    lines = body.splitlines()
+    if len([line for line in lines if line.strip()]) > max_events:
+        raise EventServiceError(f"Batch exceeds the maximum of {max_events} events.", 413)
+
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            rows.append(validate_event(json.loads(line), user_id, now))
+            line_numbers.append(line_no)
+        except (ValueError, UnicodeDecodeError):
+            errors.append({'line': line_no, 'message': 'Line is not valid JSON.'})
+        except EventServiceError as e:
+            errors.append({'line': line_no, 'message': str(e)})
+
+    if rows:
+        invalid = check_references(rows, user_id)
+        if invalid:
+            errors.extend({'line': line_numbers[index], 'message': message} for index, message in invalid.items())
+            errors.sort(key=lambda error: error['line'])
+            rows = [row for index, row in enumerate(rows) if index not in invalid]
+    return rows, errors
+
+def check_references(rows: list[dict], user_id: int) -> dict[int, str]:
+    """
+    Checks the course_id / chapter_id of validated rows: the course must exist (not deleted) and
+    the user must teach or be enrolled in it, and a chapter must belong to such a course (and to
+    the event's course_id, if both are given). Returns {row index: message} for the rows that fail.
+    Two queries per batch, however many events it holds.
+    """
+    course_ids = {row['course_id'] for row in rows if row['course_id'] is not None}
+    chapter_ids = {row['chapter_id'] for row in rows if row['chapter_id'] is not None}
+    if not course_ids and not chapter_ids:
+        return {}
+
+    chapter_courses = dict(db.session.execute(
+        select(Chapter.id, Chapter.course_id).where(Chapter.id.in_(chapter_ids))
+    ).all()) if chapter_ids else {}
+    wanted = course_ids | set(chapter_courses.values())
+    enrolled = select(Enrollment.id).where(Enrollment.course_id == Course.id, Enrollment.student_id == user_id).exists()
+    accessible = set(db.session.execute(
+        select(Course.id).where(Course.id.in_(wanted), Course.deleted_at.is_(None), or_(Course.teacher_id == user_id, enrolled))
+    ).scalars())
+
+    invalid = {}
+    for index, row in enumerate(rows):
+        course_id, chapter_id = row['course_id'], row['chapter_id']
+        if course_id is not None and course_id not in accessible:
+            invalid[index] = f"Course {course_id} not found or you are not enrolled in it."
+        elif chapter_id is not None and chapter_courses.get(chapter_id) not in accessible:
+            invalid[index] = f"Chapter {chapter_id} not found or you are not enrolled in its course."
+        elif chapter_id is not None and course_id is not None and chapter_courses[chapter_id] != course_id:
+            invalid[index] = f"Chapter {chapter_id} does not belong to course {course_id}."
+    return invalid
+
+def _is_transient(error: Exception) -> bool:
+    return isinstance(error, _TRANSIENT_ERRORS) or getattr(error, 'connection_invalidated', False)
+
+
+class EventBuffer:
+    """
+    In-memory, per-process buffer in front of the learning_events table.
+
+    Requests append validated rows and return immediately; a flusher thread drains the
+    buffer with one multi-row INSERT when it reaches EVENT_FLUSH_SIZE rows or every
+    EVENT_FLUSH_INTERVAL_SECONDS, whichever comes first. When the buffer holds
+    EVENT_BUFFER_CAPACITY rows, `offer()` refuses the batch so the route can answer 429
+    instead of queueing without bound.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.capacity = 10000
+        self.flush_size = 500
+        self.flush_interval = 5.0
+        self._rows = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock() # Serialises flushes (timer, size trigger, shutdown)
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._exit_hook_registered = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.capacity = app.config.get('EVENT_BUFFER_CAPACITY', 10000)
+        self.flush_size = app.config.get('EVENT_FLUSH_SIZE', 500)
+        self.flush_interval = app.config.get('EVENT_FLUSH_INTERVAL_SECONDS', 5.0)
+        app.extensions['event_buffer'] = self
+        if app.config.get('EVENT_FLUSHER_ENABLED', True):
+            self.start()
+        if not self._exit_hook_registered:
+            atexit.register(self._flush_on_exit)
+            self._exit_hook_registered = True
+
+    def __len__(self):
+        return len(self._rows)
+
+    def offer(self, rows: list[dict]) -> bool:
+        """Buffers a batch atomically. Returns False (nothing buffered) if it would overflow."""
+        with self._lock:
+            if len(self._rows) + len(rows) > self.capacity:
+                return False
+            self._rows.extend(rows)
+            reached_flush_size = len(self._rows) >= self.flush_size
+        if reached_flush_size:
+            if self._thread is not None:
+                self._wakeup.set()
+            else:
+                self.flush() # No flusher thread (e.g. disabled in config): flush inline
+        return True
+
+    def flush(self) -> int:
+        """
+        Writes everything buffered so far in one executemany INSERT. Needs an app context.
+        If a row is rejected (a constraint violation, e.g. a course was purged after its events
+        were buffered, or a value out of range), the batch is retried row by row and only the
+        offending rows are dropped; transient failures (database unavailable) put the whole
+        batch back for the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            try:
+                db.session.execute(insert(LearningEvent), rows)
+                db.session.commit()
+                return len(rows)
+            except _ROW_ERRORS as e:
+                db.session.rollback()
+                if _is_transient(e):
+                    self._requeue(rows)
+                    raise
+            except Exception:
+                db.session.rollback()
+                self._requeue(rows)
+                raise
+            try:
+                return self._insert_row_by_row(rows)
+            except Exception:
+                db.session.rollback()
+                self._requeue(rows)
+                raise
+
+    def _insert_row_by_row(self, rows: list[dict]) -> int:
+        written, dropped = 0, []
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(LearningEvent), [row])
+                written += 1
+            except _ROW_ERRORS as e:
+                if _is_transient(e):
+                    raise
+                dropped.append(row)
+                logger.error("Dropping learning event the database rejected: %s (%s)", row, getattr(e, 'orig', e))
+        db.session.commit()
+        if dropped:
+            logger.error("Dropped %d of %d buffered learning events", len(dropped), len(rows))
+        return written
+
+    def _requeue(self, rows: list[dict]):
+        # Put failed rows back in front of newer ones, dropping the oldest if that would overflow
+        with self._lock:
+            merged = rows + self._rows
+            dropped = len(merged) - self.capacity
+            if dropped > 0:
+                logger.error("Event buffer overflow after failed flush; dropping %d events", dropped)
+                merged = merged[dropped:]
+            self._rows = merged
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='event-buffer-flusher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception:
+                logger.exception("Learning event flush failed; will retry")
+
+    def _flush_on_exit(self):
+        if not self._rows or self.app is None:
+            return
+        try:
+            with self.app.app_context():
+                self.flush()
+        except Exception:
+            logger.exception("Could not flush %d buffered learning events at shutdown", len(self._rows))
+
+
+event_buffer = EventBuffer()
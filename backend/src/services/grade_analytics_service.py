@@ -0,0 +1,101 @@
+import numpy as np
+from sqlalchemy import update
+from backend.src.models import Assignment, Submission, Course
+from backend.src.extensions import db
+from backend.src.services import archive_service
+from backend.src.utils.grading import parse_grade, GradeParseError
+
+class GradeAnalyticsServiceError(Exception):
+    """Custom exception for grade analytics errors."""
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+PERCENTILES = (10, 25, 50, 75, 90)
+HISTOGRAM_BINS = 10 # 10-point buckets over the 0-100 score range
+
+def _load_scores(query) -> tuple[np.ndarray, np.ndarray]:
+    """Runs a (student_id, score) query straight into two NumPy arrays."""
+    rows = db.session.execute(query).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    data = np.array(rows, dtype=np.float64)
+    return data[:, 0].astype(np.int64), data[:, 1]
+
+def summarize_scores(student_ids: np.ndarray, scores: np.ndarray) -> dict:
+    """
+    Mean, percentiles, histogram and per-student z-scores in one vectorized pass.
+    A student with several scores (course-level analytics) is reduced to their mean score
+    with bincount before z-scoring, so each student counts once.
+    """
+    if scores.size == 0:
+        return {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None,
+                'percentiles': {}, 'histogram': [], 'students': []}
+
+    students, inverse = np.unique(student_ids, return_inverse=True)
+    per_student = np.bincount(inverse, weights=scores) / np.bincount(inverse)
+    spread = per_student.std()
+    z_scores = (per_student - per_student.mean()) / spread if spread > 0 else np.zeros_like(per_student)
+
+    counts, edges = np.histogram(scores, bins=HISTOGRAM_BINS, range=(0, 100))
+    percentile_values = np.percentile(scores, PERCENTILES)
+
+    return {
+        'count': int(scores.size),
+        'mean': round(float(scores.mean()), 2),
+        'std': round(float(scores.std()), 2),
+        'min': float(scores.min()),
+        'max': float(scores.max()),
+        'percentiles': {f'p{p}': round(float(v), 2) for p, v in zip(PERCENTILES, percentile_values)},
+        'histogram': [
+            {'from': float(low), 'to': float(high), 'count': int(count)}
+            for low, high, count in zip(edges[:-1], edges[1:], counts)
+        ],
+        'students': [
+            {'student_id': int(student_id), 'score': round(float(score), 2), 'z_score': round(float(z), 3)}
+            for student_id, score, z in zip(students, per_student, z_scores)
+        ],
+    }
+
+def get_assignment_grade_analytics(teacher_id: int, assignment_id: int) -> dict:
+    assignment = Assignment.query.filter_by(id=assignment_id, deleted_at=None).first()
+    if not assignment:
+        raise GradeAnalyticsServiceError(f"Assignment with ID {assignment_id} not found.", 404)
+    if assignment.course.teacher_id != teacher_id:
+        raise GradeAnalyticsServiceError("You are not authorized to view analytics for this assignment as you do not teach the course it belongs to.", 403)
+
+    # Archived submissions (closed courses) count too; their scores are read from the archive index
+    student_ids, scores = _load_scores(archive_service.score_rows(Assignment.id == assignment_id))
+    return {'assignment_id': assignment_id, **summarize_scores(student_ids, scores)}
+
+def get_course_grade_analytics(teacher_id: int, course_id: int) -> dict:
+    course = Course.query.filter_by(id=course_id, teacher_id=teacher_id, deleted_at=None).first()
+    if not course:
+        raise GradeAnalyticsServiceError("Course not found or you are not the teacher of this course.", 403)
+
+    student_ids, scores = _load_scores(archive_service.score_rows(Assignment.course_id == course_id, Assignment.deleted_at.is_(None)))
+    return {'course_id': course_id, **summarize_scores(student_ids, scores)}
+
+def rescore_submissions(batch_size: int = 1000) -> dict:
+    """
+    Parses grades that were stored before scores existed (grade set, score NULL) with each
+    assignment's grading scheme. Grades no scheme understands are left unscored and counted.
+    """
+    unparseable = 0
+    query = db.session.query(Submission.id, Submission.grade, Assignment.grading_scheme).\
+        join(Assignment, Assignment.id == Submission.assignment_id).\
+        filter(Submission.grade.isnot(None), Submission.score.is_(None))
+    updates = []
+    for submission_id, grade, scheme in query.yield_per(batch_size):
+        try:
+            updates.append({'id': submission_id, 'score': parse_grade(grade, scheme).score})
+        except GradeParseError:
+            unparseable += 1
+    try:
+        for start in range(0, len(updates), batch_size):
+            db.session.execute(update(Submission), updates[start:start + batch_size]) # Bulk UPDATE by primary key
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {'scored': len(updates), 'unparseable': unparseable}
@@ -0,0 +1,360 @@
+"""
+Bulk import of chapters (and optionally assignments) from a zip or tar of Markdown files.
+
+The archive holds a `manifest.json` (at its root, or inside a single top-level folder) and the
+Markdown files it lists:
+
+    {
+      "chapters": ["intro.md", {"file": "basics.md", "title": "The Basics"}, ...],
+      "assignments": [{"title": "...", "description": "...", "due_date": "2024-06-30T23:59:00",
+                       "chapter": "basics.md", "grading_scheme": "auto"}, ...]
+    }
+
+An assignment with an "answer_key" (schema in utils/quiz.py) is imported as a quiz.
+
+Chapters are appended to the course in manifest order. A chapter's title is the manifest title,
+else the file's first `# ` heading, else the file name. Members are read one at a time (a zip in
+manifest order, a tar in archive order) and parsed rows are inserted in multi-row batches of
+IMPORT_BATCH_ROWS (rendered on the way, see utils/rendering.py), so memory holds one member
+plus one batch of rows, not the whole archive. Everything is written in one transaction: either the whole import lands or none of it.
+"""
+import json
+import posixpath
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import insert
+from backend.src.models import Chapter, Assignment, AssignmentStats
+from backend.src.extensions import db
+from backend.src.services import course_service, notification_service
+from backend.src.services.course_service import chapter_rebalancer
+from backend.src.services.reminder_service import reminder_scheduler
+from backend.src.utils.archives import ArchiveError, open_archive
+from backend.src.utils.cache import catalog_cache
+from backend.src.utils.grading import get_grading_scheme, GradeParseError
+from backend.src.utils.quiz import QuizError, parse_answer_key
+
+MANIFEST_NAME = 'manifest.json'
+MARKDOWN_SUFFIXES = ('.md', '.markdown')
+
+class ImportServiceError(Exception):
+    """Custom exception for import service errors; `errors` lists per-file problems."""
+    def __init__(self, message, status_code=400, errors=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.errors = errors or []
+
+def _file_error(file: str | None, message: str) -> dict:
+    return {'file': file, 'error': message}
+
+# --- Manifest ---
+
+def _manifest_prefix(name: str) -> str | None:
+    """Folder prefix ('' or 'top/') if `name` is a manifest the importer accepts, else None."""
+    head, tail = posixpath.split(name)
+    if tail != MANIFEST_NAME or '/' in head:
+        return None
+    return f'{head}/' if head else ''
+
+def _parse_due_date(value):
+    if value in (None, ''):
+        return None
+    if not isinstance(value, str):
+        raise ValueError("due_date must be an ISO 8601 string.")
+    try:
+        due_date = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid due_date {value!r}. Expected ISO 8601, e.g. 2024-06-30T23:59:00.")
+    if due_date.tzinfo is not None:
+        due_date = due_date.astimezone(timezone.utc).replace(tzinfo=None)
+    return due_date
+
+def _parse_manifest(data: bytes, prefix: str, allow_empty: bool = False) -> tuple[list[dict], list[dict], list[dict]]:
+    """
+    (chapter entries, assignment entries, errors). Chapter entries carry the member name
+    ('path'), the name as written in the manifest ('file') and an optional title.
+    """
+    try:
+        manifest = json.loads(data.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ImportServiceError(f"{MANIFEST_NAME} is not valid JSON: {e}", 400)
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('chapters'), list):
+        raise ImportServiceError(f"{MANIFEST_NAME} must be an object with a 'chapters' list.", 400)
+    assignments = manifest.get('assignments') or []
+    if not isinstance(assignments, list):
+        raise ImportServiceError(f"{MANIFEST_NAME}: 'assignments' must be a list.", 400)
+
+    chapters, errors, seen = [], [], set()
+    for position, entry in enumerate(manifest['chapters'], start=1):
+        if isinstance(entry, str):
+            entry = {'file': entry}
+        file = entry.get('file') if isinstance(entry, dict) else None
+        title = entry.get('title') if isinstance(entry, dict) else None
+        if not isinstance(file, str) or not file or (title is not None and not isinstance(title, str)):
+            errors.append(_file_error(None, f"Chapter entry {position}: expected a file name or {{\"file\", \"title\"}}."))
+            continue
+        path = posixpath.normpath(prefix + file)
+        if file.startswith('/') or path.startswith('../') or not path.lower().endswith(MARKDOWN_SUFFIXES):
+            errors.append(_file_error(file, "Not a Markdown file inside the archive (.md or .markdown)."))
+            continue
+        if path in seen:
+            errors.append(_file_error(file, "Listed more than once in the manifest."))
+            continue
+        seen.add(path)
+        chapters.append({'path': path, 'file': file, 'title': title.strip() if title else None})
+
+    if not chapters and not errors and not allow_empty:
+        raise ImportServiceError(f"{MANIFEST_NAME} lists no chapters.", 400)
+    return chapters, assignments, errors
+
+# --- Markdown ---
+
+def parse_markdown(data: bytes, name: str, title: str | None = None, allow_empty: bool = False) -> tuple[str, str | None]:
+    """
+    (title, content) of one Markdown member. Raises ValueError for non-UTF-8 files, and for empty
+    ones unless `allow_empty` (content None). The content is stored as written; only a BOM and
+    Windows line endings are normalized.
+    """
+    try:
+        content = data.decode('utf-8-sig')
+    except UnicodeDecodeError as e:
+        raise ValueError(f"Not valid UTF-8 text: {e}")
+    content = content.replace('\r\n', '\n')
+    if not content.strip():
+        if not allow_empty:
+            raise ValueError("File is empty.")
+        content = None
+    if not title and content:
+        for line in content.split('\n'):
+            if line.startswith('# '):
+                title = line[2:].strip().rstrip('#').strip()
+                break
+    if not title:
+        title = posixpath.splitext(posixpath.basename(name))[0].replace('-', ' ').replace('_', ' ').strip() or name
+    return title[:255], content
+
+# --- Import ---
+
+class _ChapterBatcher:
+    """Collects parsed chapter rows and inserts them IMPORT_BATCH_ROWS at a time."""
+
+    def __init__(self, course_id: int, batch_rows: int):
+        self.course_id = course_id
+        self.batch_rows = batch_rows
+        self.rows, self.paths = [], {} # paths: order key -> member path of the pending rows
+        self.ids = {} # member path -> new chapter id
+
+    def add(self, path: str, row: dict):
+        self.rows.append({'course_id': self.course_id, **row})
+        self.paths[row['order']] = path
+        if len(self.rows) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        # RETURNING the order key matches ids to rows without sort_by_parameter_order, which some
+        # backends (SQLite) can only honour one row per statement
+        for chapter_id, order in db.session.execute(insert(Chapter).returning(Chapter.id, Chapter.order), self.rows):
+            self.ids[self.paths[order]] = chapter_id
+        self.rows, self.paths = [], {}
+
+def _replay(data):
+    # A member read before the manifest was known: its bytes, or the error reading it raised
+    if isinstance(data, ArchiveError):
+        raise data
+    return data
+
+def _read_chapters(archive, max_file_bytes: int, adder_for, allow_empty: bool = False) -> tuple[list[dict], list, str, list[dict], list[str]]:
+    """
+    Streams the archive: finds the manifest, then parses each listed member as it is read and
+    passes (entry, title, content) to the callback `adder_for(chapter entries)` returns once the
+    manifest is known. Returns (chapter entries, assignment entries, manifest folder prefix,
+    errors, skipped member names).
+    """
+    errors, skipped = [], []
+    found = set() # Member paths already parsed (or failed)
+
+    def consume(entries_by_path, add, name, read):
+        entry = entries_by_path.get(name)
+        if entry is None:
+            skipped.append(name)
+            return
+        if name in found:
+            errors.append(_file_error(entry['file'], "Appears more than once in the archive."))
+            return
+        found.add(name)
+        try:
+            title, content = parse_markdown(read(), name, entry['title'], allow_empty)
+        except (ArchiveError, ValueError) as e:
+            errors.append(_file_error(entry['file'], str(e)))
+            return
+        add(entry, title, content)
+
+    if archive.random_access:
+        manifests = [name for name in archive.names() if _manifest_prefix(name) is not None]
+        if len(manifests) != 1:
+            raise ImportServiceError(
+                f"The archive must contain exactly one {MANIFEST_NAME}, at its root or in a single top-level folder "
+                f"(found {len(manifests)}).", 400)
+        manifest_name = manifests[0]
+        prefix = _manifest_prefix(manifest_name)
+        chapters, assignments, manifest_errors = _parse_manifest(archive.read(manifest_name, max_file_bytes), prefix, allow_empty)
+        errors.extend(manifest_errors)
+        entries_by_path = {entry['path']: entry for entry in chapters}
+        add = adder_for(chapters)
+        available = set(archive.names())
+        for entry in chapters: # Manifest order; only one member is held at a time
+            if entry['path'] in available:
+                consume(entries_by_path, add, entry['path'], lambda path=entry['path']: archive.read(path, max_file_bytes))
+        skipped.extend(sorted(available - set(entries_by_path) - {manifest_name}))
+    else:
+        # Stream order: members ahead of the manifest are held until it shows up (put it first to avoid that)
+        pending, chapters, assignments, prefix, entries_by_path, add = [], None, None, '', None, None
+        for name, read in archive.members(max_file_bytes):
+            if chapters is None and _manifest_prefix(name) is not None:
+                prefix = _manifest_prefix(name)
+                chapters, assignments, manifest_errors = _parse_manifest(read(), prefix, allow_empty)
+                errors.extend(manifest_errors)
+                entries_by_path = {entry['path']: entry for entry in chapters}
+                add = adder_for(chapters)
+                for pending_name, data in pending:
+                    consume(entries_by_path, add, pending_name, lambda data=data: _replay(data))
+                pending = None
+            elif chapters is None:
+                try:
+                    pending.append((name, read()))
+                except ArchiveError as e:
+                    pending.append((name, e))
+            else:
+                consume(entries_by_path, add, name, read)
+        if chapters is None:
+            raise ImportServiceError(f"The archive has no {MANIFEST_NAME}.", 400)
+
+    for entry in chapters:
+        if entry['path'] not in found:
+            errors.append(_file_error(entry['file'], "Listed in the manifest but not found in the archive."))
+    return chapters, assignments, prefix, errors, skipped
+
+def _assignment_rows(course_id: int, assignments: list, prefix: str, chapter_ids: dict) -> tuple[list[dict], list, list[dict]]:
+    """
+    Validated assignment rows, the manifest `ref` of each (course packages use it to attach
+    submissions; None otherwise) and per-entry errors. `chapter` refers to a chapter file of this import.
+    """
+    rows, refs, errors = [], [], []
+    for position, entry in enumerate(assignments, start=1):
+        label = f"assignments[{position}]"
+        if not isinstance(entry, dict) or not isinstance(entry.get('title'), str) or not entry['title'].strip():
+            errors.append(_file_error(MANIFEST_NAME, f"{label}: a title is required."))
+            continue
+        try:
+            due_date = _parse_due_date(entry.get('due_date'))
+            grading_scheme = entry.get('grading_scheme') or 'auto'
+            if not isinstance(grading_scheme, str):
+                raise ValueError("grading_scheme must be a string.")
+            get_grading_scheme(grading_scheme)
+            answer_key = parse_answer_key(entry['answer_key']) if entry.get('answer_key') is not None else None
+        except (ValueError, GradeParseError, QuizError) as e:
+            errors.append(_file_error(MANIFEST_NAME, f"{label}: {e}"))
+            continue
+        chapter_id = None
+        if entry.get('chapter') is not None:
+            chapter = entry['chapter']
+            chapter_id = chapter_ids.get(posixpath.normpath(prefix + chapter)) if isinstance(chapter, str) else None
+            if chapter_id is None:
+                errors.append(_file_error(MANIFEST_NAME, f"{label}: chapter {entry['chapter']!r} is not a chapter imported by this archive."))
+                continue
+        rows.append({'course_id': course_id, 'chapter_id': chapter_id, 'title': entry['title'].strip()[:255],
+                     'description': entry.get('description'), 'due_date': due_date, 'grading_scheme': grading_scheme,
+                     'answer_key': answer_key})
+        refs.append(entry.get('ref'))
+    return rows, refs, errors
+
+def stage_archive_import(course_id: int, archive, skip_invalid: bool = False, allow_empty: bool = False) -> dict:
+    """
+    Stages the chapters and assignments of an opened archive on the session, appended after the
+    course's existing chapters. The caller holds the course's chapter lock, commits, and then
+    calls finish_archive_import(). Raises ImportServiceError (422) on per-file errors unless
+    `skip_invalid`; ArchiveError if the archive itself is corrupt. `allow_empty` accepts empty
+    chapter files and an empty chapter list, as course packages of new courses contain.
+    """
+    max_file_bytes = current_app.config.get('IMPORT_MAX_FILE_BYTES', 2 * 1024 * 1024)
+    batch_rows = current_app.config.get('IMPORT_BATCH_ROWS', 500)
+    gap = chapter_rebalancer.gap
+    base = course_service.last_chapter_order(course_id) or 0
+    batcher = _ChapterBatcher(course_id, batch_rows)
+
+    def adder_for(chapters):
+        positions = {entry['path']: index for index, entry in enumerate(chapters, start=1)}
+        def add(entry, title, content):
+            # Keys follow manifest order whatever order the members arrive in
+            batcher.add(entry['path'], {'title': title, 'content': content, 'order': base + gap * positions[entry['path']],
+                                        **course_service.rendered_chapter_columns(content)})
+        return add
+
+    chapters, assignments, prefix, errors, skipped = _read_chapters(archive, max_file_bytes, adder_for, allow_empty)
+    batcher.flush()
+
+    assignment_rows, refs, assignment_errors = _assignment_rows(course_id, assignments, prefix, batcher.ids)
+    errors.extend(assignment_errors)
+    if errors and not skip_invalid:
+        raise ImportServiceError(f"Import failed: {len(errors)} file error(s); nothing was imported.", 422, errors)
+    if not batcher.ids and not allow_empty:
+        raise ImportServiceError("Nothing to import: no valid chapters in the archive.", 422, errors)
+
+    new_assignments = []
+    if assignment_rows:
+        # Ids come from one sequence in row order, so ascending ids line up with assignment_rows
+        assignment_ids = sorted(db.session.execute(insert(Assignment).returning(Assignment.id), assignment_rows).scalars())
+        db.session.execute(insert(AssignmentStats), [{'assignment_id': assignment_id} for assignment_id in assignment_ids])
+        new_assignments = [{'id': assignment_id, 'ref': ref, 'title': row['title'], 'due_date': row['due_date']}
+                           for assignment_id, ref, row in zip(assignment_ids, refs, assignment_rows)]
+    deferred = any([notification_service.notify_course_students(course_id, 'assignment_created', row['title'], row['id'])
+                    for row in new_assignments])
+    return {
+        'chapters': [{'id': batcher.ids[entry['path']], 'file': entry['file']} for entry in chapters if entry['path'] in batcher.ids],
+        'assignments': new_assignments, 'errors': errors, 'skipped': skipped, 'deferred': deferred,
+    }
+
+def finish_archive_import(course_id: int, staged: dict) -> dict:
+    """After-commit work of an import (cache, reminders, events); returns the response summary."""
+    catalog_cache.invalidate_course(course_id)
+    if staged['deferred']:
+        notification_service.notification_fanout.wake()
+    for row in staged['assignments']:
+        reminder_scheduler.schedule(row['id'], row['due_date'])
+        notification_service.notify_course(course_id, 'assignment_created', {
+            'assignment_id': row['id'], 'course_id': course_id, 'title': row['title'], 'due_date': row['due_date'],
+        })
+    return {
+        'course_id': course_id,
+        'chapters': staged['chapters'],
+        'assignment_ids': [row['id'] for row in staged['assignments']],
+        'imported_chapters': len(staged['chapters']),
+        'imported_assignments': len(staged['assignments']),
+        'errors': staged['errors'],
+        'skipped': staged['skipped'],
+    }
+
+def import_course_archive(course_id: int, teacher_id: int, fileobj, skip_invalid: bool = False) -> dict:
+    """
+    Imports the chapters (and assignments) of an uploaded archive into a course taught by
+    `teacher_id`, appended after its existing chapters, in one transaction. Any per-file error
+    aborts the import with a 422 listing all of them, unless `skip_invalid` is set, in which case
+    the valid files are imported and the errors returned alongside.
+    """
+    try:
+        archive = open_archive(fileobj)
+    except ArchiveError as e:
+        raise ImportServiceError(str(e), 400)
+
+    try:
+        with course_service.locked_course_chapters(course_id, teacher_id):
+            staged = stage_archive_import(course_id, archive, skip_invalid)
+            db.session.commit()
+    except ArchiveError as e: # The archive itself is corrupt (a bad member is a per-file error)
+        db.session.rollback()
+        raise ImportServiceError(str(e), 400)
+    except Exception:
+        db.session.rollback()
+        raise
+    return finish_archive_import(course_id, staged)
@@ -0,0 +1,286 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from itertools import chain
+from datetime import date, datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import select, insert, update, func, or_, and_
+from backend.src.models import (
+    Submission, SubmissionVersion, LearningEvent, LearningEventTypeEnum, User,
+    WeeklyLearningActions, DailyActiveUsers, RollupCheckpoint
+)
+from backend.src.extensions import db
+from backend.src.utils.bitmap import (
+    bitmap_from_ids, bitmap_to_bytes, bitmap_from_bytes, bitmap_union, bitmap_count
+)
+
+logger = logging.getLogger(__name__)
+
+class MetricsServiceError(Exception):
+    """Custom exception for metrics service errors."""
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+# Engaged learning actions, per docs/Metrics_Framework.md: a quiz completed, an assignment
+# submitted, or more than one minute spent on an interactive element.
+ENGAGED_INTERACTION_MS = 60 * 1000
+SUBMISSIONS_SOURCE = 'submissions'
+EVENTS_SOURCE = 'learning_events'
+
+# Source rows are folded in (timestamp, id) order up to METRICS_ROLLUP_LAG_SECONDS before now.
+# The timestamps are set when the row is written (submitted_at on submit and resubmit,
+# received_at by the database), so, unlike ids, they cannot commit out of order by more than
+# the lag. A resubmission moves the submission's submitted_at forward, so it is seen again.
+_SOURCE_CLOCKS = {
+    SUBMISSIONS_SOURCE: (Submission.submitted_at, Submission.id),
+    EVENTS_SOURCE: (LearningEvent.received_at, LearningEvent.id),
+}
+
+_refresh_lock = threading.Lock()
+
+def week_start(day: date) -> date:
+    """Monday of the ISO week containing `day`."""
+    return day - timedelta(days=day.weekday())
+
+def _is_engaged(event_type: LearningEventTypeEnum, duration_ms: int | None) -> bool:
+    if event_type == LearningEventTypeEnum.QUIZ_COMPLETED:
+        return True
+    return event_type == LearningEventTypeEnum.INTERACTION and (duration_ms or 0) > ENGAGED_INTERACTION_MS
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _load_checkpoints() -> dict[str, RollupCheckpoint]:
+    # FOR UPDATE serialises concurrent refreshes across workers (a no-op on SQLite)
+    checkpoints = {cp.source: cp for cp in RollupCheckpoint.query.filter(RollupCheckpoint.source.in_(_SOURCE_CLOCKS)).with_for_update()}
+    for source, (timestamp, row_id) in _SOURCE_CLOCKS.items():
+        checkpoint = checkpoints.get(source)
+        if checkpoint is None:
+            checkpoint = checkpoints[source] = RollupCheckpoint(source=source, last_id=0)
+            db.session.add(checkpoint)
+        if checkpoint.last_seen_at is None and checkpoint.last_id:
+            # Checkpoint from before timestamps were tracked: resume after its last id's timestamp
+            checkpoint.last_seen_at = db.session.query(func.max(timestamp)).filter(row_id <= checkpoint.last_id).scalar()
+    return checkpoints
+
+def _new_rows(checkpoint: RollupCheckpoint, cutoff: datetime, batch_size: int, *columns):
+    """
+    Yields (timestamp, id, *columns) of the source rows after `checkpoint` and up to `cutoff`,
+    in (timestamp, id) order, advancing the checkpoint as it goes.
+    """
+    timestamp, row_id = _SOURCE_CLOCKS[checkpoint.source]
+    query = db.session.query(timestamp, row_id, *columns).filter(timestamp.isnot(None), timestamp <= cutoff)
+    if checkpoint.last_seen_at is not None:
+        query = query.filter(or_(timestamp > checkpoint.last_seen_at,
+                                 and_(timestamp == checkpoint.last_seen_at, row_id > checkpoint.last_id)))
+    for row in query.order_by(timestamp.asc(), row_id.asc()).yield_per(batch_size):
+        checkpoint.last_seen_at, checkpoint.last_id = row[0], row[1]
+        yield row
+
+def _superseded_versions(after: datetime | None, cutoff: datetime, batch_size: int):
+    """
+    Yields (submitted_at, id, student id) of the superseded submission versions in the same
+    window as the submissions about to be folded. A version older than the window was either
+    folded in as the live submission or, if already superseded then, by this same scan.
+    """
+    student_id = select(Submission.student_id).where(Submission.id == SubmissionVersion.submission_id).scalar_subquery()
+    query = db.session.query(SubmissionVersion.submitted_at, SubmissionVersion.id, student_id).\
+        filter(SubmissionVersion.submitted_at.isnot(None), SubmissionVersion.submitted_at <= cutoff)
+    if after is not None:
+        query = query.filter(SubmissionVersion.submitted_at > after)
+    return query.order_by(SubmissionVersion.submitted_at.asc(), SubmissionVersion.id.asc()).yield_per(batch_size)
+
+def _merge_weekly(deltas: Counter):
+    by_week = defaultdict(dict)
+    for (student_id, week), count in deltas.items():
+        by_week[week][student_id] = count
+
+    updates, inserts = [], []
+    for week, students in by_week.items():
+        existing = dict(db.session.query(WeeklyLearningActions.student_id, WeeklyLearningActions.action_count).
+                        filter(WeeklyLearningActions.week_start == week,
+                               WeeklyLearningActions.student_id.in_(list(students))).all())
+        for student_id, count in students.items():
+            row = {'student_id': student_id, 'week_start': week}
+            if student_id in existing:
+                updates.append({**row, 'action_count': existing[student_id] + count})
+            else:
+                inserts.append({**row, 'action_count': count})
+
+    if updates:
+        db.session.execute(update(WeeklyLearningActions), updates) # Bulk UPDATE by primary key
+    if inserts:
+        db.session.execute(insert(WeeklyLearningActions), inserts)
+
+def _merge_daily(deltas: dict[date, int]):
+    existing = {row.day: row for row in DailyActiveUsers.query.filter(DailyActiveUsers.day.in_(list(deltas))).all()}
+    for day, bits in deltas.items():
+        if day in existing:
+            row = existing[day]
+            row.user_bitmap = bitmap_to_bytes(bitmap_from_bytes(row.user_bitmap) | bits)
+        else:
+            db.session.add(DailyActiveUsers(day=day, user_bitmap=bitmap_to_bytes(bits)))
+
+def refresh_rollups(batch_size: int = 5000) -> dict:
+    """
+    Folds submissions, resubmissions and learning events written since the last checkpoint into
+    the rollups. Source rows are streamed in (timestamp, id) order up to METRICS_ROLLUP_LAG_SECONDS
+    ago, aggregated in memory, then merged into the weekly counters and daily bitmaps with bulk
+    statements; the checkpoints advance in the same transaction, so a failed refresh leaves
+    nothing half-applied.
+    """
+    with _refresh_lock:
+        try:
+            checkpoints = _load_checkpoints()
+            cutoff = _utcnow() - timedelta(seconds=current_app.config.get('METRICS_ROLLUP_LAG_SECONDS', 120))
+            weekly, daily = Counter(), defaultdict(set) # daily: day -> ids, made into bitmaps once at the end
+
+            new_submissions = 0
+            submissions = chain(
+                _superseded_versions(checkpoints[SUBMISSIONS_SOURCE].last_seen_at, cutoff, batch_size),
+                _new_rows(checkpoints[SUBMISSIONS_SOURCE], cutoff, batch_size, Submission.student_id),
+            )
+            for submitted_at, _, student_id in submissions:
+                day = submitted_at.date()
+                weekly[(student_id, week_start(day))] += 1
+                daily[day].add(student_id)
+                new_submissions += 1
+
+            new_events = 0
+            events = _new_rows(checkpoints[EVENTS_SOURCE], cutoff, batch_size, LearningEvent.user_id,
+                               LearningEvent.event_type, LearningEvent.duration_ms, LearningEvent.occurred_at)
+            for _, _, user_id, event_type, duration_ms, occurred_at in events:
+                day = occurred_at.date()
+                if _is_engaged(event_type, duration_ms):
+                    weekly[(user_id, week_start(day))] += 1
+                daily[day].add(user_id)
+                new_events += 1
+
+            if weekly:
+                _merge_weekly(weekly)
+            if daily:
+                _merge_daily({day: bitmap_from_ids(user_ids) for day, user_ids in daily.items()})
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return {'submissions': new_submissions, 'events': new_events}
+
+def _active_bitmap(first_day: date, last_day: date) -> int:
+    rows = db.session.query(DailyActiveUsers.user_bitmap).\
+        filter(DailyActiveUsers.day >= first_day, DailyActiveUsers.day <= last_day).all()
+    return bitmap_union(bitmap_from_bytes(row.user_bitmap) for row in rows)
+
+# --- Read side: everything below reads only the rollup tables ---
+
+def get_wela(week: date) -> dict:
+    """
+    North Star metric for the ISO week containing `week`: the engaged learning actions of
+    students who reached at least WELA_MIN_ACTIONS actions that week.
+    """
+    start = week_start(week)
+    threshold = current_app.config.get('WELA_MIN_ACTIONS', 3)
+    engaged = WeeklyLearningActions.action_count >= threshold
+    total_learners, engaged_students, wela = db.session.query(
+        func.count(WeeklyLearningActions.student_id),
+        func.count(WeeklyLearningActions.student_id).filter(engaged),
+        func.coalesce(func.sum(WeeklyLearningActions.action_count).filter(engaged), 0)
+    ).filter(WeeklyLearningActions.week_start == start).one()
+    return {
+        'week_start': start,
+        'threshold': threshold,
+        'wela': int(wela),
+        'engaged_students': engaged_students,
+        'students_with_actions': total_learners,
+    }
+
+def get_active_users(as_of: date) -> dict:
+    """DAU, WAU (7 days) and MAU (30 days) ending on `as_of`, from the daily bitmaps."""
+    rows = db.session.query(DailyActiveUsers.day, DailyActiveUsers.user_bitmap).\
+        filter(DailyActiveUsers.day > as_of - timedelta(days=30), DailyActiveUsers.day <= as_of).all()
+    bitmaps = {day: bitmap_from_bytes(data) for day, data in rows}
+    week_cutoff = as_of - timedelta(days=7)
+    dau = bitmap_count(bitmaps.get(as_of, 0))
+    wau = bitmap_count(bitmap_union(bits for day, bits in bitmaps.items() if day > week_cutoff))
+    mau = bitmap_count(bitmap_union(bitmaps.values()))
+    return {
+        'date': as_of,
+        'dau': dau,
+        'wau': wau,
+        'mau': mau,
+        'wau_mau_ratio': round(wau / mau, 4) if mau else None,
+    }
+
+def get_retention(cohort_start: date, period: str = 'week') -> dict:
+    """
+    Share of users registered in [cohort_start, cohort_start + period) who were active again in
+    the following period. period is 'week' (7 days) or 'month' (30 days).
+    """
+    if period not in ('week', 'month'):
+        raise MetricsServiceError("period must be 'week' or 'month'.", 400)
+    length = timedelta(days=7 if period == 'week' else 30)
+    cohort_end = cohort_start + length
+
+    cohort_ids = db.session.query(User.id).filter(
+        User.created_at >= datetime.combine(cohort_start, datetime.min.time()),
+        User.created_at < datetime.combine(cohort_end, datetime.min.time())
+    ).all()
+    cohort = bitmap_from_ids(user_id for (user_id,) in cohort_ids)
+    active_next = _active_bitmap(cohort_end, cohort_end + length - timedelta(days=1))
+
+    cohort_size = bitmap_count(cohort)
+    retained = bitmap_count(cohort & active_next)
+    return {
+        'cohort_start': cohort_start,
+        'period': period,
+        'cohort_size': cohort_size,
+        'retained': retained,
+        'retention_rate': round(retained / cohort_size, 4) if cohort_size else None,
+    }
+
+def today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+class MetricsRefresher:
+    """
+    Worker thread running refresh_rollups() every METRICS_ROLLUP_MAX_AGE_SECONDS, so the read
+    endpoints never fold in rows inside a request. Refreshes in several worker processes
+    serialize on the checkpoint row locks; `flask refresh-metrics` runs one on demand.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.interval_seconds = 60
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.interval_seconds = app.config.get('METRICS_ROLLUP_MAX_AGE_SECONDS', 60)
+        app.extensions['metrics_refresher'] = self
+        if app.config.get('METRICS_REFRESHER_ENABLED', True):
+            self.start()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='metrics-refresher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    result = refresh_rollups()
+                    if result['submissions'] or result['events']:
+                        logger.info("Rolled up %d submissions and %d learning events", result['submissions'], result['events'])
+            except Exception:
+                logger.exception("Metrics rollup refresh failed; will retry")
+            time.sleep(self.interval_seconds)
+
+
+metrics_refresher = MetricsRefresher()
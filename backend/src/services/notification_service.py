@@ -0,0 +1,407 @@
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, update, exists, literal, func, and_, or_
+from backend.src.models import (
+    Course, Enrollment, RoleEnum, Assignment, CourseStats, Notification, NotificationCounter, NotificationFanout
+)
+from backend.src.models.read_models import project, NOTIFICATION
+from backend.src.extensions import db
+from backend.src.utils.fieldsets import Fieldset
+from backend.src.utils.pubsub import notification_broker, KEEPALIVE_FRAME
+
+logger = logging.getLogger(__name__)
+
+class NotificationServiceError(Exception):
+    """Custom exception for notification service errors."""
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def user_topic(user_id: int) -> str:
+    return f'user:{user_id}'
+
+def course_topic(course_id: int) -> str:
+    return f'course:{course_id}'
+
+# --- Publishing (call after the change is committed) ---
+
+def notify_user(user_id: int, event_type: str, data: dict) -> int:
+    return notification_broker.publish(user_topic(user_id), event_type, current_app.json.dumps(data))
+
+def notify_course(course_id: int, event_type: str, data: dict) -> int:
+    """One event for everyone following the course (its students and teacher), not one per student."""
+    return notification_broker.publish(course_topic(course_id), event_type, current_app.json.dumps(data))
+
+# --- Streams ---
+
+def stream_topics(user) -> list[str]:
+    """The user's own topic plus one per course they are enrolled in (students) or teach (teachers)."""
+    if user.role == RoleEnum.TEACHER:
+        query = select(Course.id).where(Course.teacher_id == user.id, Course.deleted_at.is_(None))
+    else:
+        query = select(Enrollment.course_id).join(Course, Course.id == Enrollment.course_id).\
+            where(Enrollment.student_id == user.id, Course.deleted_at.is_(None))
+    return [user_topic(user.id)] + [course_topic(course_id) for course_id in db.session.execute(query).scalars()]
+
+def parse_last_event_id(value: str | None) -> int | None:
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise NotificationServiceError("Last-Event-ID must be an event id sent by this stream.", 400)
+
+def open_stream(user, last_event_id: int | None = None):
+    """
+    Subscribes the user's topics and returns the SSE body generator. Topics are resolved now, so
+    the generator itself never touches the database; a course joined later is picked up on the
+    next reconnect (streams end after SSE_MAX_STREAM_SECONDS so clients re-authenticate anyway).
+    """
+    keepalive = current_app.config.get('SSE_KEEPALIVE_SECONDS', 15)
+    max_seconds = current_app.config.get('SSE_MAX_STREAM_SECONDS', 3600)
+    retry_ms = current_app.config.get('SSE_RETRY_MS', 3000)
+    subscription = notification_broker.subscribe(stream_topics(user), last_event_id)
+
+    def generate():
+        try:
+            yield f'retry: {retry_ms}\n: connected\n\n'
+            deadline = time.monotonic() + max_seconds
+            while (remaining := deadline - time.monotonic()) > 0:
+                frames = subscription.wait(min(keepalive, remaining))
+                yield ''.join(frames) if frames else KEEPALIVE_FRAME
+        finally:
+            # Runs when the client disconnects (the server closes the generator) or the stream expires
+            notification_broker.unsubscribe(subscription)
+
+    return generate()
+
+# --- Inbox writes (staged on the caller's session; the caller commits) ---
+
+def _counter_upsert(rows):
+    """
+    INSERT of unread counter increments that adds to an existing counter instead of failing
+    (ON CONFLICT DO UPDATE), so two writers creating the same user's counter cannot collide.
+    `rows` is a VALUES list or a select() of (user_id, unread_count).
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(NotificationCounter)
+    stmt = stmt.values(rows) if isinstance(rows, list) else stmt.from_select(['user_id', 'unread_count'], rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[NotificationCounter.user_id],
+        set_={'unread_count': NotificationCounter.unread_count + stmt.excluded.unread_count},
+    )
+
+def _bump_unread(user_ids: list[int], amount: int = 1):
+    """Adds `amount` (negative when notifications are read) to the unread counters of `user_ids`."""
+    if amount < 0:
+        # Only reads decrement, and a user with notifications to read already has a counter
+        db.session.execute(
+            update(NotificationCounter).where(NotificationCounter.user_id.in_(user_ids)).
+            values(unread_count=NotificationCounter.unread_count + amount)
+        )
+        return
+    # One row per user: an upsert may not touch the same counter twice
+    counts = Counter(user_ids)
+    if counts:
+        db.session.execute(_counter_upsert([{'user_id': user_id, 'unread_count': amount * n} for user_id, n in counts.items()]))
+
+def _bump_unread_enrolled(criteria: list):
+    """
+    Adds one to the unread counter of every enrollment matching `criteria`, set-based: one
+    INSERT ... SELECT that creates missing counters and bumps existing ones.
+    """
+    db.session.execute(_counter_upsert(select(Enrollment.student_id, literal(1)).where(*criteria)))
+
+def add_notification(user_id: int, kind: str, title: str, course_id: int | None = None, assignment_id: int | None = None):
+    db.session.add(Notification(user_id=user_id, kind=kind, title=title, course_id=course_id, assignment_id=assignment_id))
+    _bump_unread([user_id])
+
+def add_notifications(user_ids: list[int], kind: str, title: str, course_id: int | None = None, assignment_id: int | None = None):
+    """The same notification for each of `user_ids` (e.g. students whose quiz was re-graded), in one multi-row INSERT."""
+    if not user_ids:
+        return
+    db.session.execute(insert(Notification), [
+        {'user_id': user_id, 'kind': kind, 'title': title, 'course_id': course_id, 'assignment_id': assignment_id}
+        for user_id in user_ids
+    ])
+    _bump_unread(user_ids)
+
+def _student_criteria(course_id: int, after: int | None = None, upto: int | None = None) -> list:
+    criteria = [Enrollment.course_id == course_id]
+    if after is not None:
+        criteria.append(Enrollment.student_id > after)
+    if upto is not None:
+        criteria.append(Enrollment.student_id <= upto)
+    return criteria
+
+def _fan_out(kind: str, title: str, course_id: int, assignment_id: int | None, after: int | None = None, upto: int | None = None) -> int:
+    """
+    One notification per enrolled student in (after, upto], written as a single INSERT ... SELECT.
+    Nothing is written once the course or assignment is soft-deleted (checked in the same statement).
+    """
+    criteria = _student_criteria(course_id, after, upto)
+    criteria.append(exists().where(Course.id == course_id, Course.deleted_at.is_(None)))
+    if assignment_id is not None:
+        criteria.append(exists().where(Assignment.id == assignment_id, Assignment.deleted_at.is_(None)))
+    result = db.session.execute(insert(Notification).from_select(
+        ['user_id', 'kind', 'course_id', 'assignment_id', 'title'],
+        select(Enrollment.student_id, literal(kind), literal(course_id), literal(assignment_id), literal(title)).where(*criteria)
+    ))
+    _bump_unread_enrolled(criteria)
+    return result.rowcount or 0
+
+def notify_course_students(course_id: int, kind: str, title: str, assignment_id: int | None = None) -> bool:
+    """
+    Writes a course-wide notification for every enrolled student. Courses of up to
+    NOTIFICATION_INLINE_MAX students get it in the caller's transaction; larger ones get a
+    fan-out job for the background worker instead. Returns True when deferred (wake the worker
+    after committing).
+    """
+    stats = db.session.get(CourseStats, course_id)
+    enrolled = stats.enrolled_count if stats is not None else \
+        db.session.execute(select(func.count()).select_from(Enrollment).where(Enrollment.course_id == course_id)).scalar()
+    if enrolled == 0:
+        return False
+    if enrolled <= current_app.config.get('NOTIFICATION_INLINE_MAX', 500):
+        _fan_out(kind, title, course_id, assignment_id)
+        return False
+    db.session.add(NotificationFanout(kind=kind, course_id=course_id, assignment_id=assignment_id, title=title))
+    return True
+
+# --- Inbox reads ---
+
+def get_unread_count(user_id: int) -> int:
+    counter = db.session.get(NotificationCounter, user_id)
+    return counter.unread_count if counter is not None else 0
+
+def list_notifications(user_id: int, fieldset: Fieldset | None = None, before: int | None = None,
+                       limit: int = 20, unread_only: bool = False) -> tuple[list[dict], int | None]:
+    """
+    One page of the user's inbox, newest first, and the `before` cursor of the next page
+    (None on the last page). Keyset pagination on id, so deep pages cost the same as the first.
+    """
+    criteria = [Notification.user_id == user_id]
+    if before is not None:
+        criteria.append(Notification.id < before)
+    if unread_only:
+        criteria.append(Notification.read_at.is_(None))
+    # One extra row tells whether another page follows; its id is the next cursor
+    wanted = fieldset or Fieldset()
+    keyed = Fieldset(fields=wanted.fields | {'id'}, include=wanted.include, nested=wanted.nested) \
+        if wanted.fields is not None else wanted
+    rows = project(NOTIFICATION, keyed, *criteria, order_by=(Notification.id.desc(),), limit=limit + 1)
+    next_before = rows[limit - 1]['id'] if len(rows) > limit else None
+    page = rows[:limit]
+    if wanted.fields is not None and 'id' not in wanted.fields:
+        page = [{name: value for name, value in row.items() if name != 'id'} for row in page]
+    return page, next_before
+
+def mark_read(user_id: int, notification_id: int) -> dict:
+    """Marks one notification read; the counter only drops if it was unread (idempotent)."""
+    notification = Notification.query.filter_by(id=notification_id, user_id=user_id).first()
+    if not notification:
+        raise NotificationServiceError(f"Notification with ID {notification_id} not found.", 404)
+    try:
+        changed = db.session.execute(
+            update(Notification).where(Notification.id == notification_id, Notification.read_at.is_(None)).values(read_at=_utcnow())
+        ).rowcount
+        if changed:
+            _bump_unread([user_id], -changed)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.refresh(notification)
+    return notification.to_dict()
+
+def mark_all_read(user_id: int) -> int:
+    """
+    Marks every unread notification read. The counter is decremented by the rows actually
+    changed, so notifications fanned out concurrently stay counted.
+    """
+    try:
+        changed = db.session.execute(
+            update(Notification).where(Notification.user_id == user_id, Notification.read_at.is_(None)).values(read_at=_utcnow())
+        ).rowcount
+        if changed:
+            _bump_unread([user_id], -changed)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return changed
+
+def _uncount_unread(*criteria):
+    # One correlated UPDATE taking the unread notifications matching `criteria` out of their users' counters
+    unread = (*criteria, Notification.read_at.is_(None))
+    per_user = select(func.count()).where(Notification.user_id == NotificationCounter.user_id, *unread).scalar_subquery()
+    db.session.execute(
+        update(NotificationCounter).where(NotificationCounter.user_id.in_(select(Notification.user_id).where(*unread))).
+        values(unread_count=NotificationCounter.unread_count - per_user)
+    )
+
+def unread_adjustments(notification_ids: list[int]):
+    """
+    Takes notifications that are about to be deleted (e.g. by a purge) out of their users'
+    unread counters: one correlated UPDATE for the whole batch.
+    """
+    _uncount_unread(Notification.id.in_(notification_ids))
+
+def retire_notifications(*criteria):
+    """
+    Marks the unread notifications matching `criteria` read and takes them out of the unread
+    counters. Soft deletes call it in their transaction for the notifications the inbox stops
+    showing, so the badge never counts what the inbox hides.
+    """
+    _uncount_unread(*criteria)
+    db.session.execute(update(Notification).where(*criteria, Notification.read_at.is_(None)).values(read_at=_utcnow()))
+
+def rebuild_unread_counters() -> int:
+    """Recomputes every unread counter from the notifications table (one GROUP BY)."""
+    try:
+        db.session.execute(update(NotificationCounter).values(unread_count=0))
+        rows = db.session.execute(
+            select(Notification.user_id, func.count()).where(Notification.read_at.is_(None)).group_by(Notification.user_id)
+        ).all()
+        existing = set(db.session.execute(select(NotificationCounter.user_id)).scalars())
+        if rows:
+            db.session.execute(update(NotificationCounter), [
+                {'user_id': user_id, 'unread_count': count} for user_id, count in rows if user_id in existing])
+            missing = [{'user_id': user_id, 'unread_count': count} for user_id, count in rows if user_id not in existing]
+            if missing:
+                db.session.execute(insert(NotificationCounter), missing)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(rows)
+
+# --- Background fan-out ---
+
+def _claimable(stale_before: datetime):
+    return or_(
+        NotificationFanout.status == 'pending',
+        and_(NotificationFanout.status == 'running', NotificationFanout.heartbeat_at < stale_before), # Its worker died
+    )
+
+def claim_next_fanout(stale_seconds: int = 300) -> NotificationFanout | None:
+    """Atomically marks the oldest claimable fan-out as running for this worker and returns it."""
+    while True:
+        now = _utcnow()
+        claimable = _claimable(now - timedelta(seconds=stale_seconds))
+        fanout_id = db.session.execute(
+            select(NotificationFanout.id).where(claimable).order_by(NotificationFanout.id).limit(1)
+        ).scalar()
+        if fanout_id is None:
+            db.session.commit()
+            return None
+        claimed = db.session.execute(
+            update(NotificationFanout).where(NotificationFanout.id == fanout_id, claimable).values(status='running', heartbeat_at=now)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(NotificationFanout, fanout_id)
+
+def run_fanout(fanout: NotificationFanout, batch_size: int = 5000) -> NotificationFanout:
+    """
+    Delivers a fan-out in batches of `batch_size` students (by ascending student_id); each
+    batch is one INSERT ... SELECT plus its counter updates, committed with the new cursor,
+    so a reclaimed job continues exactly where the previous worker stopped.
+    """
+    try:
+        while True:
+            # Shared row locks: a soft delete (FOR UPDATE) waits for this batch, then retires it
+            course_gone = db.session.execute(
+                select(Course.deleted_at).where(Course.id == fanout.course_id).with_for_update(read=True)).scalar() is not None
+            assignment_gone = fanout.assignment_id is not None and db.session.execute(
+                select(Assignment.deleted_at).where(Assignment.id == fanout.assignment_id).with_for_update(read=True)).scalar() is not None
+            if course_gone or assignment_gone:
+                break
+            # Upper student_id of this batch; None means the rest fits in it
+            upto = db.session.execute(
+                select(Enrollment.student_id).where(*_student_criteria(fanout.course_id, fanout.cursor)).
+                order_by(Enrollment.student_id).offset(batch_size - 1).limit(1)
+            ).scalar()
+            delivered = _fan_out(fanout.kind, fanout.title, fanout.course_id, fanout.assignment_id, fanout.cursor, upto)
+            fanout.delivered += delivered
+            fanout.heartbeat_at = _utcnow()
+            if upto is None:
+                break
+            fanout.cursor = upto
+            db.session.commit()
+        fanout.status, fanout.finished_at = 'done', _utcnow()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        fanout.status, fanout.error = 'failed', str(e)
+        db.session.commit()
+        logger.exception("Notification fan-out %s failed", fanout.id)
+    return fanout
+
+
+class NotificationFanoutWorker:
+    """
+    Worker thread delivering queued course-wide notifications. Jobs live in the database, so
+    any worker process can take one (claims are atomic UPDATEs); `wake()` is called after a
+    job is queued, otherwise the queue is polled every NOTIFICATION_POLL_SECONDS.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.batch_size = 5000
+        self.poll_seconds = 30
+        self.stale_seconds = 300
+        self._wakeup = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config.get('NOTIFICATION_FANOUT_BATCH', 5000)
+        self.poll_seconds = app.config.get('NOTIFICATION_POLL_SECONDS', 30)
+        app.extensions['notification_fanout'] = self
+        if app.config.get('NOTIFICATION_WORKER_ENABLED', True):
+            self.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def run_pending(self) -> int:
+        """Runs fan-outs until none is claimable. Must run inside an app context."""
+        ran = 0
+        while (fanout := claim_next_fanout(self.stale_seconds)) is not None:
+            run_fanout(fanout, self.batch_size)
+            ran += 1
+        return ran
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='notification-fanout', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    ran = self.run_pending()
+                    if ran:
+                        logger.info("Delivered %d notification fan-outs", ran)
+            except Exception:
+                logger.exception("Notification fan-out tick failed")
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+
+notification_fanout = NotificationFanoutWorker()
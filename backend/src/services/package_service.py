@@ -0,0 +1,311 @@
+"""
+Course packages: a whole course as one zip, for moving it to another instance or keeping an
+offline copy.
+
+Layout (a superset of the chapter import format, see import_service.py):
+  manifest.json      - format/version, course metadata, the chapter list (file + title, in
+                       course order) and the assignments (with `ref`, their id at export time,
+                       and quizzes' answer keys)
+  chapters/<id>.md   - one member per chapter, content as stored
+  submissions.jsonl  - optional; one submission per line (live and archived), students
+                       identified by email so they can be matched on the importing instance
+
+Export streams: every part comes from a `yield_per` query and is compressed into the response
+as it is read (utils/archives.ZipStreamWriter), so memory stays flat however large the course.
+Import creates a new course from a package in one transaction, with the multi-row inserts of
+the chapter import. Submissions are only imported on request, from the `flask import-course-package
+--submissions` maintenance command (a package is just an upload, so a teacher could otherwise
+forge graded work for any student): they are attached to the students found by email, who are
+not enrolled (the teacher enrolls them as usual), and the others are reported.
+"""
+import json
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import select, insert, func
+from backend.src.models import (
+    Course, Chapter, Assignment, Submission, SubmissionTypeEnum, SubmissionArchiveSegment, User, RoleEnum
+)
+from backend.src.extensions import db
+from backend.src.services import stats_service, import_service
+from backend.src.services.archive_service import unpack_segment
+from backend.src.services.import_service import ImportServiceError, MANIFEST_NAME
+from backend.src.utils.archives import ArchiveError, ZipStreamWriter, open_archive
+
+PACKAGE_FORMAT = 'course-package'
+PACKAGE_VERSION = 1
+SUBMISSIONS_NAME = 'submissions.jsonl'
+
+class PackageServiceError(Exception):
+    """Custom exception for package service errors."""
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _chapter_file(chapter_id: int) -> str:
+    return f'chapters/{chapter_id}.md'
+
+# --- Export ---
+
+def export_course_package(course_id: int, teacher_id: int, include_submissions: bool = False) -> tuple[str, object]:
+    """
+    Checks access and returns (file name, generator of zip chunks). The generator queries the
+    database as it is consumed, so the caller must keep the app context alive while streaming
+    (flask.stream_with_context).
+    """
+    course = Course.query.filter_by(id=course_id, teacher_id=teacher_id, deleted_at=None).first()
+    if not course:
+        raise PackageServiceError("Course not found or you are not the teacher of this course.", 404)
+    return f'course-{course_id}.zip', _package_chunks(course_id, include_submissions)
+
+def _rows(stmt, batch_size: int):
+    return db.session.execute(stmt.execution_options(yield_per=batch_size))
+
+def _package_chunks(course_id: int, include_submissions: bool):
+    batch_size = current_app.config.get('EXPORT_YIELD_ROWS', 200)
+    dumps = current_app.json.dumps # ISO 8601 datetimes, enums by value
+    writer = ZipStreamWriter()
+    course = db.session.execute(
+        select(Course.title, Course.description).where(Course.id == course_id)
+    ).one()
+    in_course = (Chapter.course_id == course_id,)
+    live_assignments = (Assignment.course_id == course_id, Assignment.deleted_at.is_(None))
+
+    # The manifest goes first (readers that stream the archive want it up front) and is itself
+    # written piece by piece, so not even the chapter list is held in memory
+    with writer.open(MANIFEST_NAME) as handle:
+        header = {'format': PACKAGE_FORMAT, 'version': PACKAGE_VERSION, 'exported_at': _utcnow(),
+                  'course': {'title': course.title, 'description': course.description}}
+        if include_submissions:
+            header['submissions'] = SUBMISSIONS_NAME
+        handle.write(dumps(header)[:-1].encode('utf-8') + b',"chapters":[')
+        chapters = _rows(select(Chapter.id, Chapter.title).where(*in_course).order_by(Chapter.order, Chapter.id), batch_size)
+        for index, (chapter_id, title) in enumerate(chapters):
+            handle.write((',' if index else '').encode('utf-8') +
+                         dumps({'file': _chapter_file(chapter_id), 'title': title}).encode('utf-8'))
+        handle.write(b'],"assignments":[')
+        assignments = _rows(select(
+            Assignment.id, Assignment.title, Assignment.description, Assignment.due_date,
+            Assignment.chapter_id, Assignment.grading_scheme, Assignment.answer_key,
+        ).where(*live_assignments).order_by(Assignment.id), batch_size)
+        for index, row in enumerate(assignments):
+            entry = {'ref': row.id, 'title': row.title, 'description': row.description, 'due_date': row.due_date,
+                     'chapter': _chapter_file(row.chapter_id) if row.chapter_id else None,
+                     'grading_scheme': row.grading_scheme}
+            if row.answer_key is not None:
+                entry['answer_key'] = row.answer_key
+            handle.write((',' if index else '').encode('utf-8') + dumps(entry).encode('utf-8'))
+        handle.write(b']}')
+    yield writer.drain()
+
+    chapters = _rows(select(Chapter.id, Chapter.content).where(*in_course).order_by(Chapter.order, Chapter.id), batch_size)
+    for chapter_id, content in chapters:
+        with writer.open(_chapter_file(chapter_id)) as handle:
+            handle.write((content or '').encode('utf-8'))
+        chunk = writer.drain()
+        if chunk:
+            yield chunk
+
+    if include_submissions:
+        with writer.open(SUBMISSIONS_NAME) as handle:
+            for count, record in enumerate(_submission_records(course_id, live_assignments, batch_size), start=1):
+                handle.write(dumps(record).encode('utf-8') + b'\n')
+                if count % batch_size == 0:
+                    chunk = writer.drain()
+                    if chunk:
+                        yield chunk
+    yield writer.close()
+
+def _submission_record(assignment_id: int, email: str, username: str, row) -> dict:
+    return {
+        'assignment_ref': assignment_id, 'student_email': email, 'student_username': username,
+        'submission_type': row['submission_type'], 'content_text': row['content_text'], 'file_url': row['file_url'],
+        'submitted_at': row['submitted_at'], 'grade': row['grade'], 'score': row['score'], 'feedback': row['feedback'],
+    }
+
+def _submission_records(course_id: int, live_assignments: tuple, batch_size: int):
+    """Latest version of every live and archived submission of the course's live assignments."""
+    live = _rows(select(
+        Submission.assignment_id, User.email, User.username, Submission.submission_type, Submission.content_text,
+        Submission.file_url, Submission.submitted_at, Submission.grade, Submission.score, Submission.feedback,
+    ).join(Assignment, Assignment.id == Submission.assignment_id).join(User, User.id == Submission.student_id).
+        where(*live_assignments).order_by(Submission.id), batch_size)
+    for row in live:
+        yield _submission_record(row.assignment_id, row.email, row.username, row._mapping)
+
+    # Archived segments are decompressed one at a time
+    segments = _rows(select(SubmissionArchiveSegment.assignment_id, SubmissionArchiveSegment.payload).
+                     join(Assignment, Assignment.id == SubmissionArchiveSegment.assignment_id).
+                     where(*live_assignments).order_by(SubmissionArchiveSegment.id), 1)
+    for assignment_id, payload in segments:
+        records = unpack_segment(payload)
+        students = {student_id: (email, username) for student_id, email, username in db.session.execute(
+            select(User.id, User.email, User.username).where(User.id.in_({record['student_id'] for record in records}))
+        )}
+        for record in records:
+            email, username = students.get(record['student_id'], (None, None))
+            yield _submission_record(assignment_id, email, username, record)
+
+# --- Import ---
+
+def _read_manifest(archive) -> dict:
+    if MANIFEST_NAME not in archive.names():
+        raise PackageServiceError(f"Not a course package: no {MANIFEST_NAME} at the root of the zip.", 400)
+    max_file_bytes = current_app.config.get('IMPORT_MAX_FILE_BYTES', 2 * 1024 * 1024)
+    try:
+        manifest = json.loads(archive.read(MANIFEST_NAME, max_file_bytes).decode('utf-8'))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise PackageServiceError(f"{MANIFEST_NAME} is not valid JSON: {e}", 400)
+    if not isinstance(manifest, dict) or manifest.get('format') != PACKAGE_FORMAT:
+        raise PackageServiceError(f"Not a course package: {MANIFEST_NAME} has no \"format\": \"{PACKAGE_FORMAT}\".", 400)
+    if not isinstance(manifest.get('version'), int) or manifest['version'] > PACKAGE_VERSION:
+        raise PackageServiceError(f"Unsupported course package version {manifest.get('version')!r} (this server reads up to {PACKAGE_VERSION}).", 400)
+    if not isinstance(manifest.get('course'), dict):
+        raise PackageServiceError(f"{MANIFEST_NAME}: 'course' must be an object.", 400)
+    return manifest
+
+def _parse_submission(line: bytes, number: int, assignment_ids: dict) -> dict:
+    """Submission row (student still as email) for one JSON line; raises ValueError."""
+    try:
+        record = json.loads(line.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"line {number}: not valid JSON ({e})")
+    if not isinstance(record, dict):
+        raise ValueError(f"line {number}: expected an object")
+    assignment_id = assignment_ids.get(record.get('assignment_ref'))
+    if assignment_id is None:
+        raise ValueError(f"line {number}: assignment_ref {record.get('assignment_ref')!r} is not an imported assignment")
+    if not isinstance(record.get('student_email'), str):
+        raise ValueError(f"line {number}: student_email is required")
+    try:
+        submission_type = SubmissionTypeEnum(record.get('submission_type'))
+        submitted_at = datetime.fromisoformat(record['submitted_at']) if record.get('submitted_at') else None
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"line {number}: {e}")
+    if submitted_at is not None and submitted_at.tzinfo is not None:
+        submitted_at = submitted_at.astimezone(timezone.utc).replace(tzinfo=None)
+    score = record.get('score')
+    if score is not None and (not isinstance(score, (int, float)) or isinstance(score, bool)):
+        raise ValueError(f"line {number}: score must be a number")
+    return {
+        'assignment_id': assignment_id, 'email': record['student_email'].strip().lower(), 'submission_type': submission_type,
+        'content_text': record.get('content_text'), 'file_url': record.get('file_url'), 'submitted_at': submitted_at,
+        'grade': record.get('grade'), 'score': score, 'feedback': record.get('feedback'),
+    }
+
+class _SubmissionLoader:
+    """Inserts parsed submissions IMPORT_BATCH_ROWS at a time, matching students by email."""
+
+    def __init__(self, course_id: int, batch_rows: int):
+        self.course_id = course_id
+        self.batch_rows = batch_rows
+        self.pending = []
+        self.students = set()
+        self.seen = set() # (assignment_id, student_id): one submission per student and assignment
+        self.imported = 0
+        self.unmatched = {} # email -> submissions skipped
+
+    def add(self, row: dict):
+        self.pending.append(row)
+        if len(self.pending) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        emails = {row['email'] for row in self.pending}
+        students = dict(db.session.execute(
+            select(func.lower(User.email), User.id).where(func.lower(User.email).in_(emails), User.role == RoleEnum.STUDENT)
+        ).all())
+        rows = []
+        for row in self.pending:
+            student_id = students.get(row['email'])
+            if student_id is None:
+                self.unmatched[row['email']] = self.unmatched.get(row['email'], 0) + 1
+                continue
+            if (row['assignment_id'], student_id) in self.seen:
+                continue # Duplicate line; the first one wins
+            self.seen.add((row['assignment_id'], student_id))
+            self.students.add(student_id)
+            rows.append({'student_id': student_id, **{name: value for name, value in row.items() if name != 'email'}})
+        if rows:
+            db.session.execute(insert(Submission), rows)
+            self.imported += len(rows)
+        self.pending = []
+
+def _stage_submissions(course_id: int, archive, name: str, assignment_ids: dict, skip_invalid: bool) -> tuple[_SubmissionLoader, list[dict]]:
+    max_line_bytes = current_app.config.get('IMPORT_MAX_FILE_BYTES', 2 * 1024 * 1024)
+    loader = _SubmissionLoader(course_id, current_app.config.get('IMPORT_BATCH_ROWS', 500))
+    errors = []
+    try:
+        handle = archive.open(name)
+    except KeyError:
+        return loader, [{'file': name, 'error': "Listed in the manifest but not found in the archive."}]
+    with handle:
+        number = 0
+        while line := handle.readline(max_line_bytes + 1):
+            number += 1
+            if len(line) > max_line_bytes:
+                raise PackageServiceError(f"{name} line {number} is longer than {max_line_bytes} bytes.", 400)
+            if not line.strip():
+                continue
+            try:
+                loader.add(_parse_submission(line, number, assignment_ids))
+            except ValueError as e:
+                errors.append({'file': name, 'error': str(e)})
+    loader.flush()
+    if errors and not skip_invalid:
+        raise ImportServiceError(f"Import failed: {len(errors)} file error(s); nothing was imported.", 422, errors)
+    return loader, errors
+
+def import_course_package(teacher_id: int, fileobj, title: str | None = None, include_submissions: bool = False,
+                          skip_invalid: bool = False) -> dict:
+    """
+    Creates a new course taught by `teacher_id` from an exported package, in one transaction.
+    With `include_submissions` (maintenance command only), submissions are attached to the
+    students with the same email on this instance, without enrolling them; the emails that
+    match nobody are reported.
+    """
+    try:
+        archive = open_archive(fileobj)
+    except ArchiveError as e:
+        raise PackageServiceError(str(e), 400)
+    if not archive.random_access:
+        raise PackageServiceError("Course packages are zip files, as exported by GET /courses/<id>/export.", 400)
+    manifest = _read_manifest(archive)
+    course_info = manifest['course']
+
+    loader = None
+    try:
+        course = Course(title=(title or course_info.get('title') or 'Imported course')[:255],
+                        description=course_info.get('description'), teacher_id=teacher_id)
+        db.session.add(course)
+        db.session.flush()
+        stats_service.init_course_stats(course.id)
+        db.session.flush()
+
+        # A brand-new course: no concurrent chapter writes to serialize against
+        staged = import_service.stage_archive_import(course.id, archive, skip_invalid, allow_empty=True)
+        submissions_name = manifest.get('submissions')
+        if include_submissions and isinstance(submissions_name, str):
+            assignment_ids = {row['ref']: row['id'] for row in staged['assignments'] if row['ref'] is not None}
+            loader, submission_errors = _stage_submissions(course.id, archive, submissions_name, assignment_ids, skip_invalid)
+            staged['errors'].extend(submission_errors)
+        staged['skipped'] = [name for name in staged['skipped'] if name != submissions_name]
+        stats_service.rebuild_course_stats(course.id) # Submissions were bulk-inserted
+        db.session.commit()
+    except ArchiveError as e:
+        db.session.rollback()
+        raise PackageServiceError(str(e), 400)
+    except Exception:
+        db.session.rollback()
+        raise
+
+    result = import_service.finish_archive_import(course.id, staged)
+    result['course'] = course.to_dict(include_chapters=False, include_teacher=False)
+    result['imported_submissions'] = loader.imported if loader else 0
+    result['submission_students'] = len(loader.students) if loader else 0
+    result['unmatched_students'] = sorted(loader.unmatched) if loader else []
+    return result
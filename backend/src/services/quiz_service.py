@@ -0,0 +1,212 @@
+"""
+Quiz auto-grading.
+
+A quiz is an assignment with an answer key (utils/quiz.py). Quiz submissions are scored when
+they arrive, in the submission's transaction, so the student gets their grade in the response.
+Replacing the key re-grades every live quiz submission of the assignment in the same
+transaction: rows are scored in chunks of QUIZ_GRADING_CHUNK with the vectorized scorer,
+spread over a process pool of QUIZ_GRADING_WORKERS when there is more than one chunk, and
+written back with one executemany UPDATE per chunk. Students whose grade changed are notified.
+
+Submissions archived with a closed course are not re-graded (restore them first).
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from sqlalchemy import select, update
+from backend.src.models import Assignment, Submission, SubmissionTypeEnum, Course, RoleEnum
+from backend.src.extensions import db
+from backend.src.services import stats_service, notification_service, course_service
+from backend.src.utils.quiz import QuizError, CompiledKey, Score, grade_rows, parse_answer_key, public_questions
+
+logger = logging.getLogger(__name__)
+
+class QuizServiceError(Exception):
+    """Custom exception for quiz service errors."""
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+class QuizGrader:
+    """
+    Scores batches of quiz submissions, in worker processes when a batch spans several chunks.
+    Workers are started with 'spawn' (never forked from a threaded app process) on first use,
+    once per app process, and only ever run utils.quiz.grade_rows.
+    """
+
+    def __init__(self, app=None):
+        self.workers = 0
+        self.chunk_size = 2000
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = app.config.get('QUIZ_GRADING_WORKERS', min(4, os.cpu_count() or 1))
+        self.chunk_size = max(1, app.config.get('QUIZ_GRADING_CHUNK', 2000))
+        app.extensions['quiz_grader'] = self
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+            return self._executor
+
+    def grade(self, key: dict, rows: list[tuple[int, str | None]]) -> list[tuple[int, float, int]]:
+        """(submission id, points, correct count) for each (submission id, answers JSON) row."""
+        chunks = [rows[start:start + self.chunk_size] for start in range(0, len(rows), self.chunk_size)]
+        if self.workers < 2 or len(chunks) < 2:
+            return [result for chunk in chunks for result in grade_rows(key, chunk)]
+        try:
+            return [result for chunk in self._pool().map(grade_rows, repeat(key), chunks) for result in chunk]
+        except BrokenProcessPool:
+            logger.exception("Quiz grading pool failed; grading in-process")
+            self.shutdown()
+            return [result for chunk in chunks for result in grade_rows(key, chunk)]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+quiz_grader = QuizGrader()
+atexit.register(quiz_grader.shutdown)
+
+def _apply(submission: Submission, score: Score):
+    submission.grade = score.label
+    submission.score = score.percent
+    submission.feedback = score.feedback
+
+def _publish(submission_ids_by_student: dict, assignment_id: int, grades: dict):
+    for student_id, submission_id in submission_ids_by_student.items():
+        grade, score = grades[submission_id]
+        notification_service.notify_user(student_id, 'submission_graded', {
+            'submission_id': submission_id, 'assignment_id': assignment_id, 'grade': grade, 'score': score,
+        })
+
+# --- On arrival ---
+
+def locked_answer_key(assignment_id: int) -> dict | None:
+    """
+    The assignment's current key, read under a shared row lock (where the database has row
+    locks), so a submission is never scored against a key that a concurrent re-grade replaces.
+    """
+    return db.session.execute(
+        select(Assignment.answer_key).where(Assignment.id == assignment_id).with_for_update(read=True)
+    ).scalar()
+
+def grade_on_arrival(submission: Submission, assignment: Assignment, key: dict):
+    """Scores a new quiz submission; staged on the caller's session (the caller commits, then calls publish_grade)."""
+    _apply(submission, CompiledKey(key).score_one(submission.content_text))
+    stats_service.record_grading(assignment.course_id, assignment.id, True)
+    notification_service.add_notification(submission.student_id, 'submission_graded', assignment.title, assignment.course_id, assignment.id)
+
+def publish_grade(submission: Submission):
+    _publish({submission.student_id: submission.id}, submission.assignment_id, {submission.id: (submission.grade, submission.score)})
+
+# --- Answer keys ---
+
+def _teacher_assignment_for_update(assignment_id: int, teacher_id: int) -> Assignment:
+    assignment = Assignment.query.filter_by(id=assignment_id, deleted_at=None).with_for_update().first()
+    if not assignment:
+        raise QuizServiceError(f"Assignment with ID {assignment_id} not found.", 404)
+    if db.session.query(Course.id).filter_by(id=assignment.course_id, teacher_id=teacher_id, deleted_at=None).first() is None:
+        raise QuizServiceError("You are not authorized to change this assignment as you do not teach the course it belongs to.", 403)
+    return assignment
+
+def parse_key(key) -> dict:
+    try:
+        return parse_answer_key(key)
+    except QuizError as e:
+        raise QuizServiceError(str(e), 400)
+
+def set_answer_key(assignment_id: int, teacher_id: int, key) -> tuple[Assignment, dict]:
+    """
+    Sets or replaces an assignment's answer key (making it a quiz) and re-grades its quiz
+    submissions against the new key. Returns the assignment and the re-grade summary.
+    """
+    parsed = parse_key(key)
+    assignment = _teacher_assignment_for_update(assignment_id, teacher_id)
+    assignment.answer_key = parsed
+    summary, changed, grades = regrade_submissions(assignment, parsed)
+    db.session.commit()
+    _publish(changed, assignment.id, grades)
+    return assignment, summary
+
+def regrade_submissions(assignment: Assignment, key: dict) -> tuple[dict, dict, dict]:
+    """
+    Scores every live quiz submission of `assignment` against `key` and stages the updates,
+    stats and inbox notifications. Returns (summary, {student id: submission id} of changed
+    grades, {submission id: (grade, score)}) for the caller to push after committing.
+    """
+    rows = db.session.execute(
+        select(Submission.id, Submission.student_id, Submission.content_text, Submission.grade, Submission.score).
+        where(Submission.assignment_id == assignment.id, Submission.submission_type == SubmissionTypeEnum.QUIZ).
+        order_by(Submission.id)
+    ).all()
+    if not rows:
+        return {'regraded': 0, 'changed': 0}, {}, {}
+    compiled = CompiledKey(key)
+    previous = {row.id: row for row in rows}
+    results = quiz_grader.grade(key, [(row.id, row.content_text) for row in rows])
+
+    updates, changed, grades, newly_graded = [], {}, {}, 0
+    for submission_id, points, correct in results:
+        score = Score(points, compiled.total, correct, compiled.question_count)
+        row = previous[submission_id]
+        grades[submission_id] = (score.label, score.percent)
+        if row.grade == score.label and row.score == score.percent:
+            continue
+        newly_graded += row.grade is None
+        changed[row.student_id] = submission_id
+        updates.append({'id': submission_id, 'grade': score.label, 'score': score.percent, 'feedback': score.feedback})
+
+    chunk_size = quiz_grader.chunk_size
+    for start in range(0, len(updates), chunk_size):
+        db.session.execute(update(Submission), updates[start:start + chunk_size]) # Bulk UPDATE by primary key
+    if updates:
+        stats_service.record_grading(assignment.course_id, assignment.id, newly_graded)
+        notification_service.add_notifications(list(changed), 'submission_graded', assignment.title, assignment.course_id, assignment.id)
+    return {'regraded': len(rows), 'changed': len(updates)}, changed, grades
+
+def regrade_assignment(assignment_id: int) -> dict:
+    """Re-grades a quiz against its stored key (`flask regrade-quiz`, e.g. after fixing submissions by hand)."""
+    assignment = Assignment.query.filter_by(id=assignment_id, deleted_at=None).with_for_update().first()
+    if not assignment:
+        raise QuizServiceError(f"Assignment with ID {assignment_id} not found.", 404)
+    if assignment.answer_key is None:
+        raise QuizServiceError("This assignment is not a quiz.", 400)
+    summary, changed, grades = regrade_submissions(assignment, assignment.answer_key)
+    db.session.commit()
+    _publish(changed, assignment.id, grades)
+    return summary
+
+# --- Reads ---
+
+def get_quiz(assignment_id: int, user) -> dict:
+    """The questions of a quiz: the whole key for the course teacher, without answers for enrolled students."""
+    assignment = Assignment.query.filter_by(id=assignment_id, deleted_at=None).first()
+    if not assignment:
+        raise QuizServiceError(f"Assignment with ID {assignment_id} not found.", 404)
+    course = Course.query.filter_by(id=assignment.course_id, deleted_at=None).first()
+    is_teacher = user.role == RoleEnum.TEACHER and course is not None and course.teacher_id == user.id
+    if not is_teacher and (course is None or not course_service.is_student_enrolled(user.id, assignment.course_id)):
+        raise QuizServiceError("You are not enrolled in the course for this assignment.", 403)
+    if assignment.answer_key is None:
+        raise QuizServiceError("This assignment is not a quiz.", 404)
+    questions = assignment.answer_key['questions'] if is_teacher else public_questions(assignment.answer_key)
+    return {
+        'assignment_id': assignment.id,
+        'title': assignment.title,
+        'total_points': CompiledKey(assignment.answer_key).total,
+        'questions': questions,
+    }
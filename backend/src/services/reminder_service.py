@@ -0,0 +1,231 @@
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, insert, exists, tuple_, union
+from backend.src.models import Assignment, Submission, Enrollment, AssignmentReminder, RollupCheckpoint
+from backend.src.models.read_models import project, REMINDER
+from backend.src.extensions import db
+from backend.src.utils.fieldsets import Fieldset
+
+logger = logging.getLogger(__name__)
+
+REMINDER_CHECKPOINT = 'assignment_reminders'
+_COMMIT_LAG = timedelta(minutes=2) # updated_at is stamped before commit; rescan this far back for late commits
+
+def _utcnow() -> datetime:
+    # TIMESTAMP columns are stored naive (UTC), so compare against a naive UTC "now".
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def emit_reminders(deadlines: list[tuple[int, datetime]]) -> int:
+    """
+    Emits reminder records for every enrolled student who has not submitted yet.
+    `deadlines` is a list of (assignment_id, due_date) pairs popped from the scheduler.
+
+    Runs as one INSERT ... SELECT: enrollments anti-joined against submissions (and
+    against reminders already emitted), so the cost is one statement per tick rather
+    than one query per assignment per student. The due_date in each pair must still
+    match the assignment row, which drops heap entries made stale by later edits.
+    """
+    if not deadlines:
+        return 0
+
+    not_submitted = ~exists().where(
+        Submission.assignment_id == Assignment.id,
+        Submission.student_id == Enrollment.student_id
+    )
+    not_reminded = ~exists().where(
+        AssignmentReminder.assignment_id == Assignment.id,
+        AssignmentReminder.student_id == Enrollment.student_id
+    )
+    pending = select(Assignment.id, Enrollment.student_id, Assignment.due_date).\
+        join(Enrollment, Enrollment.course_id == Assignment.course_id).\
+        where(tuple_(Assignment.id, Assignment.due_date).in_(deadlines), Assignment.deleted_at.is_(None),
+              not_submitted, not_reminded)
+
+    stmt = insert(AssignmentReminder).from_select(['assignment_id', 'student_id', 'due_date'], pending)
+    try:
+        result = db.session.execute(stmt)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return result.rowcount or 0
+
+def get_reminders_for_student(student_id: int, fieldset: Fieldset | None = None) -> list[dict]:
+    """
+    Returns the reminders emitted for a student, soonest deadline first, projected to `fieldset`.
+    """
+    return project(REMINDER, fieldset, AssignmentReminder.student_id == student_id,
+                   order_by=(AssignmentReminder.due_date.asc(),))
+
+
+class DueDateReminderScheduler:
+    """
+    Time-ordered index of the assignment deadlines whose reminder is due soon.
+
+    Entries are (remind_at, assignment_id, due_date) tuples on a min-heap, so finding the
+    next deadline is O(1) and each tick only touches the assignments whose reminder time has
+    passed. The heap only holds deadlines up to one poll past the reminder horizon (now + lead
+    time + REMINDER_POLL_SECONDS), and every poll adds to it incrementally:
+      * the deadlines that entered the horizon since the last poll (a due_date range scan), and
+      * assignments created or moved since the last poll by any process (an updated_at scan),
+        so web workers, imports and clones need no channel to the worker; `schedule()` only
+        wakes a worker in the same process early.
+    After each successful tick the worker saves a checkpoint (rollup_checkpoints row
+    'assignment_reminders'): changes up to it have been seen, and deadlines up to it plus the
+    lead time have been reminded. A restarted worker resumes from there, so deadlines that came
+    due while it was down are still reminded, late. The unique constraint on
+    assignment_reminders keeps the emitted records idempotent if several workers fire for the
+    same deadline.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.lead_time = timedelta(hours=24)
+        self.poll_seconds = 60
+        self._heap = []
+        self._known = set() # (assignment_id, due_date) pairs queued or already emitted by this worker
+        self._loaded_until = None # Deadlines up to here have been scanned into the heap
+        self._changes_since = None # Time of the last updated_at scan
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.lead_time = timedelta(hours=app.config.get('REMINDER_LEAD_HOURS', 24))
+        self.poll_seconds = app.config.get('REMINDER_POLL_SECONDS', 60)
+        app.extensions['reminder_scheduler'] = self
+
+        if app.config.get('REMINDER_SCHEDULER_ENABLED'):
+            with app.app_context():
+                self.resume()
+            self.start()
+
+    def resume(self, now: datetime | None = None):
+        """Empties the heap and positions the scans at the saved checkpoint (or at now, on a first run)."""
+        now = now or _utcnow()
+        checkpoint = db.session.get(RollupCheckpoint, REMINDER_CHECKPOINT)
+        with self._lock:
+            self._heap, self._known = [], set()
+            if checkpoint is not None and checkpoint.last_seen_at is not None:
+                self._changes_since = checkpoint.last_seen_at
+                self._loaded_until = checkpoint.last_seen_at + self.lead_time
+            else:
+                self._changes_since = self._loaded_until = now
+
+    def refresh(self, now: datetime | None = None) -> int:
+        """
+        Adds the deadlines that entered the horizon, or were created or moved, since the last
+        refresh. Returns the number of deadlines added.
+        """
+        now = now or _utcnow()
+        if self._loaded_until is None:
+            self.resume(now)
+        horizon = now + self.lead_time + timedelta(seconds=self.poll_seconds)
+        changes_since = self._changes_since
+        live = (Assignment.due_date.isnot(None), Assignment.deleted_at.is_(None), Assignment.due_date <= horizon)
+        entered = select(Assignment.id, Assignment.due_date).where(*live, Assignment.due_date > self._loaded_until)
+        changed = select(Assignment.id, Assignment.due_date).where(
+            *live, Assignment.due_date > changes_since, Assignment.updated_at > changes_since - _COMMIT_LAG)
+        rows = db.session.execute(union(entered, changed)).all()
+        added = 0
+        with self._lock:
+            for assignment_id, due_date in rows:
+                added += self._push(assignment_id, due_date)
+            self._loaded_until, self._changes_since = horizon, now
+            # Neither scan returns these again
+            self._known = {entry for entry in self._known if entry[1] > changes_since}
+        return added
+
+    def _push(self, assignment_id: int, due_date: datetime) -> bool:
+        if (assignment_id, due_date) in self._known:
+            return False
+        self._known.add((assignment_id, due_date))
+        heapq.heappush(self._heap, (due_date - self.lead_time, assignment_id, due_date))
+        return True
+
+    def schedule(self, assignment_id: int, due_date: datetime | None):
+        """Queues a deadline written by this process and wakes its worker, if it runs one."""
+        if self._thread is None or due_date is None or due_date <= _utcnow():
+            return
+        with self._lock:
+            if self._loaded_until is not None and due_date <= self._loaded_until:
+                self._push(assignment_id, due_date) # Later ones are picked up as the horizon moves
+        self._wakeup.set() # The new entry may be earlier than the one the worker is sleeping towards
+
+    def next_trigger(self) -> datetime | None:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime | None = None) -> list[tuple[int, datetime]]:
+        """Removes and returns the (assignment_id, due_date) pairs whose reminder time has passed."""
+        now = now or _utcnow()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, assignment_id, due_date = heapq.heappop(self._heap)
+                due.append((assignment_id, due_date))
+        return due
+
+    def run_pending(self, now: datetime | None = None) -> int:
+        """Emits reminders for every deadline that is due. Must run inside an app context."""
+        due = self.pop_due(now)
+        if not due:
+            return 0
+        try:
+            return emit_reminders(due)
+        except Exception:
+            # Put the entries back so the next tick retries them
+            with self._lock:
+                for assignment_id, due_date in due:
+                    heapq.heappush(self._heap, (due_date - self.lead_time, assignment_id, due_date))
+            raise
+
+    def tick(self, now: datetime | None = None) -> int:
+        """Refreshes, emits what is due and saves the checkpoint. Returns the reminders emitted."""
+        now = now or _utcnow()
+        self.refresh(now)
+        emitted = self.run_pending(now)
+        checkpoint = db.session.get(RollupCheckpoint, REMINDER_CHECKPOINT)
+        if checkpoint is None:
+            checkpoint = RollupCheckpoint(source=REMINDER_CHECKPOINT, last_id=0)
+            db.session.add(checkpoint)
+        checkpoint.last_seen_at = now
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return emitted
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='due-date-reminders', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            # Cleared before the tick, so a schedule() that arrives during it cuts the sleep below short
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    emitted = self.tick()
+                    if emitted:
+                        logger.info("Emitted %d due-date reminders", emitted)
+            except Exception:
+                logger.exception("Due-date reminder tick failed")
+
+            # Sleep until the next deadline (capped by the poll interval) or until schedule() wakes us
+            timeout = self.poll_seconds
+            next_trigger = self.next_trigger()
+            if next_trigger is not None:
+                timeout = max(0, min(timeout, (next_trigger - _utcnow()).total_seconds()))
+            self._wakeup.wait(timeout)
+
+
+reminder_scheduler = DueDateReminderScheduler()
@@ -0,0 +1,166 @@
+from sqlalchemy import select, update, insert, delete, func
+from backend.src.models import (
+    Course, Assignment, Submission, ArchivedSubmission, Enrollment, CourseStats, AssignmentStats
+)
+from backend.src.extensions import db
+
+# These helpers only stage statements on the current session; the calling service commits
+# them together with the change they describe, so counters and source rows never diverge.
+
+def _insert_missing(model, rows: list[dict]) -> int:
+    """INSERT ... ON CONFLICT DO NOTHING of stats rows; returns how many were inserted."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return db.session.execute(dialect_insert(model).values(rows).on_conflict_do_nothing()).rowcount
+
+def _bump(model, key_column, key, **increments):
+    values = {name: getattr(model, name) + amount for name, amount in increments.items()}
+    values['last_activity_at'] = func.now()
+    bump = update(model).where(key_column == key).values(**values)
+    if db.session.execute(bump).rowcount:
+        return
+    # Row predates the stats tables: materialize it from the source tables instead. The pending
+    # change was autoflushed by the UPDATE above, so the recount already includes it.
+    db.session.flush()
+    if model is CourseStats:
+        rows = list(_course_aggregates(Course.id == key).values())
+    else:
+        rows = list(_assignment_aggregates(Assignment.id == key).values())
+    if rows and not _insert_missing(model, rows):
+        # A concurrent transaction materialized it first (its recount cannot see our uncommitted
+        # change), so apply the increment to its row rather than failing on the duplicate key
+        db.session.execute(bump)
+
+def init_course_stats(course_id: int):
+    db.session.add(CourseStats(course_id=course_id))
+
+def init_assignment_stats(assignment_id: int):
+    db.session.add(AssignmentStats(assignment_id=assignment_id))
+
+def record_enrollment(course_id: int):
+    _bump(CourseStats, CourseStats.course_id, course_id, enrolled_count=1)
+
+def record_submission(course_id: int, assignment_id: int):
+    _bump(AssignmentStats, AssignmentStats.assignment_id, assignment_id, submission_count=1)
+    _bump(CourseStats, CourseStats.course_id, course_id, submission_count=1)
+
+def record_grading(course_id: int, assignment_id: int, newly_graded: bool | int):
+    """
+    Counts a submission as graded once; re-grading only refreshes last_activity_at. Bulk grading
+    passes how many of its submissions had no grade before.
+    """
+    delta = int(newly_graded)
+    _bump(AssignmentStats, AssignmentStats.assignment_id, assignment_id, graded_count=delta)
+    _bump(CourseStats, CourseStats.course_id, course_id, graded_count=delta)
+
+def record_assignment_removed(course_id: int, assignment_id: int):
+    """Takes a soft-deleted assignment's submissions out of its course's counters."""
+    counts = db.session.execute(
+        select(AssignmentStats.submission_count, AssignmentStats.graded_count).
+        where(AssignmentStats.assignment_id == assignment_id)
+    ).first()
+    if counts is None:
+        _rebuild_course(course_id) # No per-assignment counters to subtract; recount (excludes deleted assignments)
+        return
+    _bump(CourseStats, CourseStats.course_id, course_id, submission_count=-counts[0], graded_count=-counts[1])
+
+# --- Rebuild from source tables ---
+
+def _course_aggregates(course_filter=None) -> dict[int, dict]:
+    stats = {}
+    course_ids = select(Course.id)
+    if course_filter is not None:
+        course_ids = course_ids.where(course_filter)
+    for (course_id,) in db.session.execute(course_ids):
+        stats[course_id] = {'course_id': course_id, 'enrolled_count': 0, 'submission_count': 0,
+                            'graded_count': 0, 'last_activity_at': None}
+
+    enrolled = select(Enrollment.course_id, func.count(), func.max(Enrollment.enrolled_at)).\
+        group_by(Enrollment.course_id)
+    # Archived submissions (closed courses, see archive_service) still count
+    submitted = [
+        select(Assignment.course_id, func.count(source.id), func.count(source.grade), func.max(source.submitted_at)).
+        join(source, source.assignment_id == Assignment.id).
+        where(Assignment.deleted_at.is_(None)).group_by(Assignment.course_id)
+        for source in (Submission, ArchivedSubmission)
+    ]
+    if course_filter is not None:
+        enrolled = enrolled.where(Enrollment.course_id.in_(list(stats)))
+        submitted = [query.where(Assignment.course_id.in_(list(stats))) for query in submitted]
+
+    for course_id, count, last_at in db.session.execute(enrolled):
+        if course_id in stats:
+            stats[course_id].update(enrolled_count=count, last_activity_at=last_at)
+    for course_id, count, graded, last_at in (row for query in submitted for row in db.session.execute(query)):
+        if course_id in stats:
+            row = stats[course_id]
+            row.update(submission_count=row['submission_count'] + count, graded_count=row['graded_count'] + graded)
+            if last_at and (row['last_activity_at'] is None or last_at > row['last_activity_at']):
+                row['last_activity_at'] = last_at
+    return stats
+
+def _assignment_aggregates(assignment_filter=None) -> dict[int, dict]:
+    query = select(Assignment.id, func.count(Submission.id), func.count(Submission.grade),
+                   func.max(Submission.submitted_at)).\
+        outerjoin(Submission, Submission.assignment_id == Assignment.id).group_by(Assignment.id)
+    archived = select(Assignment.id, func.count(ArchivedSubmission.id), func.count(ArchivedSubmission.grade),
+                      func.max(ArchivedSubmission.submitted_at)).\
+        join(ArchivedSubmission, ArchivedSubmission.assignment_id == Assignment.id).group_by(Assignment.id)
+    if assignment_filter is not None:
+        query = query.where(assignment_filter)
+        archived = archived.where(assignment_filter)
+    stats = {
+        assignment_id: {'assignment_id': assignment_id, 'submission_count': count,
+                        'graded_count': graded, 'last_activity_at': last_at}
+        for assignment_id, count, graded, last_at in db.session.execute(query)
+    }
+    for assignment_id, count, graded, last_at in db.session.execute(archived):
+        row = stats[assignment_id]
+        row['submission_count'] += count
+        row['graded_count'] += graded
+        if last_at and (row['last_activity_at'] is None or last_at > row['last_activity_at']):
+            row['last_activity_at'] = last_at
+    return stats
+
+def _rebuild_course(course_id: int):
+    rows = list(_course_aggregates(Course.id == course_id).values())
+    db.session.execute(delete(CourseStats).where(CourseStats.course_id == course_id))
+    if rows:
+        db.session.execute(insert(CourseStats), rows)
+
+def _rebuild_assignment(assignment_id: int):
+    rows = list(_assignment_aggregates(Assignment.id == assignment_id).values())
+    db.session.execute(delete(AssignmentStats).where(AssignmentStats.assignment_id == assignment_id))
+    if rows:
+        db.session.execute(insert(AssignmentStats), rows)
+
+def rebuild_course_stats(course_id: int):
+    """Recomputes the stats rows of one course and its assignments (e.g. after a bulk load)."""
+    _rebuild_course(course_id)
+    rows = list(_assignment_aggregates(Assignment.course_id == course_id).values())
+    db.session.execute(delete(AssignmentStats).where(
+        AssignmentStats.assignment_id.in_(select(Assignment.id).where(Assignment.course_id == course_id))))
+    if rows:
+        db.session.execute(insert(AssignmentStats), rows)
+
+def rebuild_all_stats() -> dict:
+    """
+    Recomputes every stats row from the source tables with a handful of GROUP BY queries
+    and replaces the stats tables in one transaction.
+    """
+    try:
+        course_rows = list(_course_aggregates().values())
+        assignment_rows = list(_assignment_aggregates().values())
+        db.session.execute(delete(CourseStats))
+        db.session.execute(delete(AssignmentStats))
+        if course_rows:
+            db.session.execute(insert(CourseStats), course_rows)
+        if assignment_rows:
+            db.session.execute(insert(AssignmentStats), assignment_rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {'courses': len(course_rows), 'assignments': len(assignment_rows)}
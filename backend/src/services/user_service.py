@@ -1,5 +1,7 @@
-from backend.src.models.user_model import User
+from backend.src.models.user_model import User, RoleEnum
+from backend.src.models.course_model import Course
 from backend.src.extensions import db
+from backend.src.utils.cache import catalog_cache
 
 class UserServiceError(Exception):
     """Custom exception for user service errors."""
@@ -28,7 +30,7 @@ def create_user(data: dict) -> User:
     new_user = User(
         username=data['username'],
         email=data['email'],
-        role=data['role'],
+        role=RoleEnum(data['role']), # Validated against the allowed values above
         first_name=data.get('first_name'),
         last_name=data.get('last_name'),
         profile_picture_url=data.get('profile_picture_url')
@@ -102,5 +104,8 @@ def update_user_profile(user_id: int, data: dict) -> User | None:
             db.session.rollback()
             # Log the exception e
             raise UserServiceError(f"Database error during profile update: {str(e)}", 500)
+        if user.role == RoleEnum.TEACHER:
+            # The catalog embeds the teacher's public profile
+            catalog_cache.invalidate_course(*[course_id for course_id, in db.session.query(Course.id).filter_by(teacher_id=user.id)])
 
     return user
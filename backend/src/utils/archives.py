@@ -0,0 +1,179 @@
+"""
+Streaming readers for uploaded zip / tar archives.
+
+`open_archive(fileobj)` detects the format from the leading bytes:
+  * zip                        - random access through the central directory; members are
+                                 opened one at a time, in any order (`read(name)`)
+  * tar (plain, gz, bz2, xz)   - read strictly in archive order with tarfile's stream mode,
+                                 so a compressed tarball is never decompressed as a whole
+Member contents are read with a byte limit, so an oversized entry (or a zip bomb) fails after
+`limit` bytes instead of filling memory. Member names are normalized POSIX paths; absolute
+paths and `..` components are rejected.
+
+`ZipStreamWriter` goes the other way: it builds a zip incrementally for a streamed response.
+"""
+import io
+import posixpath
+import tarfile
+import tempfile
+import time
+import zipfile
+
+SPOOL_MEMORY_BYTES = 1024 * 1024 # Uploads larger than this are spooled to a temporary file
+
+class ArchiveError(ValueError):
+    """Unreadable archive or member (HTTP 400)."""
+
+def spool(stream, max_bytes: int, chunk_size: int = 64 * 1024):
+    """
+    Copies a non-seekable stream (e.g. a raw request body) into a seekable temporary file,
+    in chunks. Raises ArchiveError beyond `max_bytes`.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    total = 0
+    while chunk := stream.read(chunk_size):
+        total += len(chunk)
+        if total > max_bytes:
+            spooled.close()
+            raise ArchiveError(f"Archive is larger than {max_bytes} bytes.")
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+def safe_name(name: str) -> str | None:
+    """Normalized member path, or None for directories and unsafe paths."""
+    name = name.replace('\\', '/')
+    if name.endswith('/') or name.startswith('/'):
+        return None
+    normalized = posixpath.normpath(name)
+    if normalized.startswith('../') or normalized == '..' or normalized == '.':
+        return None
+    return normalized
+
+def _read_limited(handle, limit: int, name: str) -> bytes:
+    data = handle.read(limit + 1)
+    if len(data) > limit:
+        raise ArchiveError(f"{name} is larger than {limit} bytes.")
+    return data
+
+class ZipArchive:
+    random_access = True
+
+    def __init__(self, fileobj):
+        try:
+            self._zip = zipfile.ZipFile(fileobj)
+        except zipfile.BadZipFile as e:
+            raise ArchiveError(f"Not a valid zip archive: {e}")
+        self._names = {}
+        for info in self._zip.infolist():
+            name = safe_name(info.filename)
+            if name is not None and not info.is_dir():
+                self._names[name] = info
+
+    def names(self) -> list[str]:
+        return list(self._names)
+
+    def read(self, name: str, limit: int) -> bytes:
+        info = self._names.get(name)
+        if info is None:
+            raise KeyError(name)
+        if info.file_size > limit: # Declared size; _read_limited also guards against lying headers
+            raise ArchiveError(f"{name} is larger than {limit} bytes.")
+        try:
+            with self._zip.open(info) as handle:
+                return _read_limited(handle, limit, name)
+        except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as e: # Corrupt, encrypted or unsupported entry
+            raise ArchiveError(f"{name} could not be read: {e}")
+
+    def members(self, limit: int):
+        """(name, read) pairs in archive order; `read()` returns the member's bytes."""
+        for name in self._names:
+            yield name, lambda name=name: self.read(name, limit)
+
+    def open(self, name: str):
+        """Binary stream of a member, for reading a large one (e.g. JSON lines) incrementally."""
+        info = self._names.get(name)
+        if info is None:
+            raise KeyError(name)
+        try:
+            return self._zip.open(info)
+        except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as e:
+            raise ArchiveError(f"{name} could not be read: {e}")
+
+class TarArchive:
+    random_access = False
+
+    def __init__(self, fileobj):
+        try:
+            self._tar = tarfile.open(fileobj=fileobj, mode='r|*')
+        except tarfile.TarError as e:
+            raise ArchiveError(f"Not a valid tar archive: {e}")
+
+    def members(self, limit: int):
+        """(name, read) pairs in archive order; each `read()` must happen before advancing."""
+        try:
+            for info in self._tar:
+                name = safe_name(info.name)
+                if name is None or not info.isfile():
+                    continue
+                def read(info=info, name=name):
+                    if info.size > limit:
+                        raise ArchiveError(f"{name} is larger than {limit} bytes.")
+                    return _read_limited(self._tar.extractfile(info), limit, name)
+                yield name, read
+        except tarfile.TarError as e:
+            raise ArchiveError(f"Tar archive is corrupt: {e}")
+
+def open_archive(fileobj):
+    """ZipArchive or TarArchive for a seekable file object, detected from its leading bytes."""
+    head = fileobj.read(512)
+    fileobj.seek(0)
+    if head.startswith(b'PK\x03\x04') or head.startswith(b'PK\x05\x06'):
+        return ZipArchive(fileobj)
+    compressed = head.startswith(b'\x1f\x8b') or head.startswith(b'BZh') or head.startswith(b'\xfd7zXZ\x00')
+    if compressed or head[257:262] == b'ustar':
+        return TarArchive(fileobj)
+    raise ArchiveError("Unsupported archive format; upload a .zip, .tar, .tar.gz, .tar.bz2 or .tar.xz file.")
+
+class _Sink(io.RawIOBase):
+    """Unseekable write target collecting the bytes ZipFile produces until they are drained."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+class ZipStreamWriter:
+    """
+    Writes a zip archive as a sequence of byte chunks: write members one at a time through
+    `open(name)` and hand whatever `drain()` returns to the client as you go; `close()` returns
+    the final chunk (the central directory). Only the compressor's buffer and the current chunk
+    are held in memory. The target is unseekable, so member sizes go in data descriptors and
+    every member is written as zip64, which all current unzip tools read.
+    """
+
+    def __init__(self, compresslevel: int = 6):
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        self._date_time = time.localtime()[:6]
+
+    def open(self, name: str):
+        """Writable binary handle for a new member; close it (use `with`) before opening the next."""
+        info = zipfile.ZipInfo(name, date_time=self._date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        return self._zip.open(info, 'w', force_zip64=True) # Size unknown up front
+
+    def drain(self) -> bytes:
+        data = b''.join(self._sink.chunks)
+        self._sink.chunks.clear()
+        return data
+
+    def close(self) -> bytes:
+        self._zip.close()
+        return self.drain()
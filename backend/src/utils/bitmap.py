@@ -0,0 +1,42 @@
+"""
+Compact user-id bitmaps.
+
+A set of user ids is held as a Python int with bit N set for user N, and stored as
+little-endian bytes (one bit per user, so 100k users fit in ~12.5 KB). Union, intersection
+and cardinality are single C-level operations on the int (|, &, int.bit_count()).
+"""
+
+def bitmap_from_ids(user_ids) -> int:
+    # Bits are set in a bytearray and converted once: OR-ing into the int would copy the whole
+    # (ever larger) int per id, O(ids x max id) instead of O(ids + max id)
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    buffer = bytearray(max(user_ids) // 8 + 1)
+    for user_id in user_ids:
+        buffer[user_id >> 3] |= 1 << (user_id & 7)
+    return int.from_bytes(buffer, 'little')
+
+def bitmap_to_bytes(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+def bitmap_from_bytes(data: bytes | None) -> int:
+    return int.from_bytes(data, 'little') if data else 0
+
+def bitmap_union(bitmaps) -> int:
+    bits = 0
+    for bitmap in bitmaps:
+        bits |= bitmap
+    return bits
+
+def bitmap_count(bits: int) -> int:
+    return bits.bit_count()
+
+def bitmap_ids(bits: int) -> list[int]:
+    """Expands a bitmap back into a sorted list of user ids."""
+    user_ids = []
+    while bits:
+        lowest = bits & -bits
+        user_ids.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return user_ids
@@ -0,0 +1,242 @@
+"""
+Course-catalog response cache.
+
+Serialized bodies of GET /courses/ and GET /courses/<id> are cached under keys that embed a
+version counter:
+  * 'catalog'        - bumped by every catalog write; keys the course list
+  * 'course:<id>'    - bumped by writes to that course; keys its detail page
+Writers bump the counters right after their transaction commits (`invalidate_course`), so the
+next read builds a new key and old entries are never served again; they simply age out of
+the LRU. A reader that raced the write may store pre-write data, but only under the old
+version, which nobody reads any more.
+
+Backends (CATALOG_CACHE_BACKEND):
+  * 'sqlite' - (default) entries and counters in a local SQLite file shared by every worker on
+               the host, fronted by a small in-process LRU. Versioned entries are immutable, so the
+               front LRU never needs invalidating; only the counters are read from SQLite per
+               request. Entry keys carry a hash of the database URI, so apps on different databases
+               sharing the file never serve each other's entries; after restoring a database in
+               place run `flask clear-catalog-cache`.
+  * 'memory' - in-process LRU with in-process counters, for a single worker process. Another
+               worker's writes never reach its counters, so entries also expire after
+               CATALOG_CACHE_MEMORY_TTL_SECONDS to bound staleness if it is run with several.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, make_response, request
+
+# Only these query parameters change a catalog response (see utils/fieldsets.py)
+_KEYED_ARGS = ('fields', 'include')
+
+class MemoryCacheBackend:
+    """Bounded LRU of serialized responses plus in-process version counters; entries expire after `ttl` seconds if set."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (value, expires at or None)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def versions(self, names: list[str]) -> list[int]:
+        with self._lock:
+            return [self._versions.get(name, 0) for name in names]
+
+    def bump(self, names: list[str]):
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+class SQLiteCacheBackend:
+    """
+    Entries and version counters in a local SQLite file shared by all worker processes.
+    WAL mode keeps readers unblocked while a writer bumps counters or stores entries.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024, front_entries: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self._front = MemoryCacheBackend(front_entries) # Counters of the front LRU are unused
+        self._local = threading.local()
+        self._sets_since_prune = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute('CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, stored REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_cache_entries_stored ON cache_entries (stored)')
+        conn.execute('CREATE TABLE IF NOT EXISTS cache_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> bytes | None:
+        value = self._front.get(key)
+        if value is not None:
+            return value
+        row = self._connect().execute('SELECT value FROM cache_entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value = bytes(row[0])
+        self._front.set(key, value)
+        return value
+
+    def set(self, key: str, value: bytes):
+        self._front.set(key, value)
+        conn = self._connect()
+        conn.execute('INSERT OR REPLACE INTO cache_entries (key, value, stored) VALUES (?, ?, ?)', (key, value, time.time()))
+        self._sets_since_prune += 1
+        if self._sets_since_prune >= max(self.max_entries // 10, 1):
+            self._sets_since_prune = 0
+            # Oldest-stored first; superseded versions are never read again, so they go first in practice
+            conn.execute(
+                'DELETE FROM cache_entries WHERE key IN ('
+                ' SELECT key FROM cache_entries ORDER BY stored DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def versions(self, names: list[str]) -> list[int]:
+        placeholders = ','.join('?' * len(names))
+        rows = dict(self._connect().execute(
+            f'SELECT name, version FROM cache_versions WHERE name IN ({placeholders})', names
+        ).fetchall())
+        return [rows.get(name, 0) for name in names]
+
+    def bump(self, names: list[str]):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO cache_versions (name, version) VALUES (?, 1) '
+                'ON CONFLICT(name) DO UPDATE SET version = version + 1',
+                [(name,) for name in names]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def clear(self):
+        self._front.clear()
+        conn = self._connect()
+        conn.execute('DELETE FROM cache_entries')
+        # Counters are bumped rather than reset so no worker's front LRU can serve an old key
+        conn.execute('UPDATE cache_versions SET version = version + 1')
+
+def _database_namespace(uri) -> str:
+    """Key prefix identifying the database entries are built from; in-memory ones get a fresh one."""
+    uri = str(uri or '')
+    if not uri or uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri:
+        return uuid.uuid4().hex[:12]
+    return hashlib.sha1(uri.encode()).hexdigest()[:12]
+
+class CatalogCache:
+    """Flask extension holding the cache backend; also exposes the invalidation hooks used by services."""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.backend = None
+        self.namespace = ''
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CATALOG_CACHE_ENABLED', True)
+        backend = app.config.get('CATALOG_CACHE_BACKEND', 'sqlite')
+        max_entries = app.config.get('CATALOG_CACHE_MAX_ENTRIES', 1024)
+        if backend == 'sqlite':
+            self.backend = SQLiteCacheBackend(
+                app.config.get('CATALOG_CACHE_SQLITE_PATH', os.path.join(app.instance_path, 'catalog_cache.sqlite3')),
+                max_entries=max_entries,
+            )
+        elif backend == 'memory':
+            self.backend = MemoryCacheBackend(max_entries, ttl=app.config.get('CATALOG_CACHE_MEMORY_TTL_SECONDS', 10))
+        else:
+            raise ValueError(f"Unknown CATALOG_CACHE_BACKEND '{backend}'. Use 'memory' or 'sqlite'.")
+        self.namespace = _database_namespace(app.config.get('SQLALCHEMY_DATABASE_URI'))
+        app.extensions['catalog_cache'] = self
+
+    def invalidate_course(self, *course_ids: int):
+        """
+        Call after committing any write that changes what the catalog shows for these courses
+        (the course row, its chapters, assignments, enrollments or teacher profile).
+        """
+        if self.backend is None:
+            return
+        self.backend.bump(['catalog', *(f'course:{course_id}' for course_id in course_ids)])
+
+    def clear(self):
+        """Drops every entry; for bulk maintenance that touches many courses at once."""
+        if self.backend is not None:
+            self.backend.clear()
+
+    def key(self, scope: str) -> str:
+        """Versioned key for `scope` and the current request's fieldset parameters."""
+        version, = self.backend.versions([scope])
+        args = sorted((name, value) for name, value in request.args.items(multi=True) if name in _KEYED_ARGS)
+        return f'{self.namespace}:{scope}@{version}?{urlencode(args)}'
+
+
+catalog_cache = CatalogCache()
+
+def catalog_cached(fn):
+    """
+    Serves a catalog GET route from the cache. Routes with a `course_id` argument are keyed by that
+    course's version, others by the catalog version. Only 200 responses are stored; the
+    X-Catalog-Cache header reports HIT or MISS.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not catalog_cache.enabled or catalog_cache.backend is None:
+            return fn(*args, **kwargs)
+        course_id = kwargs.get('course_id')
+        key = catalog_cache.key('catalog' if course_id is None else f'course:{course_id}')
+
+        body = catalog_cache.backend.get(key)
+        if body is not None:
+            response = current_app.response_class(body, status=200, mimetype='application/json')
+            response.headers['X-Catalog-Cache'] = 'HIT'
+            return response
+
+        response = make_response(fn(*args, **kwargs))
+        if response.status_code == 200:
+            catalog_cache.backend.set(key, response.get_data())
+        response.headers['X-Catalog-Cache'] = 'MISS'
+        return response
+    return wrapper
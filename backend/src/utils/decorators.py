@@ -1,10 +1,11 @@
 from functools import wraps
 from flask import request, jsonify, current_app
-from backend.src.utils.security import decode_jwt
+from backend.src.utils.security import decode_jwt, decode_stream_token
+from backend.src.utils.rate_limit import limiter
+from backend.src.utils.timing import phase
 from backend.src.models.user_model import User
 from backend.src.extensions import db # Assuming db session might be needed if we re-fetch user
 
-def jwt_required(fn):
 from backend.src.models.user_model import RoleEnum # Import RoleEnum
 
 def jwt_required(fn):
@@ -23,17 +24,19 @@ def jwt_required(fn):
         if not token:
             return jsonify({'message': 'Token is missing'}), 401
 
-        payload = decode_jwt(token)
+        with phase('jwt'):
+            payload = decode_jwt(token)
+            user_id = payload.get('user_id') if payload else None
+            # Fetch user from DB to ensure they exist and are active
+            # This also makes the user object available if needed
+            current_user = User.query.get(user_id) if user_id else None
+
         if not payload:
             return jsonify({'message': 'Token is invalid or expired'}), 401 # Or 403 Forbidden
 
-        user_id = payload.get('user_id')
         if not user_id:
             return jsonify({'message': 'Token payload missing user_id'}), 401
 
-        # Fetch user from DB to ensure they exist and are active
-        # This also makes the user object available if needed
-        current_user = User.query.get(user_id)
         if not current_user:
             return jsonify({'message': 'User not found or token invalid'}), 401
 
@@ -42,6 +45,29 @@ def jwt_required(fn):
         return fn(*args, **kwargs, current_user=current_user)
     return wrapper
 
+def stream_auth_required(fn):
+    """
+    Like jwt_required, but also accepts a stream token (POST /notifications/stream-token) in the
+    ?token= query parameter, since the browser EventSource API cannot set headers.
+    The Authorization header wins when both are sent.
+    """
+    with_jwt = jwt_required(fn)
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = request.args.get('token')
+        if not token or request.headers.get('Authorization'):
+            return with_jwt(*args, **kwargs)
+
+        with phase('jwt'):
+            user_id = decode_stream_token(token)
+            current_user = db.session.get(User, user_id) if user_id else None
+
+        if not current_user:
+            return jsonify({'message': 'Stream token is invalid or expired'}), 401
+        return fn(*args, **kwargs, current_user=current_user)
+    return wrapper
+
 def roles_required(roles: list):
     """
     Decorator to ensure user has one of the specified roles.
@@ -57,15 +83,49 @@ def roles_required(roles: list):
                 # and correctly passes current_user.
                 return jsonify({"message": "Authentication context not found. Ensure @jwt_required is used before @roles_required."}), 500
 
-            # current_user.role is an instance of RoleEnum
-            # roles is a list of strings e.g. ['teacher', 'admin']
-            if not isinstance(current_user.role, RoleEnum):
+            with phase('roles'):
+                # current_user.role is an instance of RoleEnum
+                # roles is a list of strings e.g. ['teacher', 'admin']
+                role_ok = isinstance(current_user.role, RoleEnum)
+                allowed = role_ok and current_user.role.value in roles
+
+            if not role_ok:
                  # This might happen if current_user.role is not an Enum type as expected
                  return jsonify({"message": "User role format is incorrect."}), 500
 
-            if current_user.role.value not in roles:
+            if not allowed:
                 return jsonify({"message": f"Access denied: Your role ('{current_user.role.value}') is not authorized for this resource. Required roles: {roles}"}), 403
 
             return fn(*args, **kwargs)
         return wrapper
     return decorator
+
+def rate_limited(scope: str, identity_fields: tuple = ()):
+    """
+    Decorator applying the token-bucket limits configured for `scope`
+    (RATELIMIT_<SCOPE>_IP and RATELIMIT_<SCOPE>_IDENTITY) before the view runs.
+    The identity is the first of `identity_fields` present in the JSON body, normalised,
+    so one account cannot be brute-forced from many IPs.
+    Answers 429 before any expensive work (e.g. bcrypt in the auth routes) happens.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Already the real client behind TRUSTED_PROXY_COUNT proxies (ProxyFix in create_app)
+            client_ip = request.remote_addr
+
+            identity = None
+            if identity_fields:
+                data = request.get_json(silent=True) or {}
+                for field in identity_fields:
+                    value = data.get(field) if isinstance(data, dict) else None
+                    if isinstance(value, str) and value.strip():
+                        identity = value.strip().lower()
+                        break
+
+            retry_after = limiter.hit(scope, client_ip or 'unknown', identity)
+            if retry_after:
+                return jsonify({'message': 'Too many attempts. Please try again later.'}), 429, {'Retry-After': str(retry_after)}
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
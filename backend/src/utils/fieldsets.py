@@ -0,0 +1,105 @@
+"""
+Sparse fieldsets and opt-in expansions for GET endpoints.
+
+Query language (shared by every GET route):
+
+    ?fields=id,title                 only these fields of the returned resource(s)
+    ?fields=id,title,teacher.username   a dotted name picks fields of an expansion (and includes it)
+    ?include=teacher,chapters        expansions to embed (related resources, counts)
+
+Rules:
+  * Neither parameter given      -> the endpoint's historical response (all fields, default expansions).
+  * `fields` given, no `include` -> only the expansions named in `fields` are embedded.
+  * `include` given              -> exactly those expansions (plus any named in `fields`);
+                                    `?include=` with an empty value turns every expansion off.
+Unknown field or expansion names are rejected with FieldsetError (HTTP 400), so typos fail loudly
+instead of silently returning less data.
+
+For database-backed resources the parsed Fieldset is handed to models/read_models.py, which turns it
+into SQL column selection and batched loading of only the requested expansions. Computed payloads
+(analytics, metrics) only support `fields`, applied with `prune_payload`.
+"""
+from dataclasses import dataclass, field
+
+class FieldsetError(ValueError):
+    """Malformed or unknown ?fields= / ?include= names (HTTP 400)."""
+    status_code = 400
+
+@dataclass(frozen=True)
+class Fieldset:
+    fields: frozenset[str] | None = None # Top-level fields; None = all of them
+    include: frozenset[str] = frozenset() # Expansion names to embed
+    nested: dict[str, frozenset[str]] = field(default_factory=dict) # Expansion name -> its fields (from dotted names)
+
+    def wants(self, name: str) -> bool:
+        return self.fields is None or name in self.fields
+
+    def includes(self, name: str) -> bool:
+        return name in self.include
+
+    def nested_fields(self, expansion: str) -> frozenset[str] | None:
+        return self.nested.get(expansion)
+
+def _split(value: str | None) -> list[str]:
+    if value is None:
+        return []
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+def parse_fieldset(args, field_names, expansions=None, default_include=()) -> Fieldset:
+    """
+    Parses ?fields= / ?include= from `args` (request.args or any mapping).
+
+    `field_names` are the resource's plain fields; `expansions` maps expansion name -> the field names
+    of the embedded resource (or None for scalar expansions such as counts, which take no dotted fields).
+    `default_include` is what the endpoint embeds when the client sends neither parameter.
+    """
+    expansions = expansions or {}
+    args = args or {}
+    fields_param, include_param = args.get('fields'), args.get('include')
+
+    if fields_param is None and include_param is None:
+        return Fieldset(include=frozenset(default_include))
+
+    top, nested, implied = set(), {}, set()
+    for name in _split(fields_param):
+        head, _, tail = name.partition('.')
+        if tail:
+            if head not in expansions or expansions[head] is None:
+                raise FieldsetError(f"Unknown expansion in fields: '{head}'. Expandable: {sorted(k for k, v in expansions.items() if v is not None)}.")
+            if tail not in expansions[head]:
+                raise FieldsetError(f"Unknown field '{tail}' for '{head}'. Allowed: {sorted(expansions[head])}.")
+            nested.setdefault(head, set()).add(tail)
+            implied.add(head)
+        elif name in expansions:
+            implied.add(name)
+        elif name in field_names:
+            top.add(name)
+        else:
+            raise FieldsetError(f"Unknown field: '{name}'. Allowed: {sorted(field_names)}; expansions: {sorted(expansions)}.")
+
+    include = set(implied)
+    for name in _split(include_param):
+        if name not in expansions:
+            raise FieldsetError(f"Unknown include: '{name}'. Allowed: {sorted(expansions)}.")
+        include.add(name)
+
+    return Fieldset(
+        fields=frozenset(top) if fields_param is not None else None,
+        include=frozenset(include),
+        nested={name: frozenset(names) for name, names in nested.items()},
+    )
+
+def prune_payload(payload: dict, args) -> dict:
+    """
+    Applies ?fields= to a computed payload (top-level keys only). `include` has no meaning there.
+    """
+    args = args or {}
+    if args.get('include') is not None:
+        raise FieldsetError("include is not supported on this endpoint.")
+    names = _split(args.get('fields'))
+    if args.get('fields') is None:
+        return payload
+    unknown = [name for name in names if name not in payload]
+    if unknown:
+        raise FieldsetError(f"Unknown field: '{unknown[0]}'. Allowed: {sorted(payload)}.")
+    return {key: value for key, value in payload.items() if key in names}
@@ -0,0 +1,113 @@
+"""
+Grading-scheme parsers.
+
+A scheme turns the free-form grade a teacher types ("A+", "85/100", "Pass") into a numeric
+score on a 0-100 scale plus the label to display. Each assignment names its scheme
+(Assignment.grading_scheme); new schemes are added with `register_grading_scheme`.
+"""
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class ParsedGrade:
+    score: float # Normalised to 0-100
+    label: str # What the teacher entered, tidied up for display
+
+class GradeParseError(ValueError):
+    pass
+
+class GradingScheme(ABC):
+    name = None
+
+    @abstractmethod
+    def parse(self, raw: str) -> ParsedGrade:
+        """Parses a grade as typed by the teacher; raises GradeParseError if it does not fit the scheme."""
+
+class PercentageScheme(GradingScheme):
+    """'85', '85%', '85/100', '17/20', '8.5 / 10'."""
+    name = 'percentage'
+    _pattern = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(?:(%)|/\s*(\d+(?:\.\d+)?))?\s*$')
+
+    def parse(self, raw: str) -> ParsedGrade:
+        match = self._pattern.match(raw)
+        if not match:
+            raise GradeParseError(f"'{raw}' is not a number, percentage or fraction.")
+        value, _, out_of = match.groups()
+        value = float(value)
+        if out_of is not None:
+            out_of = float(out_of)
+            if out_of <= 0:
+                raise GradeParseError("The denominator of a fractional grade must be positive.")
+            score = value / out_of * 100
+        else:
+            score = value
+        if not 0 <= score <= 100:
+            raise GradeParseError(f"'{raw}' is outside the 0-100 range.")
+        return ParsedGrade(score=round(score, 2), label=raw.strip())
+
+class LetterScheme(GradingScheme):
+    """A+ .. F, mapped to the midpoint of the usual percentage band."""
+    name = 'letter'
+    scores = {
+        'A+': 98.0, 'A': 95.0, 'A-': 91.0,
+        'B+': 88.0, 'B': 85.0, 'B-': 81.0,
+        'C+': 78.0, 'C': 75.0, 'C-': 71.0,
+        'D+': 68.0, 'D': 65.0, 'D-': 61.0,
+        'F': 50.0,
+    }
+
+    def parse(self, raw: str) -> ParsedGrade:
+        label = raw.strip().upper()
+        if label not in self.scores:
+            raise GradeParseError(f"'{raw}' is not a letter grade (A+ to F).")
+        return ParsedGrade(score=self.scores[label], label=label)
+
+class PassFailScheme(GradingScheme):
+    name = 'pass_fail'
+    scores = {'PASS': 100.0, 'FAIL': 0.0}
+
+    def parse(self, raw: str) -> ParsedGrade:
+        label = raw.strip().upper()
+        if label not in self.scores:
+            raise GradeParseError(f"'{raw}' must be Pass or Fail.")
+        return ParsedGrade(score=self.scores[label], label=label.capitalize())
+
+class AutoScheme(GradingScheme):
+    """Tries the registered concrete schemes in order; the default for existing assignments."""
+    name = 'auto'
+    order = ('percentage', 'letter', 'pass_fail')
+
+    def parse(self, raw: str) -> ParsedGrade:
+        for name in self.order:
+            try:
+                return _SCHEMES[name].parse(raw)
+            except GradeParseError:
+                continue
+        raise GradeParseError(f"Could not interpret grade '{raw}'. Use a number (0-100), a fraction like 17/20, a letter grade or Pass/Fail.")
+
+_SCHEMES: dict[str, GradingScheme] = {}
+
+def register_grading_scheme(scheme: GradingScheme):
+    _SCHEMES[scheme.name] = scheme
+
+def get_grading_scheme(name: str) -> GradingScheme:
+    try:
+        return _SCHEMES[name]
+    except KeyError:
+        raise GradeParseError(f"Unknown grading scheme '{name}'. Must be one of {available_grading_schemes()}.")
+
+def available_grading_schemes() -> list[str]:
+    return list(_SCHEMES)
+
+def parse_grade(raw, scheme_name: str = 'auto') -> ParsedGrade:
+    if isinstance(raw, bool) or raw is None:
+        raise GradeParseError("Grade must be a string or a number.")
+    if isinstance(raw, (int, float)):
+        raw = str(raw)
+    if not isinstance(raw, str) or not raw.strip():
+        raise GradeParseError("Grade must not be empty.")
+    return get_grading_scheme(scheme_name).parse(raw)
+
+for _scheme in (PercentageScheme(), LetterScheme(), PassFailScheme(), AutoScheme()):
+    register_grading_scheme(_scheme)
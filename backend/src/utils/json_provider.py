@@ -0,0 +1,83 @@
+"""
+JSON providers for the Flask app.
+
+Both providers serialize datetime/date as ISO 8601 and Enum members as their value, so
+`to_dict` methods can hand back TIMESTAMP columns and RoleEnum / SubmissionTypeEnum values
+untouched and leave the string conversion to the encoder.
+
+JSON_PROVIDER selects the implementation:
+  * 'orjson' - orjson (Rust, serializes datetime/enum natively); requires the orjson package
+  * 'stdlib' - Flask's default provider with the same datetime/enum handling
+  * 'auto'   - orjson when installed, otherwise stdlib (default)
+"""
+import dataclasses
+import decimal
+import enum
+import uuid
+from datetime import date, time
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from backend.src.utils.timing import phase
+
+try:
+    import orjson
+except ImportError: # Optional dependency
+    orjson = None
+
+def _default(obj):
+    # datetime is a subclass of date, so one check covers both
+    if isinstance(obj, (date, time)):
+        return obj.isoformat()
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's stdlib provider, but with ISO 8601 datetimes instead of HTTP dates."""
+    default = staticmethod(_default)
+
+    def response(self, *args, **kwargs):
+        with phase('json'):
+            return super().response(*args, **kwargs)
+
+class OrJSONProvider(JSONProvider):
+    """
+    orjson-backed provider. Responses are built straight from orjson's bytes output,
+    skipping the str round trip the base provider does.
+    """
+    # orjson handles datetime, date, enum, dataclass and UUID itself; _default covers the rest
+    _options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=_default, option=self._options).decode('utf-8')
+
+    def loads(self, s: str | bytes, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self._options
+        if self._app.debug:
+            option |= orjson.OPT_INDENT_2
+        with phase('json'):
+            body = orjson.dumps(obj, default=_default, option=option)
+        return self._app.response_class(body, mimetype='application/json')
+
+def make_json_provider(app) -> JSONProvider:
+    choice = app.config.get('JSON_PROVIDER', 'auto')
+    if choice == 'auto':
+        choice = 'orjson' if orjson is not None else 'stdlib'
+    if choice == 'orjson':
+        if orjson is None:
+            raise RuntimeError("JSON_PROVIDER=orjson but the orjson package is not installed.")
+        return OrJSONProvider(app)
+    if choice == 'stdlib':
+        return StdlibJSONProvider(app)
+    raise ValueError(f"Unknown JSON_PROVIDER '{choice}'. Use 'auto', 'orjson' or 'stdlib'.")
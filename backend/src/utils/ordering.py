@@ -0,0 +1,35 @@
+"""
+Sparse integer sort keys.
+
+Chapters are ordered by an integer key with gaps (ORDER_GAP apart after a rebalance), so a
+chapter can be placed between two neighbours by taking the midpoint of their keys: one new
+row, no renumbering. Each insert at the same spot halves the gap; once two neighbours are
+adjacent integers the list has to be respaced (`spaced_keys`), which costs one UPDATE for
+the whole list and restores the full gaps.
+"""
+
+ORDER_GAP = 1024 # Distance between neighbouring keys after a rebalance
+LOW_WATER_GAP = 8 # A placement leaving less room than this schedules a background rebalance
+
+def key_between(before: int | None, after: int | None, gap: int = ORDER_GAP) -> int | None:
+    """
+    Key strictly between `before` and `after` (either may be None for the ends of the list),
+    or None when they are adjacent and the list must be respaced first.
+    """
+    if before is None and after is None:
+        return gap
+    if before is None:
+        return after - gap # Keys may go negative; only their order matters
+    if after is None:
+        return before + gap
+    if after - before < 2:
+        return None
+    return before + (after - before) // 2
+
+def is_crowded(key: int, before: int | None, after: int | None, low_water: int = LOW_WATER_GAP) -> bool:
+    """True when `key` sits closer than `low_water` to a neighbour."""
+    return (before is not None and key - before < low_water) or (after is not None and after - key < low_water)
+
+def spaced_keys(count: int, gap: int = ORDER_GAP) -> list[int]:
+    """Evenly spaced keys for a list of `count` items: gap, 2*gap, ..."""
+    return [gap * (position + 1) for position in range(count)]
@@ -0,0 +1,200 @@
+"""
+On-demand statistical profiling of individual requests.
+
+A request is profiled when
+  * random() < PROFILER_SAMPLE_RATE, or
+  * it carries a valid `X-Profile` header (PROFILER_HEADER_ENABLED, off by default):
+    "<expires>.<signature>", where signature = HMAC-SHA256(SECRET_KEY, "<expires>") and expires
+    is a Unix timestamp. Mint one with `flask profile-token`. Refused while SECRET_KEY is the
+    public development default, since anyone could then mint tokens.
+
+While a profiled request runs, one shared sampler thread records the request thread's Python
+stack every PROFILER_INTERVAL_MS (routes, decorators, services, SQLAlchemy, JSON encoding: whatever
+is on the stack). When the request ends, the samples are written to PROFILER_OUTPUT_DIR in the
+collapsed ("folded") stack format read by flamegraph.pl, inferno, speedscope and similar tools:
+
+    frame;frame;frame <count>
+
+Only the newest PROFILER_MAX_FILES profiles are kept; older ones are deleted as new ones are written.
+
+With both triggers off, no hooks are registered at all; with only the header trigger on, the
+per-request cost is one header lookup.
+"""
+import hashlib
+import hmac
+import itertools
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'X-Profile'
+INSECURE_SECRET_KEY = 'a_very_default_and_not_secure_secret_key' # create_app's fallback SECRET_KEY
+_sequence = itertools.count(1) # Keeps file names unique within a second
+
+def make_profile_token(secret_key: str, ttl_seconds: int = 3600, now: float | None = None) -> str:
+    expires = int((time.time() if now is None else now) + ttl_seconds)
+    signature = hmac.new(secret_key.encode('utf-8'), str(expires).encode('ascii'), hashlib.sha256).hexdigest()
+    return f'{expires}.{signature}'
+
+def verify_profile_token(secret_key: str, token: str, now: float | None = None) -> bool:
+    expires, _, signature = token.partition('.')
+    if not expires.isdigit() or int(expires) < (time.time() if now is None else now):
+        return False
+    expected = hmac.new(secret_key.encode('utf-8'), expires.encode('ascii'), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+def _frame_label(code) -> str:
+    # Function-level labels (first line, not current line) so samples of one function merge
+    path = code.co_filename.replace('\\', '/')
+    for marker in ('/site-packages/', '/backend/'):
+        if marker in path:
+            path = path.split(marker, 1)[1]
+            break
+    return f'{code.co_name} ({path}:{code.co_firstlineno})'
+
+class StackSampler:
+    """
+    One daemon thread sampling the stacks of all currently profiled threads. It sleeps on an
+    Event while nothing is being profiled, so it costs nothing between profiled requests.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._targets = {} # thread id -> Counter of folded stacks
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id: int):
+        with self._lock:
+            self._targets[thread_id] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def stop(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._targets:
+                    self._wakeup.clear()
+                targets = list(self._targets.items())
+            if not targets:
+                self._wakeup.wait()
+                continue
+            frames = sys._current_frames()
+            for thread_id, counter in targets:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    counter[';'.join(reversed(stack))] += 1
+            del frames
+            time.sleep(self.interval)
+
+class RequestProfiler:
+    """Flask extension deciding which requests to profile and writing their folded stacks."""
+
+    def __init__(self, app=None):
+        self.sampler = None
+        self.output_dir = None
+        self.max_files = 500
+        self._prune_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.sample_rate = app.config.get('PROFILER_SAMPLE_RATE', 0.0)
+        self.header_enabled = app.config.get('PROFILER_HEADER_ENABLED', False)
+        self.output_dir = app.config.get('PROFILER_OUTPUT_DIR', os.path.join(app.instance_path, 'profiles'))
+        self.max_files = app.config.get('PROFILER_MAX_FILES', 500)
+        self.secret_key = app.config['SECRET_KEY']
+        if self.header_enabled and self.secret_key in (None, '', INSECURE_SECRET_KEY):
+            logger.warning("PROFILER_HEADER_ENABLED ignored: SECRET_KEY is unset or the public default, so anyone could mint X-Profile tokens")
+            self.header_enabled = False
+        app.extensions['request_profiler'] = self
+        if not self.sample_rate and not self.header_enabled:
+            return # Off: no per-request hooks at all
+        self.sampler = StackSampler(app.config.get('PROFILER_INTERVAL_MS', 5) / 1000.0)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _wanted(self) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if self.header_enabled:
+            token = request.headers.get(HEADER)
+            return token is not None and verify_profile_token(self.secret_key, token)
+        return False
+
+    def _before_request(self):
+        if self._wanted():
+            g._profile_started = time.perf_counter()
+            self.sampler.start(threading.get_ident())
+
+    def _after_request(self, response):
+        started = g.pop('_profile_started', None)
+        if started is not None:
+            samples = self.sampler.stop(threading.get_ident())
+            path = self._write(samples, time.perf_counter() - started)
+            if path:
+                response.headers[HEADER] = os.path.basename(path)
+        return response
+
+    def _teardown_request(self, exc):
+        # after_request is skipped when the view raised; never leave the thread registered
+        if g.pop('_profile_started', None) is not None:
+            self.sampler.stop(threading.get_ident())
+
+    def _write(self, samples: Counter, elapsed: float) -> str | None:
+        if not samples:
+            return None # Finished within one sampling interval
+        os.makedirs(self.output_dir, exist_ok=True)
+        rule = request.url_rule.rule if request.url_rule else request.path
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', rule).strip('_') or 'root'
+        filename = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.method}-{slug}-{elapsed * 1000:.0f}ms-{os.getpid()}-{next(_sequence)}.folded"
+        path = os.path.join(self.output_dir, filename)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        self._prune()
+        return path
+
+    def _prune(self):
+        """Deletes the oldest profiles beyond PROFILER_MAX_FILES."""
+        if not self._prune_lock.acquire(blocking=False):
+            return # Another request of this process is pruning
+        try:
+            with os.scandir(self.output_dir) as entries:
+                profiles = [(entry.stat().st_mtime, entry.path) for entry in entries
+                            if entry.name.endswith('.folded') and entry.is_file()]
+            if len(profiles) <= self.max_files:
+                return
+            profiles.sort()
+            for _, path in profiles[:len(profiles) - self.max_files]:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass # Pruned by another worker
+        except OSError:
+            logger.exception("Could not prune %s", self.output_dir)
+        finally:
+            self._prune_lock.release()
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,254 @@
+"""
+In-process publish/subscribe for Server-Sent Event streams.
+
+Services publish small events to topics ('user:<id>', 'course:<id>') right after their
+transaction commits; every open stream subscribed to one of the topics gets the event as a
+ready-made SSE frame (built once per event, shared by all subscribers).
+
+  * Replay  - each topic keeps its last SSE_REPLAY_SIZE events, so a client reconnecting with
+              Last-Event-ID receives what it missed. A client that fell further behind, whose
+              own queue overflowed, or whose last event predates this process listening (a
+              restarted worker, or another worker than the one it was connected to) gets a
+              `resync` event and should refetch.
+  * Workers - with SSE_TRANSPORT='local', every worker process on the host binds a Unix datagram
+              socket in SSE_TRANSPORT_DIR and forwards what it publishes to the others, so a
+              stream sees events no matter which worker handled the write. One receiver thread
+              per process, never one per stream.
+  * Idle    - a stream waits on a threading.Event with a keep-alive timeout and holds no
+              database connection. Under a cooperative server (e.g. gunicorn -k gevent, which
+              patches threading) each idle stream is a parked greenlet, so a worker can hold
+              thousands of them; under a threaded server each stream occupies a thread.
+
+Event ids are microsecond timestamps made strictly increasing per publishing process.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 256 # Frames buffered for one slow stream before it is told to resync
+MAX_DATAGRAM_BYTES = 64 * 1024
+
+def format_frame(event_id: int, event_type: str, data: str) -> str:
+    lines = ''.join(f'data: {line}\n' for line in data.split('\n'))
+    return f'id: {event_id}\nevent: {event_type}\n{lines}\n'
+
+KEEPALIVE_FRAME = ': keep-alive\n\n'
+RESYNC_FRAME = 'event: resync\ndata: {}\n\n'
+
+class Subscription:
+    """One stream's view of the broker: a bounded frame queue and a wakeup event."""
+    __slots__ = ('topics', 'frames', 'overflowed', '_ready')
+
+    def __init__(self, topics: tuple[str, ...]):
+        self.topics = topics
+        self.frames = deque()
+        self.overflowed = False
+        self._ready = threading.Event()
+
+    def push(self, frame: str):
+        if len(self.frames) >= SUBSCRIBER_QUEUE_SIZE:
+            self.frames.clear()
+            self.overflowed = True
+        self.frames.append(frame)
+        self._ready.set()
+
+    def wait(self, timeout: float) -> list[str]:
+        """Frames available now, or after at most `timeout` seconds (empty list: send a keep-alive)."""
+        if not self.frames and not self.overflowed:
+            self._ready.wait(timeout)
+        self._ready.clear()
+        if self.overflowed:
+            self.overflowed = False
+            self.frames.clear()
+            return [RESYNC_FRAME]
+        frames = []
+        while self.frames:
+            frames.append(self.frames.popleft())
+        return frames
+
+class UnixSocketTransport:
+    """
+    Forwards published events to the other worker processes on this host: each process binds
+    `<directory>/<pid>.sock` and sends every event it publishes to all other sockets there.
+    Sockets of processes that are gone are removed on the first failed send.
+    """
+
+    def __init__(self, directory: str, deliver):
+        self.directory = directory
+        self.deliver = deliver # Callback for events received from other workers
+        self.path = None
+        self._sender = None
+        self._receiver = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f'{os.getpid()}.sock')
+        if os.path.exists(self.path):
+            os.unlink(self.path) # Left behind by an earlier process with the same pid
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(self.path)
+        self._receiver = receiver
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False) # A full peer buffer drops the event instead of stalling the request
+        threading.Thread(target=self._receive, name='pubsub-receiver', daemon=True).start()
+
+    def send(self, payload: bytes):
+        own = os.path.basename(self.path)
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name == own or not name.endswith('.sock'):
+                continue
+            peer = os.path.join(self.directory, name)
+            try:
+                self._sender.sendto(payload, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(peer) # Its process exited without cleaning up
+                except OSError:
+                    pass
+            except OSError:
+                logger.warning("Dropped an event for worker socket %s (buffer full)", peer)
+
+    def _receive(self):
+        while True:
+            try:
+                payload = self._receiver.recv(MAX_DATAGRAM_BYTES)
+                event_id, topic, frame = payload.decode('utf-8').split('\n', 2)
+                self.deliver(int(event_id), topic, frame)
+            except Exception:
+                logger.exception("Could not receive a forwarded event")
+
+class NotificationBroker:
+    """Flask extension holding topic histories and live subscriptions for this process."""
+
+    def __init__(self, app=None):
+        self.replay_size = 100
+        self.max_topics = 10000
+        self.transport_kind = 'none'
+        self.transport_dir = None
+        self._transport = None
+        self._transport_pid = None
+        self._lock = threading.Lock()
+        self._subscribers = {} # topic -> set of Subscription
+        self._history = OrderedDict() # topic -> deque of (event_id, frame), least recently used first
+        self._truncated = {} # topic -> id of the newest event dropped from its history
+        self._history_floor = 0 # Newest event id of any topic whose whole history was dropped
+        self._listening_since = 0 # Every event with a larger id reached this process's histories
+        self._last_id = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.replay_size = app.config.get('SSE_REPLAY_SIZE', 100)
+        self.transport_kind = app.config.get('SSE_TRANSPORT', 'local')
+        self.transport_dir = app.config.get('SSE_TRANSPORT_DIR') or os.path.join(app.instance_path, 'pubsub')
+        if self.transport_kind == 'local' and not hasattr(socket, 'AF_UNIX'):
+            logger.warning("SSE_TRANSPORT=local needs Unix sockets; events stay within each worker")
+            self.transport_kind = 'none'
+        app.extensions['notification_broker'] = self
+        self._listening_since = max(self._listening_since, time.time_ns() // 1000)
+
+    def _ensure_transport(self):
+        # Started lazily and per pid, so a preloading server that forks workers gets one socket per worker
+        if self.transport_kind != 'local' or self._transport_pid == os.getpid():
+            return
+        with self._lock:
+            if self._transport_pid == os.getpid():
+                return
+            transport = UnixSocketTransport(self.transport_dir, self._deliver)
+            transport.start()
+            self._transport, self._transport_pid = transport, os.getpid()
+            # Other workers' events only arrive from now on (e.g. in a freshly forked worker)
+            self._listening_since = max(self._listening_since, time.time_ns() // 1000)
+
+    def _next_id(self) -> int:
+        with self._lock:
+            self._last_id = max(time.time_ns() // 1000, self._last_id + 1)
+            return self._last_id
+
+    def publish(self, topic: str, event_type: str, data: str) -> int:
+        """
+        Sends an event (`data` already JSON-encoded) to the topic's subscribers in every worker.
+        Call after the change it describes is committed.
+        """
+        self._ensure_transport()
+        event_id = self._next_id()
+        frame = format_frame(event_id, event_type, data)
+        self._deliver(event_id, topic, frame)
+        if self._transport is not None:
+            payload = f'{event_id}\n{topic}\n{frame}'.encode('utf-8')
+            if len(payload) <= MAX_DATAGRAM_BYTES:
+                self._transport.send(payload)
+            else:
+                logger.warning("Event %s on %s is too large to forward to other workers", event_type, topic)
+        return event_id
+
+    def _deliver(self, event_id: int, topic: str, frame: str):
+        with self._lock:
+            self._last_id = max(self._last_id, event_id)
+            history = self._history.get(topic)
+            if history is None:
+                history = self._history[topic] = deque(maxlen=self.replay_size)
+                while len(self._history) > self.max_topics:
+                    _, dropped = self._history.popitem(last=False)
+                    if dropped:
+                        self._history_floor = max(self._history_floor, dropped[-1][0])
+            else:
+                self._history.move_to_end(topic)
+            if len(history) == history.maxlen:
+                self._truncated[topic] = history[0][0]
+            history.append((event_id, frame))
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            subscription.push(frame)
+
+    def subscribe(self, topics: list[str], last_event_id: int | None = None) -> Subscription:
+        """
+        Registers a stream for `topics`. With `last_event_id`, the events after it still held in
+        the topic histories are queued first, preceded by a resync if some of them may be gone:
+        dropped from a history, or published before this process was listening.
+        """
+        self._ensure_transport()
+        subscription = Subscription(tuple(topics))
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+            if last_event_id is None:
+                return subscription
+            missed, gap = [], last_event_id < self._listening_since
+            for topic in subscription.topics:
+                history = self._history.get(topic)
+                if history is None:
+                    gap = gap or last_event_id < self._history_floor
+                    continue
+                gap = gap or last_event_id < self._truncated.get(topic, 0)
+                missed.extend(event for event in history if event[0] > last_event_id)
+        if gap:
+            subscription.push(RESYNC_FRAME)
+        for _, frame in sorted(missed):
+            subscription.push(frame)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({subscription for subscribers in self._subscribers.values() for subscription in subscribers})
+
+
+notification_broker = NotificationBroker()
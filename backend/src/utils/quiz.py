@@ -0,0 +1,209 @@
+"""
+Objective quizzes: answer-key schema and vectorized scoring.
+
+An answer key is stored on the assignment (Assignment.answer_key):
+
+    {"questions": [
+        {"id": "q1", "type": "multiple_choice", "prompt": "...", "options": ["a", "b", "c"],
+         "answer": "b", "points": 1},
+        {"id": "q2", "type": "numeric", "prompt": "...", "answer": 9.81,
+         "tolerance": 0.05, "relative_tolerance": 0.01, "points": 2}
+    ]}
+
+  * multiple_choice - the response must equal `answer` (trimmed, case-insensitive); `options`
+                      is optional and, when given, must contain the answer
+  * numeric         - the response is correct within max(tolerance, relative_tolerance * |answer|)
+`points` defaults to 1. A submission's answers are a JSON object {question id: response}
+kept in Submission.content_text; missing, unknown or malformed responses score nothing.
+
+Scoring is done for a whole batch of submissions at once: responses are laid out as one
+matrix per question type (option indices, floats) and compared with the key row in a single
+numpy operation, then weighted by the points vector. `grade_rows` is the unit of work of a
+grading process pool, so it only takes and returns plain picklable values.
+"""
+import json
+import math
+from dataclasses import dataclass
+import numpy as np
+
+QUESTION_TYPES = ('multiple_choice', 'numeric')
+MAX_QUESTIONS = 500
+MAX_ID_LENGTH = 64
+
+class QuizError(ValueError):
+    """Invalid answer key or answers (HTTP 400)."""
+
+def _normalize(value) -> str:
+    return str(value).strip().casefold()
+
+def _number(value, what: str, minimum: float | None = None) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise QuizError(f"{what} must be a number.")
+    if minimum is not None and value < minimum:
+        raise QuizError(f"{what} must be at least {minimum:g}.")
+    return float(value)
+
+def parse_answer_key(key) -> dict:
+    """Validated, normalized copy of an answer key (defaults filled in); raises QuizError."""
+    if not isinstance(key, dict) or not isinstance(key.get('questions'), list):
+        raise QuizError("The answer key must be an object with a 'questions' list.")
+    questions = key['questions']
+    if not questions:
+        raise QuizError("The answer key must have at least one question.")
+    if len(questions) > MAX_QUESTIONS:
+        raise QuizError(f"The answer key has more than {MAX_QUESTIONS} questions.")
+    parsed, seen = [], set()
+    for position, question in enumerate(questions, start=1):
+        if not isinstance(question, dict):
+            raise QuizError(f"Question {position} must be an object.")
+        question_id = question.get('id')
+        if not isinstance(question_id, str) or not question_id.strip() or len(question_id) > MAX_ID_LENGTH:
+            raise QuizError(f"Question {position} needs an 'id' string of at most {MAX_ID_LENGTH} characters.")
+        if question_id in seen:
+            raise QuizError(f"Question id '{question_id}' is used twice.")
+        seen.add(question_id)
+        kind = question.get('type')
+        if kind not in QUESTION_TYPES:
+            raise QuizError(f"Question '{question_id}': 'type' must be one of {list(QUESTION_TYPES)}.")
+        entry = {'id': question_id, 'type': kind, 'points': _number(question.get('points', 1), f"Question '{question_id}': points", 0)}
+        if question.get('prompt') is not None:
+            if not isinstance(question['prompt'], str):
+                raise QuizError(f"Question '{question_id}': prompt must be a string.")
+            entry['prompt'] = question['prompt']
+        if kind == 'multiple_choice':
+            answer = question.get('answer')
+            if not isinstance(answer, (str, int)) or isinstance(answer, bool) or not str(answer).strip():
+                raise QuizError(f"Question '{question_id}': 'answer' must be the correct option.")
+            options = question.get('options')
+            if options is not None:
+                if not isinstance(options, list) or not all(isinstance(option, (str, int)) and not isinstance(option, bool) for option in options):
+                    raise QuizError(f"Question '{question_id}': options must be a list of strings.")
+                if _normalize(answer) not in {_normalize(option) for option in options}:
+                    raise QuizError(f"Question '{question_id}': the answer is not one of the options.")
+                entry['options'] = [str(option) for option in options]
+            entry['answer'] = str(answer)
+        else:
+            entry['answer'] = _number(question.get('answer'), f"Question '{question_id}': answer")
+            entry['tolerance'] = _number(question.get('tolerance', 0), f"Question '{question_id}': tolerance", 0)
+            entry['relative_tolerance'] = _number(question.get('relative_tolerance', 0), f"Question '{question_id}': relative_tolerance", 0)
+        parsed.append(entry)
+    if sum(question['points'] for question in parsed) <= 0:
+        raise QuizError("The questions of an answer key must be worth more than 0 points in total.")
+    return {'questions': parsed}
+
+def public_questions(key: dict) -> list[dict]:
+    """The key's questions without answers and tolerances, for students taking the quiz."""
+    hidden = ('answer', 'tolerance', 'relative_tolerance')
+    return [{name: value for name, value in question.items() if name not in hidden} for question in key['questions']]
+
+def parse_answers(answers) -> str:
+    """Canonical JSON text of a student's answers ({question id: response}); raises QuizError."""
+    if not isinstance(answers, dict) or not answers:
+        raise QuizError("'answers' must be an object mapping question ids to responses.")
+    if len(answers) > MAX_QUESTIONS:
+        raise QuizError(f"'answers' has more than {MAX_QUESTIONS} entries.")
+    for question_id, response in answers.items():
+        if len(question_id) > MAX_ID_LENGTH:
+            raise QuizError(f"Question ids are at most {MAX_ID_LENGTH} characters.")
+        if not (response is None or isinstance(response, (str, int, float))) or isinstance(response, bool):
+            raise QuizError(f"The response to '{question_id}' must be a string or a number.")
+    return json.dumps(answers, sort_keys=True, separators=(',', ':'))
+
+def _load_answers(content_text: str | None) -> dict:
+    try:
+        answers = json.loads(content_text) if content_text else {}
+    except ValueError:
+        return {}
+    return answers if isinstance(answers, dict) else {}
+
+@dataclass(frozen=True)
+class Score:
+    points: float
+    total: float
+    correct: int
+    questions: int
+
+    @property
+    def percent(self) -> float:
+        return round(self.points / self.total * 100, 2)
+
+    @property
+    def label(self) -> str:
+        return f'{self.points:g}/{self.total:g}'
+
+    @property
+    def feedback(self) -> str:
+        return f'Auto-graded: {self.correct} of {self.questions} questions correct.'
+
+class CompiledKey:
+    """An answer key laid out as arrays: one column per question, grouped by question type."""
+
+    def __init__(self, key: dict):
+        questions = key['questions']
+        self.total = float(sum(question['points'] for question in questions))
+        self.question_count = len(questions)
+        choice = [question for question in questions if question['type'] == 'multiple_choice']
+        numeric = [question for question in questions if question['type'] == 'numeric']
+        self.choice_ids = [question['id'] for question in choice]
+        # Responses become option indices; the key's answer is index 0 of its question's lookup
+        self.choice_lookup = []
+        for question in choice:
+            options = [question['answer']] + [option for option in question.get('options', ()) if _normalize(option) != _normalize(question['answer'])]
+            self.choice_lookup.append({_normalize(option): index for index, option in enumerate(options)})
+        self.choice_points = np.array([question['points'] for question in choice], dtype=np.float64)
+        self.numeric_ids = [question['id'] for question in numeric]
+        answers = np.array([question['answer'] for question in numeric], dtype=np.float64)
+        self.numeric_answers = answers
+        self.numeric_tolerance = np.maximum(
+            np.array([question['tolerance'] for question in numeric], dtype=np.float64),
+            np.array([question['relative_tolerance'] for question in numeric], dtype=np.float64) * np.abs(answers))
+        self.numeric_points = np.array([question['points'] for question in numeric], dtype=np.float64)
+
+    def _choice_matrix(self, batch: list[dict]) -> np.ndarray:
+        matrix = np.full((len(batch), len(self.choice_ids)), -1, dtype=np.int32) # -1: no or unknown response
+        for column, (question_id, lookup) in enumerate(zip(self.choice_ids, self.choice_lookup)):
+            responses = [answers.get(question_id) for answers in batch]
+            matrix[:, column] = [-1 if response is None else lookup.get(_normalize(response), -1) for response in responses]
+        return matrix
+
+    def _numeric_matrix(self, batch: list[dict]) -> np.ndarray:
+        matrix = np.full((len(batch), len(self.numeric_ids)), np.nan, dtype=np.float64) # NaN never matches
+        for column, question_id in enumerate(self.numeric_ids):
+            for row, answers in enumerate(batch):
+                response = answers.get(question_id)
+                if isinstance(response, str):
+                    try:
+                        response = float(response.strip())
+                    except ValueError:
+                        continue
+                if isinstance(response, (int, float)) and not isinstance(response, bool):
+                    matrix[row, column] = response
+        return matrix
+
+    def score(self, batch: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+        """(points, correct answer count) per submission of `batch` (dicts of responses)."""
+        points = np.zeros(len(batch), dtype=np.float64)
+        correct = np.zeros(len(batch), dtype=np.int64)
+        if self.choice_ids:
+            hits = self._choice_matrix(batch) == 0
+            points += hits @ self.choice_points
+            correct += hits.sum(axis=1)
+        if self.numeric_ids:
+            with np.errstate(invalid='ignore'):
+                hits = np.abs(self._numeric_matrix(batch) - self.numeric_answers) <= self.numeric_tolerance
+            points += hits @ self.numeric_points
+            correct += hits.sum(axis=1)
+        return points, correct
+
+    def score_one(self, content_text: str | None) -> Score:
+        points, correct = self.score([_load_answers(content_text)])
+        return Score(round(float(points[0]), 4), self.total, int(correct[0]), self.question_count)
+
+def grade_rows(key: dict, rows: list[tuple[int, str | None]]) -> list[tuple[int, float, int]]:
+    """
+    Scores (submission id, answers JSON) rows against a parsed key: (id, points, correct count)
+    per row. Runs in grading worker processes, so it takes and returns plain values.
+    """
+    compiled = CompiledKey(key)
+    points, correct = compiled.score([_load_answers(content_text) for _, content_text in rows])
+    return [(row[0], round(float(value), 4), int(count)) for row, value, count in zip(rows, points.tolist(), correct.tolist())]
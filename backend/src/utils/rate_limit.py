@@ -0,0 +1,189 @@
+"""
+Token-bucket rate limiting.
+
+Buckets live in a store chosen by RATELIMIT_BACKEND:
+  * 'memory' - sharded in-process dicts (one per worker, no I/O)
+  * 'sqlite' - a local SQLite file shared by every worker process on the host
+
+Limits are configured per scope as "<requests>/<period>" strings, e.g. RATELIMIT_AUTH_IP="20/minute".
+A bucket holds up to <requests> tokens and refills continuously at <requests>/<period>.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+def parse_limit(limit: str) -> tuple[float, float]:
+    """'20/minute' -> (capacity=20, refill_rate=20/60 tokens per second)."""
+    try:
+        count, period = limit.split('/')
+        count, seconds = float(count), _PERIODS[period.strip().rstrip('s')]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit '{limit}'. Expected '<count>/<second|minute|hour|day>'.")
+    return count, count / seconds
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + (now - updated) * rate)
+
+class MemoryBucketStore:
+    """
+    In-process buckets split across independently locked shards, so concurrent requests for
+    different keys rarely contend. Each entry is a (tokens, updated_at) tuple. Shards keep
+    keys in least-recently-used order and evict the oldest beyond `max_keys_per_shard`,
+    which bounds memory under a flood of distinct IPs or usernames.
+    """
+
+    def __init__(self, shards: int = 16, max_keys_per_shard: int = 10000):
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.max_keys_per_shard = max_keys_per_shard
+
+    def _shard(self, key: str):
+        return self._shards[zlib.crc32(key.encode('utf-8')) % len(self._shards)]
+
+    def consume(self, key: str, capacity: float, rate: float, cost: float = 1.0, now: float | None = None) -> float:
+        """Takes `cost` tokens. Returns 0 if allowed, otherwise the seconds until it would be."""
+        now = time.monotonic() if now is None else now
+        buckets, lock = self._shard(key)
+        with lock:
+            entry = buckets.pop(key, None)
+            tokens = capacity if entry is None else _refill(entry[0], entry[1], now, capacity, rate)
+            if tokens >= cost:
+                tokens -= cost
+                retry_after = 0.0
+            else:
+                retry_after = (cost - tokens) / rate
+            buckets[key] = (tokens, now) # Re-insert at the end: most recently used
+            while len(buckets) > self.max_keys_per_shard:
+                del buckets[next(iter(buckets))]
+        return retry_after
+
+    def reset(self):
+        for buckets, lock in self._shards:
+            with lock:
+                buckets.clear()
+
+class SQLiteBucketStore:
+    """
+    Buckets in a local SQLite file so every worker process on the host shares one budget.
+    Each consume is a single BEGIN IMMEDIATE transaction; WAL mode keeps readers unblocked.
+    At most every `prune_interval` seconds, buckets idle long enough to have refilled to full
+    are deleted (a missing bucket is a full one), which bounds the table under a flood of
+    distinct IPs or usernames.
+    """
+
+    def __init__(self, path: str, prune_interval: float = 60.0):
+        self.path = path
+        self.prune_interval = prune_interval
+        self._local = threading.local()
+        self._refill_seconds = 0.0 # Longest time any bucket seen so far takes to refill from empty
+        self._next_prune = 0.0
+        self._prune_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS buckets_updated ON buckets (updated)')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key: str, capacity: float, rate: float, cost: float = 1.0, now: float | None = None) -> float:
+        # Wall-clock time: monotonic clocks are not comparable across processes
+        now = time.time() if now is None else now
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = capacity if row is None else _refill(row[0], row[1], now, capacity, rate)
+            if tokens >= cost:
+                tokens -= cost
+                retry_after = 0.0
+            else:
+                retry_after = (cost - tokens) / rate
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)', (key, tokens, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._refill_seconds = max(self._refill_seconds, capacity / rate)
+        if now >= self._next_prune:
+            self.prune(now)
+        return retry_after
+
+    def prune(self, now: float | None = None) -> int:
+        """Deletes buckets that have refilled to full. Returns the number deleted."""
+        now = time.time() if now is None else now
+        if not self._prune_lock.acquire(blocking=False):
+            return 0 # Another thread of this process is pruning
+        try:
+            self._next_prune = now + self.prune_interval
+            cursor = self._connect().execute('DELETE FROM buckets WHERE updated < ?', (now - self._refill_seconds,))
+            return cursor.rowcount
+        finally:
+            self._prune_lock.release()
+
+    def reset(self):
+        self._connect().execute('DELETE FROM buckets')
+
+class RateLimiter:
+    """Flask extension holding the bucket store and the configured per-scope limits."""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.store = None
+        self._limits = {}
+        self._config = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATELIMIT_ENABLED', True)
+        backend = app.config.get('RATELIMIT_BACKEND', 'memory')
+        if backend == 'sqlite':
+            self.store = SQLiteBucketStore(app.config.get('RATELIMIT_SQLITE_PATH', os.path.join(app.instance_path, 'ratelimit.sqlite3')))
+        elif backend == 'memory':
+            self.store = MemoryBucketStore(shards=app.config.get('RATELIMIT_MEMORY_SHARDS', 16))
+        else:
+            raise ValueError(f"Unknown RATELIMIT_BACKEND '{backend}'. Use 'memory' or 'sqlite'.")
+        self._limits = {}
+        self._config = app.config
+        app.extensions['rate_limiter'] = self
+
+    def _limit(self, scope: str, kind: str) -> tuple[float, float] | None:
+        cache_key = (scope, kind)
+        if cache_key not in self._limits:
+            limit = self._config.get(f'RATELIMIT_{scope.upper()}_{kind.upper()}')
+            self._limits[cache_key] = parse_limit(limit) if limit else None
+        return self._limits[cache_key]
+
+    def hit(self, scope: str, client_ip: str, identity: str | None = None) -> int:
+        """
+        Consumes one token from the scope's per-IP bucket and, if an identity is given, from its
+        per-identity bucket. Returns 0 when allowed, else whole seconds to wait (Retry-After).
+        """
+        if not self.enabled or self.store is None:
+            return 0
+        checks = [('ip', client_ip)]
+        if identity:
+            checks.append(('identity', identity))
+        for kind, value in checks:
+            limit = self._limit(scope, kind)
+            if limit is None:
+                continue
+            capacity, rate = limit
+            retry_after = self.store.consume(f'{scope}:{kind}:{value}', capacity, rate)
+            if retry_after:
+                return max(1, math.ceil(retry_after))
+        return 0
+
+
+limiter = RateLimiter()
@@ -0,0 +1,405 @@
+"""
+Chapter content rendering: Markdown (or HTML) to sanitized HTML plus a table of contents.
+
+Rendering runs once, when a chapter is written; reads serve the stored result. The pipeline:
+  1. markdown_to_html - a CommonMark subset: ATX/setext headings, paragraphs, emphasis, strong,
+                        strikethrough, inline code, fenced and indented code blocks, block
+                        quotes, (nested) lists, rules, links, images, autolinks and raw HTML.
+                        Content that is already an HTML document (starts with '<' and ends
+                        with '>') skips this step.
+  2. sanitize_html    - an allowlist pass over the result: unknown tags are dropped (script,
+                        style and similar together with their contents), attributes are
+                        filtered per tag and URLs limited to http(s), mailto and relative ones.
+                        The same pass gives every heading a unique id and collects the TOC.
+
+Results are keyed by `content_hash(content)`, which includes RENDERER_VERSION: bump it whenever
+the output changes, and `flask render-chapters` re-renders the chapters whose stored hash is stale.
+A small in-process LRU (`render_cached`) lets duplicate content (imports, clones) render once.
+"""
+import hashlib
+import html
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from html.parser import HTMLParser
+
+RENDERER_VERSION = 1
+RENDER_CACHE_SIZE = 256
+
+@dataclass(frozen=True)
+class Rendered:
+    html: str
+    toc: list # [{'level': 2, 'id': 'setup', 'title': 'Setup'}, ...] in document order
+
+def content_hash(content: str | None) -> str:
+    return hashlib.sha256(f'{RENDERER_VERSION}\0{content or ""}'.encode('utf-8')).hexdigest()
+
+# --- Markdown ---
+
+_FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})\s*([\w#+.-]*)')
+_ATX = re.compile(r'^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$')
+_SETEXT = re.compile(r'^ {0,3}(=+|-+)[ \t]*$')
+_RULE = re.compile(r'^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+_QUOTE = re.compile(r'^ {0,3}> ?')
+_BULLET = re.compile(r'^( {0,3})([-+*])([ \t]+|$)')
+_ORDERED = re.compile(r'^( {0,3})(\d{1,9})([.)])([ \t]+|$)')
+_HTML_BLOCK = re.compile(r'^ {0,3}(?:<!--|</?[A-Za-z][A-Za-z0-9-]*(?:[\s/>]|$))')
+
+_CODE_SPAN = re.compile(r'(`+)(.+?)\1', re.S)
+_INLINE_TAG = re.compile(r'</?[A-Za-z][A-Za-z0-9-]*(?:\s+[^<>]*)?/?>|<!--.*?-->', re.S)
+_AUTOLINK = re.compile(r'<((?:https?://|mailto:)[^\s<>]+)>')
+_ENTITY = re.compile(r'&(?:#\d{1,7}|#[xX][0-9a-fA-F]{1,6}|[A-Za-z][A-Za-z0-9]{1,31});')
+_LINK = re.compile(r'(!?)\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(\s*<?([^\s()<>]*(?:\([^\s()<>]*\)[^\s()<>]*)*)>?(?:\s+"([^"]*)")?\s*\)')
+_STRONG = re.compile(r'(\*\*|__)(?=\S)(.+?)(?<=\S)\1', re.S)
+_EM_STAR = re.compile(r'\*(?=\S)(.+?)(?<=\S)\*', re.S)
+_EM_UNDERSCORE = re.compile(r'(?<![\w])_(?=\S)(.+?)(?<=\S)_(?![\w])', re.S)
+_STRIKE = re.compile(r'~~(?=\S)(.+?)(?<=\S)~~', re.S)
+_ESCAPABLE = re.compile(r'\\([!"#$%&\'()*+,\-./:;<=>?@\[\\\]^_`{|}~])')
+_HARD_BREAK = re.compile(r'(?: {2,}|\\)\n')
+_PLACEHOLDER = re.compile('\x00(\\d+)\x00')
+
+class _Inline:
+    """Renders one block's inline Markdown. Finished fragments are parked as placeholders so later
+    passes (emphasis, escaping) cannot touch them."""
+
+    def __init__(self):
+        self.parked = []
+
+    def _park(self, fragment: str) -> str:
+        self.parked.append(fragment)
+        return f'\x00{len(self.parked) - 1}\x00'
+
+    def _attr(self, value: str) -> str:
+        return html.escape(_ESCAPABLE.sub(r'\1', value), quote=True)
+
+    def render(self, text: str) -> str:
+        text = _CODE_SPAN.sub(lambda m: self._park(f'<code>{html.escape(m.group(2).strip(), quote=False)}</code>'), text)
+        text = _ESCAPABLE.sub(lambda m: self._park(html.escape(m.group(1), quote=False)), text)
+        text = _AUTOLINK.sub(lambda m: self._park(f'<a href="{self._attr(m.group(1))}">{html.escape(m.group(1), quote=False)}</a>'), text)
+        text = _INLINE_TAG.sub(lambda m: self._park(m.group(0)), text) # Raw HTML; sanitize_html decides what survives
+        text = _LINK.sub(self._link, text)
+        return self._finish(text)
+
+    def _link(self, match) -> str:
+        image, label, url, title = match.groups()
+        title_attr = f' title="{self._attr(title)}"' if title else ''
+        if image:
+            return self._park(f'<img src="{self._attr(url)}" alt="{self._attr(label)}"{title_attr}>')
+        return self._park(f'<a href="{self._attr(url)}"{title_attr}>') + self._finish(label) + self._park('</a>')
+
+    def _finish(self, text: str) -> str:
+        text = _ENTITY.sub(lambda m: self._park(m.group(0)), text)
+        text = html.escape(text, quote=False)
+        text = _STRONG.sub(r'<strong>\2</strong>', text)
+        text = _EM_STAR.sub(r'<em>\1</em>', text)
+        text = _EM_UNDERSCORE.sub(r'<em>\1</em>', text)
+        text = _STRIKE.sub(r'<del>\1</del>', text)
+        text = _HARD_BREAK.sub('<br>\n', text)
+        return text
+
+    def expand(self, text: str) -> str:
+        # Parked fragments may contain placeholders themselves (link labels), so expand until stable
+        while '\x00' in text:
+            text = _PLACEHOLDER.sub(lambda m: self.parked[int(m.group(1))], text)
+        return text
+
+def _inline(text: str) -> str:
+    renderer = _Inline()
+    return renderer.expand(renderer.render(text))
+
+def _starts_block(line: str) -> bool:
+    return bool(_FENCE.match(line) or _ATX.match(line) or _RULE.match(line) or _QUOTE.match(line)
+                or _BULLET.match(line) or _ORDERED.match(line) or _HTML_BLOCK.match(line))
+
+def _list_item_marker(line: str):
+    """(ordered, start number, content indent, first-line text) of a list item line, or None."""
+    match = _BULLET.match(line)
+    if match:
+        return False, None, len(match.group(0)) if match.group(3) else len(match.group(0)) + 1, line[len(match.group(0)):]
+    match = _ORDERED.match(line)
+    if match:
+        return True, int(match.group(2)), len(match.group(0)) if match.group(4) else len(match.group(0)) + 1, line[len(match.group(0)):]
+    return None
+
+def _blocks(lines: list[str]) -> list[str]:
+    out = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if not line.strip():
+            i += 1
+            continue
+
+        fence = _FENCE.match(line)
+        if fence:
+            marker, language = fence.group(1), fence.group(2)
+            body = []
+            i += 1
+            while i < len(lines) and not lines[i].lstrip().startswith(marker):
+                body.append(lines[i])
+                i += 1
+            i += 1 # Closing fence (or end of document)
+            language_attr = f' class="language-{html.escape(language)}"' if language else ''
+            out.append(f'<pre><code{language_attr}>{html.escape(chr(10).join(body), quote=False)}\n</code></pre>')
+            continue
+
+        if line.startswith('    ') or line.startswith('\t'):
+            body = []
+            while i < len(lines) and (lines[i].startswith('    ') or lines[i].startswith('\t') or not lines[i].strip()):
+                body.append(lines[i][4:] if lines[i].startswith('    ') else lines[i][1:])
+                i += 1
+            while body and not body[-1].strip():
+                body.pop()
+            out.append(f'<pre><code>{html.escape(chr(10).join(body), quote=False)}\n</code></pre>')
+            continue
+
+        heading = _ATX.match(line)
+        if heading:
+            level = len(heading.group(1))
+            out.append(f'<h{level}>{_inline((heading.group(2) or "").strip())}</h{level}>')
+            i += 1
+            continue
+
+        if _RULE.match(line):
+            out.append('<hr>')
+            i += 1
+            continue
+
+        if _QUOTE.match(line):
+            body = []
+            while i < len(lines) and lines[i].strip() and (_QUOTE.match(lines[i]) or not _starts_block(lines[i])):
+                body.append(_QUOTE.sub('', lines[i], count=1))
+                i += 1
+            out.append(f'<blockquote>\n{chr(10).join(_blocks(body))}\n</blockquote>')
+            continue
+
+        marker = _list_item_marker(line)
+        if marker:
+            ordered, start = marker[0], marker[1]
+            items, loose = [], False
+            while i < len(lines):
+                item = _list_item_marker(lines[i])
+                if item is None or item[0] != ordered:
+                    break
+                indent = item[2]
+                body = [item[3]]
+                i += 1
+                while i < len(lines):
+                    current = lines[i]
+                    if not current.strip():
+                        # A blank line continues the item only if indented content follows
+                        if i + 1 < len(lines) and lines[i + 1].startswith(' ' * indent) and lines[i + 1].strip():
+                            body.append('')
+                            loose = True
+                            i += 1
+                            continue
+                        break
+                    if current.startswith(' ' * indent):
+                        body.append(current[indent:])
+                    elif _list_item_marker(current) or _starts_block(current):
+                        break
+                    else:
+                        body.append(current.strip()) # Lazy continuation line
+                    i += 1
+                items.append(body)
+                following = _list_item_marker(lines[i + 1]) if i + 1 < len(lines) and not lines[i].strip() else None
+                if following and following[0] == ordered: # Blank line between items of the same list
+                    loose = True
+                    i += 1
+            rendered = []
+            for body in items:
+                inner = _blocks(body)
+                if not loose and inner and inner[0].startswith('<p>'):
+                    inner[0] = inner[0][3:-4] # Tight list: no <p> around the item text
+                rendered.append(f'<li>{chr(10).join(inner)}</li>')
+            tag = 'ol' if ordered else 'ul'
+            start_attr = f' start="{start}"' if ordered and start != 1 else ''
+            out.append(f'<{tag}{start_attr}>\n{chr(10).join(rendered)}\n</{tag}>')
+            continue
+
+        if _HTML_BLOCK.match(line):
+            body = []
+            while i < len(lines) and lines[i].strip():
+                body.append(lines[i])
+                i += 1
+            out.append('\n'.join(body))
+            continue
+
+        paragraph = []
+        while i < len(lines) and lines[i].strip():
+            setext = _SETEXT.match(lines[i])
+            if paragraph and setext:
+                level = 1 if setext.group(1)[0] == '=' else 2
+                out.append(f'<h{level}>{_inline(chr(10).join(paragraph).strip())}</h{level}>')
+                paragraph = None
+                i += 1
+                break
+            if paragraph and _starts_block(lines[i]):
+                break
+            paragraph.append(lines[i].lstrip() if not paragraph else lines[i])
+            i += 1
+        if paragraph:
+            out.append(f'<p>{_inline(chr(10).join(paragraph).rstrip())}</p>')
+    return out
+
+def markdown_to_html(text: str) -> str:
+    """Unsanitized HTML for Markdown `text`; always pass the result through sanitize_html."""
+    text = text.replace('\x00', '').replace('\r\n', '\n').replace('\r', '\n')
+    return '\n'.join(_blocks(text.split('\n')))
+
+# --- Sanitizer ---
+
+ALLOWED_TAGS = frozenset({
+    'a', 'abbr', 'b', 'blockquote', 'br', 'caption', 'code', 'dd', 'del', 'details', 'div', 'dl', 'dt',
+    'em', 'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'ins', 'kbd',
+    'li', 'mark', 'ol', 'p', 'pre', 'q', 's', 'samp', 'small', 'span', 'strong', 'sub', 'summary',
+    'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul', 'var',
+})
+VOID_TAGS = frozenset({'br', 'hr', 'img'})
+DROP_CONTENT_TAGS = frozenset({'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript',
+                               'textarea', 'select', 'title', 'head', 'svg', 'math'})
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'}, 'img': {'src', 'alt', 'title', 'width', 'height'},
+    'abbr': {'title'}, 'q': {'cite'}, 'blockquote': {'cite'}, 'ol': {'start'},
+    'td': {'colspan', 'rowspan', 'align'}, 'th': {'colspan', 'rowspan', 'align', 'scope'},
+    'code': {'class'}, 'details': {'open'},
+}
+URL_ATTRIBUTES = frozenset({'href', 'src', 'cite'})
+ALLOWED_SCHEMES = frozenset({'http', 'https', 'mailto'})
+HEADING_TAGS = frozenset({'h1', 'h2', 'h3', 'h4', 'h5', 'h6'})
+_LANGUAGE_CLASS = re.compile(r'^language-[\w#+.-]{1,32}$')
+_SCHEME = re.compile(r'^([A-Za-z][A-Za-z0-9+.-]*):')
+_SLUG_STRIP = re.compile(r'[^\w\s-]')
+_SLUG_SPACE = re.compile(r'[\s_-]+')
+
+def _safe_url(value: str) -> bool:
+    # Browsers ignore control characters and whitespace inside a scheme ("java\tscript:")
+    compact = ''.join(ch for ch in value if ch > ' ').strip()
+    scheme = _SCHEME.match(compact)
+    return scheme is None or scheme.group(1).lower() in ALLOWED_SCHEMES
+
+def slugify(text: str) -> str:
+    slug = _SLUG_SPACE.sub('-', _SLUG_STRIP.sub('', text.lower())).strip('-')
+    return slug[:64].rstrip('-') or 'section'
+
+class _Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.open = [] # Allowed tags currently open, innermost last
+        self.dropping = 0 # Depth inside a DROP_CONTENT_TAGS element
+        self.toc = []
+        self.ids = set()
+        self.heading = None # (output index of the start tag, level, given id, text parts) while inside one
+
+    def _unique_id(self, wanted: str) -> str:
+        candidate, suffix = wanted, 2
+        while candidate in self.ids:
+            candidate = f'{wanted}-{suffix}'
+            suffix += 1
+        self.ids.add(candidate)
+        return candidate
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            if tag not in VOID_TAGS:
+                self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set()) | {'title'}
+        kept = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not _safe_url(value):
+                continue
+            if name == 'class' and not _LANGUAGE_CLASS.match(value):
+                continue
+            kept.append((name, value))
+        if tag == 'a' and any(name == 'href' and _SCHEME.match(value.strip()) for name, value in kept):
+            kept.append(('rel', 'nofollow noopener noreferrer'))
+        if tag in HEADING_TAGS and self.heading is None:
+            given = next((value for name, value in attrs if name == 'id' and value), None)
+            self.heading = (len(self.out), int(tag[1]), given, [])
+        rendered = ''.join(f' {name}="{html.escape(value, quote=True)}"' for name, value in kept)
+        self.out.append(f'<{tag}{rendered}>')
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            return # Self-closed (<svg/>, <script/>): nothing inside to drop, and no end tag will follow
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open and self.open[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open:
+            return
+        while self.open: # Close anything left open inside it
+            inner = self.open.pop()
+            self.out.append(f'</{inner}>')
+            if inner in HEADING_TAGS and self.heading is not None:
+                self._finish_heading()
+            if inner == tag:
+                break
+
+    def _finish_heading(self):
+        index, level, given, parts = self.heading
+        self.heading = None
+        title = ' '.join(''.join(parts).split())
+        heading_id = self._unique_id(slugify(given or title))
+        self.out[index] = self.out[index][:-1] + f' id="{html.escape(heading_id, quote=True)}">'
+        self.toc.append({'level': level, 'id': heading_id, 'title': title})
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        if self.heading is not None:
+            self.heading[3].append(data)
+        self.out.append(html.escape(data, quote=False))
+
+    def close(self):
+        super().close()
+        if self.open: # Unclosed tags at the end of the document
+            self.handle_endtag(self.open[0])
+
+def sanitize_html(markup: str) -> Rendered:
+    """Allowlist-sanitized markup, with heading ids and the table of contents."""
+    sanitizer = _Sanitizer()
+    sanitizer.feed(markup)
+    sanitizer.close()
+    return Rendered(html=''.join(sanitizer.out), toc=sanitizer.toc)
+
+# --- Entry points ---
+
+def render(content: str | None) -> Rendered:
+    if not content or not content.strip():
+        return Rendered(html='', toc=[])
+    stripped = content.strip()
+    if stripped.startswith('<') and stripped.endswith('>'):
+        return sanitize_html(stripped) # Already HTML
+    return sanitize_html(markdown_to_html(content))
+
+_cache = OrderedDict() # content hash -> Rendered, least recently used first
+_cache_lock = threading.Lock()
+
+def render_cached(content: str | None) -> tuple[str, Rendered]:
+    """(content hash, rendering), reusing a recent rendering of identical content."""
+    key = content_hash(content)
+    with _cache_lock:
+        rendered = _cache.get(key)
+        if rendered is not None:
+            _cache.move_to_end(key)
+            return key, rendered
+    rendered = render(content)
+    with _cache_lock:
+        _cache[key] = rendered
+        while len(_cache) > RENDER_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return key, rendered
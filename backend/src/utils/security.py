@@ -27,6 +27,35 @@ def generate_jwt(user_id: int, user_role: str) -> str:
     token = jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
     return token
 
+STREAM_TOKEN_PURPOSE = 'notification-stream'
+
+def generate_stream_token(user_id: int) -> str:
+    """
+    Generates a short-lived token that only opens the user's notification stream, for clients
+    that cannot send an Authorization header (the browser EventSource API). It has no `user_id`
+    claim, so jwt_required does not accept it as an access token.
+    """
+    now = datetime.now(timezone.utc)
+    payload = {
+        'sub': str(user_id),
+        'purpose': STREAM_TOKEN_PURPOSE,
+        'exp': now + timedelta(seconds=current_app.config.get('SSE_TOKEN_TTL_SECONDS', 60)),
+        'iat': now,
+    }
+    return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
+
+def decode_stream_token(token: str) -> int | None:
+    """
+    Returns the user id of a valid stream token, otherwise None.
+    """
+    payload = decode_jwt(token)
+    if not payload or payload.get('purpose') != STREAM_TOKEN_PURPOSE:
+        return None
+    try:
+        return int(payload['sub'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
 def decode_jwt(token: str) -> dict | None:
     """
     Decodes a JWT.
@@ -0,0 +1,45 @@
+"""
+Compact text deltas for submission history.
+
+A delta rebuilds a `target` text from a `source` text as a list of operations:
+  [start, end]  - copy source[start:end]
+  "literal"     - insert this text
+Matching runs line by line (difflib.SequenceMatcher over lines), so building a delta stays fast
+for long essays, and an edit costs roughly the changed lines. Deltas and snapshots are stored
+zlib-compressed; `pack_snapshot` / `unpack_snapshot` handle whole texts.
+"""
+import difflib
+import json
+import zlib
+
+def make_delta(source: str, target: str) -> bytes:
+    """Compressed operations turning `source` into `target`."""
+    source_lines = source.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    offsets = [0]
+    for line in source_lines:
+        offsets.append(offsets[-1] + len(line))
+
+    ops = []
+    matcher = difflib.SequenceMatcher(None, source_lines, target_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            if ops and isinstance(ops[-1], list) and ops[-1][1] == offsets[i1]:
+                ops[-1][1] = offsets[i2] # Extend the previous copy
+            else:
+                ops.append([offsets[i1], offsets[i2]])
+        elif j2 > j1: # replace / insert; deletes simply copy nothing
+            ops.append(''.join(target_lines[j1:j2]))
+    return zlib.compress(json.dumps(ops, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+def apply_delta(source: str, delta: bytes) -> str:
+    parts = []
+    for op in json.loads(zlib.decompress(delta).decode('utf-8')):
+        parts.append(source[op[0]:op[1]] if isinstance(op, list) else op)
+    return ''.join(parts)
+
+def pack_snapshot(text: str) -> bytes:
+    return zlib.compress(text.encode('utf-8'))
+
+def unpack_snapshot(payload: bytes) -> str:
+    return zlib.decompress(payload).decode('utf-8')
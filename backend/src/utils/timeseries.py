@@ -0,0 +1,212 @@
+"""
+Array-backed storage for sensor time series, and downsampling for charts.
+
+Each series is two flat files under the store's directory:
+  <id>.ts   - int64 timestamps (milliseconds since the epoch, UTC), strictly ascending
+  <id>.val  - float32 values, one per timestamp
+Reads memory-map both files (numpy.memmap), so a range query touches only the pages of its
+slice (found by binary search on the timestamps) and a series of millions of points costs
+12 bytes a point on disk and nothing in memory until read.
+
+Writes are serialized per series by a lock file (fcntl, across worker processes) plus a
+thread lock. Points after the last stored timestamp are appended in place, values first, so
+a reader or an interrupted write never sees a timestamp without its value; the files are
+trimmed back to the common length before the next write. Any other batch is merged into a
+new pair of files that replace the old ones; readers holding the old maps keep reading them.
+
+`lttb()` reduces a slice to a pixel budget with Largest-Triangle-Three-Buckets, which keeps
+the peaks and dips a min/max or average downsample would flatten.
+"""
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+import numpy as np
+
+try:
+    import fcntl
+except ImportError: # Windows: only the thread lock guards writes (single worker)
+    fcntl = None
+
+TS_DTYPE = np.dtype('<i8')
+VALUE_DTYPE = np.dtype('<f4')
+
+@dataclass(frozen=True)
+class SeriesSummary:
+    """What the series' database row caches about its files."""
+    point_count: int
+    start_ms: int | None
+    end_ms: int | None
+    min_value: float | None
+    max_value: float | None
+
+def as_float(value) -> float:
+    """A float32 value as the float it was stored from (7 significant digits), not its float64 expansion."""
+    return float(f'{value:.7g}')
+
+def sorted_points(timestamps, values) -> tuple[np.ndarray, np.ndarray]:
+    """Batch sorted by timestamp; of duplicate timestamps the last one in the batch wins."""
+    timestamps = np.asarray(timestamps, dtype=TS_DTYPE)
+    values = np.asarray(values, dtype=VALUE_DTYPE)
+    order = np.argsort(timestamps, kind='stable')
+    timestamps, values = timestamps[order], values[order]
+    if len(timestamps) > 1:
+        keep = np.append(timestamps[1:] != timestamps[:-1], True) # Last of each run of equal timestamps
+        timestamps, values = timestamps[keep], values[keep]
+    return timestamps, values
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of the `threshold` points Largest-Triangle-Three-Buckets keeps (always the first and
+    the last). `x` must be ascending; returns every index when there are no more points than that.
+    """
+    if threshold < 3:
+        raise ValueError("LTTB needs a threshold of at least 3 points.")
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64) - float(x[0]) # Relative, so epoch milliseconds keep their precision
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket boundaries over the inner points; bucket i spans edges[i]:edges[i + 1]
+    edges = (np.arange(threshold - 1, dtype=np.float64) * ((n - 2) / (threshold - 2)) + 1).astype(np.int64)
+    edges[-1] = n - 1
+    # Average point of each bucket (the third triangle vertex of the bucket before it), plus the last point
+    counts = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts, x[-1])
+    avg_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+        # Twice the triangle area (a, candidate, next bucket's average); the constant factor does not change the argmax
+        areas = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+class SeriesStore:
+    """Directory of series files; configured from DATASET_STORAGE_DIR by init_app."""
+
+    def __init__(self, root: str | None = None):
+        self.root = root
+        self._lock = threading.Lock()
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def init_app(self, app):
+        self.root = app.config.get('DATASET_STORAGE_DIR') or os.path.join(app.instance_path, 'datasets')
+        os.makedirs(self.root, exist_ok=True)
+        app.extensions['series_store'] = self
+
+    def _paths(self, series_id: int) -> tuple[str, str]:
+        base = os.path.join(self.root, str(int(series_id)))
+        return base + '.ts', base + '.val'
+
+    @contextmanager
+    def _locked(self, series_id: int, exclusive: bool):
+        with self._lock if exclusive else nullcontext():
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.root, f'{int(series_id)}.lock'), 'a+b') as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _length(self, series_id: int) -> int:
+        ts_path, val_path = self._paths(series_id)
+        try:
+            return min(os.path.getsize(ts_path) // TS_DTYPE.itemsize, os.path.getsize(val_path) // VALUE_DTYPE.itemsize)
+        except FileNotFoundError:
+            return 0
+
+    def read(self, series_id: int) -> tuple[np.ndarray, np.ndarray]:
+        """Read-only (timestamps, values) maps of the whole series; empty arrays if it has no points."""
+        with self._locked(series_id, exclusive=False):
+            length = self._length(series_id)
+            if length == 0:
+                return np.empty(0, dtype=TS_DTYPE), np.empty(0, dtype=VALUE_DTYPE)
+            ts_path, val_path = self._paths(series_id)
+            return (np.memmap(ts_path, dtype=TS_DTYPE, mode='r', shape=(length,)),
+                    np.memmap(val_path, dtype=VALUE_DTYPE, mode='r', shape=(length,)))
+
+    def window(self, series_id: int, start_ms: int | None = None, end_ms: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Points with start_ms <= timestamp <= end_ms (either bound optional), as views of the maps."""
+        timestamps, values = self.read(series_id)
+        lo = 0 if start_ms is None else int(np.searchsorted(timestamps, start_ms, side='left'))
+        hi = len(timestamps) if end_ms is None else int(np.searchsorted(timestamps, end_ms, side='right'))
+        return timestamps[lo:hi], values[lo:hi]
+
+    def append(self, series_id: int, timestamps, values) -> tuple[SeriesSummary, int]:
+        """
+        Adds a batch (any order; a timestamp already stored gets the batch's value) and returns
+        the series' new summary and the number of points written.
+        """
+        timestamps, values = sorted_points(timestamps, values)
+        if len(timestamps) == 0:
+            return self.summary(series_id), 0
+        ts_path, val_path = self._paths(series_id)
+        with self._locked(series_id, exclusive=True):
+            length = self._length(series_id)
+            last = None
+            if length:
+                with open(ts_path, 'rb') as handle:
+                    handle.seek((length - 1) * TS_DTYPE.itemsize)
+                    last = int(np.frombuffer(handle.read(TS_DTYPE.itemsize), dtype=TS_DTYPE)[0])
+            if last is None or timestamps[0] > last:
+                for path, data, itemsize in ((val_path, values, VALUE_DTYPE.itemsize), (ts_path, timestamps, TS_DTYPE.itemsize)):
+                    with open(path, 'ab') as handle:
+                        handle.truncate(length * itemsize) # Drops the tail of an interrupted write
+                        handle.write(data.tobytes())
+                        handle.flush()
+                        os.fsync(handle.fileno())
+            else:
+                self._merge(series_id, length, timestamps, values)
+            return self._summary(series_id), len(timestamps)
+
+    def _merge(self, series_id: int, length: int, timestamps: np.ndarray, values: np.ndarray):
+        ts_path, val_path = self._paths(series_id)
+        old_ts = np.fromfile(ts_path, dtype=TS_DTYPE, count=length)
+        old_values = np.fromfile(val_path, dtype=VALUE_DTYPE, count=length)
+        # Stored points first, so sorted_points lets the batch win on equal timestamps
+        merged_ts, merged_values = sorted_points(np.concatenate((old_ts, timestamps)), np.concatenate((old_values, values)))
+        for path, data in ((val_path, merged_values), (ts_path, merged_ts)):
+            temporary = path + '.tmp'
+            with open(temporary, 'wb') as handle:
+                handle.write(data.tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temporary, path)
+
+    def summary(self, series_id: int) -> SeriesSummary:
+        with self._locked(series_id, exclusive=False):
+            return self._summary(series_id)
+
+    def _summary(self, series_id: int) -> SeriesSummary:
+        length = self._length(series_id)
+        if length == 0:
+            return SeriesSummary(0, None, None, None, None)
+        ts_path, val_path = self._paths(series_id)
+        timestamps = np.memmap(ts_path, dtype=TS_DTYPE, mode='r', shape=(length,))
+        values = np.memmap(val_path, dtype=VALUE_DTYPE, mode='r', shape=(length,))
+        return SeriesSummary(length, int(timestamps[0]), int(timestamps[-1]), as_float(values.min()), as_float(values.max()))
+
+    def delete(self, series_id: int):
+        """Removes a series' files (missing files are fine)."""
+        with self._locked(series_id, exclusive=True):
+            for path in self._paths(series_id):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        try:
+            os.remove(os.path.join(self.root, f'{int(series_id)}.lock'))
+        except FileNotFoundError:
+            pass
+
+series_store = SeriesStore()
@@ -0,0 +1,189 @@
+"""
+Per-request phase timing: per-route histograms plus an opt-in `Server-Timing` response header.
+
+Phases (exclusive: time inside a nested phase is counted only there):
+  * jwt       - token decode and user load in @jwt_required
+  * roles     - role check in @roles_required
+  * db        - SQL execution (every cursor execute) and row fetching in read projections
+  * serialize - building response dicts from rows (read_models.project)
+  * json      - JSON encoding of the response body (json_provider)
+  * app       - everything else: routing, controllers, service logic
+  * total     - the whole request as seen by Flask
+
+Code marks a phase with `with phase('name'):`; outside a timed request it is a no-op.
+Histograms (fixed log-spaced millisecond buckets) are kept per "METHOD /rule" and phase in
+process memory and served by GET /metrics/timings.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds in milliseconds; the last bucket is +inf
+BUCKET_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+PHASES = ('jwt', 'roles', 'db', 'serialize', 'json', 'app', 'total')
+
+def _timer():
+    """The current request's phase accumulator, or None when not timing."""
+    if not has_request_context():
+        return None
+    return g.get('_phase_timer')
+
+class _PhaseTimer:
+    """Exclusive per-phase durations for one request, using a stack of open phases."""
+    __slots__ = ('started', 'totals', 'stack')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.totals = {}
+        self.stack = [] # [name, started, child_time] for each open phase
+
+    def enter(self, name: str):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def exit(self):
+        name, started, child_time = self.stack.pop()
+        elapsed = time.perf_counter() - started
+        self.totals[name] = self.totals.get(name, 0.0) + elapsed - child_time
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+@contextmanager
+def phase(name: str):
+    timer = _timer()
+    if timer is None:
+        yield
+        return
+    timer.enter(name)
+    try:
+        yield
+    finally:
+        timer.exit()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timer = _timer()
+    if timer is not None:
+        timer.enter('db')
+        conn.info.setdefault('_phase_depth', []).append(timer)
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    pending = conn.info.get('_phase_depth')
+    if pending:
+        pending.pop().exit()
+
+def _handle_error(exception_context):
+    # The failed execute never reaches after_cursor_execute; close its phase here
+    pending = exception_context.connection.info.get('_phase_depth') if exception_context.connection is not None else None
+    if pending:
+        pending.pop().exit()
+
+class RouteHistograms:
+    """Thread-safe bucket counts and sums per (route, phase)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {} # route -> phase -> [counts list, sum_ms]
+
+    def observe(self, route: str, durations_ms: dict):
+        with self._lock:
+            phases = self._data.setdefault(route, {})
+            for name, value in durations_ms.items():
+                entry = phases.get(name)
+                if entry is None:
+                    entry = phases[name] = [[0] * (len(BUCKET_BOUNDS_MS) + 1), 0.0]
+                index = len(BUCKET_BOUNDS_MS)
+                for position, bound in enumerate(BUCKET_BOUNDS_MS):
+                    if value <= bound:
+                        index = position
+                        break
+                entry[0][index] += 1
+                entry[1] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = {route: {name: (list(counts), total) for name, (counts, total) in phases.items()}
+                    for route, phases in self._data.items()}
+        routes = {}
+        for route, phases in sorted(data.items()):
+            routes[route] = {}
+            for name in sorted(phases, key=lambda n: PHASES.index(n) if n in PHASES else len(PHASES)):
+                counts, total = phases[name]
+                count = sum(counts)
+                routes[route][name] = {
+                    'count': count,
+                    'mean_ms': round(total / count, 3) if count else 0.0,
+                    'p50_ms': _quantile(counts, count, 0.50),
+                    'p95_ms': _quantile(counts, count, 0.95),
+                    'p99_ms': _quantile(counts, count, 0.99),
+                    'buckets': {('+Inf' if i == len(BUCKET_BOUNDS_MS) else str(BUCKET_BOUNDS_MS[i])): c
+                                for i, c in enumerate(counts) if c},
+                }
+        return routes
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+
+def _quantile(counts: list[int], count: int, q: float) -> float | None:
+    """Upper bound of the bucket holding the q-quantile (None if it is the +inf bucket)."""
+    if not count:
+        return None
+    target, cumulative = q * count, 0
+    for position, bucket_count in enumerate(counts):
+        cumulative += bucket_count
+        if cumulative >= target:
+            return BUCKET_BOUNDS_MS[position] if position < len(BUCKET_BOUNDS_MS) else None
+    return None
+
+class ServerTiming:
+    """Flask extension installing the phase timer hooks, header and histograms."""
+
+    _engine_hooks_installed = False
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.emit_header = False
+        self.histograms = RouteHistograms()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SERVER_TIMING_ENABLED', True)
+        self.emit_header = app.config.get('SERVER_TIMING_HEADER', False)
+        app.extensions['server_timing'] = self
+        if not self.enabled:
+            return
+        if not ServerTiming._engine_hooks_installed:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+            ServerTiming._engine_hooks_installed = True
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _before_request(self):
+        g._phase_timer = _PhaseTimer()
+
+    def _after_request(self, response):
+        timer = g.pop('_phase_timer', None)
+        if timer is None:
+            return response
+        while timer.stack: # Phases left open by an early return
+            timer.exit()
+        total = time.perf_counter() - timer.started
+        durations = {name: seconds * 1000 for name, seconds in timer.totals.items()}
+        durations['app'] = max(total * 1000 - sum(durations.values()), 0.0)
+        durations['total'] = total * 1000
+
+        if self.emit_header:
+            response.headers['Server-Timing'] = ', '.join(
+                f'{name};dur={durations[name]:.2f}' for name in PHASES if name in durations
+            )
+        rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+        self.histograms.observe(f'{request.method} {rule}', durations)
+        return response
+
+
+server_timing = ServerTiming()
@@ -35,11 +35,8 @@ const ChapterListItem: React.FC<ChapterListItemProps> = ({ chapter, index }) =>
 
   return (
     <li style={styles.listItem}>
-      <h3 style={styles.title}>{chapter.order}. {chapter.title}</h3> {/* Use chapter.order directly */}
-      {/*
-        If you want to display index (1, 2, 3...) based on array order instead of chapter.order:
-        <h3 style={styles.title}>{index + 1}. {chapter.title}</h3>
-      */}
+      {/* chapter.order is a sparse sort key (e.g. 1024, 2048), so number chapters by list position */}
+      <h3 style={styles.title}>{index + 1}. {chapter.title}</h3>
       <p style={styles.contentPreview}>{contentPreview}</p>
       {/* Add link to full chapter page or expand functionality here later */}
     </li>